@@ -1,4 +1,20 @@
-from dakara_player_vlc.dakara_player_vlc import DakaraPlayerVlc
+import sys
+
 from dakara_player_vlc.version import __version__, __date__
 
 __all__ = ["DakaraPlayerVlc", "__version__", "__date__"]
+
+if sys.version_info >= (3, 7):
+
+    def __getattr__(name):
+        # the player is imported on first access, as it is long to import
+        if name == "DakaraPlayerVlc":
+            from dakara_player_vlc.dakara_player_vlc import DakaraPlayerVlc
+
+            return DakaraPlayerVlc
+
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+
+else:
+    from dakara_player_vlc.dakara_player_vlc import DakaraPlayerVlc  # noqa F401
@@ -1,4 +1,6 @@
 import logging
+import os
+import random
 from os.path import exists
 
 from dakara_base.exceptions import DakaraError
@@ -48,6 +50,23 @@ class BackgroundLoader:
             "other": "/custom/something.png"
         }
 
+    A background can also be taken from a pool, which is a directory of
+    background files. A different file of the pool is used each time the
+    background is renewed with `pick_next`:
+    >>> loader = BackgroundLoader(
+    ...        default_directory=Path("/default"),
+    ...        default_background_filenames={"transition": "transition.png"},
+    ...        background_pools={
+    ...            "transition": {"directory": Path("/pool")}
+    ...        }
+    ...    )
+    >>> loader.load()
+    >>> loader.backgrounds["transition"]
+        "/pool/some_file.png"
+    >>> loader.pick_next("transition")
+    >>> loader.backgrounds["transition"]
+        "/pool/some_other_file.png"
+
     Args:
         default_directory (path.Path): default lookup directory.
         default_background_filenames (dict): dictionary of default background
@@ -55,6 +74,9 @@ class BackgroundLoader:
             file name.
         directory (path.Path): custom lookup directory.
         background_filenames (dict): dictionary of custom background filenames.
+        background_pools (dict): dictionary of background pools. The key is
+            the background name, the value a dictionary of arguments passed to
+            `BackgroundPool`.
 
     Attributes:
         backgrounds (dict): dictionary of background file paths. The key is
@@ -64,6 +86,8 @@ class BackgroundLoader:
             filenames.
         directory (path.Path): custom lookup directory.
         background_filenames (dict): dictionary of custom background filenames.
+        pools (dict): dictionary of background pools. The key is the
+            background name, the value the `BackgroundPool` object.
     """
 
     def __init__(
@@ -72,6 +96,7 @@ class BackgroundLoader:
         default_background_filenames,
         directory=None,
         background_filenames=None,
+        background_pools=None,
     ):
         self.default_directory = default_directory
         self.default_background_filenames = default_background_filenames
@@ -81,6 +106,10 @@ class BackgroundLoader:
             (k, v) for k, v in background_filenames.items() if v
         )
         self.backgrounds = {}
+        background_pools = background_pools or {}
+        self.pools = dict(
+            (k, BackgroundPool(**v)) for k, v in background_pools.items() if v
+        )
 
     def load(self):
         """Load the backgrounds
@@ -89,21 +118,125 @@ class BackgroundLoader:
         for name in self.default_background_filenames:
             self.backgrounds[name] = self.get_background_path(name)
 
-    def get_background_path(self, name):
+        # index the pools and pick their first background
+        for name, pool in self.pools.items():
+            pool.load()
+            self.pick_next(name)
+
+    def prepare_reload(self, directory=None, background_filenames=None):
+        """Resolve the backgrounds with a new custom config without applying it
+
+        Backgrounds taken from a pool are not resolved again, as their pool is
+        refreshed each time a background is picked. The current backgrounds
+        are not modified, so that they are kept if the new ones cannot be
+        found.
+
+        Args:
+            directory (path.Path): custom lookup directory.
+            background_filenames (dict): dictionary of custom background
+                filenames.
+
+        Returns:
+            dict: resolved backgrounds, to give to `reload`.
+
+        Raises:
+            BackgroundNotFoundError: if a background cannot be found.
+        """
+        directory = directory or Path()
+        background_filenames = background_filenames or {}
+        background_filenames = dict(
+            (k, v) for k, v in background_filenames.items() if v
+        )
+
+        return {
+            "directory": directory,
+            "background_filenames": background_filenames,
+            "backgrounds": dict(
+                (name, self.get_background_path(name, directory, background_filenames))
+                for name in self.default_background_filenames
+                if name not in self.pools
+            ),
+        }
+
+    def reload(self, prepared):
+        """Apply the backgrounds resolved by `prepare_reload`
+
+        Args:
+            prepared (dict): backgrounds returned by `prepare_reload`.
+
+        Returns:
+            set: names of the backgrounds whose path has changed.
+        """
+        self.directory = prepared["directory"]
+        self.background_filenames = prepared["background_filenames"]
+
+        changed = set()
+        for name, path in prepared["backgrounds"].items():
+            if path != self.backgrounds.get(name):
+                self.backgrounds[name] = path
+                changed.add(name)
+
+        return changed
+
+    def pick_next(self, name):
+        """Renew a background from its pool
+
+        The pool is refreshed first, so that changes in its directory are taken
+        into account. If the background has no pool or its pool is empty, the
+        background is left unchanged.
+
+        Args:
+            name (str): name of the background.
+
+        Returns:
+            path.Path: path of the background file.
+        """
+        pool = self.pools.get(name)
+        if pool is None:
+            return self.backgrounds[name]
+
+        pool.refresh()
+        path = pool.pick()
+        if path is None:
+            logger.warning("Background pool for %s is empty", name)
+            return self.backgrounds[name]
+
+        logger.debug("Picking %s background file '%s' from pool", name, path)
+        self.backgrounds[name] = path
+
+        return path
+
+    def get_background_path(self, name, directory=None, background_filenames=None):
         """Get the accurate path of one background
+
+        Args:
+            name (str): name of the background.
+            directory (path.Path): custom lookup directory. If not given, the
+                current one is used.
+            background_filenames (dict): dictionary of custom background
+                filenames. If not given, the current one is used.
+
+        Returns:
+            path.Path: path of the background file.
         """
+        if directory is None:
+            directory = self.directory
+
+        if background_filenames is None:
+            background_filenames = self.background_filenames
+
         # trying to load from custom name and custom directory
-        if name in self.background_filenames and self.directory:
-            filename = self.background_filenames[name]
-            path = self.directory / filename
+        if name in background_filenames and directory:
+            filename = background_filenames[name]
+            path = directory / filename
             if exists(path):
                 logger.debug("Loading custom %s background file '%s'", name, path)
                 return path
 
         # trying to load from default name and custom directory
         default_filename = self.default_background_filenames[name]
-        if self.directory:
-            path = self.directory / default_filename
+        if directory:
+            path = directory / default_filename
             if exists(path):
                 logger.debug("Loading default %s background file '%s'", name, path)
                 return path
@@ -119,6 +252,230 @@ class BackgroundLoader:
         )
 
 
+class BackgroundPool:
+    """Pool of background files taken from a directory
+
+    The directory is indexed once on `load`, then `refresh` updates the index
+    incrementally by only scanning the directory when its modification time
+    has changed. Picking a file with `pick` runs in constant time.
+
+    Two strategies are available to pick a file:
+        - "shuffle": the files are picked in a random order, without
+          repetition until all of them have been used;
+        - "weighted": the files are picked randomly according to a weight,
+          which is 1 by default.
+
+    Args:
+        directory (path.Path): directory of the pool.
+        strategy (str): strategy to pick files, either "shuffle" or "weighted".
+        weights (dict): dictionary of weights for the "weighted" strategy. The
+            key is the file name, the value the weight.
+
+    Attributes:
+        directory (path.Path): directory of the pool.
+        strategy (str): strategy to pick files.
+        weights (dict): dictionary of weights.
+        files (set): set of indexed files names.
+        mtime (float): modification time of the directory when it was last
+            indexed.
+    """
+
+    STRATEGIES = ("shuffle", "weighted")
+
+    def __init__(self, directory, strategy="shuffle", weights=None):
+        if strategy not in self.STRATEGIES:
+            raise BackgroundPoolStrategyError(
+                "Unknown background pool strategy '{}'".format(strategy)
+            )
+
+        self.directory = Path(directory)
+        self.strategy = strategy
+        self.weights = weights or {}
+        self.files = set()
+        self.mtime = None
+
+        # state of the shuffle strategy
+        self.bag = []
+        self.last = None
+
+        # state of the weighted strategy
+        self.alias_files = []
+        self.alias_probabilities = []
+        self.alias_indexes = []
+
+    def load(self):
+        """Index the directory of the pool
+
+        Raises:
+            BackgroundNotFoundError: if the directory does not exist.
+        """
+        if not self.directory.isdir():
+            raise BackgroundNotFoundError(
+                "Background pool directory '{}' not found".format(self.directory)
+            )
+
+        self.update()
+        logger.debug(
+            "Indexed %i files in background pool '%s'", len(self.files), self.directory
+        )
+
+    def refresh(self):
+        """Update the index if the directory has changed
+
+        Only a `stat` call is made if the directory has not changed.
+        """
+        try:
+            mtime = os.stat(self.directory).st_mtime
+
+        except OSError:
+            logger.warning("Background pool directory '%s' is gone", self.directory)
+            return
+
+        if mtime != self.mtime:
+            self.update()
+
+    def update(self):
+        """Scan the directory and apply the difference to the index
+
+        If the directory cannot be scanned, the index is left unchanged.
+        """
+        try:
+            mtime = os.stat(self.directory).st_mtime
+            files = set(
+                entry.name
+                for entry in os.scandir(self.directory)
+                if entry.is_file() and not entry.name.startswith(".")
+            )
+
+        except OSError as error:
+            logger.warning(
+                "Unable to scan background pool directory '%s': %s",
+                self.directory,
+                error,
+            )
+            return
+
+        self.mtime = mtime
+
+        added = files - self.files
+        removed = self.files - files
+        if not added and not removed:
+            return
+
+        logger.debug(
+            "Background pool '%s' updated: %i added, %i removed",
+            self.directory,
+            len(added),
+            len(removed),
+        )
+
+        self.files = files
+
+        if self.strategy == "shuffle":
+            # new files are put at random positions in the current bag
+            self.bag = [name for name in self.bag if name not in removed]
+            for name in added:
+                self.bag.insert(random.randint(0, len(self.bag)), name)
+
+            return
+
+        self.build_alias_table()
+
+    def build_alias_table(self):
+        """Build the alias table used by the weighted strategy
+
+        This uses the alias method of Vose, which gives picks in constant time.
+        """
+        files = sorted(self.files)
+        weights = [float(self.weights.get(name, 1)) for name in files]
+        total = sum(weights)
+        count = len(files)
+
+        self.alias_files = files
+        self.alias_probabilities = [0.0] * count
+        self.alias_indexes = [0] * count
+
+        if total <= 0:
+            self.alias_files = []
+            return
+
+        scaled = [weight * count / total for weight in weights]
+        small = [index for index, value in enumerate(scaled) if value < 1]
+        large = [index for index, value in enumerate(scaled) if value >= 1]
+
+        while small and large:
+            index_small = small.pop()
+            index_large = large.pop()
+            self.alias_probabilities[index_small] = scaled[index_small]
+            self.alias_indexes[index_small] = index_large
+            scaled[index_large] -= 1 - scaled[index_small]
+            if scaled[index_large] < 1:
+                small.append(index_large)
+
+            else:
+                large.append(index_large)
+
+        for index in small + large:
+            self.alias_probabilities[index] = 1.0
+
+    def pick(self):
+        """Pick a file from the pool
+
+        Returns:
+            path.Path: path of the picked file, or None if the pool is empty.
+        """
+        if not self.files:
+            return None
+
+        if self.strategy == "shuffle":
+            name = self.pick_shuffle()
+
+        else:
+            name = self.pick_weighted()
+
+        if name is None:
+            return None
+
+        return (self.directory / name).normpath()
+
+    def pick_shuffle(self):
+        """Pick a file with the shuffle strategy
+
+        Returns:
+            str: name of the picked file.
+        """
+        if not self.bag:
+            self.bag = list(self.files)
+            random.shuffle(self.bag)
+
+            # prevent to play the same file twice in a row when refilling
+            if len(self.bag) > 1 and self.bag[-1] == self.last:
+                self.bag[0], self.bag[-1] = self.bag[-1], self.bag[0]
+
+        self.last = self.bag.pop()
+        return self.last
+
+    def pick_weighted(self):
+        """Pick a file with the weighted strategy
+
+        Returns:
+            str: name of the picked file.
+        """
+        if not self.alias_files:
+            return None
+
+        index = random.randrange(len(self.alias_files))
+        if random.random() >= self.alias_probabilities[index]:
+            index = self.alias_indexes[index]
+
+        return self.alias_files[index]
+
+
 class BackgroundNotFoundError(DakaraError, FileNotFoundError):
     """Error raised when a background cannot be found
     """
+
+
+class BackgroundPoolStrategyError(DakaraError, ValueError):
+    """Error raised when the strategy of a background pool is unknown
+    """
@@ -0,0 +1,66 @@
+import random
+
+
+class Backoff:
+    """Capped exponential backoff with full jitter
+
+    The delay before the next attempt is chosen randomly between 0 and an
+    upper bound, which starts at `base` and doubles after each attempt, up to
+    `cap`. The randomness spreads the attempts of many clients that failed at
+    the same time, instead of having them retry all together.
+
+    Example of use:
+
+    >>> backoff = Backoff(1, 60)
+    >>> backoff.get_delay()
+    0.63
+    >>> backoff.get_delay()
+    1.52
+    >>> backoff.reset()
+
+    Args:
+        base (float): upper bound of the first delay in seconds.
+        cap (float): maximum upper bound of the delay in seconds.
+        random_generator (random.Random): random generator to use. If not
+            given, the module generator is used.
+
+    Attributes:
+        base (float): upper bound of the first delay in seconds.
+        cap (float): maximum upper bound of the delay in seconds.
+        attempt (int): number of delays given since the last reset.
+    """
+
+    def __init__(self, base, cap, random_generator=None):
+        self.base = base
+        self.cap = max(base, cap)
+        self.random = random_generator or random
+        self.attempt = 0
+
+    def get_upper_bound(self):
+        """Get the upper bound of the next delay
+
+        Returns:
+            float: upper bound in seconds.
+        """
+        upper_bound = self.base * 2 ** self.attempt
+        if upper_bound >= self.cap:
+            return self.cap
+
+        return upper_bound
+
+    def get_delay(self):
+        """Get the delay before the next attempt
+
+        Returns:
+            float: delay in seconds.
+        """
+        upper_bound = self.get_upper_bound()
+        if upper_bound < self.cap:
+            self.attempt += 1
+
+        return self.random.uniform(0, upper_bound)
+
+    def reset(self):
+        """Start again from the first delay
+        """
+        self.attempt = 0
@@ -5,6 +5,7 @@
 
 import logging
 from argparse import ArgumentParser
+from contextlib import ExitStack
 
 from dakara_base.exceptions import DakaraError
 from dakara_base.config import (
@@ -16,7 +17,8 @@ from dakara_base.config import (
     set_loglevel,
 )
 
-from dakara_player_vlc import DakaraPlayerVlc
+from dakara_player_vlc.log_queue import LogQueue
+from dakara_player_vlc.startup_trace import StartupTrace, TRACE_FILE_NAME
 from dakara_player_vlc.version import __version__, __date__
 
 
@@ -46,6 +48,22 @@ def get_parser():
         help="enable debug output, increase verbosity",
     )
 
+    parser.add_argument(
+        "--trace-startup",
+        nargs="?",
+        const=TRACE_FILE_NAME,
+        metavar="FILE",
+        help="record the duration of the startup and shutdown phases, print "
+        "them and write them as JSON in FILE (default: {})".format(TRACE_FILE_NAME),
+    )
+
+    parser.add_argument(
+        "--log-queue",
+        action="store_true",
+        help="write the logs in a background thread, so that the player does "
+        "not wait for them; logs are dropped if they are produced too fast",
+    )
+
     parser.add_argument(
         "--version",
         action="version",
@@ -78,15 +96,23 @@ def play(args):
     Args:
         args (argparse.Namespace): arguments from command line.
     """
+    # the trace is written only if requested
+    trace = StartupTrace()
+
+    # the player is imported only now, so that other commands start quickly
+    with trace.span("command/import player"):
+        from dakara_player_vlc.dakara_player_vlc import DakaraPlayerVlc
+
     create_logger()
 
     # load the config, display help to create config if it fails
     try:
-        config = load_config(
-            get_config_file(CONFIG_FILE),
-            args.debug,
-            mandatory_keys=["player", "server"],
-        )
+        with trace.span("command/load config"):
+            config = load_config(
+                get_config_file(CONFIG_FILE),
+                args.debug,
+                mandatory_keys=["player", "server"],
+            )
 
     except ConfigNotFoundError as error:
         raise ConfigNotFoundError(
@@ -94,22 +120,58 @@ def play(args):
         ) from error
 
     set_loglevel(config)
-    dakara = DakaraPlayerVlc(config)
 
-    # load the feeder, consider that the config is incomplete if it fails
-    try:
-        dakara.load()
+    # in multi-room mode, each room runs its own player in a process
+    config_rooms = config.get("rooms") or {}
+    if config_rooms.get("enabled", False):
+        from dakara_player_vlc.rooms import RoomSupervisor
 
-    except DakaraError:
-        logger.warning(
-            "Config may be incomplete, please check '{}'".format(
-                get_config_file(CONFIG_FILE)
-            )
+        dakara = RoomSupervisor(config, trace=trace)
+
+    else:
+        dakara = DakaraPlayerVlc(
+            config, trace=trace, config_path=get_config_file(CONFIG_FILE)
         )
-        raise
 
-    # run the player
-    dakara.run()
+    with ExitStack() as stack:
+        # the handlers of the logger must be set up before
+        if args.log_queue:
+            stack.enter_context(LogQueue())
+
+        try:
+            # load the feeder, consider that the config is incomplete if it
+            # fails
+            try:
+                dakara.load()
+
+            except DakaraError:
+                logger.warning(
+                    "Config may be incomplete, please check '{}'".format(
+                        get_config_file(CONFIG_FILE)
+                    )
+                )
+                raise
+
+            # run the player
+            dakara.run()
+
+        finally:
+            if args.trace_startup:
+                write_trace(trace, args.trace_startup)
+
+
+def write_trace(trace, path):
+    """Print the startup trace and write it as JSON
+
+    Args:
+        trace (startup_trace.StartupTrace): trace to write.
+        path (str): path of the JSON file.
+    """
+    print("Startup and shutdown phases, from the longest to the shortest:")
+    for line in trace.get_summary():
+        print(line)
+
+    trace.write(path)
 
 
 def create_config(args):
@@ -0,0 +1,177 @@
+import logging
+import os
+from threading import Event
+
+import yaml
+from dakara_base.config import load_config
+from dakara_base.exceptions import DakaraError
+from dakara_base.safe_workers import Worker
+from path import Path
+
+
+WATCH_INTERVAL = 5
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigReloader(Worker):
+    """Reload the config of the media player without restarting
+
+    The config file is loaded again when a reload is requested, by instance
+    when the program receives a SIGHUP signal, or when the config file, a file
+    of the custom templates directory or a file of the custom backgrounds
+    directory has changed. These files are watched by comparing their
+    modification times every `watch_interval` seconds.
+
+    The new config is given to the media player, which applies it on next
+    transition or idle screen. If the config file cannot be loaded or is not
+    valid, the current config is kept.
+
+    Example of use:
+
+    >>> with ConfigReloader(
+    ...     stop, errors, media_player, Path("config.yaml"), config["player"]
+    ... ) as config_reloader:
+    ...     config_reloader.thread.start()
+    ...     config_reloader.request_reload()
+
+    Args:
+        stop (Event): event to stop the program.
+        errors (Queue): queue of errors.
+        media_player (media_player.MediaPlayer): media player to reload.
+        config_path (path.Path): path of the config file.
+        config (dict): current config of the player.
+        watch_interval (float): interval in seconds between two checks of the
+            watched files. If 0, the files are not watched.
+        reload_requested (threading.Event): event set to request a reload. If
+            not given, a new one is created.
+
+    Attributes:
+        media_player (media_player.MediaPlayer): media player to reload.
+        config_path (path.Path): path of the config file.
+        config (dict): current config of the player.
+        watch_interval (float): interval in seconds between two checks of the
+            watched files.
+        reload_requested (threading.Event): event set to request a reload.
+        snapshot (dict): modification time of each watched file, by path.
+        thread (SafeThread): thread watching the files.
+    """
+
+    def init_worker(
+        self,
+        media_player,
+        config_path,
+        config,
+        watch_interval=WATCH_INTERVAL,
+        reload_requested=None,
+    ):
+        self.media_player = media_player
+        self.config_path = Path(config_path)
+        self.config = config
+        self.watch_interval = watch_interval
+        self.reload_requested = reload_requested or Event()
+        self.snapshot = self.get_snapshot()
+
+        # create the watching thread
+        self.thread = self.create_thread(target=self.run)
+
+    def request_reload(self):
+        """Request to reload the config
+        """
+        self.reload_requested.set()
+
+    def get_watched_directories(self):
+        """Get the custom directories of templates and backgrounds
+
+        Returns:
+            list of path.Path: directories given in the current config.
+        """
+        directories = []
+        for key in ("templates", "backgrounds"):
+            directory = (self.config.get(key) or {}).get("directory")
+            if directory:
+                directories.append(Path(directory))
+
+        return directories
+
+    def get_snapshot(self):
+        """Get the modification time of the watched files
+
+        Returns:
+            dict: modification time of each watched file, by path.
+        """
+        snapshot = {}
+        paths = [self.config_path]
+        for directory in self.get_watched_directories():
+            try:
+                paths.extend(
+                    entry.path for entry in os.scandir(directory) if entry.is_file()
+                )
+
+            except OSError:
+                continue
+
+        for path in paths:
+            try:
+                snapshot[path] = os.stat(path).st_mtime
+
+            except OSError:
+                continue
+
+        return snapshot
+
+    def has_changed(self):
+        """Tell if a watched file has changed since the last check
+
+        Returns:
+            bool: True if a file has been modified, added or removed.
+        """
+        snapshot = self.get_snapshot()
+        changed = snapshot != self.snapshot
+        self.snapshot = snapshot
+
+        return changed
+
+    def run(self):
+        """Reload the config when requested or when a watched file changes
+        """
+        while not self.stop.is_set():
+            self.reload_requested.wait(self.watch_interval or None)
+            if self.stop.is_set():
+                # the event is shared with the next reloader after a restart
+                self.reload_requested.clear()
+                break
+
+            if self.reload_requested.is_set():
+                self.reload_requested.clear()
+                logger.info("Config reload requested")
+                self.reload()
+                continue
+
+            if self.watch_interval and self.has_changed():
+                logger.info("Config files changed")
+                self.reload()
+
+    def reload(self):
+        """Load the config file again and give it to the media player
+        """
+        try:
+            config = load_config(self.config_path, False, mandatory_keys=["player"])
+
+        except (DakaraError, yaml.YAMLError, OSError, TypeError) as error:
+            logger.error("Unable to reload config: %s", error)
+            return
+
+        if not isinstance(config, dict) or not isinstance(config["player"], dict):
+            logger.error("Unable to reload config: 'player' must be a mapping")
+            return
+
+        self.config = config["player"]
+        self.snapshot = self.get_snapshot()
+        self.media_player.request_reload(self.config)
+
+    def exit_worker(self, *args, **kwargs):
+        """Wake up the watching thread so that it ends
+        """
+        self.reload_requested.set()
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import sys
+import time
+from functools import wraps
+
+from dakara_base.safe_workers import Worker
+
+
+logger = logging.getLogger(__name__)
+
+
+class Coordinator(Worker):
+    """Run the handlers of the events of the player on one event loop
+
+    The events come from several threads: the thread of the WebSocket client
+    for the orders of the server, and the threads of the media player for its
+    events. Handlers wrapped with `wrap` are not called in these threads, but
+    scheduled with `call_soon_threadsafe` on an asyncio event loop running in
+    its own thread. The handlers are thus called one at a time, in the order
+    of the events, and the state they share needs no locks. The thread that
+    emits an event does not wait for it to be handled.
+
+    If a handler raises an error, the error is put in the errors queue and the
+    program stops, as for a safe thread.
+
+    Example of use:
+
+    >>> with Coordinator(stop, errors) as coordinator:
+    ...     coordinator.thread.start()
+    ...     media_player.set_callback(
+    ...         "finished", coordinator.wrap(manager.handle_finished)
+    ...     )
+
+    Args:
+        stop (Event): event to stop the program.
+        errors (Queue): queue of errors.
+
+    Attributes:
+        loop (asyncio.AbstractEventLoop): event loop of the handlers.
+        thread (SafeThread): thread running the event loop.
+        events_count (int): number of events handled.
+        delay_max (float): maximum delay between an event and the call of its
+            handler, in seconds.
+    """
+
+    def init_worker(self):
+        self.loop = asyncio.new_event_loop()
+        self.events_count = 0
+        self.delay_max = 0
+
+        # create the event loop thread
+        self.thread = self.create_thread(target=self.run)
+
+    def run(self):
+        """Run the event loop until the worker exits
+        """
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def call(self, function, *args):
+        """Schedule a call of a function on the event loop
+
+        Args:
+            function (function): function to call.
+            Extra arguments are passed to the function.
+        """
+        try:
+            self.loop.call_soon_threadsafe(
+                self.run_handler, function, args, time.monotonic()
+            )
+
+        except RuntimeError:
+            logger.debug("Event ignored, the event loop is closed")
+
+    def wrap(self, function):
+        """Get a function that schedules calls of a function on the event loop
+
+        Args:
+            function (function): function to call.
+
+        Returns:
+            function: function with the same arguments, that returns
+            immediately.
+        """
+
+        @wraps(function)
+        def wrapper(*args):
+            self.call(function, *args)
+
+        return wrapper
+
+    def run_handler(self, function, args, scheduled_time):
+        """Call a handler within the event loop
+
+        Args:
+            function (function): handler to call.
+            args (tuple): arguments of the handler.
+            scheduled_time (float): monotonic time of the event.
+        """
+        self.events_count += 1
+        self.delay_max = max(self.delay_max, time.monotonic() - scheduled_time)
+
+        try:
+            function(*args)
+
+        except BaseException:
+            self.errors.put_nowait(sys.exc_info())
+            self.stop.set()
+            self.loop.stop()
+
+    def exit_worker(self, *args, **kwargs):
+        """Stop the event loop and log its statistics
+        """
+        if self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+        self.loop.close()
+
+        if self.events_count:
+            logger.debug(
+                "Handled %i events, with a maximum delay of %.1f ms",
+                self.events_count,
+                self.delay_max * 1000,
+            )
@@ -0,0 +1,75 @@
+import time
+
+
+class CpuUsageMeter:
+    """Measure the CPU usage of the whole process over a period
+
+    The CPU time accounts for all the threads of the process, including the
+    ones of the media player library.
+
+    Example of use:
+
+    >>> meter = CpuUsageMeter()
+    >>> meter.start()
+    >>> # do stuff
+    >>> cpu_time, duration, usage = meter.stop()
+
+    Attributes:
+        start_cpu_time (float): CPU time of the process at the start of the
+            measure. None if no measure is running.
+        start_time (float): monotonic time at the start of the measure.
+    """
+
+    def __init__(self):
+        self.start_cpu_time = None
+        self.start_time = None
+
+    def is_running(self):
+        """Check if a measure is running
+
+        Returns:
+            bool: True if a measure is running.
+        """
+        return self.start_cpu_time is not None
+
+    def start(self):
+        """Start a measure
+
+        Does nothing if a measure is already running.
+        """
+        if self.is_running():
+            return
+
+        self.start_cpu_time = time.process_time()
+        self.start_time = time.monotonic()
+
+    def get_usage(self):
+        """Get the CPU usage since the start of the measure
+
+        Returns:
+            tuple: contains the following elements:
+                float: CPU time used in seconds;
+                float: duration of the measure in seconds;
+                float: CPU usage in percent of one core.
+            None if no measure is running.
+        """
+        if not self.is_running():
+            return None
+
+        cpu_time = time.process_time() - self.start_cpu_time
+        duration = time.monotonic() - self.start_time
+        usage = 100 * cpu_time / duration if duration > 0 else 0.0
+
+        return cpu_time, duration, usage
+
+    def stop(self):
+        """Stop the measure
+
+        Returns:
+            tuple: see `get_usage`.
+        """
+        usage = self.get_usage()
+        self.start_cpu_time = None
+        self.start_time = None
+
+        return usage
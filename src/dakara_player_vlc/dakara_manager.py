@@ -14,42 +14,94 @@ class DakaraManager:
         font_loader (font_loader.FontLoader): object for font
             installation/deinstallation.
         media_player (media_player.MediaPlayer): interface to VLC.
-        dakara_server_http (dakara_server.DakaraServerHTTPConnection):
-            interface to the Dakara server for the HTTP protocol.
+        dakara_server_http (status_sender.StatusSender): interface to send
+            status events to the Dakara server. A
+            `dakara_server.DakaraServerHTTPConnection` can be used as well to
+            send them synchronously.
         dakara_server_websocket
             (dakara_server.DakaraServerWebSocketConnection): interface to the
             Dakara server for the Websocket protocol.
+        player_state (player_state.PlayerState): persistent state of the
+            player, used to resume a song after a restart. Optional.
+        playlist_prefetcher (playlist_prefetcher.PlaylistPrefetcher):
+            preparation of the upcoming playlist entries. Optional.
+        history_warmer (history_warmer.HistoryWarmer): warming of the most
+            played songs, fed with the songs played. Optional.
+        coordinator (coordinator.Coordinator): event loop where the callbacks
+            of the media player and of the WebSocket connection are run, one
+            at a time and in order. If not given, they are run in the thread
+            that triggers them.
     """
 
     def __init__(
-        self, font_loader, media_player, dakara_server_http, dakara_server_websocket
+        self,
+        font_loader,
+        media_player,
+        dakara_server_http,
+        dakara_server_websocket,
+        player_state=None,
+        playlist_prefetcher=None,
+        history_warmer=None,
+        coordinator=None,
     ):
         # set modules up
         self.font_loader = font_loader
         self.media_player = media_player
         self.dakara_server_http = dakara_server_http
         self.dakara_server_websocket = dakara_server_websocket
+        self.player_state = player_state
+        self.playlist_prefetcher = playlist_prefetcher
+        self.history_warmer = history_warmer
+        self.coordinator = coordinator
+
+        # last playlist entry requested to play
+        self.playlist_entry = None
 
         # set player callbacks
         self.media_player.set_callback(
-            "started_transition", self.handle_started_transition
+            "started_transition", self.coordinate(self.handle_started_transition)
+        )
+        self.media_player.set_callback(
+            "started_song", self.coordinate(self.handle_started_song)
+        )
+        self.media_player.set_callback(
+            "could_not_play", self.coordinate(self.handle_could_not_play)
         )
-        self.media_player.set_callback("started_song", self.handle_started_song)
-        self.media_player.set_callback("could_not_play", self.handle_could_not_play)
-        self.media_player.set_callback("finished", self.handle_finished)
-        self.media_player.set_callback("paused", self.handle_paused)
-        self.media_player.set_callback("resumed", self.handle_resumed)
-        self.media_player.set_callback("error", self.handle_error)
+        self.media_player.set_callback(
+            "finished", self.coordinate(self.handle_finished)
+        )
+        self.media_player.set_callback("paused", self.coordinate(self.handle_paused))
+        self.media_player.set_callback("resumed", self.coordinate(self.handle_resumed))
+        self.media_player.set_callback("error", self.coordinate(self.handle_error))
 
         # set dakara server websocket callbacks
-        self.dakara_server_websocket.set_callback("idle", self.play_idle_screen)
         self.dakara_server_websocket.set_callback(
-            "playlist_entry", self.play_playlist_entry
+            "idle", self.coordinate(self.play_idle_screen)
         )
-        self.dakara_server_websocket.set_callback("command", self.do_command)
         self.dakara_server_websocket.set_callback(
-            "connection_lost", self.play_idle_screen
+            "playlist_entry", self.coordinate(self.play_playlist_entry)
         )
+        self.dakara_server_websocket.set_callback(
+            "command", self.coordinate(self.do_command)
+        )
+        self.dakara_server_websocket.set_callback(
+            "connection_lost", self.coordinate(self.play_idle_screen)
+        )
+
+    def coordinate(self, callback):
+        """Get a callback run by the coordinator, if any
+
+        Args:
+            callback (function): callback to run.
+
+        Returns:
+            function: callback scheduled on the event loop of the coordinator,
+            or the callback itself if there is no coordinator.
+        """
+        if self.coordinator is None:
+            return callback
+
+        return self.coordinator.wrap(callback)
 
     def handle_error(self, playlist_entry_id, message):
         """Callback when a media player error occurs
@@ -63,9 +115,31 @@ class DakaraManager:
     def handle_finished(self, playlist_entry_id):
         """Callback when a playlist entry finishes
 
+        The song is recorded in the play history.
+
+        Args:
+            playlist_entry_id (int): playlist entry ID.
+        """
+        if (
+            self.history_warmer is not None
+            and self.playlist_entry is not None
+            and self.playlist_entry["id"] == playlist_entry_id
+        ):
+            self.history_warmer.record_finished(
+                self.playlist_entry["song"]["file_path"]
+            )
+
+        self.end_playlist_entry(playlist_entry_id)
+
+    def end_playlist_entry(self, playlist_entry_id):
+        """Report that a playlist entry has ended, finished or skipped
+
         Args:
             playlist_entry_id (int): playlist entry ID.
         """
+        if self.player_state is not None:
+            self.player_state.clear()
+
         self.dakara_server_http.update_finished(playlist_entry_id)
 
     def handle_started_transition(self, playlist_entry_id):
@@ -82,6 +156,15 @@ class DakaraManager:
         Args:
             playlist_entry_id (int): playlist entry ID.
         """
+        if (
+            self.player_state is not None
+            and self.playlist_entry is not None
+            and self.playlist_entry["id"] == playlist_entry_id
+        ):
+            self.player_state.set_playing(
+                playlist_entry_id, self.playlist_entry["song"]["file_path"]
+            )
+
         self.dakara_server_http.update_started_song(playlist_entry_id)
 
     def handle_could_not_play(self, playlist_entry_id):
@@ -90,6 +173,9 @@ class DakaraManager:
         Args:
             playlist_entry_id (int): playlist entry ID.
         """
+        if self.player_state is not None:
+            self.player_state.clear()
+
         self.dakara_server_http.update_could_not_play(playlist_entry_id)
 
     def handle_paused(self, playlist_entry_id, timing):
@@ -97,7 +183,7 @@ class DakaraManager:
 
         Args:
             playlist_entry_id (int): playlist entry ID.
-            timing (int): position of the player in seconds.
+            timing (float): position of the player in seconds.
         """
         self.dakara_server_http.update_paused(playlist_entry_id, timing)
 
@@ -106,23 +192,72 @@ class DakaraManager:
 
         Args:
             playlist_entry_id (int): playlist entry ID.
-            timing (int): position of the player in seconds.
+            timing (float): position of the player in seconds.
         """
         self.dakara_server_http.update_resumed(playlist_entry_id, timing)
 
     def play_playlist_entry(self, playlist_entry):
         """Play the requested playlist entry
 
+        If the player was playing the same playlist entry before being
+        restarted, the song is resumed where it stopped. If the player is
+        already playing it, nothing is done.
+
         Args:
             playlist_entry (dict): dictionary of the playlist entry.
         """
+        # the server sends the current playlist entry again after a
+        # reconnection
+        if self.media_player.playing_id == playlist_entry["id"]:
+            logger.debug("Playlist entry %i already playing", playlist_entry["id"])
+            return
+
+        self.playlist_entry = playlist_entry
+
+        # the queue of upcoming playlist entries has changed
+        if self.playlist_prefetcher is not None:
+            self.playlist_prefetcher.request_poll()
+
+        if self.history_warmer is not None:
+            self.history_warmer.count_play(playlist_entry["song"]["file_path"])
+
+        saved_state = self.pop_saved_state()
+        if (
+            saved_state is not None
+            and saved_state["playlist_entry_id"] == playlist_entry["id"]
+            and saved_state["file_path"] == str(playlist_entry["song"]["file_path"])
+        ):
+            logger.info("Resuming playlist entry %i", playlist_entry["id"])
+            self.media_player.resume_playlist_entry(
+                playlist_entry, saved_state["timing"]
+            )
+            return
+
         self.media_player.play_playlist_entry(playlist_entry)
 
     def play_idle_screen(self):
         """Play the idle screen
         """
+        self.pop_saved_state()
+        if self.player_state is not None:
+            self.player_state.clear()
+
         self.media_player.play_idle_screen()
 
+    def pop_saved_state(self):
+        """Get the state saved before the player was restarted
+
+        The saved state can be used only once, as the first order of the
+        server tells if the playlist entry is still current.
+
+        Returns:
+            dict: saved state, None if there is no saved state.
+        """
+        if self.player_state is None:
+            return None
+
+        return self.player_state.pop_saved_state()
+
     def do_command(self, command):
         """Execute a player command
 
@@ -147,5 +282,6 @@ class DakaraManager:
             return
 
         if command == "skip":
-            self.handle_finished(self.media_player.playing_id)
+            # a skipped song is not recorded in the play history
+            self.end_playlist_entry(self.media_player.playing_id)
             self.play_idle_screen()
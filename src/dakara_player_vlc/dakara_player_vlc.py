@@ -1,19 +1,52 @@
 import logging
+import signal
 from contextlib import ExitStack
 from tempfile import TemporaryDirectory
+from threading import Event
 
+from dakara_base.config import get_config_directory
 from dakara_base.safe_workers import Runner, WorkerSafeThread
 from path import Path
 
+from dakara_player_vlc.config_reloader import ConfigReloader, WATCH_INTERVAL
+from dakara_player_vlc.coordinator import Coordinator
 from dakara_player_vlc.font_loader import get_font_loader_class
 from dakara_player_vlc.dakara_manager import DakaraManager
 from dakara_player_vlc.dakara_server import (
     DakaraServerHTTPConnection,
     DakaraServerWebSocketConnection,
+    TOKEN_CACHE_FILE_NAME,
+)
+from dakara_player_vlc.history_warmer import BUDGET, HistoryWarmer, WARM_INTERVAL
+from dakara_player_vlc.media_player import get_media_player_class, MEDIA_PLAYERS
+from dakara_player_vlc.play_history import HISTORY_FILE_NAME, PlayHistory
+from dakara_player_vlc.server_selector import (
+    get_server_configs,
+    PROBE_INTERVAL,
+    ServerSelector,
+)
+from dakara_player_vlc.playlist_prefetcher import (
+    COUNT,
+    PlaylistPrefetcher,
+    POLL_INTERVAL,
+    WARM_SIZE,
+)
+from dakara_player_vlc.player_state import FLUSH_INTERVAL, PlayerState, STATE_FILE_NAME
+from dakara_player_vlc.status_journal import JOURNAL_FILE_NAME, StatusJournal
+from dakara_player_vlc.startup import StartupOrchestrator
+from dakara_player_vlc.startup_trace import StartupTrace
+from dakara_player_vlc.supervisor import (
+    MAX_RESTARTS,
+    RESTART_DELAY,
+    RESTART_DELAY_MAX,
+    Supervisor,
+)
+from dakara_player_vlc.status_sender import (
+    RETRY_DELAY,
+    RETRY_DELAY_MAX,
+    StatusSender,
 )
-from dakara_player_vlc.mpv_player import MpvPlayer
 from dakara_player_vlc.version import check_version
-from dakara_player_vlc.vlc_player import VlcPlayer
 
 FontLoader = get_font_loader_class()
 
@@ -28,16 +61,28 @@ class DakaraPlayerVlc(Runner):
     user Ctrl+C to be fired.
     """
 
-    def init_runner(self, config):
+    def init_runner(self, config, trace=None, config_path=None, load_fonts=True):
         """Initialization
 
         Creates the worker stop event.
 
         Args:
             config (dict): configuration for the program.
+            trace (startup_trace.StartupTrace): trace of the startup and
+                shutdown phases. Optional.
+            config_path (path.Path): path of the config file, to reload it.
+                Optional.
+            load_fonts (bool): if false, the fonts are considered already
+                loaded, by instance by the supervisor of rooms.
         """
         # store arguments
         self.config = config
+        self.trace = trace or StartupTrace()
+        self.config_path = config_path
+        self.load_fonts = load_fonts
+
+        # event to request a reload of the config
+        self.reload_requested = Event()
 
         # inform the user
         logger.debug("Started main")
@@ -46,12 +91,37 @@ class DakaraPlayerVlc(Runner):
         """Execute side-effect actions
         """
         # check version
-        check_version()
+        with self.trace.span("load/check version"):
+            check_version()
 
     def run(self):
         """Launch the worker and wait for the end
+
+        On systems that have it, the SIGHUP signal requests a reload of the
+        config during the execution.
         """
-        self.run_safe(DakaraWorker, self.config)
+        has_sighup = hasattr(signal, "SIGHUP")
+        if has_sighup:
+            previous_handler = signal.signal(signal.SIGHUP, self.handle_sighup)
+
+        try:
+            self.run_safe(
+                DakaraWorker,
+                self.config,
+                self.trace,
+                self.config_path,
+                self.reload_requested,
+                self.load_fonts,
+            )
+
+        finally:
+            if has_sighup:
+                signal.signal(signal.SIGHUP, previous_handler)
+
+    def handle_sighup(self, signum, frame):
+        """Request a reload of the config on SIGHUP
+        """
+        self.reload_requested.set()
 
 
 class DakaraWorker(WorkerSafeThread):
@@ -61,15 +131,34 @@ class DakaraWorker(WorkerSafeThread):
     the main thread and waits for the end.
     """
 
-    def init_worker(self, config):
+    def init_worker(
+        self,
+        config,
+        trace=None,
+        config_path=None,
+        reload_requested=None,
+        load_fonts=True,
+    ):
         """Initialization
 
         Load the config and set the logger loglevel.
 
         Args:
             config (dict): configuration for the program.
+            trace (startup_trace.StartupTrace): trace of the startup and
+                shutdown phases. Optional.
+            config_path (path.Path): path of the config file, to reload it.
+                Optional.
+            reload_requested (threading.Event): event set to request a reload
+                of the config. Optional.
+            load_fonts (bool): if false, the fonts are considered already
+                loaded.
         """
         self.config = config
+        self.trace = trace or StartupTrace()
+        self.config_path = config_path
+        self.reload_requested = reload_requested or Event()
+        self.load_fonts = load_fonts
 
         # set thread
         self.thread = self.create_thread(target=self.run)
@@ -77,12 +166,342 @@ class DakaraWorker(WorkerSafeThread):
         # inform the user
         logger.debug("Starting Dakara worker")
 
+    def start_font_loader(self, startup):
+        """Load the fonts
+
+        This is a startup phase.
+
+        Args:
+            startup (startup.StartupOrchestrator): orchestrator of the startup
+                phases.
+
+        Returns:
+            font_loader.FontLoader: font loader, None if the fonts are already
+            loaded.
+        """
+        if not self.load_fonts:
+            return None
+
+        font_loader = startup.enter_context(FontLoader())
+        with self.trace.span("fonts/load"):
+            font_loader.load()
+
+        return font_loader
+
+    def start_media_player(self, startup, group):
+        """Create and load the media player
+
+        This is a startup phase.
+
+        Args:
+            startup (startup.StartupOrchestrator): orchestrator of the startup
+                phases.
+            group (supervisor.ComponentGroup): group of the backend
+                components, the media player is added to.
+
+        Returns:
+            media_player.MediaPlayer: media player.
+        """
+        # only the library of the selected media player is loaded
+        config_player_name = self.config["player"].get("player_name", "vlc")
+        if config_player_name not in MEDIA_PLAYERS:
+            logger.error("Unknown player name: %s", config_player_name)
+            raise NotImplementedError
+
+        with self.trace.span("media player/create"):
+            media_player_class = get_media_player_class(config_player_name)
+            media_player = media_player_class(
+                group.stop, group.errors, self.config["player"], self.tempdir
+            )
+
+        media_player = startup.enter_context(media_player, group.stack)
+        with self.trace.span("media player/load"):
+            media_player.load()
+
+        return media_player
+
+    def start_server_http(self, startup):
+        """Select the server and authenticate to it
+
+        This is a startup phase.
+
+        Args:
+            startup (startup.StartupOrchestrator): orchestrator of the startup
+                phases.
+
+        Returns:
+            tuple: contains the server selector, None if there is only one
+            endpoint, the config of the selected server and the HTTP
+            connection to it.
+        """
+        # selection of the dakara server among several endpoints
+        server_configs = get_server_configs(self.config["server"])
+        server_config = server_configs[0]
+        server_selector = None
+        if len(server_configs) > 1:
+            server_selector = startup.enter_context(
+                ServerSelector(
+                    self.stop,
+                    self.errors,
+                    server_configs,
+                    probe_interval=self.config["server"].get(
+                        "probe_interval", PROBE_INTERVAL
+                    ),
+                )
+            )
+            with self.trace.span("server/select"):
+                server_config = server_selector.select()
+
+        # communication with the dakara HTTP server
+        config_token_cache = self.config["server"].get("token_cache") or {}
+        token_cache_path = None
+        if config_token_cache.get("enabled", False):
+            token_cache_path = Path(
+                config_token_cache.get("cache_file")
+                or get_config_directory().expand() / TOKEN_CACHE_FILE_NAME
+            )
+
+        dakara_server_http = DakaraServerHTTPConnection(
+            server_config, endpoint_prefix="api/", token_cache_path=token_cache_path,
+        )
+        startup.callback(dakara_server_http.close)
+        startup.callback(dakara_server_http.log_latency_stats)
+        with self.trace.span("server/authenticate"):
+            dakara_server_http.authenticate_cached()
+
+        with self.trace.span("server/warm up"):
+            dakara_server_http.warm_up()
+
+        return server_selector, server_config, dakara_server_http
+
+    def start_backend(self, group):
+        """Start the components that depend on the media player only
+
+        Args:
+            group (supervisor.ComponentGroup): group of the backend
+                components.
+        """
+        # persistent state of the player
+        config_resume = self.config["player"].get("resume") or {}
+        self.player_state = None
+        if config_resume.get("enabled", False):
+            self.player_state = self.trace.enter_context(
+                group.stack,
+                PlayerState(
+                    group.stop,
+                    group.errors,
+                    Path(
+                        config_resume.get("state_file")
+                        or get_config_directory().expand() / STATE_FILE_NAME
+                    ),
+                    self.media_player.get_timing,
+                    config_resume.get("flush_interval", FLUSH_INTERVAL),
+                ),
+            )
+            self.player_state.load()
+
+        # warming of the most played songs
+        config_history = self.config["player"].get("history") or {}
+        self.history_warmer = None
+        if config_history.get("enabled", False):
+            play_history = PlayHistory(
+                Path(
+                    config_history.get("history_file")
+                    or get_config_directory().expand() / HISTORY_FILE_NAME
+                )
+            )
+            play_history.load()
+            self.history_warmer = self.trace.enter_context(
+                group.stack,
+                HistoryWarmer(
+                    group.stop,
+                    group.errors,
+                    play_history,
+                    self.media_player,
+                    self.media_player.kara_folder_path,
+                    budget=config_history.get("budget", BUDGET),
+                    warm_interval=config_history.get("warm_interval", WARM_INTERVAL),
+                ),
+            )
+
+        # reload of the config without restarting
+        config_reload = self.config["player"].get("reload") or {}
+        config_reloader = None
+        if config_reload.get("enabled", False) and self.config_path is not None:
+            config_reloader = self.trace.enter_context(
+                group.stack,
+                ConfigReloader(
+                    group.stop,
+                    group.errors,
+                    self.media_player,
+                    self.config_path,
+                    self.config["player"],
+                    watch_interval=config_reload.get("watch_interval", WATCH_INTERVAL),
+                    reload_requested=self.reload_requested,
+                ),
+            )
+
+        # start writing the player state
+        if self.player_state is not None:
+            self.player_state.thread.start()
+
+        # start watching the config
+        if config_reloader is not None:
+            config_reloader.thread.start()
+
+        # start warming the most played songs
+        if self.history_warmer is not None:
+            self.history_warmer.thread.start()
+
+    def restart_backend(self, group):
+        """Create the media player again and start the backend components
+
+        Args:
+            group (supervisor.ComponentGroup): group of the backend
+                components.
+        """
+        startup = StartupOrchestrator(group.stack, trace=self.trace)
+        startup.submit("media player", self.start_media_player, startup, group)
+        self.media_player = startup.wait()["media player"]
+        self.start_backend(group)
+
+    def start_server(self, group):
+        """Start the components that communicate with the server
+
+        Args:
+            group (supervisor.ComponentGroup): group of the server components.
+        """
+        # event loop running the handlers of the manager
+        config_coordinator = self.config.get("coordinator") or {}
+        coordinator = None
+        if config_coordinator.get("enabled", False):
+            coordinator = self.trace.enter_context(
+                group.stack, Coordinator(group.stop, group.errors)
+            )
+            coordinator.thread.start()
+
+        # communication with the dakara WebSocket server
+        token_header = self.dakara_server_http.get_token_header()
+        dakara_server_websocket = self.trace.enter_context(
+            group.stack,
+            DakaraServerWebSocketConnection(
+                group.stop,
+                group.errors,
+                self.server_config,
+                header=token_header,
+                endpoint="ws/playlist/device/",
+            ),
+        )
+        dakara_server_websocket.set_callback(
+            "token_rejected", self.dakara_server_http.renew_token_header
+        )
+
+        # fail over to another dakara server
+        if self.server_selector is not None:
+
+            def switch_server(config):
+                self.server_config = config
+                self.dakara_server_http.set_server(config)
+                dakara_server_websocket.set_server(config)
+
+            self.server_selector.set_callback("switched", switch_server)
+            dakara_server_websocket.set_callback(
+                "disconnected", self.server_selector.request_probe
+            )
+
+        # journal of status events not sent yet
+        config_journal = self.config["server"].get("journal") or {}
+        status_journal = None
+        if config_journal.get("enabled", False):
+            status_journal = StatusJournal(
+                Path(
+                    config_journal.get("journal_file")
+                    or get_config_directory().expand() / JOURNAL_FILE_NAME
+                )
+            )
+
+        # queue of status events sent to the dakara server
+        config_status_transport = self.config["server"].get("status_transport", "http")
+        if config_status_transport not in ("http", "websocket"):
+            logger.error("Unknown status transport: %s", config_status_transport)
+            raise NotImplementedError
+
+        status_sender = self.trace.enter_context(
+            group.stack,
+            StatusSender(
+                group.stop,
+                group.errors,
+                self.dakara_server_http,
+                retry_delay=self.config["server"].get("retry_delay", RETRY_DELAY),
+                retry_delay_max=self.config["server"].get(
+                    "retry_delay_max", RETRY_DELAY_MAX
+                ),
+                journal=status_journal,
+                dakara_server_websocket=dakara_server_websocket
+                if config_status_transport == "websocket"
+                else None,
+            ),
+        )
+        status_sender.load()
+
+        # preparation of the upcoming playlist entries
+        config_prefetch = self.config["player"].get("prefetch") or {}
+        playlist_prefetcher = None
+        if config_prefetch.get("enabled", False):
+            playlist_prefetcher = self.trace.enter_context(
+                group.stack,
+                PlaylistPrefetcher(
+                    group.stop,
+                    group.errors,
+                    self.dakara_server_http,
+                    self.media_player,
+                    count=config_prefetch.get("count", COUNT),
+                    poll_interval=config_prefetch.get("poll_interval", POLL_INTERVAL),
+                    warm_size=config_prefetch.get("warm_size", WARM_SIZE),
+                ),
+            )
+
+        # manager for the precedent workers
+        self.dakara_manager = DakaraManager(
+            self.font_loader,
+            self.media_player,
+            status_sender,
+            dakara_server_websocket,
+            player_state=self.player_state,
+            playlist_prefetcher=playlist_prefetcher,
+            history_warmer=self.history_warmer,
+            coordinator=coordinator,
+        )
+
+        # start sending status events
+        status_sender.thread.start()
+
+        # start preparing the upcoming playlist entries
+        if playlist_prefetcher is not None:
+            playlist_prefetcher.thread.start()
+
+        # start the worker timer
+        dakara_server_websocket.timer.start()
+
+    def restart_server(self, group):
+        """Authenticate again and start the server components
+
+        Args:
+            group (supervisor.ComponentGroup): group of the server components.
+        """
+        with self.trace.span("server/authenticate"):
+            self.dakara_server_http.renew_token_header()
+
+        self.start_server(group)
+
     def run(self):
         """Worker main method
 
         It sets up the different workers and uses them as context managers,
         which guarantee that their different clean methods will be called
-        prorperly.
+        prorperly. The startup phases that do not depend on each other, like
+        loading the fonts, loading the media player and authenticating to the
+        server, are run in parallel.
 
         Then it starts the polling thread and waits for the end.
 
@@ -92,7 +511,27 @@ class DakaraWorker(WorkerSafeThread):
             * an exception has been raised within the `run` method (directly in
               the worker thread);
             * an exception has been raised within the polling thread.
+
+        In supervisor mode, the workers are split in two groups: the backend
+        ones, which use the media player, and the server ones, which
+        communicate with the server. An exception raised within the thread of
+        a worker only restarts its group, and the server group if the backend
+        group failed. The fonts, the server selector and the HTTP connection
+        are kept.
         """
+        config_supervisor = self.config.get("supervisor") or {}
+        supervisor = Supervisor(
+            self.stop,
+            self.errors,
+            enabled=config_supervisor.get("enabled", False),
+            max_restarts=config_supervisor.get("max_restarts", MAX_RESTARTS),
+            restart_delay=config_supervisor.get("restart_delay", RESTART_DELAY),
+            restart_delay_max=config_supervisor.get(
+                "restart_delay_max", RESTART_DELAY_MAX
+            ),
+            trace=self.trace,
+        )
+
         # get the different workers as context managers
         # ExitStack makes the management of multiple context managers simpler
         # This mechanism plus the use of Worker classes allow to gracelly end
@@ -101,56 +540,43 @@ class DakaraWorker(WorkerSafeThread):
         # be executed.
         with ExitStack() as stack:
             # temporary directory
-            tempdir = Path(stack.enter_context(TemporaryDirectory(suffix=".dakara")))
-
-            # font loader
-            font_loader = stack.enter_context(FontLoader())
-            font_loader.load()
-
-            # media player
-            config_player_name = self.config["player"].get("player_name", "vlc")
-            if config_player_name == "vlc":
-                media_player = stack.enter_context(
-                    VlcPlayer(self.stop, self.errors, self.config["player"], tempdir)
-                )
-            elif config_player_name == "mpv":
-                media_player = stack.enter_context(
-                    MpvPlayer(self.stop, self.errors, self.config["player"], tempdir)
-                )
-            else:
-                logger.error(f"Unknown player name: {config_player_name}")
-                raise NotImplementedError
-
-            media_player.load()
-
-            # communication with the dakara HTTP server
-            dakara_server_http = DakaraServerHTTPConnection(
-                self.config["server"], endpoint_prefix="api/", mute_raise=True
-            )
-            dakara_server_http.authenticate()
-            token_header = dakara_server_http.get_token_header()
-
-            # communication with the dakara WebSocket server
-            dakara_server_websocket = stack.enter_context(
-                DakaraServerWebSocketConnection(
-                    self.stop,
-                    self.errors,
-                    self.config["server"],
-                    header=token_header,
-                    endpoint="ws/playlist/device/",
-                )
+            self.tempdir = Path(
+                self.trace.enter_context(stack, TemporaryDirectory(suffix=".dakara"))
             )
 
-            # manager for the precedent workers
-            dakara_manager = DakaraManager(  # noqa F841
-                font_loader, media_player, dakara_server_http, dakara_server_websocket
-            )
-
-            # start the worker timer
-            dakara_server_websocket.timer.start()
-
-            # wait for stop event
-            self.stop.wait()
+            # components kept when restarting the groups, they are exited
+            # after the groups
+            persistent_stack = stack.enter_context(ExitStack())
+            stack.callback(supervisor.log_restarts_stats)
+            stack.callback(supervisor.close)
+            backend = supervisor.create_group("backend", self.restart_backend)
+            server = supervisor.create_group("server", self.restart_server)
+
+            # run the independent startup phases in parallel
+            startup = StartupOrchestrator(persistent_stack, trace=self.trace)
+            startup.submit("fonts", self.start_font_loader, startup)
+            startup.submit("media player", self.start_media_player, startup, backend)
+            startup.submit("server", self.start_server_http, startup)
+            phases = startup.wait()
+            self.font_loader = phases["fonts"]
+            self.media_player = phases["media player"]
+            (
+                self.server_selector,
+                self.server_config,
+                self.dakara_server_http,
+            ) = phases["server"]
+
+            self.start_backend(backend)
+            self.start_server(server)
+
+            # start probing the other dakara servers
+            if self.server_selector is not None:
+                self.server_selector.thread.start()
+
+            # wait for stop event, restarting the failed groups if enabled
+            self.trace.mark("run/ready")
+            supervisor.supervise()
+            self.trace.mark("run/stop")
 
             # leaving this method means leaving all the context managers and
             # stopping the program
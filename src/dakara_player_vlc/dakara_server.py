@@ -1,8 +1,39 @@
+import json
 import logging
-
-from dakara_base.http_client import authenticated, HTTPClient
-from dakara_base.websocket_client import WebSocketClient
-from dakara_base.utils import truncate_message
+import os
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+import requests
+from dakara_base.exceptions import DakaraError
+from dakara_base.http_client import (
+    authenticated,
+    HTTPClient,
+    MethodError,
+    ResponseError,
+    ResponseInvalidError,
+    ResponseRequestError,
+)
+from dakara_base.safe_workers import safe
+from dakara_base.websocket_client import ParameterError, WebSocketClient
+from dakara_base.utils import create_url, truncate_message
+from furl import furl
+from path import Path
+from websocket import WebSocketApp, WebSocketBadStatusException
+
+from dakara_player_vlc.backoff import Backoff
+from dakara_player_vlc.latency_stats import LatencyStats
+
+
+POOL_SIZE = 2
+POOL_IDLE_TIMEOUT = 60
+WARM_UP_TIMEOUT = 5
+TOKEN_CACHE_FILE_NAME = "player_vlc_token.json"
+PING_INTERVAL = 10
+PING_TIMEOUT = 5
+GRACE_PERIOD = 0
+RECONNECT_INTERVAL_MAX = 60
 
 
 logger = logging.getLogger(__name__)
@@ -25,13 +56,376 @@ class DakaraServerHTTPConnection(HTTPClient):
     ... )
     >>> http_connection.authenticate()
 
+    The requests are sent with a session, which keeps a pool of connections
+    alive between requests. Connections unused for more than
+    `pool_idle_timeout` seconds are closed before the next request, as the
+    server has probably closed them already. The latency of the requests is
+    recorded by endpoint.
+
+    The session is shared by the threads sending requests, so that a
+    connection opened in advance with `warm_up` benefits to all of them. This
+    is safe, as the pool of connections of the session is thread-safe, the
+    session does not keep cookies for the server, which authenticates with a
+    token header, and the connections are not closed while a request is
+    being sent.
+
+    If a token cache is given, the token obtained on login is stored in it,
+    and the stored token is used instead of logging in on next start. If the
+    server rejects the token, the connection logs in again and sends the
+    request again.
+
     Args:
-        config (dict): config of the server.
+        config (dict): config of the server. It can contain the number of
+            connections to keep alive ("pool_size") and the duration in seconds
+            after which an unused connection is closed ("pool_idle_timeout").
         endpoint_prefix (str): prefix of the endpoint, added to the URL.
         mute_raise (bool): if true, no exception will be raised when performing
             connections with the server (but authentication), only logged.
+        token_cache_path (path.Path): path of the token cache file. Optional.
+
+    Attributes:
+        token_cache_path (path.Path): path of the token cache file.
+        session (requests.Session): session used to send requests.
+        pool_idle_timeout (float): duration in seconds after which unused
+            connections are closed.
+        last_request_time (float): monotonic time of the last request.
+        requests_pending (int): number of requests being sent.
+        session_lock (threading.Lock): lock of the usage of the session.
+        latency_stats (latency_stats.LatencyStats): latency of the requests
+            by endpoint.
     """
 
+    def __init__(
+        self, config, endpoint_prefix="", mute_raise=False, token_cache_path=None
+    ):
+        super().__init__(config, endpoint_prefix=endpoint_prefix, mute_raise=mute_raise)
+
+        self.endpoint_prefix = endpoint_prefix
+
+        self.token_cache_path = None
+        if token_cache_path is not None:
+            self.token_cache_path = Path(token_cache_path)
+
+        pool_size = config.get("pool_size", POOL_SIZE)
+        self.pool_idle_timeout = config.get("pool_idle_timeout", POOL_IDLE_TIMEOUT)
+        self.last_request_time = None
+        self.requests_pending = 0
+        self.session_lock = Lock()
+        self.latency_stats = LatencyStats()
+
+        # create the session
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get_send_method(self, method):
+        """Get the method of the session sending a request
+
+        Args:
+            method (str): name of the HTTP method to use.
+
+        Returns:
+            function: method of the session.
+
+        Raises:
+            MethodError: if the method is not supported.
+        """
+        if not hasattr(self.session, method):
+            raise MethodError("Method {} not supported".format(method))
+
+        return getattr(self.session, method)
+
+    @contextmanager
+    def using_session(self):
+        """Account for a request being sent with the session
+
+        Connections that have been unused for too long are closed before,
+        unless another request is being sent.
+        """
+        with self.session_lock:
+            now = time.monotonic()
+            if (
+                not self.requests_pending
+                and self.last_request_time is not None
+                and now - self.last_request_time > self.pool_idle_timeout
+            ):
+                logger.debug("Closing idle connections to the server")
+                self.session.close()
+
+            self.last_request_time = now
+            self.requests_pending += 1
+
+        try:
+            yield
+
+        finally:
+            with self.session_lock:
+                self.requests_pending -= 1
+
+    def send_request_raw(
+        self,
+        method,
+        endpoint,
+        *args,
+        message_on_error="",
+        function_on_error=None,
+        **kwargs
+    ):
+        """Generic method to send requests to the server with the session
+
+        `HTTPClient.send_request_raw` sends the request with the functions of
+        the `requests` module, which open a new connection each time, and
+        cannot be given another function. This method takes the same steps
+        with the method given by `get_send_method`, records the latency and
+        detects a rejected token.
+
+        See `HTTPClient.send_request_raw`.
+
+        Raises:
+            TokenRejectedError: if the server rejects the token.
+        """
+        send_method = self.get_send_method(method)
+
+        # handle message on error
+        if not message_on_error:
+            message_on_error = "Unable to request the server"
+
+        # forge URL
+        url = furl(self.server_url).add(path=endpoint).url
+        logger.debug("Sending %s request to %s", method.upper(), url)
+
+        start = time.monotonic()
+        try:
+            # send request to the server
+            with self.using_session():
+                response = send_method(url, *args, **kwargs)
+
+        except requests.exceptions.RequestException as error:
+            # handle connection error
+            logger.error("%s, communication error", message_on_error)
+            raise ResponseRequestError(
+                "Error when communicating with the server: {}".format(error)
+            ) from error
+
+        finally:
+            self.latency_stats.add(endpoint, time.monotonic() - start)
+
+        # return here if the request was made without error
+        if response.ok:
+            return response
+
+        # otherwise call custom error management function
+        if function_on_error:
+            raise function_on_error(response)
+
+        # manage rejected token
+        if response.status_code == 401:
+            raise TokenRejectedError("The server rejected the token")
+
+        # otherwise manage error generically
+        logger.error(message_on_error)
+        logger.debug(
+            "Error %i: %s", response.status_code, truncate_message(response.text)
+        )
+
+        raise ResponseInvalidError(
+            "Error {} when communicationg with the server: {}".format(
+                response.status_code, response.text
+            )
+        )
+
+    @authenticated
+    def send_request(self, *args, **kwargs):
+        """Generic method to send requests to the server when connected
+
+        If the server rejects the token, the connection logs in again and the
+        request is sent again.
+
+        See `HTTPClient.send_request`.
+        """
+        try:
+            return self.send_request_raw(
+                *args, headers=self.get_token_header(), **kwargs
+            )
+
+        except TokenRejectedError:
+            logger.info("Token rejected by the server, login again")
+
+        except ResponseError:
+            if self.mute_raise:
+                return None
+
+            raise
+
+        try:
+            self.renew_token_header()
+
+        except ResponseError:
+            if self.mute_raise:
+                return None
+
+            raise
+
+        return super().send_request(*args, **kwargs)
+
+    def get_token_cache_key(self):
+        """Get the key of the token in the token cache
+
+        Returns:
+            str: key made from the server URL and the login.
+        """
+        return "{} {}".format(self.server_url, self.login)
+
+    def load_token(self):
+        """Get the token from the token cache
+
+        Returns:
+            bool: True if a token has been found.
+        """
+        if self.token_cache_path is None or not self.token_cache_path.exists():
+            return False
+
+        try:
+            with self.token_cache_path.open() as file:
+                tokens = json.load(file)
+
+        except (OSError, ValueError) as error:
+            logger.warning("Unable to read token cache: %s", error)
+            return False
+
+        token = tokens.get(self.get_token_cache_key())
+        if token is None:
+            return False
+
+        self.token = token
+        return True
+
+    def save_token(self):
+        """Store the token in the token cache
+
+        The file is readable by the user only.
+        """
+        if self.token_cache_path is None:
+            return
+
+        tokens = {}
+        if self.token_cache_path.exists():
+            try:
+                with self.token_cache_path.open() as file:
+                    tokens = json.load(file)
+
+            except (OSError, ValueError):
+                pass
+
+        tokens[self.get_token_cache_key()] = self.token
+
+        try:
+            self.token_cache_path.dirname().makedirs_p()
+            path_temp = self.token_cache_path + ".tmp"
+            file_descriptor = os.open(
+                path_temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+            )
+            with os.fdopen(file_descriptor, "w") as file:
+                json.dump(tokens, file)
+
+            os.replace(path_temp, self.token_cache_path)
+
+        except OSError as error:
+            logger.warning("Unable to write token cache: %s", error)
+
+    def authenticate_cached(self):
+        """Authenticate with the server, using the cached token if possible
+
+        The cached token is not checked, the server will reject it on the
+        first request if it is invalid.
+
+        Raises:
+            See `authenticate`.
+        """
+        if self.load_token():
+            logger.info("Using cached token")
+            return
+
+        self.authenticate()
+        self.save_token()
+
+    def renew_token_header(self):
+        """Log in again and get the new token header
+
+        Returns:
+            dict: formatted token.
+
+        Raises:
+            See `authenticate`.
+        """
+        self.authenticate()
+        self.save_token()
+
+        return self.get_token_header()
+
+    def set_server(self, config):
+        """Use another server
+
+        Args:
+            config (dict): config of the server. Only the keys defining the URL
+                are used.
+        """
+        self.server_url = create_url(**config, path=self.endpoint_prefix)
+        with self.session_lock:
+            self.session.close()
+        logger.debug("HTTP connection now uses %s", self.server_url)
+
+    def warm_up(self):
+        """Open a connection to the server in advance
+
+        The response is ignored, only the connection matters, so that the next
+        request does not wait for the TCP and TLS handshakes.
+        """
+        try:
+            with self.using_session():
+                self.session.head(self.server_url, timeout=WARM_UP_TIMEOUT)
+
+        except requests.exceptions.RequestException as error:
+            logger.debug("Unable to warm up the connection: %s", error)
+
+    def log_latency_stats(self):
+        """Log the latency of the requests by endpoint
+        """
+        for line in self.latency_stats.get_summary():
+            logger.debug("Latency of %s", line)
+
+    def close(self):
+        """Close the connections to the server
+        """
+        self.session.close()
+
+    @authenticated
+    def get_queuing_playlist_entries(self, count):
+        """Get the next playlist entries to play
+
+        Args:
+            count (int): maximum number of playlist entries to get.
+
+        Returns:
+            list: next playlist entries, in order. Each playlist entry is a
+            dictionary with at least the keys `id` and `song`.
+        """
+        logger.debug("Asking the server for the next playlist entries")
+
+        response = self.get(
+            endpoint="playlist/queuing/",
+            message_on_error="Unable to get the next playlist entries",
+        )
+
+        # the response may be paginated
+        if isinstance(response, dict):
+            response = response.get("results")
+
+        return (response or [])[:count]
+
     @authenticated
     def create_player_error(self, playlist_entry_id, message):
         """Report an error to the server
@@ -169,7 +563,7 @@ class DakaraServerHTTPConnection(HTTPClient):
         Args:
             playlist_entry_id (int): ID of the playlist entry. Must not be
                 `None`.
-            timing (int): progress of the player in seconds.
+            timing (float): progress of the player in seconds.
 
         Raises:
             AssertError: if `playlist_entry_id` is `None`.
@@ -195,7 +589,7 @@ class DakaraServerHTTPConnection(HTTPClient):
         Args:
             playlist_entry_id (int): ID of the playlist entry. Must not be
                 `None`.
-            timing (int): progress of the player in seconds.
+            timing (float): progress of the player in seconds.
 
         Raises:
             AssertError: if `playlist_entry_id` is `None`.
@@ -252,11 +646,73 @@ class DakaraServerWebSocketConnection(WebSocketClient):
             DakaraServerHTTPConnection.
         endpoint (str): enpoint of the WebSocket connection, added to the URL.
         header (dict): header containing the authentication token.
+
+    The connection is checked with ping messages sent every `ping_interval`
+    seconds. If no pong message is received within `ping_timeout` seconds,
+    the connection is considered lost. The timeout must be lower than the
+    interval.
+
+    When the connection is lost, the `connection_lost` callback is called only
+    if the connection has not been established again within `grace_period`
+    seconds, so that a short network outage does not interrupt the current
+    song. By default, there is no grace period.
+
+    When the connection is lost, the next attempt to connect is made after a
+    random delay, whose upper bound starts at `reconnect_interval` and doubles
+    after each failed attempt, up to `reconnect_interval_max`. This prevents a
+    fleet of players from reconnecting all at the same time when the server
+    restarts.
+
+    Attributes:
+        is_connected (bool): True if the connection is open.
+        token_renewed (bool): True if the token has been renewed since the
+            connection was last established.
+        renewing_token (bool): True if the connection is closed to be
+            established again with a new token.
+        ping_interval (float): interval in seconds between two pings. 0 to not
+            send pings.
+        ping_timeout (float): duration in seconds to wait for a pong.
+        grace_period (float): duration in seconds to wait for the connection
+            to be established again before calling `connection_lost`.
+        grace_timer (SafeTimer): timer of the grace period.
+        reconnect_interval (float): delay in seconds before the next attempt
+            to connect, given by the backoff.
+        reconnect_backoff (backoff.Backoff): delays before reconnecting.
     """
 
+    def init_worker(self, config, endpoint="", header={}):
+        super().init_worker(config, endpoint=endpoint, header=header)
+        self.endpoint = endpoint
+        self.is_connected = False
+        self.token_renewed = False
+        self.renewing_token = False
+        self.ping_interval = config.get("ping_interval", PING_INTERVAL)
+        self.ping_timeout = config.get("ping_timeout", PING_TIMEOUT)
+        if self.ping_interval and self.ping_timeout >= self.ping_interval:
+            raise ParameterError(
+                "Ping timeout ({} s) must be lower than ping interval ({} s)".format(
+                    self.ping_timeout, self.ping_interval
+                )
+            )
+
+        self.grace_period = config.get("grace_period", GRACE_PERIOD)
+        self.grace_timer = None
+        self.reconnect_backoff = Backoff(
+            self.reconnect_interval,
+            config.get("reconnect_interval_max", RECONNECT_INTERVAL_MAX),
+        )
+
+    def exit_worker(self, *args, **kwargs):
+        """Method called on exiting the worker to abort the connection
+        """
+        self.cancel_grace_timer()
+        super().exit_worker(*args, **kwargs)
+
     def set_default_callbacks(self):
         """Set all the default callbacks
         """
+        self.set_callback("token_rejected", lambda: None)
+        self.set_callback("disconnected", lambda: None)
         self.set_callback("idle", lambda: None)
         self.set_callback("playlist_entry", lambda playlist_entry: None)
         self.set_callback("command", lambda command: None)
@@ -265,13 +721,167 @@ class DakaraServerWebSocketConnection(WebSocketClient):
     def on_connected(self):
         """Callback when the connection is open
         """
+        self.is_connected = True
+        self.token_renewed = False
+        self.reconnect_backoff.reset()
+
+        if self.cancel_grace_timer():
+            logger.info("Websocket connection established again in time")
+
         self.send_ready()
 
+    @safe
+    def on_close(self, code, reason):
+        """Callback when the connection is closed
+
+        The reconnection is attempted after a delay given by the backoff.
+
+        See `WebSocketClient.on_close`.
+        """
+        if not self.stop.is_set():
+            self.reconnect_interval = self.reconnect_backoff.get_delay()
+
+        super().on_close(code, reason)
+
+    @safe
+    def on_error(self, error):
+        """Callback when an error occurs
+
+        If the token is rejected, the `token_rejected` callback is asked for a
+        new token header. If there is one, the connection is attempted again
+        with it, and the following closing of the connection is not
+        considered as a loss. The token is renewed only once until the
+        connection is established, if the new token is rejected too, or if it
+        cannot be obtained, the error is raised.
+
+        See `WebSocketClient.on_error`.
+        """
+        if (
+            not self.stop.is_set()
+            and isinstance(error, WebSocketBadStatusException)
+            and error.status_code == 401
+            and not self.token_renewed
+        ):
+            self.token_renewed = True
+            try:
+                header = self.callbacks["token_rejected"]()
+
+            except DakaraError as renew_error:
+                logger.error("Unable to get a new token: %s", renew_error)
+                header = None
+
+            if header is not None:
+                logger.info("Token rejected by the server, using a new one")
+                self.header = header
+                self.retry = True
+                self.renewing_token = True
+                return
+
+        super().on_error(error)
+
     def on_connection_lost(self):
         """Callback when the connection is lost
+
+        Nothing is done if the connection has been closed to renew the token.
         """
+        if self.renewing_token:
+            self.renewing_token = False
+            logger.debug("Websocket connection closed to renew the token")
+            return
+
+        self.is_connected = False
+        self.callbacks["disconnected"]()
+
+        if self.grace_period <= 0:
+            self.callbacks["connection_lost"]()
+            return
+
+        # the grace period is already running
+        if self.grace_timer is not None:
+            return
+
+        logger.warning(
+            "Waiting %i s for the connection to be established again",
+            self.grace_period,
+        )
+        self.grace_timer = self.create_timer(
+            self.grace_period, self.on_grace_period_expired
+        )
+        self.grace_timer.start()
+
+    def set_server(self, config):
+        """Use another server
+
+        The current connection, if any, is interrupted, and the connection is
+        established again with the new server.
+
+        Args:
+            config (dict): config of the server. Only the keys defining the URL
+                are used.
+        """
+        self.server_url = create_url(
+            **config, path=self.endpoint, scheme_no_ssl="ws", scheme_ssl="wss"
+        )
+        logger.debug("Websocket connection now uses %s", self.server_url)
+
+        if self.websocket is not None:
+            self.abort()
+            self.retry = True
+
+    def on_grace_period_expired(self):
+        """Callback when the connection has been lost for too long
+        """
+        self.grace_timer = None
+        if self.is_connected or self.stop.is_set():
+            return
+
+        logger.error("Websocket connection lost for too long")
         self.callbacks["connection_lost"]()
 
+    def cancel_grace_timer(self):
+        """Stop the grace period
+
+        Returns:
+            bool: True if the grace period was running.
+        """
+        grace_timer = self.grace_timer
+        if grace_timer is None:
+            return False
+
+        self.grace_timer = None
+        grace_timer.cancel()
+
+        return True
+
+    def run(self):
+        """Event loop
+
+        Create the websocket connection with pings and wait events from it.
+
+        `WebSocketClient.run` calls `run_forever` without arguments and cannot
+        be given the ping parameters, so the connection is created the same
+        way here with them. If pings are disabled, the base implementation is
+        used.
+
+        See `WebSocketClient.run`.
+        """
+        if not self.ping_interval:
+            super().run()
+            return
+
+        logger.debug("Preparing websocket connection")
+        self.websocket = WebSocketApp(
+            self.server_url,
+            header=self.header,
+            on_open=lambda ws: self.on_open(),
+            on_close=lambda ws, code, reason: self.on_close(code, reason),
+            on_message=lambda ws, message: self.on_message(message),
+            on_error=lambda ws, error: self.on_error(error),
+        )
+        self.websocket.run_forever(
+            ping_interval=self.ping_interval, ping_timeout=self.ping_timeout
+        )
+
     def receive_idle(self, content):
         """Receive idle order
 
@@ -305,3 +915,102 @@ class DakaraServerWebSocketConnection(WebSocketClient):
         """
         logger.debug("Telling the server that the player is ready")
         self.send("ready")
+
+    def create_player_error(self, playlist_entry_id, message):
+        """Report an error to the server
+
+        Args:
+            playlist_entry_id (int): ID of the playlist entry. Must not be
+                `None`.
+            message (str): error message.
+
+        Raises:
+            AssertError: if `playlist_entry_id` is `None`.
+        """
+        assert playlist_entry_id is not None, "Entry with ID None is invalid"
+
+        logger.debug(
+            "Telling the server that playlist entry %i cannot be played",
+            playlist_entry_id,
+        )
+
+        self.send(
+            "error",
+            {
+                "playlist_entry_id": playlist_entry_id,
+                "error_message": truncate_message(message, 255),
+            },
+        )
+
+    def send_status(self, event, playlist_entry_id, **kwargs):
+        """Report a status event to the server
+
+        The content of the message is the same as for the HTTP connection.
+
+        Args:
+            event (str): name of the event.
+            playlist_entry_id (int): ID of the playlist entry. Must not be
+                `None`.
+            Extra arguments are added to the content of the message.
+
+        Raises:
+            AssertError: if `playlist_entry_id` is `None`.
+        """
+        assert playlist_entry_id is not None, "Entry with ID None is invalid"
+
+        logger.debug(
+            "Telling the server that playlist entry %i has event %s",
+            playlist_entry_id,
+            event,
+        )
+
+        self.send(
+            "status", dict(event=event, playlist_entry_id=playlist_entry_id, **kwargs)
+        )
+
+    def update_finished(self, playlist_entry_id):
+        """Report that a playlist entry has finished
+
+        See `send_status`.
+        """
+        self.send_status("finished", playlist_entry_id)
+
+    def update_started_transition(self, playlist_entry_id):
+        """Report that the transition of a playlist entry has started
+
+        See `send_status`.
+        """
+        self.send_status("started_transition", playlist_entry_id)
+
+    def update_started_song(self, playlist_entry_id):
+        """Report that the song of a playlist entry has started
+
+        See `send_status`.
+        """
+        self.send_status("started_song", playlist_entry_id)
+
+    def update_could_not_play(self, playlist_entry_id):
+        """Report that a playlist entry could not play
+
+        See `send_status`.
+        """
+        self.send_status("could_not_play", playlist_entry_id)
+
+    def update_paused(self, playlist_entry_id, timing):
+        """Report that the player is paused
+
+        See `send_status`.
+        """
+        self.send_status("paused", playlist_entry_id, timing=timing)
+
+    def update_resumed(self, playlist_entry_id, timing):
+        """Report that the player resumed playing
+
+        See `send_status`.
+        """
+        self.send_status("resumed", playlist_entry_id, timing=timing)
+
+
+class TokenRejectedError(ResponseInvalidError):
+    """Error raised when the server rejects the token
+    """
@@ -0,0 +1,61 @@
+import logging
+import os
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+logger = logging.getLogger(__name__)
+
+
+def warm_file(path, size_limit=None):
+    """Load a file into the page cache of the system
+
+    The file is read by chunks and its content is discarded, so that the next
+    read of the file by the media player does not have to wait for the
+    storage.
+
+    Example of use:
+
+    >>> warm_file(Path("/path/to/file.mkv"), size_limit=10 * 1024 * 1024)
+    10485760
+
+    Args:
+        path (path.Path): path of the file to warm.
+        size_limit (int): maximum number of bytes to read. If not given, the
+            entire file is read.
+
+    Returns:
+        int: number of bytes read. 0 if the file cannot be read.
+    """
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    total = 0
+
+    try:
+        with open(path, "rb", buffering=0) as file:
+            # tell the system we will need the file soon, if possible
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(
+                    file.fileno(), 0, size_limit or 0, os.POSIX_FADV_WILLNEED
+                )
+
+            while size_limit is None or total < size_limit:
+                if size_limit is None:
+                    size = CHUNK_SIZE
+
+                else:
+                    size = min(CHUNK_SIZE, size_limit - total)
+
+                read = file.readinto(view[:size])
+                if not read:
+                    break
+
+                total += read
+
+    except OSError as error:
+        logger.debug("Unable to warm file '%s': %s", path, error)
+        return 0
+
+    logger.debug("Warmed %i bytes of file '%s'", total, path)
+    return total
@@ -6,7 +6,7 @@ from os.path import isfile, islink, exists
 
 from path import Path
 
-from dakara_player_vlc.resources_manager import get_all_fonts, PATH_FONTS
+from dakara_player_vlc.resources_manager import get_all_fonts, get_fonts_directory
 
 
 logger = logging.getLogger(__name__)
@@ -221,7 +221,7 @@ class FontLoaderWindows(FontLoader):
             (
                 "Please install the following fonts located in the '{}' "
                 "folder and press Enter:"
-            ).format(PATH_FONTS)
+            ).format(get_fonts_directory())
         )
 
         for font_file_path in font_file_path_list:
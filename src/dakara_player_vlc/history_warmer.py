@@ -0,0 +1,173 @@
+import logging
+import os
+from threading import Lock
+
+from dakara_base.safe_workers import Worker
+
+from dakara_player_vlc.file_warmer import warm_file
+
+
+BUDGET = 1024 * 1024 * 1024
+WARM_INTERVAL = 300
+
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryWarmer(Worker):
+    """Keep the songs the most likely to be played in the page cache
+
+    While the player is idle, the songs are loaded in the page cache of the
+    system, from the most likely to be played according to the play history,
+    until their total size reaches the budget. This is done again every
+    `warm_interval` seconds, as the system may have evicted them.
+
+    The play history is written at the same interval, and when the worker
+    exits.
+
+    The rate of played songs that were warmed is logged, to tune the budget.
+
+    Example of use:
+
+    >>> with HistoryWarmer(
+    ...     stop, errors, play_history, media_player, Path("kara")
+    ... ) as history_warmer:
+    ...     history_warmer.thread.start()
+    ...     history_warmer.count_play("path/to/file.mkv")
+    ...     history_warmer.record_finished("path/to/file.mkv")
+
+    Args:
+        stop (Event): event to stop the program.
+        errors (Queue): queue of errors.
+        play_history (play_history.PlayHistory): history of the songs played.
+        media_player (media_player.MediaPlayer): media player, to know if it
+            is idle.
+        kara_folder_path (path.Path): path to the root karaoke folder.
+        budget (int): maximum number of bytes to keep in the page cache.
+        warm_interval (float): interval in seconds between two warmings.
+
+    Attributes:
+        play_history (play_history.PlayHistory): history of the songs played.
+        media_player (media_player.MediaPlayer): media player.
+        kara_folder_path (path.Path): path to the root karaoke folder.
+        budget (int): maximum number of bytes to keep in the page cache.
+        warm_interval (float): interval in seconds between two warmings.
+        warmed (set): file paths of the songs warmed by the last warming.
+        plays_count (int): number of songs played.
+        hits_count (int): number of songs played that were warmed.
+        thread (SafeThread): thread warming the songs.
+    """
+
+    def init_worker(
+        self,
+        play_history,
+        media_player,
+        kara_folder_path,
+        budget=BUDGET,
+        warm_interval=WARM_INTERVAL,
+    ):
+        self.play_history = play_history
+        self.media_player = media_player
+        self.kara_folder_path = kara_folder_path
+        self.budget = budget
+        self.warm_interval = warm_interval
+        self.lock = Lock()
+        self.warmed = set()
+        self.plays_count = 0
+        self.hits_count = 0
+
+        # create the warming thread
+        self.thread = self.create_thread(target=self.run)
+
+    def run(self):
+        """Warm the songs periodically when the player is idle
+
+        The play history is written at the same time.
+        """
+        while not self.stop.is_set():
+            if self.media_player.is_idle():
+                self.warm()
+
+            self.play_history.flush()
+            self.stop.wait(self.warm_interval)
+
+    def warm(self):
+        """Load the songs the most likely to be played within the budget
+
+        The warming is interrupted if the player stops being idle.
+        """
+        warmed = set()
+        total = 0
+        for file_path in self.play_history.get_most_likely():
+            if self.stop.is_set() or not self.media_player.is_idle():
+                logger.debug("Warming of the most played songs interrupted")
+                break
+
+            try:
+                size = os.path.getsize(self.kara_folder_path / file_path)
+
+            except OSError:
+                continue
+
+            if total + size > self.budget:
+                continue
+
+            read = warm_file(self.kara_folder_path / file_path)
+            if read:
+                total += read
+                warmed.add(file_path)
+
+        with self.lock:
+            self.warmed = warmed
+
+        logger.debug("Warmed %i most played songs (%i bytes)", len(warmed), total)
+
+    def count_play(self, file_path):
+        """Count if a song that starts playing was warmed
+
+        Args:
+            file_path (str): path of the song file.
+        """
+        with self.lock:
+            hit = str(file_path) in self.warmed
+            self.plays_count += 1
+            self.hits_count += hit
+
+        logger.debug(
+            "Song %s warmed, hit rate %.0f%%",
+            "was" if hit else "was not",
+            self.get_hit_rate() * 100,
+        )
+
+    def record_finished(self, file_path):
+        """Record in the play history that a song has finished
+
+        Args:
+            file_path (str): path of the song file.
+        """
+        self.play_history.record(file_path)
+
+    def get_hit_rate(self):
+        """Get the rate of played songs that were warmed
+
+        Returns:
+            float: hit rate between 0 and 1. 0 if no songs were played.
+        """
+        with self.lock:
+            if not self.plays_count:
+                return 0
+
+            return self.hits_count / self.plays_count
+
+    def exit_worker(self, *args, **kwargs):
+        """Write the play history and log the hit rate
+        """
+        self.play_history.flush()
+
+        if self.plays_count:
+            logger.info(
+                "Most played songs warming hit rate %.0f%% (%i of %i songs)",
+                self.get_hit_rate() * 100,
+                self.hits_count,
+                self.plays_count,
+            )
@@ -0,0 +1,105 @@
+from collections import deque
+from threading import Lock
+
+
+SAMPLES_COUNT = 256
+PERCENTILES = (50, 90, 99)
+
+
+class LatencyStats:
+    """Latency statistics grouped by name
+
+    Only the last `samples_count` latencies of each name are kept.
+
+    Example of use:
+
+    >>> stats = LatencyStats()
+    >>> stats.add("playlist/player/status/", 0.012)
+    >>> stats.get_percentiles("playlist/player/status/")
+    {50: 0.012, 90: 0.012, 99: 0.012}
+
+    Args:
+        samples_count (int): number of latencies to keep for each name.
+
+    Attributes:
+        samples_count (int): number of latencies to keep for each name.
+        samples (dict): last latencies in seconds, by name.
+        counts (dict): total number of latencies added, by name.
+    """
+
+    def __init__(self, samples_count=SAMPLES_COUNT):
+        self.samples_count = samples_count
+        self.lock = Lock()
+        self.samples = {}
+        self.counts = {}
+
+    def add(self, name, latency):
+        """Add a latency
+
+        Args:
+            name (str): name of the latency.
+            latency (float): latency in seconds.
+        """
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.samples_count)
+                self.counts[name] = 0
+
+            self.samples[name].append(latency)
+            self.counts[name] += 1
+
+    def get_percentiles(self, name, percentiles=PERCENTILES):
+        """Get percentiles of the last latencies
+
+        The nearest-rank method is used.
+
+        Args:
+            name (str): name of the latency.
+            percentiles (tuple): percentiles to compute.
+
+        Returns:
+            dict: latency in seconds for each percentile. None if there is no
+            latency for this name.
+        """
+        with self.lock:
+            if not self.samples.get(name):
+                return None
+
+            samples = sorted(self.samples[name])
+
+        return {
+            percentile: samples[max(0, -(-percentile * len(samples) // 100) - 1)]
+            for percentile in percentiles
+        }
+
+    def get_names(self):
+        """Get the names with latencies
+
+        Returns:
+            list: names of the latencies.
+        """
+        with self.lock:
+            return list(self.samples)
+
+    def get_summary(self):
+        """Get a text summary of the statistics
+
+        Returns:
+            list: one line per name, with the number of latencies and the
+            percentiles in milliseconds.
+        """
+        lines = []
+        for name in self.get_names():
+            percentiles = self.get_percentiles(name)
+            lines.append(
+                "{}: {} requests, {}".format(
+                    name,
+                    self.counts[name],
+                    ", ".join(
+                        "p{} {:.1f} ms".format(percentile, latency * 1000)
+                        for percentile, latency in percentiles.items()
+                    ),
+                )
+            )
+
+        return lines
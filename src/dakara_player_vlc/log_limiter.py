@@ -0,0 +1,162 @@
+import time
+
+
+BURST = 20
+INTERVAL = 1
+
+
+class SourceState:
+    """State of the messages of one source
+
+    Attributes:
+        last_level (int): level of the last message.
+        last_message (str): last message.
+        last_suppressed (bool): true if the last message was not logged.
+        repeated_count (int): number of times the last message was repeated
+            and not logged.
+        window_start (float): monotonic time of the start of the current
+            interval.
+        logged_count (int): number of messages logged within the current
+            interval.
+        suppressed_count (int): number of messages not logged within the
+            current interval.
+    """
+
+    def __init__(self, window_start):
+        self.last_level = None
+        self.last_message = None
+        self.last_suppressed = False
+        self.repeated_count = 0
+        self.window_start = window_start
+        self.logged_count = 0
+        self.suppressed_count = 0
+
+
+class LogLimiter:
+    """Deduplicate and rate-limit log messages coming from several sources
+
+    Messages repeated consecutively by a source are logged once, followed by
+    the number of repetitions when the source logs another message. At most
+    `burst` messages of a source are logged within an interval of `interval`
+    seconds, the others are counted and the count is logged when the next
+    interval starts. A source flooding the logs thus does not hide the
+    messages of the other sources.
+
+    The class is not thread safe, messages must be logged from one thread.
+
+    Example of use:
+
+    >>> limiter = LogLimiter(logger, "mpv")
+    >>> limiter.log(logging.ERROR, "ffmpeg/video", "error while decoding MB")
+    >>> limiter.flush()
+
+    Args:
+        logger (logging.Logger): logger to log the messages to.
+        name (str): name of the emitter of the messages, put in front of them.
+        burst (int): maximum number of messages logged by a source within an
+            interval. If 0, messages are not rate-limited.
+        interval (float): duration of an interval in seconds.
+        clock (function): function giving the monotonic time in seconds.
+
+    Attributes:
+        logger (logging.Logger): logger to log the messages to.
+        name (str): name of the emitter of the messages.
+        burst (int): maximum number of messages logged by a source within an
+            interval.
+        interval (float): duration of an interval in seconds.
+        clock (function): function giving the monotonic time in seconds.
+        sources (dict of SourceState): state of the messages, by source.
+    """
+
+    def __init__(self, logger, name, burst=BURST, interval=INTERVAL, clock=None):
+        self.logger = logger
+        self.name = name
+        self.burst = burst
+        self.interval = interval
+        self.clock = clock or time.monotonic
+        self.sources = {}
+
+    def log(self, level, source, message):
+        """Log a message, unless it is repeated or its source floods the logs
+
+        Args:
+            level (int): level of the message.
+            source (str): source of the message.
+            message (str): message.
+        """
+        now = self.clock()
+        state = self.sources.get(source)
+        if state is None:
+            state = self.sources[source] = SourceState(now)
+
+        # deduplicate, repetitions of a suppressed message are suppressed too
+        if level == state.last_level and message == state.last_message:
+            if state.last_suppressed:
+                state.suppressed_count += 1
+
+            else:
+                state.repeated_count += 1
+
+            return
+
+        self.flush_repeated(source, state)
+        state.last_level = level
+        state.last_message = message
+
+        # rate-limit
+        if now - state.window_start >= self.interval:
+            self.flush_suppressed(source, state)
+            state.window_start = now
+            state.logged_count = 0
+
+        state.last_suppressed = bool(self.burst) and state.logged_count >= self.burst
+        if state.last_suppressed:
+            state.suppressed_count += 1
+            return
+
+        state.logged_count += 1
+        self.logger.log(level, "%s: %s: %s", self.name, source, message)
+
+    def flush_repeated(self, source, state):
+        """Log the number of repetitions of the last message of a source
+
+        Args:
+            source (str): source of the messages.
+            state (SourceState): state of the messages of the source.
+        """
+        if not state.repeated_count:
+            return
+
+        self.logger.log(
+            state.last_level,
+            "%s: %s: last message repeated %i times",
+            self.name,
+            source,
+            state.repeated_count,
+        )
+        state.repeated_count = 0
+
+    def flush_suppressed(self, source, state):
+        """Log the number of messages of a source that were not logged
+
+        Args:
+            source (str): source of the messages.
+            state (SourceState): state of the messages of the source.
+        """
+        if not state.suppressed_count:
+            return
+
+        self.logger.warning(
+            "%s: %s: %i messages suppressed, as they were logged too fast",
+            self.name,
+            source,
+            state.suppressed_count,
+        )
+        state.suppressed_count = 0
+
+    def flush(self):
+        """Log the pending counts of all sources
+        """
+        for source, state in self.sources.items():
+            self.flush_repeated(source, state)
+            self.flush_suppressed(source, state)
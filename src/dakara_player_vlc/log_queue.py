@@ -0,0 +1,142 @@
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from queue import Full, Queue
+from threading import Lock
+
+
+QUEUE_SIZE = 10000
+
+
+logger = logging.getLogger(__name__)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Handler putting log records in a bounded queue without blocking
+
+    The message of the record is merged with its arguments, as they may be
+    modified once the record is queued, but the record is not formatted: this
+    is done by the handlers of the listener. When the queue is full, the
+    record is dropped and counted.
+
+    Args:
+        queue (queue.Queue): bounded queue of records.
+
+    Attributes:
+        dropped_count (int): number of records dropped because the queue was
+            full.
+    """
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped_lock = Lock()
+        self.dropped_count = 0
+
+    def prepare(self, record):
+        """Merge the message of a record with its arguments
+
+        Args:
+            record (logging.LogRecord): record to prepare.
+
+        Returns:
+            logging.LogRecord: the record, with its message merged.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+
+        return record
+
+    def enqueue(self, record):
+        """Put a record in the queue, or drop it if the queue is full
+
+        Args:
+            record (logging.LogRecord): record to put.
+        """
+        try:
+            self.queue.put_nowait(record)
+
+        except Full:
+            with self.dropped_lock:
+                self.dropped_count += 1
+
+
+class BoundedQueueListener(QueueListener):
+    """Listener of a bounded queue of log records
+
+    On stop, the listener waits for a free slot in the queue to signal its
+    thread to end, instead of failing if the queue is full.
+    """
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class LogQueue:
+    """Write the logs in a background thread
+
+    On enter, the handlers of the root logger are moved to a listener running
+    in a background thread, and replaced by a handler putting the records in a
+    bounded queue. Logging then does not wait for slow handlers, like writing
+    on a slow disk. When the queue is full, records are dropped. On exit, the
+    remaining records are written, the handlers are put back on the root
+    logger and the number of dropped records is logged.
+
+    The handlers of the root logger must be set up before entering.
+
+    Example of use:
+
+    >>> create_logger()
+    >>> set_loglevel(config)
+    >>> with LogQueue():
+    ...     logger.info("Written in the background")
+
+    Args:
+        size (int): maximum number of records in the queue.
+
+    Attributes:
+        queue (queue.Queue): bounded queue of records.
+        handler (DroppingQueueHandler): handler of the root logger.
+        listener (BoundedQueueListener): background thread writing
+            the records with the former handlers of the root logger.
+        handlers (list): former handlers of the root logger.
+    """
+
+    def __init__(self, size=QUEUE_SIZE):
+        self.queue = Queue(size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.listener = None
+        self.handlers = []
+
+    def __enter__(self):
+        root_logger = logging.getLogger()
+        self.handlers = list(root_logger.handlers)
+
+        # records below the level of all handlers are not queued
+        if self.handlers:
+            self.handler.setLevel(min(handler.level for handler in self.handlers))
+
+        self.listener = BoundedQueueListener(
+            self.queue, *self.handlers, respect_handler_level=True
+        )
+        self.listener.start()
+
+        for handler in self.handlers:
+            root_logger.removeHandler(handler)
+
+        root_logger.addHandler(self.handler)
+
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        root_logger = logging.getLogger()
+        root_logger.removeHandler(self.handler)
+        for handler in self.handlers:
+            root_logger.addHandler(handler)
+
+        # write the remaining records
+        self.listener.stop()
+
+        if self.handler.dropped_count:
+            logger.warning(
+                "%i log messages dropped, as they were logged faster than written",
+                self.handler.dropped_count,
+            )
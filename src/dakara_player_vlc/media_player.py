@@ -1,19 +1,59 @@
+import logging
+from importlib import import_module
+from threading import Lock
+
+from dakara_base.config import get_config_directory
 from dakara_base.exceptions import DakaraError
 from dakara_base.safe_workers import Worker
 from path import Path
 
 from dakara_player_vlc.background_loader import BackgroundLoader
-from dakara_player_vlc.resources_manager import PATH_BACKGROUNDS
+from dakara_player_vlc.cpu_usage import CpuUsageMeter
+from dakara_player_vlc.file_warmer import warm_file
+from dakara_player_vlc.playback_clock import PlaybackClock
+from dakara_player_vlc.resources_manager import get_backgrounds_directory
 from dakara_player_vlc.text_generator import TextGenerator
+from dakara_player_vlc.transition_cache import (
+    MAX_SIZE as TRANSITION_CACHE_MAX_SIZE,
+    TransitionCache,
+)
 
 
 TRANSITION_BG_NAME = "transition.png"
 TRANSITION_TEXT_NAME = "transition.ass"
 TRANSITION_DURATION = 2
+TRANSITION_CLIP_TEXT_NAME = "transition_clip.ass"
+TRANSITION_CACHE_DIRECTORY = "transition_clips"
 
 IDLE_BG_NAME = "idle.png"
 IDLE_TEXT_NAME = "idle.ass"
 IDLE_DURATION = 300
+IDLE_FRAME_RATE = 1
+
+# modules and classes of the media players, by name
+MEDIA_PLAYERS = {
+    "vlc": ("dakara_player_vlc.vlc_player", "VlcPlayer"),
+    "mpv": ("dakara_player_vlc.mpv_player", "MpvPlayer"),
+}
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_media_player_class(name):
+    """Get the class of a media player by its name
+
+    The module of the media player is imported on call, so that only the
+    library of the selected player is loaded.
+
+    Args:
+        name (str): name of the media player, key of `MEDIA_PLAYERS`.
+
+    Returns:
+        type: class of the media player.
+    """
+    module_name, class_name = MEDIA_PLAYERS[name]
+    return getattr(import_module(module_name), class_name)
 
 
 class MediaPlayer(Worker):
@@ -39,6 +79,23 @@ class MediaPlayer(Worker):
             playing, its value is None.
         in_transition (bool): flag set to True is a transition screen is
             playing.
+        clock (playback_clock.PlaybackClock): clock giving the playback time
+            of the current song.
+        transition_cache (transition_cache.TransitionCache): cache of
+            pre-rendered transition clips. None if the cache is disabled.
+        idle_power_saving (bool): if True, the idle screen is displayed with
+            as few resources as possible.
+        idle_frame_rate (float): frame rate of the idle screen in power saving
+            mode.
+        idle_cpu_meter (cpu_usage.CpuUsageMeter): meter of the CPU usage
+            during the idle screen.
+        prepared_transition_texts (dict): transition texts of the upcoming
+            playlist entries, by playlist entry ID.
+        pending_reload (dict): templates, backgrounds and durations loaded
+            from a new configuration, to apply on next transition or idle
+            screen. None if no reload is requested.
+        transition_text_fade_in (bool): if True, the live transition text has
+            a fade-in effect.
 
     Args:
         stop (Event): event to stop the program.
@@ -47,6 +104,8 @@ class MediaPlayer(Worker):
         tempdir (path.Path): path to a temporary directory.
     """
 
+    transition_text_fade_in = True
+
     def init_worker(self, config, tempdir):
         """Init the worker
         """
@@ -66,6 +125,12 @@ class MediaPlayer(Worker):
             "idle": IDLE_DURATION,
         }
 
+        # set idle screen power saving mode
+        config_idle = config.get("idle") or {}
+        self.idle_power_saving = config_idle.get("power_saving", False)
+        self.idle_frame_rate = config_idle.get("frame_rate", IDLE_FRAME_RATE)
+        self.idle_cpu_meter = CpuUsageMeter()
+
         # set text generator
         config_texts = config.get("templates") or {}
         self.text_generator = TextGenerator(config_texts)
@@ -73,9 +138,19 @@ class MediaPlayer(Worker):
         # set background loader
         # we need to make some adaptations here
         config_backgrounds = config.get("backgrounds") or {}
+        background_pools = {}
+        for name in ("transition", "idle"):
+            pool_directory = config_backgrounds.get("{}_background_pool".format(name))
+            if pool_directory:
+                background_pools[name] = {
+                    "directory": Path(pool_directory),
+                    "strategy": config_backgrounds.get("pool_strategy", "shuffle"),
+                    "weights": config_backgrounds.get("pool_weights"),
+                }
+
         self.background_loader = BackgroundLoader(
             directory=Path(config_backgrounds.get("directory", "")),
-            default_directory=Path(PATH_BACKGROUNDS),
+            default_directory=Path(get_backgrounds_directory()),
             background_filenames={
                 "transition": config_backgrounds.get("transition_background_name"),
                 "idle": config_backgrounds.get("idle_background_name"),
@@ -84,11 +159,34 @@ class MediaPlayer(Worker):
                 "transition": TRANSITION_BG_NAME,
                 "idle": IDLE_BG_NAME,
             },
+            background_pools=background_pools,
         )
 
         # set path of ASS files for text screens
         self.idle_text_path = tempdir / IDLE_TEXT_NAME
         self.transition_text_path = tempdir / TRANSITION_TEXT_NAME
+        self.transition_clip_text_path = tempdir / TRANSITION_CLIP_TEXT_NAME
+
+        # set transition clips cache
+        config_transition_cache = config.get("transition_cache") or {}
+        self.transition_cache = None
+        if config_transition_cache.get("enabled", False):
+            self.transition_cache = TransitionCache(
+                Path(
+                    config_transition_cache.get("directory")
+                    or get_config_directory().expand() / TRANSITION_CACHE_DIRECTORY
+                ),
+                max_size=config_transition_cache.get(
+                    "max_size", TRANSITION_CACHE_MAX_SIZE
+                ),
+            )
+
+        # transition texts prepared for the upcoming playlist entries
+        self.prepared_transition_texts = {}
+
+        # config to apply on next transition
+        self.pending_reload = None
+        self.pending_reload_lock = Lock()
 
         # playlist entry id of the current song
         # if no songs are playing, its value is None
@@ -97,6 +195,9 @@ class MediaPlayer(Worker):
         # flag set to True is a transition screen is playing
         self.in_transition = False
 
+        # clock of the current song
+        self.clock = PlaybackClock(self.get_player_time)
+
         # set default callbacks
         self.set_default_callbacks()
 
@@ -121,6 +222,10 @@ class MediaPlayer(Worker):
         # load backgrounds
         self.background_loader.load()
 
+        # load transition clips cache
+        if self.transition_cache is not None:
+            self.transition_cache.load()
+
         self.load_player()
 
     def load_player(self):
@@ -162,6 +267,286 @@ class MediaPlayer(Worker):
         """
         self.callbacks[name] = callback
 
+    def prepare_next_background(self, name):
+        """Pre-select the next background of a pool and prefetch it
+
+        This is done in a separate thread, so that the current screen is not
+        disturbed. Nothing is done if the background has no pool.
+
+        Args:
+            name (str): name of the background.
+        """
+        if name not in self.background_loader.pools:
+            return
+
+        thread = self.create_thread(target=self.pick_next_background, args=(name,))
+        thread.start()
+
+    def pick_next_background(self, name):
+        """Pick the next background of a pool and load it in the page cache
+
+        Args:
+            name (str): name of the background.
+        """
+        warm_file(self.background_loader.pick_next(name))
+
+    def get_transition_clip(self, playlist_entry):
+        """Get the pre-rendered transition clip of a playlist entry
+
+        If the clip is not in the cache yet, its rendering is requested in a
+        separate thread, so that it can be used next time. The cache cannot be
+        used until the hash of the background is known, it is then computed in
+        a separate thread too.
+
+        Args:
+            playlist_entry (dict): dictionnary of the playlist entry.
+
+        Returns:
+            path.Path: path of the clip, None if it is not available.
+        """
+        if self.transition_cache is None:
+            return None
+
+        background_path = self.background_loader.backgrounds["transition"]
+        background_hash = self.transition_cache.get_background_hash(background_path)
+        if background_hash is None:
+            # hash the background if no other background is being hashed
+            if self.transition_cache.reserve_hashing():
+                thread = self.create_thread(
+                    target=self.transition_cache.compute_background_hash,
+                    args=(background_path,),
+                )
+                thread.start()
+
+            return None
+
+        text = self.text_generator.create_transition_text(playlist_entry)
+        key = self.transition_cache.get_key(
+            self.text_generator.get_transition_template_hash(),
+            background_hash,
+            text,
+            self.durations["transition"],
+        )
+
+        clip = self.transition_cache.get_clip(key)
+        if clip is not None:
+            logger.debug("Using transition clip '%s'", clip)
+            return clip
+
+        # render the clip if no other clip is being rendered
+        if self.transition_cache.reserve():
+            thread = self.create_thread(
+                target=self.store_transition_clip, args=(key, background_path, text)
+            )
+            thread.start()
+
+        return None
+
+    def store_transition_clip(self, key, background_path, text):
+        """Render a transition clip and store it in the cache
+
+        Args:
+            key (str): key of the clip in the cache.
+            background_path (path.Path): path of the background file.
+            text (str): transition text.
+        """
+
+        def render(output_path):
+            with self.transition_clip_text_path.open("w", encoding="utf8") as file:
+                file.write(text)
+
+            self.render_transition_clip(
+                background_path,
+                self.transition_clip_text_path,
+                self.durations["transition"],
+                output_path,
+            )
+
+        self.transition_cache.store(key, render)
+
+    def render_transition_clip(self, background_path, text_path, duration, output_path):
+        """Render a transition clip with the encoding capabilities of the player
+
+        Args:
+            background_path (path.Path): path of the background file.
+            text_path (path.Path): path of the transition text file.
+            duration (int): duration of the clip in seconds.
+            output_path (path.Path): path of the clip to create.
+
+        Raises:
+            transition_cache.TransitionRenderError: if the rendering fails.
+        """
+        raise NotImplementedError
+
+    def prepare_playlist_entry(self, playlist_entry, warm_size=None):
+        """Prepare an upcoming playlist entry before it is requested
+
+        The file of the song is checked and its beginning is loaded in the page
+        cache. The transition text is rendered and kept until the playlist
+        entry is played or forgotten, and the rendering of the transition clip
+        is requested if the cache is enabled.
+
+        Args:
+            playlist_entry (dict): dictionnary of the playlist entry.
+            warm_size (int): number of bytes of the song file to load in the
+                page cache. If not given, the entire file is loaded.
+
+        Returns:
+            bool: True if the playlist entry is prepared, False if its file
+            cannot be found.
+        """
+        if playlist_entry["id"] in self.prepared_transition_texts:
+            return True
+
+        file_path = self.kara_folder_path / playlist_entry["song"]["file_path"]
+        if not file_path.exists():
+            logger.warning("File of an upcoming song not found '%s'", file_path)
+            return False
+
+        self.prepared_transition_texts[
+            playlist_entry["id"]
+        ] = self.text_generator.create_transition_text(
+            playlist_entry, fade_in=self.transition_text_fade_in
+        )
+        self.get_transition_clip(playlist_entry)
+        warm_file(file_path, warm_size)
+
+        logger.debug("Prepared playlist entry %i", playlist_entry["id"])
+        return True
+
+    def forget_prepared_playlist_entries(self, playlist_entries_id):
+        """Forget the preparation of playlist entries that are not upcoming
+
+        Args:
+            playlist_entries_id (list): IDs of the upcoming playlist entries,
+                whose preparation is kept.
+        """
+        for playlist_entry_id in list(self.prepared_transition_texts):
+            if playlist_entry_id not in playlist_entries_id:
+                self.prepared_transition_texts.pop(playlist_entry_id, None)
+
+    def get_transition_text(self, playlist_entry):
+        """Get the live transition text of a playlist entry
+
+        The text prepared in advance is used if possible.
+
+        Args:
+            playlist_entry (dict): dictionnary of the playlist entry.
+
+        Returns:
+            str: transition text.
+        """
+        text = self.prepared_transition_texts.get(playlist_entry["id"])
+        if text is not None:
+            logger.debug("Using prepared transition text")
+            return text
+
+        return self.text_generator.create_transition_text(
+            playlist_entry, fade_in=self.transition_text_fade_in
+        )
+
+    def request_reload(self, config):
+        """Request to apply a new config on next transition or idle screen
+
+        Only the templates, the backgrounds and the transition duration are
+        reloaded. They are loaded in the calling thread, so that the player
+        is not slowed down. If they cannot be loaded, the error is logged and
+        the current config is kept.
+
+        Args:
+            config (dict): new configuration of the player.
+        """
+        try:
+            prepared = self.prepare_reload(config)
+
+        except Exception as error:
+            logger.error("Unable to reload config: %s", error)
+            return
+
+        with self.pending_reload_lock:
+            self.pending_reload = prepared
+
+        logger.debug("Config reload requested")
+
+    def apply_pending_reload(self):
+        """Apply the config requested to reload, if any
+
+        This should be called by the actual player before playing a transition
+        or the idle screen.
+        """
+        with self.pending_reload_lock:
+            prepared = self.pending_reload
+            self.pending_reload = None
+
+        if prepared is None:
+            return
+
+        self.reload(prepared)
+
+    def prepare_reload(self, config):
+        """Load the templates, the backgrounds and the transition duration
+
+        The current ones are not modified.
+
+        Args:
+            config (dict): new configuration of the player.
+
+        Returns:
+            dict: loaded templates, backgrounds and durations, to give to
+            `reload`.
+        """
+        config_backgrounds = config.get("backgrounds") or {}
+        config_durations = config.get("durations") or {}
+
+        return {
+            "templates": self.text_generator.prepare_reload(
+                config.get("templates") or {}
+            ),
+            "backgrounds": self.background_loader.prepare_reload(
+                directory=Path(config_backgrounds.get("directory", "")),
+                background_filenames={
+                    "transition": config_backgrounds.get("transition_background_name"),
+                    "idle": config_backgrounds.get("idle_background_name"),
+                },
+            ),
+            "durations": {
+                "transition": config_durations.get(
+                    "transition_duration", TRANSITION_DURATION
+                )
+            },
+        }
+
+    def reload(self, prepared):
+        """Apply the templates, the backgrounds and the transition duration
+
+        The transition texts prepared in advance are discarded if the
+        transition template has changed. The pre-rendered transition clips
+        depend on the template, the background and the duration, so the
+        outdated clips are not used anymore.
+
+        Args:
+            prepared (dict): templates, backgrounds and durations returned by
+                `prepare_reload`.
+        """
+        changed_templates = self.text_generator.reload(prepared["templates"])
+        changed_backgrounds = self.background_loader.reload(prepared["backgrounds"])
+
+        changed_durations = set()
+        for name, duration in prepared["durations"].items():
+            if duration != self.durations[name]:
+                self.durations[name] = duration
+                changed_durations.add(name)
+
+        if "transition" in changed_templates:
+            self.prepared_transition_texts.clear()
+
+        logger.info(
+            "Config reloaded, changed templates: %s, backgrounds: %s, durations: %s",
+            ", ".join(sorted(changed_templates)) or "none",
+            ", ".join(sorted(changed_backgrounds)) or "none",
+            ", ".join(sorted(changed_durations)) or "none",
+        )
+
     def play_playlist_entry(self, playlist_entry):
         """Play the specified playlist entry
 
@@ -176,11 +561,51 @@ class MediaPlayer(Worker):
         """
         raise NotImplementedError
 
+    def resume_playlist_entry(self, playlist_entry, timing):
+        """Resume the specified playlist entry
+
+        The song is played directly at the given timing, without transition
+        screen. This is used to resume a song after the player has been
+        restarted. If the song file cannot be found, the playlist entry is
+        played normally.
+
+        Args:
+            playlist_entry (dict): dictionnary containing at least `id` and
+                `song` attributes. `song` is a dictionary containing at least
+                the key `file_path`.
+            timing (float): timing in seconds where to resume the song.
+        """
+        raise NotImplementedError
+
     def play_idle_screen(self):
         """Play idle screen
         """
         raise NotImplementedError
 
+    def start_idle_cpu_measure(self):
+        """Start to measure the CPU usage of the idle screen
+
+        Does nothing if the measure is already running.
+        """
+        self.idle_cpu_meter.start()
+
+    def report_idle_cpu_usage(self):
+        """Log the CPU usage of the idle screen and stop the measure
+
+        Does nothing if no measure is running.
+        """
+        usage = self.idle_cpu_meter.stop()
+        if usage is None:
+            return
+
+        cpu_time, duration, percent = usage
+        logger.info(
+            "Idle screen used %.1f%% of CPU (%.1f s of CPU time over %.0f s)",
+            percent,
+            cpu_time,
+            duration,
+        )
+
     def is_idle(self):
         """Get player idling status
 
@@ -201,9 +626,24 @@ class MediaPlayer(Worker):
     def get_timing(self):
         """Player timing getter
 
+        The timing is given by the playback clock, so the player is not
+        queried on each call.
+
+        Returns:
+            float: current song timing in seconds, with a precision of one
+                millisecond, if a song is playing or 0 when idle or during
+                transition screen.
+        """
+        if self.is_idle() or self.in_transition:
+            return 0
+
+        return self.clock.get_time() / 1000
+
+    def get_player_time(self):
+        """Get the playback time directly from the player
+
         Returns:
-            int: current song timing in seconds if a song is playing or 0 when
-                idle or during transition screen.
+            int: playback time of the current media in milliseconds.
         """
         raise NotImplementedError
 
@@ -233,6 +673,7 @@ class MediaPlayer(Worker):
     def exit_worker(self, exception_type, exception_value, traceback):
         """Exit the worker
         """
+        self.report_idle_cpu_usage()
         self.stop_player()
 
 
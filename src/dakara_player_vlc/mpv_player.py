@@ -4,10 +4,21 @@ from threading import Timer
 
 import mpv
 
+from dakara_player_vlc.log_limiter import BURST, INTERVAL, LogLimiter
 from dakara_player_vlc.media_player import MediaPlayer
+from dakara_player_vlc.transition_cache import TransitionRenderError
 from dakara_player_vlc.version import __version__
 
 
+LOG_LEVELS = {
+    "fatal": logging.CRITICAL,
+    "error": logging.ERROR,
+    "warn": logging.WARNING,
+    "info": logging.INFO,
+    "debug": logging.DEBUG,
+}
+
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,13 +33,40 @@ class MpvPlayer(MediaPlayer):
         player (mpv.Mpv): instance of mpv, attached to the actual player.
         media_pending (str): path of a song which will be played after the transition
             screen.
+        log_limiter (log_limiter.LogLimiter): deduplicator and rate limiter of
+            the mpv log messages.
+        last_error (str): last error message of mpv for the current file.
     """
 
+    # the live transition screen has no fade-in effect as it stutters
+    transition_text_fade_in = False
+
     def init_player(self, config, tempdir):
         # set mpv player options and logging
         config_loglevel = config.get("loglevel") or "info"
-        self.player = mpv.MPV(log_handler=self.handle_log_messages,
-                              loglevel=config_loglevel)
+        config_mpv_log = config.get("mpv_log") or {}
+        self.log_limiter = LogLimiter(
+            logger,
+            "mpv",
+            burst=config_mpv_log.get("burst", BURST),
+            interval=config_mpv_log.get("interval", INTERVAL),
+        )
+        self.last_error = None
+
+        # the level of each component is filtered by mpv itself, so that
+        # discarded messages are not sent to the log handler
+        config_levels = config_mpv_log.get("levels") or {}
+        options = {}
+        if config_levels:
+            levels = {"all": config_loglevel, **config_levels}
+            options["msg_level"] = ",".join(
+                "{}={}".format(component, level) for component, level in levels.items()
+            )
+            config_loglevel = "terminal-default"
+
+        self.player = mpv.MPV(
+            log_handler=self.handle_log_messages, loglevel=config_loglevel, **options
+        )
         config_mpv = config.get("mpv") or {}
         for mpv_option in config_mpv:
             self.player[mpv_option] = config_mpv[mpv_option]
@@ -77,8 +115,13 @@ class MpvPlayer(MediaPlayer):
         Args:
             event (mpv.MpvEventEndFile): mpv end fle event object.
         """
+        # a file that cannot be played is a failure of the current media
+        if event["event"]["reason"] == mpv.MpvEventEndFile.ERROR:
+            self.handle_playback_error()
+            return
+
         # check that the reason is actually a file ending (could be a force stop)
-        if (event["event"]["reason"] != mpv.MpvEventEndFile.EOF):
+        if event["event"]["reason"] != mpv.MpvEventEndFile.EOF:
             return
 
         logger.debug("Song end callback called")
@@ -88,17 +131,9 @@ class MpvPlayer(MediaPlayer):
             # request to play the song itself
             self.in_transition = False
 
-            # manually set the subtitles as a workaround for the matching of mpv being
-            # too permissive
-            filename_without_ext = os.path.splitext(self.media_pending)[0]
-            sub_file = None
-            if os.path.exists(f"{filename_without_ext}.ass"):
-                sub_file = f"{filename_without_ext}.ass"
-            elif os.path.exists(f"{filename_without_ext}.ssa"):
-                sub_file = f"{filename_without_ext}.ssa"
-
             thread = self.create_thread(
-                target=self.play_media, args=(self.media_pending, sub_file)
+                target=self.play_media,
+                args=(self.media_pending, self.get_sub_file(self.media_pending)),
             )
 
             thread.start()
@@ -106,6 +141,9 @@ class MpvPlayer(MediaPlayer):
             # get file path
             logger.info("Now playing '%s'", self.media_pending)
 
+            # reset the clock for the new song
+            self.clock.reset()
+
             # call the callback for when a song starts
             self.callbacks["started_song"](self.playing_id)
 
@@ -122,52 +160,92 @@ class MpvPlayer(MediaPlayer):
         # so call the right callback
         self.callbacks["finished"](self.playing_id)
 
+    @staticmethod
+    def get_sub_file(media):
+        """Get the subtitle file of a song
+
+        The subtitles are manually set as a workaround for the matching of mpv
+        being too permissive.
+
+        Args:
+            media (str): path of the song file.
+
+        Returns:
+            str: path of the subtitle file, None if there is no subtitle file.
+        """
+        filename_without_ext = os.path.splitext(media)[0]
+        if os.path.exists(f"{filename_without_ext}.ass"):
+            return f"{filename_without_ext}.ass"
+
+        if os.path.exists(f"{filename_without_ext}.ssa"):
+            return f"{filename_without_ext}.ssa"
+
+        return None
+
     def handle_log_messages(self, loglevel, component, message):
         """Callback called when a log message occurs
 
-        Direct the message to the logger for Dakara Player.
-        If the level is 'error' or higher, call the callbacks
-        `callbackss["finished"]` and `callbacks["error"]`
+        Direct the message to the logger for Dakara Player, through the log
+        limiter. Error messages do not mean the current media has failed, as
+        mpv can recover from most of them (e.g. decoding errors), but the last
+        one is kept to explain a failure.
 
         Args:
             loglevel (str): level of the log message
             component (str): component of mpv that generated the message
             message (str): actual log message
         """
-        if loglevel == "fatal":
-            intlevel = logging.CRITICAL
-        elif loglevel == "error":
-            intlevel = logging.ERROR
-        elif loglevel == "warn":
-            intlevel = logging.WARNING
-        elif loglevel == "info":
-            intlevel = logging.INFO
-        elif loglevel == "debug":
-            intlevel = logging.DEBUG
-        else:
-            intlevel = logging.NOTSET
-
-        logger.log(intlevel, f"mpv: {component}: {message}")
+        intlevel = LOG_LEVELS.get(loglevel, logging.NOTSET)
+        message = message.rstrip("\n")
 
         if intlevel >= logging.ERROR:
+            self.last_error = message
+
+        if not logger.isEnabledFor(intlevel):
+            return
+
+        self.log_limiter.log(intlevel, component, message)
+
+    def handle_playback_error(self):
+        """Callback called when the current media cannot be played
+
+        mpv ends a file with an error once, so the callbacks
+        `callbacks["finished"]` and `callbacks["error"]` are called once for
+        the current media. The failure of the idle screen is only logged.
+        """
+        if self.last_error:
+            message = "Unable to play current media: {}".format(self.last_error)
+
+        else:
             message = "Unable to play current media"
-            logger.error(message)
 
-            self.in_transition = False
+        logger.error(message)
+        self.last_error = None
 
+        if self.playing_id is not None:
             self.callbacks["finished"](self.playing_id)
             self.callbacks["error"](self.playing_id, message)
 
-    def play_media(self, media, sub_file=None):
+        # reset current state
+        self.playing_id = None
+        self.in_transition = False
+
+    def play_media(self, media, sub_file=None, **options):
         """Play the given media
 
         Args:
             media (str): path to media
+            sub_file (str): path to a subtitle file.
+            Extra arguments are passed as options for this media only.
         """
+        self.last_error = None
         self.player["sub-files"] = [sub_file] if sub_file else []
-        self.player.loadfile(media)
+        self.player.loadfile(media, **options)
 
     def play_playlist_entry(self, playlist_entry):
+        # apply the reloaded config
+        self.apply_pending_reload()
+
         # file location
         file_path = self.kara_folder_path / playlist_entry["song"]["file_path"]
 
@@ -181,25 +259,65 @@ class MpvPlayer(MediaPlayer):
 
             return
 
+        # leave the idle screen
+        self.report_idle_cpu_usage()
+
         # create the media
         self.playing_id = playlist_entry["id"]
         self.media_pending = str(file_path)
 
-        # create the transition screen
-        with self.transition_text_path.open("w", encoding="utf8") as file:
-            file.write(self.text_generator.create_transition_text(playlist_entry,
-                fade_in=False))
+        # create the transition screen, use the pre-rendered clip if possible
+        # the live transition screen has no fade-in effect as it stutters, but
+        # the pre-rendered clip has one
+        clip = self.get_transition_clip(playlist_entry)
+        self.in_transition = True
 
-        media_transition = str(self.background_loader.backgrounds["transition"])
+        if clip is not None:
+            self.play_media(str(clip))
 
-        self.in_transition = True
+        else:
+            with self.transition_text_path.open("w", encoding="utf8") as file:
+                file.write(self.get_transition_text(playlist_entry))
+
+            media_transition = str(self.background_loader.backgrounds["transition"])
+            self.player.image_display_duration = int(self.durations["transition"])
+            self.play_media(media_transition, self.transition_text_path)
 
-        self.player.image_display_duration = int(self.durations["transition"])
-        self.play_media(media_transition, self.transition_text_path)
         logger.info("Playing transition for '%s'", file_path)
         self.callbacks["started_transition"](playlist_entry["id"])
 
+        # prepare the background of the next transition
+        self.prepare_next_background("transition")
+
+    def resume_playlist_entry(self, playlist_entry, timing):
+        # file location
+        file_path = self.kara_folder_path / playlist_entry["song"]["file_path"]
+
+        # play the entry normally if the file does not exist
+        if not file_path.exists():
+            self.play_playlist_entry(playlist_entry)
+            return
+
+        # leave the idle screen
+        self.report_idle_cpu_usage()
+
+        # play the song directly
+        self.playing_id = playlist_entry["id"]
+        self.in_transition = False
+        self.media_pending = str(file_path)
+        self.clock.reset()
+        self.play_media(
+            self.media_pending, self.get_sub_file(self.media_pending), start=timing
+        )
+        logger.info("Resuming '%s' at %.1f s", file_path, timing)
+
+        # call the callback for when a song starts
+        self.callbacks["started_song"](self.playing_id)
+
     def play_idle_screen(self):
+        # apply the reloaded config
+        self.apply_pending_reload()
+
         # set idle state
         self.playing_id = None
         self.in_transition = False
@@ -221,19 +339,57 @@ class MpvPlayer(MediaPlayer):
             )
 
         self.player.image_display_duration = "inf"
-        self.play_media(media, self.idle_text_path)
+
+        if self.idle_power_saving:
+            # mpv draws a still picture only once, so there is no need to cap
+            # the frame rate, but the hardware decoder can be released
+            self.play_media(media, self.idle_text_path, hwdec="no")
+
+        else:
+            self.play_media(media, self.idle_text_path)
+
         logger.debug("Playing idle screen")
+        self.start_idle_cpu_measure()
+
+        # prepare the background of the next idle screen
+        self.prepare_next_background("idle")
+
+    def render_transition_clip(self, background_path, text_path, duration, output_path):
+        # the clip is rendered by a dedicated mpv instance in encoding mode,
+        # which burns the text in the video
+        try:
+            encoder = mpv.MPV(
+                o=str(output_path),
+                of="matroska",
+                ovc="libx264",
+                image_display_duration=int(duration),
+                sub_files=str(text_path),
+            )
 
-    def get_timing(self):
-        if self.is_idle() or self.in_transition:
-            return 0
+        except (AttributeError, ValueError, TypeError) as error:
+            raise TransitionRenderError(
+                "mpv does not support encoding mode: {}".format(error)
+            ) from error
+
+        try:
+            encoder.play(str(background_path))
+            encoder.wait_for_playback()
+
+        except (RuntimeError, SystemError) as error:
+            raise TransitionRenderError(
+                "mpv was unable to render the clip: {}".format(error)
+            ) from error
 
+        finally:
+            encoder.terminate()
+
+    def get_player_time(self):
         timing = self.player.time_pos
 
         if timing is None:
             return 0
 
-        return int(timing)
+        return int(timing * 1000)
 
     def is_paused(self):
         return self.player.pause
@@ -247,6 +403,7 @@ class MpvPlayer(MediaPlayer):
 
                 logger.info("Setting pause")
                 self.player.pause = True
+                self.clock.sync(playing=False)
                 logger.debug("Set pause")
                 self.callbacks["paused"](self.playing_id, self.get_timing())
 
@@ -257,6 +414,7 @@ class MpvPlayer(MediaPlayer):
 
                 logger.info("Resuming play")
                 self.player.pause = False
+                self.clock.sync(playing=True)
                 logger.debug("Resumed play")
                 self.callbacks["resumed"](self.playing_id, self.get_timing())
 
@@ -272,6 +430,9 @@ class MpvPlayer(MediaPlayer):
         # clear the warning
         timer_stop_player_too_long.cancel()
 
+        # log the pending counts of repeated and suppressed messages
+        self.log_limiter.flush()
+
         logger.debug("Stopped player")
 
     @staticmethod
@@ -279,4 +440,3 @@ class MpvPlayer(MediaPlayer):
         """Notify the user that mpv takes too long to stop
         """
         logger.warning("mpv takes too long to stop")
-
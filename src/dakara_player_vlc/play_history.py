@@ -0,0 +1,196 @@
+import json
+import logging
+import os
+import time
+from threading import Lock
+
+from path import Path
+
+
+HISTORY_FILE_NAME = "player_vlc_history.json"
+HALF_LIFE = 30 * 24 * 3600
+MAX_ENTRIES = 1000
+
+
+logger = logging.getLogger(__name__)
+
+
+class PlayHistory:
+    """Compact history of the songs played
+
+    For each song file, the history keeps the number of times it has been
+    played and the time it was last played. Songs are ranked by a score, which
+    is their play count halved every `half_life` seconds since they were last
+    played, so that recent hits come first. Only the `max_entries` songs with
+    the best score are kept.
+
+    Recording a play only updates the history in memory, the file is written
+    when the history is flushed, so that the caller is not slowed down by the
+    disk.
+
+    The history is stored in a JSON file, written atomically by using a
+    temporary file which is renamed. The file contains a dictionary whose keys
+    are the song file paths and whose values are lists of the play count and
+    the time of the last play.
+
+    Example of use:
+
+    >>> history = PlayHistory(Path("history.json"))
+    >>> history.load()
+    >>> history.record("path/to/file.mkv")
+    >>> history.flush()
+    >>> history.get_most_likely()
+    ['path/to/file.mkv']
+
+    Args:
+        path (path.Path): path of the history file.
+        half_life (float): duration in seconds after which the score of a
+            song is halved.
+        max_entries (int): maximum number of songs in the history.
+
+    Attributes:
+        path (path.Path): path of the history file.
+        half_life (float): duration in seconds after which the score of a
+            song is halved.
+        max_entries (int): maximum number of songs in the history.
+        entries (dict): play count and time of the last play, by song file
+            path.
+        dirty (bool): True if the history has changed since it was last
+            written.
+    """
+
+    def __init__(self, path, half_life=HALF_LIFE, max_entries=MAX_ENTRIES):
+        self.path = Path(path)
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self.lock = Lock()
+        self.save_lock = Lock()
+        self.entries = {}
+        self.dirty = False
+
+    def load(self):
+        """Read the history file
+        """
+        if not self.path.exists():
+            logger.debug("No play history file found")
+            return
+
+        try:
+            with self.path.open(encoding="utf8") as file:
+                entries = json.load(file)
+
+        except (OSError, ValueError) as error:
+            logger.warning("Unable to read play history file: %s", error)
+            return
+
+        # the file may have been modified by hand, so its content is checked
+        # before being used
+        try:
+            entries = {
+                file_path: (int(count), float(last_played))
+                for file_path, (count, last_played) in entries.items()
+            }
+
+        except (AttributeError, TypeError, ValueError) as error:
+            logger.warning("Invalid play history file: %s", error)
+            return
+
+        with self.lock:
+            self.entries = entries
+
+        logger.debug("Loaded play history of %i songs", len(self.entries))
+
+    def get_score(self, count, last_played, now):
+        """Get the score of a song
+
+        Args:
+            count (int): number of plays of the song.
+            last_played (float): time of the last play.
+            now (float): current time.
+
+        Returns:
+            float: score of the song.
+        """
+        return count * 0.5 ** (max(0, now - last_played) / self.half_life)
+
+    def record(self, file_path):
+        """Record that a song has been played
+
+        Args:
+            file_path (str): path of the song file.
+        """
+        now = time.time()
+        with self.lock:
+            count, _ = self.entries.get(str(file_path), (0, now))
+            self.entries[str(file_path)] = (count + 1, now)
+
+            if len(self.entries) > self.max_entries:
+                self.entries = {
+                    file_path: self.entries[file_path]
+                    for file_path in self.get_ranking(now)[: self.max_entries]
+                }
+
+            self.dirty = True
+
+    def flush(self):
+        """Write the history file if the history has changed
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+
+            entries = dict(self.entries)
+            self.dirty = False
+
+        self.save(entries)
+
+    def get_ranking(self, now):
+        """Get the song file paths ranked by score
+
+        Must be called with the lock held.
+
+        Args:
+            now (float): current time.
+
+        Returns:
+            list: song file paths, from the best score to the worst.
+        """
+        return sorted(
+            self.entries,
+            key=lambda file_path: self.get_score(*self.entries[file_path], now),
+            reverse=True,
+        )
+
+    def get_most_likely(self, limit=None):
+        """Get the songs the most likely to be played
+
+        Args:
+            limit (int): maximum number of songs to get. If not given, all
+                songs are given.
+
+        Returns:
+            list: song file paths, from the most likely to the least likely.
+        """
+        with self.lock:
+            return self.get_ranking(time.time())[:limit]
+
+    def save(self, entries):
+        """Write the history file
+
+        Only one thread writes the file at a time, as they use the same
+        temporary file.
+
+        Args:
+            entries (dict): entries to write.
+        """
+        with self.save_lock:
+            try:
+                self.path.dirname().makedirs_p()
+                path_temp = self.path + ".tmp"
+                with path_temp.open("w", encoding="utf8") as file:
+                    json.dump(entries, file)
+
+                os.replace(path_temp, self.path)
+
+            except OSError as error:
+                logger.warning("Unable to write play history file: %s", error)
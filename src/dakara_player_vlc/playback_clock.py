@@ -0,0 +1,129 @@
+import time
+from threading import Lock
+
+
+RESYNC_INTERVAL = 5
+
+
+class PlaybackClock:
+    """Clock giving the playback time of the player
+
+    The clock keeps the last time given by the player, together with the
+    monotonic time at which it has been sampled. While playing, the playback
+    time is extrapolated from this sample, so that the player is not queried
+    on each call. The clock is synchronized with the player on demand (on
+    pause, resume, seek or rate change), and automatically after
+    `resync_interval` seconds.
+
+    Example of use:
+
+    >>> clock = PlaybackClock(lambda: player.get_time())
+    >>> clock.reset()
+    >>> clock.get_time()
+    1234
+    >>> player.pause()
+    >>> clock.sync(playing=False)
+
+    Args:
+        get_player_time (function): function that gives the playback time of
+            the player in milliseconds.
+        resync_interval (float): maximum duration in seconds between two
+            synchronizations with the player while playing.
+
+    Attributes:
+        get_player_time (function): function that gives the playback time of
+            the player in milliseconds.
+        resync_interval (float): maximum duration in seconds between two
+            synchronizations with the player while playing.
+        reference_time (int): playback time of the last sample in
+            milliseconds. None if the clock has not been synchronized yet.
+        reference_timestamp (float): monotonic time of the last sample in
+            seconds.
+        playing (bool): True if the playback time is advancing.
+        rate (float): playback rate.
+    """
+
+    def __init__(self, get_player_time, resync_interval=RESYNC_INTERVAL):
+        self.get_player_time = get_player_time
+        self.resync_interval = resync_interval
+        self.lock = Lock()
+        self.reference_time = None
+        self.reference_timestamp = None
+        self.playing = True
+        self.rate = 1.0
+
+    def reset(self, playing=True, rate=1.0):
+        """Forget the last sample
+
+        The clock will be synchronized with the player on the next call of
+        `get_time`. This should be called when a new media starts.
+
+        Args:
+            playing (bool): True if the playback time is advancing.
+            rate (float): playback rate.
+        """
+        with self.lock:
+            self.reference_time = None
+            self.reference_timestamp = None
+            self.playing = playing
+            self.rate = rate
+
+    def sync(self, playing=None, rate=None):
+        """Synchronize the clock with the player
+
+        Args:
+            playing (bool): True if the playback time is advancing. If not
+                given, the previous value is kept.
+            rate (float): playback rate. If not given, the previous value is
+                kept.
+        """
+        with self.lock:
+            if playing is not None:
+                self.playing = playing
+
+            if rate is not None:
+                self.rate = rate
+
+            self.sample()
+
+    def sample(self):
+        """Query the player for its playback time
+
+        If the player has not started to play yet, the sample is discarded, as
+        it cannot be used for extrapolation.
+
+        Must be called with the lock held.
+
+        Returns:
+            int: playback time in milliseconds.
+        """
+        player_time = self.get_player_time()
+        if player_time <= 0:
+            self.reference_time = None
+            self.reference_timestamp = None
+            return 0
+
+        self.reference_time = player_time
+        self.reference_timestamp = time.monotonic()
+
+        return player_time
+
+    def get_time(self):
+        """Get the playback time
+
+        Returns:
+            int: playback time in milliseconds.
+        """
+        with self.lock:
+            now = time.monotonic()
+
+            if self.reference_time is None or (
+                self.playing and now - self.reference_timestamp > self.resync_interval
+            ):
+                return self.sample()
+
+            if not self.playing:
+                return self.reference_time
+
+            elapsed = (now - self.reference_timestamp) * 1000 * self.rate
+            return self.reference_time + int(elapsed)
@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+from threading import Lock
+
+from dakara_base.safe_workers import Worker
+from path import Path
+
+
+FLUSH_INTERVAL = 2
+STATE_FILE_NAME = "player_vlc_state.json"
+
+
+logger = logging.getLogger(__name__)
+
+
+class PlayerState(Worker):
+    """Persistent state of the player
+
+    The state contains the playlist entry ID of the current song, its file
+    path and its timing. It is written in a state file, so that the player can
+    resume the song if it is restarted after a crash.
+
+    To not disturb playback, the state is updated in memory only, and written
+    periodically by a thread, only if it has changed. The file is written
+    atomically by using a temporary file which is renamed.
+
+    Example of use:
+
+    >>> with PlayerState(stop, errors, Path("state.json"), get_timing) as state:
+    ...     state.load()
+    ...     saved_state = state.pop_saved_state()
+    ...     state.thread.start()
+    ...     state.set_playing(42, "path/to/file.mkv")
+
+    Args:
+        stop (Event): event to stop the program.
+        errors (Queue): queue of errors.
+        path (path.Path): path of the state file.
+        get_timing (function): function that gives the timing of the current
+            song in seconds.
+        flush_interval (float): interval in seconds between two writings of
+            the state file.
+
+    Attributes:
+        path (path.Path): path of the state file.
+        get_timing (function): function that gives the timing of the current
+            song in seconds.
+        flush_interval (float): interval in seconds between two writings of
+            the state file.
+        state (dict): current state. None if no song is playing.
+        saved_state (dict): state loaded from the state file on startup. None
+            if there were no song playing.
+        thread (SafeThread): thread writing the state file.
+    """
+
+    def init_worker(self, path, get_timing, flush_interval=FLUSH_INTERVAL):
+        self.path = Path(path)
+        self.get_timing = get_timing
+        self.flush_interval = flush_interval
+        self.lock = Lock()
+        self.state = None
+        self.saved_state = None
+        self.written_content = None
+
+        # create the writing thread
+        self.thread = self.create_thread(target=self.run)
+
+    def load(self):
+        """Load the state saved by the previous execution of the player
+        """
+        if not self.path.exists():
+            logger.debug("No player state file found")
+            return
+
+        try:
+            with self.path.open() as file:
+                self.written_content = file.read()
+
+            saved_state = json.loads(self.written_content)
+
+        except (OSError, ValueError) as error:
+            logger.warning("Unable to read player state file: %s", error)
+            return
+
+        if saved_state is None:
+            return
+
+        # the file may have been written by another version of the player or
+        # modified by hand, so its content is checked before being resumed
+        try:
+            playlist_entry_id = int(saved_state["playlist_entry_id"])
+            file_path = str(saved_state["file_path"])
+            timing = float(saved_state["timing"])
+
+        except KeyError as error:
+            logger.warning("Invalid player state file: missing key %s", error)
+            return
+
+        except (TypeError, ValueError) as error:
+            logger.warning("Invalid player state file: %s", error)
+            return
+
+        self.saved_state = {
+            "playlist_entry_id": playlist_entry_id,
+            "file_path": file_path,
+            "timing": timing,
+        }
+
+        logger.debug(
+            "Previous player state: playlist entry %i at %.1f s",
+            playlist_entry_id,
+            timing,
+        )
+
+    def pop_saved_state(self):
+        """Get the saved state and forget it
+
+        Returns:
+            dict: saved state. None if there were no song playing, or if the
+                saved state has already been popped.
+        """
+        with self.lock:
+            saved_state = self.saved_state
+            self.saved_state = None
+
+        return saved_state
+
+    def set_playing(self, playlist_entry_id, file_path, timing=0):
+        """Set the song that is currently playing
+
+        Args:
+            playlist_entry_id (int): ID of the playlist entry.
+            file_path (str): path of the song file.
+            timing (float): timing of the song in seconds.
+        """
+        with self.lock:
+            self.state = {
+                "playlist_entry_id": playlist_entry_id,
+                "file_path": str(file_path),
+                "timing": timing,
+            }
+
+    def clear(self):
+        """Set that no song is currently playing
+        """
+        with self.lock:
+            self.state = None
+
+    def run(self):
+        """Write the state file periodically until the end of the program
+        """
+        while not self.stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write the state file if the state has changed
+        """
+        with self.lock:
+            if self.state is not None:
+                self.state["timing"] = self.get_timing()
+
+            content = json.dumps(self.state)
+
+        if content == self.written_content:
+            return
+
+        path_temp = self.path + ".tmp"
+        try:
+            with path_temp.open("w") as file:
+                file.write(content)
+
+            os.replace(path_temp, self.path)
+
+        except OSError as error:
+            logger.warning("Unable to write player state file: %s", error)
+            return
+
+        self.written_content = content
+
+    def exit_worker(self, *args, **kwargs):
+        """Write the state file a last time
+        """
+        self.flush()
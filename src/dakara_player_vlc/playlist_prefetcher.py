@@ -0,0 +1,127 @@
+import logging
+from threading import Event
+
+from dakara_base.http_client import ResponseError
+from dakara_base.safe_workers import Worker
+
+
+COUNT = 3
+POLL_INTERVAL = 10
+WARM_SIZE = 16 * 1024 * 1024
+
+
+logger = logging.getLogger(__name__)
+
+
+class PlaylistPrefetcher(Worker):
+    """Prepare the upcoming playlist entries ahead of time
+
+    The WebSocket connection only gives the playlist entry to play now. To
+    prepare the next ones, the queue of playlist entries is polled with the
+    HTTP connection every `poll_interval` seconds, or immediately on request.
+    When the queue changes, the new upcoming playlist entries are prepared by
+    the media player, see `MediaPlayer.prepare_playlist_entry`, and the
+    preparation of the ones which left the queue is forgotten.
+
+    Example of use:
+
+    >>> with PlaylistPrefetcher(
+    ...     stop, errors, http_connection, media_player
+    ... ) as playlist_prefetcher:
+    ...     playlist_prefetcher.thread.start()
+    ...     playlist_prefetcher.request_poll()
+
+    Args:
+        stop (Event): event to stop the program.
+        errors (Queue): queue of errors.
+        dakara_server_http (dakara_server.DakaraServerHTTPConnection):
+            interface to the Dakara server for the HTTP protocol. It must not
+            mute errors.
+        media_player (media_player.MediaPlayer): media player preparing the
+            playlist entries.
+        count (int): number of upcoming playlist entries to prepare.
+        poll_interval (float): interval in seconds between two polls.
+        warm_size (int): number of bytes of each song file to load in the page
+            cache.
+
+    Attributes:
+        dakara_server_http (dakara_server.DakaraServerHTTPConnection):
+            interface to the Dakara server for the HTTP protocol.
+        media_player (media_player.MediaPlayer): media player preparing the
+            playlist entries.
+        count (int): number of upcoming playlist entries to prepare.
+        poll_interval (float): interval in seconds between two polls.
+        warm_size (int): number of bytes of each song file to load in the page
+            cache.
+        upcoming_ids (list): IDs of the upcoming playlist entries at the last
+            poll. None if the queue has never been polled.
+        poll_requested (threading.Event): event set to poll immediately.
+        thread (SafeThread): thread polling the queue.
+    """
+
+    def init_worker(
+        self,
+        dakara_server_http,
+        media_player,
+        count=COUNT,
+        poll_interval=POLL_INTERVAL,
+        warm_size=WARM_SIZE,
+    ):
+        self.dakara_server_http = dakara_server_http
+        self.media_player = media_player
+        self.count = count
+        self.poll_interval = poll_interval
+        self.warm_size = warm_size
+        self.upcoming_ids = None
+        self.poll_requested = Event()
+
+        # create the polling thread
+        self.thread = self.create_thread(target=self.run)
+
+    def request_poll(self):
+        """Ask to poll the queue immediately
+
+        This can be called when a playlist entry starts, as it leaves the
+        queue.
+        """
+        self.poll_requested.set()
+
+    def run(self):
+        """Poll the queue periodically until the end of the program
+        """
+        while not self.stop.is_set():
+            self.poll()
+
+            self.poll_requested.wait(self.poll_interval)
+            self.poll_requested.clear()
+
+    def poll(self):
+        """Get the upcoming playlist entries and prepare them if they changed
+        """
+        try:
+            playlist_entries = self.dakara_server_http.get_queuing_playlist_entries(
+                self.count
+            )
+
+        except ResponseError:
+            logger.debug("Unable to get the upcoming playlist entries")
+            return
+
+        upcoming_ids = [playlist_entry["id"] for playlist_entry in playlist_entries]
+        if upcoming_ids == self.upcoming_ids:
+            return
+
+        logger.debug("Upcoming playlist entries changed: %s", upcoming_ids)
+        self.upcoming_ids = upcoming_ids
+        self.media_player.forget_prepared_playlist_entries(upcoming_ids)
+
+        for playlist_entry in playlist_entries:
+            if self.stop.is_set():
+                return
+
+            self.media_player.prepare_playlist_entry(playlist_entry, self.warm_size)
+
+    def exit_worker(self, *args, **kwargs):
+        """Wake up the polling thread so that it can end
+        """
+        self.poll_requested.set()
@@ -1,6 +1,7 @@
-from pkg_resources import resource_filename
+import os
+import pathlib
+from functools import lru_cache
 
-from dakara_base.resources_manager import generate_get_resource, resource_listdir
 from path import Path
 
 
@@ -9,21 +10,140 @@ RESOURCES_BACKGROUNDS = "dakara_player_vlc.resources.backgrounds"
 RESOURCES_TEMPLATES = "dakara_player_vlc.resources.templates"
 RESOURCES_FONTS = "dakara_player_vlc.resources.fonts"
 
-PATH_BACKGROUNDS = resource_filename(RESOURCES_BACKGROUNDS, "")
-PATH_TEMPLATES = resource_filename(RESOURCES_TEMPLATES, "")
-PATH_FONTS = resource_filename(RESOURCES_FONTS, "")
 
-LIST_BACKGROUNDS = resource_listdir(RESOURCES_BACKGROUNDS, "")
-LIST_TEMPLATES = resource_listdir(RESOURCES_TEMPLATES, "")
-LIST_FONTS = resource_listdir(RESOURCES_FONTS, "")
+@lru_cache(maxsize=None)
+def get_resource_directory(resource):
+    """Get the directory of a resource package
 
+    The directory is given by `importlib.resources`. For versions of Python
+    that do not have it, or for packages that are not on the file system,
+    `pkg_resources` is used instead. It is imported only then, as it is slow
+    to import. The directory is computed on first call only.
 
-get_background = generate_get_resource(
-    RESOURCES_BACKGROUNDS, LIST_BACKGROUNDS, "background"
-)
+    Args:
+        resource (str): requirement.
 
+    Returns:
+        path.Path: absolute path of the directory.
+    """
+    try:
+        from importlib.resources import files
+
+        directory = files(resource)
+
+    except ImportError:
+        directory = None
+
+    if isinstance(directory, pathlib.Path):
+        return Path(str(directory)).normpath()
+
+    from pkg_resources import resource_filename
+
+    return Path(resource_filename(resource, "")).normpath()
+
+
+@lru_cache(maxsize=None)
+def get_resource_list(resource):
+    """List the files of a resource package
+
+    Special files whose name starts with "__" (like "__init__.py") are
+    ignored. The list is computed on first call only.
+
+    Args:
+        resource (str): requirement.
+
+    Returns:
+        list: sorted filenames.
+    """
+    return sorted(
+        filename
+        for filename in os.listdir(get_resource_directory(resource))
+        if not filename.startswith("__")
+    )
+
+
+def get_resource(resource, filename, resource_name):
+    """Get a file within a resource package
+
+    Args:
+        resource (str): requirement.
+        filename (str): name of the file to get.
+        resource_name (str): human readable name of the resource.
+
+    Returns:
+        path.Path: absolute path of the file.
+
+    Raises:
+        ResourceNotFoundError: if the file cannot be get.
+    """
+    if filename not in get_resource_list(resource):
+        # the exception is defined in a module that imports pkg_resources
+        from dakara_base.resources_manager import ResourceNotFoundError
+
+        raise ResourceNotFoundError(
+            "{} file '{}' not found within resources".format(
+                resource_name.capitalize(), filename
+            )
+        )
+
+    return (get_resource_directory(resource) / filename).normpath()
+
+
+def get_background(filename):
+    """Get a background within the resource files
+
+    Args:
+        filename (str): name of the file to get.
 
-get_template = generate_get_resource(RESOURCES_TEMPLATES, LIST_TEMPLATES, "template")
+    Returns:
+        path.Path: absolute path of the file.
+
+    Raises:
+        ResourceNotFoundError: if the background cannot be get.
+    """
+    return get_resource(RESOURCES_BACKGROUNDS, filename, "background")
+
+
+def get_template(filename):
+    """Get a template within the resource files
+
+    Args:
+        filename (str): name of the file to get.
+
+    Returns:
+        path.Path: absolute path of the file.
+
+    Raises:
+        ResourceNotFoundError: if the template cannot be get.
+    """
+    return get_resource(RESOURCES_TEMPLATES, filename, "template")
+
+
+def get_backgrounds_directory():
+    """Get the directory of the background resource files
+
+    Returns:
+        path.Path: absolute path of the directory.
+    """
+    return get_resource_directory(RESOURCES_BACKGROUNDS)
+
+
+def get_templates_directory():
+    """Get the directory of the template resource files
+
+    Returns:
+        path.Path: absolute path of the directory.
+    """
+    return get_resource_directory(RESOURCES_TEMPLATES)
+
+
+def get_fonts_directory():
+    """Get the directory of the font resource files
+
+    Returns:
+        path.Path: absolute path of the directory.
+    """
+    return get_resource_directory(RESOURCES_FONTS)
 
 
 def get_all_fonts():
@@ -33,5 +153,6 @@ def get_all_fonts():
         list of path.Path: list containing the absolute path to the files.
     """
     return [
-        Path(resource_filename(RESOURCES_FONTS, filename)) for filename in LIST_FONTS
+        get_fonts_directory() / filename
+        for filename in get_resource_list(RESOURCES_FONTS)
     ]
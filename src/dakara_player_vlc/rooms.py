@@ -0,0 +1,461 @@
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from contextlib import ExitStack
+from copy import deepcopy
+from multiprocessing.connection import wait
+
+from dakara_base.config import create_logger, get_config_directory, set_loglevel
+from dakara_base.exceptions import DakaraError
+
+from dakara_player_vlc.backoff import Backoff
+from dakara_player_vlc.dakara_server import TOKEN_CACHE_FILE_NAME
+from dakara_player_vlc.font_loader import get_font_loader_class
+from dakara_player_vlc.media_player import MEDIA_PLAYERS
+from dakara_player_vlc.play_history import HISTORY_FILE_NAME
+from dakara_player_vlc.player_state import STATE_FILE_NAME
+from dakara_player_vlc.startup_trace import StartupTrace
+from dakara_player_vlc.status_journal import JOURNAL_FILE_NAME
+from dakara_player_vlc.supervisor import MAX_RESTARTS, RESTART_DELAY, RESTART_DELAY_MAX
+from dakara_player_vlc.version import check_version
+
+FontLoader = get_font_loader_class()
+
+
+ROOMS_DIRECTORY = "rooms"
+STOP_TIMEOUT = 10
+LOG_FORMAT = "[%(asctime)s] {} %(name)s %(levelname)s %(message)s"
+
+# files of a player that cannot be shared between rooms, as their config
+# section and subsection, the key of their path and their default name
+ROOM_FILES = [
+    ("server", "token_cache", "cache_file", TOKEN_CACHE_FILE_NAME),
+    ("server", "journal", "journal_file", JOURNAL_FILE_NAME),
+    ("player", "resume", "state_file", STATE_FILE_NAME),
+    ("player", "history", "history_file", HISTORY_FILE_NAME),
+]
+
+
+logger = logging.getLogger(__name__)
+
+
+def merge_config(config, config_override):
+    """Merge two configs recursively
+
+    Args:
+        config (dict): base config.
+        config_override (dict): config which values replace the ones of the
+            base config.
+
+    Returns:
+        dict: new merged config.
+    """
+    merged = deepcopy(config)
+    for key, value in config_override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+            continue
+
+        merged[key] = deepcopy(value)
+
+    return merged
+
+
+def get_room_config(config, config_room):
+    """Get the config of the player of a room
+
+    The config of the room is merged in the main config. The files that cannot
+    be shared between rooms, like the token cache or the player state, are put
+    by default in a directory of the room.
+
+    Args:
+        config (dict): main config.
+        config_room (dict): config of the room, with its name.
+
+    Returns:
+        dict: config of the player of the room.
+    """
+    room_config = merge_config(
+        {key: value for key, value in config.items() if key != "rooms"},
+        config_room.get("config") or {},
+    )
+
+    directory = get_config_directory().expand() / ROOMS_DIRECTORY / config_room["name"]
+    for section_name, subsection_name, key, file_name in ROOM_FILES:
+        section = room_config.setdefault(section_name, {})
+        subsection = section.get(subsection_name) or {}
+        if not subsection.get(key):
+            subsection[key] = str(directory / file_name)
+
+        section[subsection_name] = subsection
+
+    return room_config
+
+
+def run_room(name, config, cpus=None, environment=None):
+    """Run the player of a room
+
+    This is the entry point of the process of a room. The SIGTERM signal stops
+    the player as a Ctrl+C would. The SIGINT signal is ignored, as the
+    supervisor stops the rooms itself.
+
+    Args:
+        name (str): name of the room.
+        config (dict): config of the player of the room.
+        cpus (list of int): CPU cores the process is pinned to. Optional.
+        environment (dict): environment variables of the process, e.g. the
+            display of the room. Optional.
+
+    Returns:
+        int: exit code of the process.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    create_logger(custom_log_format=LOG_FORMAT.format(name))
+    set_loglevel(config)
+
+    if environment:
+        os.environ.update({key: str(value) for key, value in environment.items()})
+
+    if cpus:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+
+        else:
+            logger.warning("Unable to pin room to CPU cores on this platform")
+
+    from dakara_player_vlc.dakara_player_vlc import DakaraPlayerVlc
+
+    try:
+        DakaraPlayerVlc(config, load_fonts=False).run()
+
+    except KeyboardInterrupt:
+        return 0
+
+    except DakaraError as error:
+        logger.critical(error)
+        return 1
+
+    except BaseException as error:
+        logger.exception("Unexpected error: %s", str(error))
+        return 128
+
+    return 0
+
+
+def run_room_process(*args, **kwargs):
+    """Run the player of a room and exit the process with its exit code
+    """
+    sys.exit(run_room(*args, **kwargs))
+
+
+class Room:
+    """Room with its own player and screen
+
+    Args:
+        name (str): name of the room.
+        config (dict): config of the player of the room.
+        backoff (backoff.Backoff): delay before a restart of the room.
+        cpus (list of int): CPU cores the room is pinned to. Optional.
+        environment (dict): environment variables of the room. Optional.
+
+    Attributes:
+        name (str): name of the room.
+        config (dict): config of the player of the room.
+        cpus (list of int): CPU cores the room is pinned to.
+        environment (dict): environment variables of the room.
+        backoff (backoff.Backoff): delay before a restart of the room.
+        process (multiprocessing.Process): process of the room, None if not
+            running.
+        started_time (float): monotonic time of the last start.
+        restart_time (float): monotonic time of the next restart, None if no
+            restart is scheduled.
+        failures_count (int): number of failures in a row.
+        restarts_count (int): number of restarts.
+        failed (bool): true if the room failed too many times in a row.
+    """
+
+    def __init__(self, name, config, backoff, cpus=None, environment=None):
+        self.name = name
+        self.config = config
+        self.cpus = cpus
+        self.environment = environment
+        self.backoff = backoff
+        self.process = None
+        self.started_time = None
+        self.restart_time = None
+        self.failures_count = 0
+        self.restarts_count = 0
+        self.failed = False
+
+    def is_running(self):
+        """Tell if the room is running or will be restarted
+
+        Returns:
+            bool: true if the process of the room is running, or if a restart
+            is scheduled.
+        """
+        return self.process is not None or self.restart_time is not None
+
+
+class RoomSupervisor:
+    """Run several rooms from one host, each in its own process
+
+    Each room has its own player, server login and screen, and runs in a
+    worker process. The parts that can be shared are set up once: the fonts
+    are loaded by the supervisor, and, on platforms that support it, the
+    processes are forked from a server process where the modules of the player
+    and of the media players are already imported. Each process can be pinned
+    to CPU cores.
+
+    When the process of a room fails, it is restarted after a delay given by a
+    capped exponential backoff, without affecting the other rooms. A room that
+    fails `max_restarts` times in a row, without running for longer than the
+    maximum restart delay in between, is not restarted. The supervisor ends
+    when all the rooms have ended.
+
+    Example of use:
+
+    >>> room_supervisor = RoomSupervisor(config)
+    >>> room_supervisor.load()
+    >>> room_supervisor.run()
+
+    Args:
+        config (dict): configuration for the program, with the `rooms` section.
+        trace (startup_trace.StartupTrace): trace of the startup. Optional.
+        context (multiprocessing.context.BaseContext): context to create the
+            processes. By default, the forkserver context if available, or the
+            spawn context.
+
+    Attributes:
+        trace (startup_trace.StartupTrace): trace of the startup.
+        max_restarts (int): number of restarts in a row before giving up.
+        rooms (list of Room): rooms.
+        context (multiprocessing.context.BaseContext): context to create the
+            processes.
+    """
+
+    POLLING_INTERVAL = 0.5
+
+    def __init__(self, config, trace=None, context=None):
+        config_rooms = config.get("rooms") or {}
+        self.trace = trace or StartupTrace()
+        self.max_restarts = config_rooms.get("max_restarts", MAX_RESTARTS)
+        restart_delay = config_rooms.get("restart_delay", RESTART_DELAY)
+        restart_delay_max = config_rooms.get("restart_delay_max", RESTART_DELAY_MAX)
+
+        # create the rooms
+        self.rooms = []
+        for config_room in config_rooms.get("list") or []:
+            if not config_room.get("name"):
+                raise InvalidRoomsConfigError("A room has no name")
+
+            if config_room["name"] in (room.name for room in self.rooms):
+                raise InvalidRoomsConfigError(
+                    "Room '{}' is defined twice".format(config_room["name"])
+                )
+
+            self.rooms.append(
+                Room(
+                    config_room["name"],
+                    get_room_config(config, config_room),
+                    Backoff(restart_delay, restart_delay_max),
+                    cpus=config_room.get("cpus"),
+                    environment=config_room.get("environment"),
+                )
+            )
+
+        if not self.rooms:
+            raise InvalidRoomsConfigError("No rooms defined")
+
+        self.context = context or self.get_context()
+
+    def get_context(self):
+        """Get the context to create the processes
+
+        Returns:
+            multiprocessing.context.BaseContext: the forkserver context, where
+            the modules of the player are preloaded, if available, or the
+            spawn context.
+        """
+        if "forkserver" not in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context("spawn")
+
+        context = multiprocessing.get_context("forkserver")
+        modules = ["dakara_player_vlc.dakara_player_vlc"]
+        for room in self.rooms:
+            player_name = room.config["player"].get("player_name", "vlc")
+            if player_name in MEDIA_PLAYERS:
+                modules.append(MEDIA_PLAYERS[player_name][0])
+
+        context.set_forkserver_preload(sorted(set(modules)))
+
+        return context
+
+    def load(self):
+        """Execute side-effect actions
+        """
+        # check version
+        with self.trace.span("load/check version"):
+            check_version()
+
+    def run(self):
+        """Start the rooms and restart them when they fail, until they end
+
+        A Ctrl+C from the user stops all the rooms.
+
+        Raises:
+            RoomsFailedError: if some rooms failed too many times in a row.
+        """
+        with ExitStack() as stack:
+            # the fonts are loaded once for all the rooms
+            font_loader = stack.enter_context(FontLoader())
+            with self.trace.span("fonts/load"):
+                font_loader.load()
+
+            stack.callback(self.log_restarts_stats)
+            stack.callback(self.stop)
+
+            for room in self.rooms:
+                self.start_room(room)
+
+            self.trace.mark("run/ready")
+
+            try:
+                self.supervise()
+
+            except KeyboardInterrupt:
+                logger.info("Stopping rooms")
+
+        failed_rooms = [room.name for room in self.rooms if room.failed]
+        if failed_rooms:
+            raise RoomsFailedError(
+                "Rooms '{}' failed".format("', '".join(failed_rooms))
+            )
+
+    def start_room(self, room):
+        """Start the process of a room
+
+        Args:
+            room (Room): room to start.
+        """
+        room.process = self.context.Process(
+            target=run_room_process,
+            args=(room.name, room.config),
+            kwargs={"cpus": room.cpus, "environment": room.environment},
+            name="Room-{}".format(room.name),
+        )
+        room.process.start()
+        room.started_time = time.monotonic()
+        room.restart_time = None
+        logger.info("Started room '%s'", room.name)
+
+    def supervise(self):
+        """Restart the rooms that failed until all rooms have ended
+        """
+        while any(room.is_running() for room in self.rooms):
+            now = time.monotonic()
+            for room in self.rooms:
+                if room.process is not None and not room.process.is_alive():
+                    self.handle_room_end(room, now)
+
+                if room.restart_time is not None and now >= room.restart_time:
+                    room.restarts_count += 1
+                    self.start_room(room)
+                    logger.info(
+                        "Restarted room '%s' (restart %i)",
+                        room.name,
+                        room.restarts_count,
+                    )
+
+            # wait for a process to end or for the next restart
+            timeout = self.POLLING_INTERVAL
+            for room in self.rooms:
+                if room.restart_time is not None:
+                    timeout = max(0, min(timeout, room.restart_time - now))
+
+            wait(
+                [room.process.sentinel for room in self.rooms if room.process], timeout,
+            )
+
+    def handle_room_end(self, room, now):
+        """Schedule the restart of a room which process has ended
+
+        Args:
+            room (Room): room which process has ended.
+            now (float): current monotonic time.
+        """
+        exit_code = room.process.exitcode
+        room.process = None
+
+        if exit_code == 0:
+            logger.info("Room '%s' stopped", room.name)
+            return
+
+        logger.error("Room '%s' failed with exit code %i", room.name, exit_code)
+
+        # the failures count is reset if the room ran for long enough
+        if now - room.started_time > room.backoff.cap:
+            room.failures_count = 0
+            room.backoff.reset()
+
+        room.failures_count += 1
+        if room.failures_count > self.max_restarts:
+            logger.critical(
+                "Room '%s' failed %i times in a row, giving up",
+                room.name,
+                self.max_restarts,
+            )
+            room.failed = True
+            return
+
+        delay = room.backoff.get_delay()
+        room.restart_time = now + delay
+        logger.info("Restarting room '%s' in %.1f s", room.name, delay)
+
+    def stop(self):
+        """Stop the processes of the rooms
+
+        The processes are asked to stop, and killed if they do not stop in
+        time.
+        """
+        rooms = [room for room in self.rooms if room.process is not None]
+        for room in rooms:
+            room.restart_time = None
+            if room.process.is_alive():
+                room.process.terminate()
+
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for room in rooms:
+            room.process.join(max(0, deadline - time.monotonic()))
+            if room.process.is_alive():
+                logger.warning(
+                    "Room '%s' takes too long to stop, killing it", room.name
+                )
+                room.process.kill()
+                room.process.join()
+
+            room.process = None
+
+    def log_restarts_stats(self):
+        """Log the number of restarts of each room
+        """
+        for room in self.rooms:
+            if room.restarts_count:
+                logger.info(
+                    "Room '%s' restarted %i times", room.name, room.restarts_count
+                )
+
+
+class InvalidRoomsConfigError(DakaraError):
+    """Error raised when the rooms are not properly configured
+    """
+
+
+class RoomsFailedError(DakaraError):
+    """Error raised when rooms failed too many times in a row
+    """
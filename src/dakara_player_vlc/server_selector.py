@@ -0,0 +1,289 @@
+import logging
+import socket
+import time
+from threading import Event, Lock
+
+from dakara_base.safe_workers import Worker
+from dakara_base.utils import create_url
+from furl import furl
+
+
+PROBE_INTERVAL = 30
+PROBE_TIMEOUT = 2
+RTT_SMOOTHING = 0.3
+ENDPOINT_KEYS = ("url", "address", "host", "port", "ssl")
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_server_configs(config):
+    """Get the config of each server endpoint
+
+    The server config can contain a list of endpoints in the `endpoints` key.
+    Each endpoint is either an address, or a dictionary with the keys
+    defining the URL (`url`, `address`, `host`, `port` and `ssl`). The other
+    keys of the server config are shared by all endpoints.
+
+    Args:
+        config (dict): config of the server.
+
+    Returns:
+        list: config of each endpoint. If there are no endpoints, the list
+        contains only the server config.
+    """
+    endpoints = config.get("endpoints")
+    if not endpoints:
+        return [config]
+
+    shared_config = {
+        key: value
+        for key, value in config.items()
+        if key not in ENDPOINT_KEYS and key != "endpoints"
+    }
+
+    server_configs = []
+    for endpoint in endpoints:
+        if isinstance(endpoint, str):
+            endpoint = {"address": endpoint}
+
+        server_config = dict(shared_config)
+        server_config.update(endpoint)
+        server_configs.append(server_config)
+
+    return server_configs
+
+
+class ServerEndpoint:
+    """Server endpoint with its health
+
+    Args:
+        config (dict): config of the endpoint.
+
+    Attributes:
+        config (dict): config of the endpoint.
+        url (str): URL of the endpoint.
+        host (str): host of the endpoint.
+        port (int): port of the endpoint.
+        healthy (bool): True if the last probe succeeded.
+        rtt (float): smoothed round-trip time in seconds of the TCP connection.
+            None if never measured.
+        failures (int): number of consecutive failed probes.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.url = create_url(**config)
+        url = furl(self.url)
+        self.host = url.host
+        self.port = url.port
+        self.healthy = False
+        self.rtt = None
+        self.failures = 0
+
+    def probe(self, timeout=PROBE_TIMEOUT):
+        """Measure the time to open a TCP connection to the endpoint
+
+        Args:
+            timeout (float): maximum duration of the probe in seconds.
+
+        Returns:
+            bool: True if the endpoint is reachable.
+        """
+        start = time.monotonic()
+        try:
+            with socket.create_connection((self.host, self.port), timeout=timeout):
+                rtt = time.monotonic() - start
+
+        except OSError as error:
+            logger.debug("Server %s unreachable: %s", self.url, error)
+            self.healthy = False
+            self.failures += 1
+            return False
+
+        if self.rtt is None:
+            self.rtt = rtt
+
+        else:
+            self.rtt += RTT_SMOOTHING * (rtt - self.rtt)
+
+        self.healthy = True
+        self.failures = 0
+        return True
+
+    def get_health(self):
+        """Get the health of the endpoint
+
+        Returns:
+            dict: contains the URL ("url"), the health ("healthy"), the round
+            trip time in seconds ("rtt") and the number of consecutive failed
+            probes ("failures").
+        """
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "rtt": self.rtt,
+            "failures": self.failures,
+        }
+
+
+class ServerSelector(Worker):
+    """Select the best server among several endpoints
+
+    The endpoints are probed on startup and every `probe_interval` seconds, by
+    measuring the time to open a TCP connection. The fastest reachable
+    endpoint is selected on startup. Afterwards, another endpoint is selected
+    only if the current one becomes unreachable, so that connections are not
+    interrupted for a small latency gain. The `switched` callback is then
+    called with the config of the new endpoint.
+
+    Example of use:
+
+    >>> with ServerSelector(stop, errors, server_configs) as server_selector:
+    ...     server_config = server_selector.select()
+    ...     server_selector.set_callback("switched", callback)
+    ...     server_selector.thread.start()
+
+    Args:
+        stop (Event): event to stop the program.
+        errors (Queue): queue of errors.
+        server_configs (list): config of each endpoint.
+        probe_interval (float): interval in seconds between two probes.
+        probe_timeout (float): maximum duration of a probe in seconds.
+
+    Attributes:
+        endpoints (list of ServerEndpoint): endpoints.
+        current (ServerEndpoint): selected endpoint.
+        probe_interval (float): interval in seconds between two probes.
+        probe_timeout (float): maximum duration of a probe in seconds.
+        callbacks (dict): callbacks of the selector.
+        probe_requested (threading.Event): event set to probe immediately.
+        thread (SafeThread): thread probing the endpoints.
+    """
+
+    def init_worker(
+        self, server_configs, probe_interval=PROBE_INTERVAL, probe_timeout=PROBE_TIMEOUT
+    ):
+        self.endpoints = [ServerEndpoint(config) for config in server_configs]
+        self.current = self.endpoints[0]
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.lock = Lock()
+        self.callbacks = {"switched": lambda config: None}
+        self.probe_requested = Event()
+
+        # create the probing thread
+        self.thread = self.create_thread(target=self.run)
+
+    def set_callback(self, name, callback):
+        """Assign an arbitrary callback
+
+        Args:
+            name (str): name of the callback in the `callbacks` attribute.
+            callback (function): function to assign.
+        """
+        self.callbacks[name] = callback
+
+    def probe(self):
+        """Probe all the endpoints
+        """
+        for endpoint in self.endpoints:
+            endpoint.probe(self.probe_timeout)
+
+        for health in self.get_health():
+            logger.debug(
+                "Server %s: %s, RTT %s",
+                health["url"],
+                "healthy" if health["healthy"] else "unhealthy",
+                "{:.1f} ms".format(health["rtt"] * 1000)
+                if health["rtt"] is not None
+                else "unknown",
+            )
+
+    def get_best(self):
+        """Get the fastest reachable endpoint
+
+        Returns:
+            ServerEndpoint: fastest reachable endpoint. None if no endpoint is
+            reachable.
+        """
+        healthy_endpoints = [
+            endpoint for endpoint in self.endpoints if endpoint.healthy
+        ]
+        if not healthy_endpoints:
+            return None
+
+        return min(healthy_endpoints, key=lambda endpoint: endpoint.rtt)
+
+    def select(self):
+        """Probe the endpoints and select the fastest one
+
+        If no endpoint is reachable, the first one is selected.
+
+        Returns:
+            dict: config of the selected endpoint.
+        """
+        self.probe()
+
+        with self.lock:
+            self.current = self.get_best() or self.endpoints[0]
+
+        logger.info("Using server %s", self.current.url)
+
+        return self.current.config
+
+    def request_probe(self):
+        """Ask to probe the endpoints immediately
+
+        This can be called when the connection with the current endpoint is
+        lost.
+        """
+        self.probe_requested.set()
+
+    def run(self):
+        """Probe the endpoints periodically and fail over if needed
+        """
+        while not self.stop.is_set():
+            self.probe_requested.wait(self.probe_interval)
+            self.probe_requested.clear()
+
+            if self.stop.is_set():
+                return
+
+            self.probe()
+            self.fail_over()
+
+    def fail_over(self):
+        """Select another endpoint if the current one is unreachable
+        """
+        with self.lock:
+            if self.current.healthy:
+                return
+
+            best = self.get_best()
+            if best is None:
+                return
+
+            logger.warning(
+                "Server %s unreachable, switching to %s", self.current.url, best.url
+            )
+            self.current = best
+
+        self.callbacks["switched"](best.config)
+
+    def get_health(self):
+        """Get the health of all endpoints
+
+        Returns:
+            list: health of each endpoint, see `ServerEndpoint.get_health`,
+            with the key "current" set to True for the selected endpoint.
+        """
+        return [
+            dict(endpoint.get_health(), current=endpoint is self.current)
+            for endpoint in self.endpoints
+        ]
+
+    def exit_worker(self, *args, **kwargs):
+        """Wake up the probing thread so that it can end
+        """
+        self.probe_requested.set()
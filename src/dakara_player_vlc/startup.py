@@ -0,0 +1,157 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from dakara_player_vlc.startup_trace import StartupTrace
+
+
+MAX_WORKERS = 4
+
+
+logger = logging.getLogger(__name__)
+
+
+class StartupOrchestrator:
+    """Run independent startup phases in parallel
+
+    Each phase is a function run on a small thread pool. Phases can enter
+    context managers in the shared exit stack with `enter_context`, which is
+    thread safe. When waiting for the phases, all of them are waited for even
+    if one fails, so that every context manager they entered is in the stack
+    and is exited when the stack closes. The first error is then raised.
+
+    The duration of each phase is logged and recorded in the trace, and the
+    duration of the whole startup is the duration of the slowest phase, not
+    the sum of all of them.
+
+    Example of use:
+
+    >>> with ExitStack() as stack:
+    ...     startup = StartupOrchestrator(stack)
+    ...     startup.submit("fonts", load_fonts, startup)
+    ...     startup.submit("server", authenticate)
+    ...     results = startup.wait()
+
+    Args:
+        stack (contextlib.ExitStack): stack of context managers of the
+            program.
+        max_workers (int): number of threads of the pool.
+        trace (startup_trace.StartupTrace): trace of the startup. Optional.
+
+    Attributes:
+        stack (contextlib.ExitStack): stack of context managers of the
+            program.
+        max_workers (int): number of threads of the pool.
+        trace (startup_trace.StartupTrace): trace of the startup.
+        phases (dict): future of each phase, by name, in order of submission.
+        durations (dict): duration of each finished phase in seconds, by
+            name.
+    """
+
+    def __init__(self, stack, max_workers=MAX_WORKERS, trace=None):
+        self.stack = stack
+        self.max_workers = max_workers
+        self.trace = trace or StartupTrace()
+        self.lock = Lock()
+        self.executor = None
+        self.start_time = None
+        self.phases = {}
+        self.durations = {}
+
+    def enter_context(self, context_manager, stack=None):
+        """Enter a context manager and add it to the stack
+
+        Args:
+            context_manager: context manager to enter.
+            stack (contextlib.ExitStack): stack to add the context manager to.
+                By default, the stack of the program.
+
+        Returns:
+            result of the `__enter__` method of the context manager.
+        """
+        with self.lock:
+            return self.trace.enter_context(
+                self.stack if stack is None else stack, context_manager
+            )
+
+    def callback(self, function, *args, **kwargs):
+        """Add a function to call when the stack closes
+
+        Args:
+            function (function): function to call.
+            Extra arguments are passed to the function.
+        """
+        with self.lock:
+            self.stack.callback(function, *args, **kwargs)
+
+    def submit(self, name, function, *args, **kwargs):
+        """Run a phase in the thread pool
+
+        Args:
+            name (str): name of the phase.
+            function (function): function of the phase.
+            Extra arguments are passed to the function.
+        """
+        if self.executor is None:
+            self.start_time = time.monotonic()
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="Startup"
+            )
+
+        self.phases[name] = self.executor.submit(
+            self.run_phase, name, function, *args, **kwargs
+        )
+
+    def run_phase(self, name, function, *args, **kwargs):
+        """Run a phase and measure its duration
+
+        Args:
+            name (str): name of the phase.
+            function (function): function of the phase.
+            Extra arguments are passed to the function.
+
+        Returns:
+            result of the function.
+        """
+        start = time.monotonic()
+        try:
+            return function(*args, **kwargs)
+
+        finally:
+            end = time.monotonic()
+            duration = end - start
+            self.trace.add("startup/" + name, start, end)
+            with self.lock:
+                self.durations[name] = duration
+
+            logger.debug("Startup phase '%s' took %.3f s", name, duration)
+
+    def wait(self):
+        """Wait for all the phases to finish
+
+        Returns:
+            dict: result of each phase, by name.
+
+        Raises:
+            Exception: the error of the first failed phase, in order of
+            submission.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+            logger.debug(
+                "Startup phases took %.3f s, instead of %.3f s one after another",
+                time.monotonic() - self.start_time,
+                sum(self.durations.values()),
+            )
+
+        results = {}
+        for name, future in self.phases.items():
+            # raise the error of the phase if any
+            results[name] = future.result()
+
+        self.phases = {}
+
+        return results
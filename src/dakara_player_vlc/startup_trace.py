@@ -0,0 +1,181 @@
+import json
+import logging
+import platform
+import threading
+import time
+from contextlib import contextmanager, ExitStack
+from threading import Lock
+
+from dakara_player_vlc.version import __version__
+
+
+TRACE_FILE_NAME = "player_vlc_startup_trace.json"
+
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTrace:
+    """Timestamps of the startup and shutdown phases
+
+    Each phase is recorded with its monotonic start and end times, relative to
+    the creation of the trace, and the name of the thread that ran it. Events
+    without duration, like the player being ready, are recorded as phases
+    that end when they start.
+
+    The context managers entered with `enter_context` are traced when they are
+    entered and when they are exited, at the end of the program.
+
+    Example of use:
+
+    >>> trace = StartupTrace()
+    >>> with trace.span("load/check version"):
+    ...     check_version()
+    >>> with ExitStack() as stack:
+    ...     font_loader = trace.enter_context(stack, FontLoader())
+    >>> trace.write(Path("trace.json"))
+
+    Attributes:
+        origin (float): monotonic time of the creation of the trace.
+        phases (list): recorded phases, in order of end. Each phase is a
+            dictionary with the keys "name", "start", "end" and "thread".
+    """
+
+    def __init__(self):
+        self.origin = time.monotonic()
+        self.lock = Lock()
+        self.phases = []
+
+    def add(self, name, start, end=None):
+        """Record a phase
+
+        Args:
+            name (str): name of the phase.
+            start (float): monotonic time of the start of the phase.
+            end (float): monotonic time of the end of the phase. If not given,
+                the phase ends when it starts.
+        """
+        if end is None:
+            end = start
+
+        with self.lock:
+            self.phases.append(
+                {
+                    "name": name,
+                    "start": start - self.origin,
+                    "end": end - self.origin,
+                    "thread": threading.current_thread().name,
+                }
+            )
+
+    def mark(self, name):
+        """Record an event without duration
+
+        Args:
+            name (str): name of the event.
+        """
+        self.add(name, time.monotonic())
+
+    @contextmanager
+    def span(self, name):
+        """Record the phase run in the context
+
+        Args:
+            name (str): name of the phase.
+        """
+        start = time.monotonic()
+        try:
+            yield
+
+        finally:
+            self.add(name, start, time.monotonic())
+
+    def enter_context(self, stack, context_manager, name=None):
+        """Enter a context manager in a stack and trace its entry and exit
+
+        Args:
+            stack (contextlib.ExitStack): stack to add the context manager to.
+            context_manager: context manager to enter.
+            name (str): name of the context manager in the trace. By default,
+                the name of its class.
+
+        Returns:
+            result of the `__enter__` method of the context manager.
+        """
+        if name is None:
+            name = type(context_manager).__name__
+
+        # the context manager is entered in its own stack, so that nothing is
+        # added to the given stack if its entry fails
+        context_stack = ExitStack()
+        with self.span("enter/" + name):
+            result = context_stack.enter_context(context_manager)
+
+        def exit_context(*exc_details):
+            start = time.monotonic()
+            try:
+                return context_stack.__exit__(*exc_details)
+
+            finally:
+                self.add("teardown/" + name, start, time.monotonic())
+
+        stack.push(exit_context)
+
+        return result
+
+    def get_breakdown(self):
+        """Get the phases sorted by duration
+
+        Returns:
+            list: phases, from the longest to the shortest. Each phase is a
+            dictionary with the keys "name", "start", "end", "duration" and
+            "thread". Times are in seconds.
+        """
+        with self.lock:
+            phases = [
+                dict(phase, duration=phase["end"] - phase["start"])
+                for phase in self.phases
+            ]
+
+        return sorted(phases, key=lambda phase: phase["duration"], reverse=True)
+
+    def get_summary(self):
+        """Get a text breakdown of the phases
+
+        Returns:
+            list: one line per phase, from the longest to the shortest, with
+            its duration, its start time and its name.
+        """
+        return [
+            "{:9.1f} ms  at {:9.1f} ms  {} ({})".format(
+                phase["duration"] * 1000,
+                phase["start"] * 1000,
+                phase["name"],
+                phase["thread"],
+            )
+            for phase in self.get_breakdown()
+        ]
+
+    def write(self, path):
+        """Write the trace as JSON
+
+        The file contains the version of the player, the version of Python,
+        the platform and the phases, in order of start.
+
+        Args:
+            path (path.Path): path of the file.
+        """
+        with self.lock:
+            phases = sorted(self.phases, key=lambda phase: phase["start"])
+
+        content = {
+            "version": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "phases": phases,
+        }
+
+        with open(path, "w", encoding="utf8") as file:
+            json.dump(content, file, indent=2)
+
+        logger.info("Startup trace written in '%s'", path)
@@ -0,0 +1,316 @@
+import json
+import logging
+import os
+import time
+from threading import Lock
+
+from path import Path
+
+
+JOURNAL_FILE_NAME = "player_vlc_journal.jsonl"
+SYNC_BATCH = 64
+SYNC_INTERVAL = 1
+COMPACT_THRESHOLD = 1024
+
+
+logger = logging.getLogger(__name__)
+
+
+class StatusJournal:
+    """Append-only journal of status events sent to the server
+
+    Each status event is written in the journal before being sent, and is
+    acknowledged once the server has received it. Events that have not been
+    acknowledged, for instance because the server was unreachable when the
+    player stopped, can be replayed on the next start.
+
+    The journal is a file of JSON lines. An event line contains the sequence
+    number of the event, the name of the method of the HTTP connection and its
+    arguments. An acknowledgement line contains the sequence number of the
+    acknowledged event.
+
+    To keep writes cheap, the file is synchronized to disk only every
+    `sync_batch` lines or every `sync_interval` seconds. A crash may then lose
+    the last lines; an incomplete last line is ignored when loading.
+
+    The journal is compacted when it contains too many acknowledged lines:
+    the file is rewritten with the pending events only. A pause and the
+    following resume of the same playlist entry are both dropped, as they
+    cancel each other. The new file is written without holding the lock of
+    the journal, so that events can be appended meanwhile; they are copied to
+    the new file when it replaces the old one.
+
+    Example of use:
+
+    >>> journal = StatusJournal(Path("journal.jsonl"))
+    >>> pending_events = journal.load()
+    >>> sequence = journal.append("update_finished", [42])
+    >>> journal.ack(sequence)
+    >>> journal.close()
+
+    Args:
+        path (path.Path): path of the journal file.
+        sync_batch (int): maximum number of lines written before synchronizing
+            the file.
+        sync_interval (float): maximum duration in seconds between the first
+            line written and the synchronization of the file.
+        compact_threshold (int): number of acknowledged lines in the file
+            above which the journal is compacted.
+
+    Attributes:
+        path (path.Path): path of the journal file.
+        sync_batch (int): maximum number of lines written before synchronizing
+            the file.
+        sync_interval (float): maximum duration in seconds between the first
+            line written and the synchronization of the file.
+        compact_threshold (int): number of acknowledged lines in the file
+            above which the journal is compacted.
+        file (file): journal file opened for appending. None if not loaded.
+        pending (dict): pending events. The key is the sequence number, the
+            value a tuple of the method name and its arguments. The order of
+            insertion is the order of the events.
+        sequence (int): sequence number of the last event.
+        acked_count (int): number of acknowledged events in the file.
+        unsynced_count (int): number of lines written since the last
+            synchronization.
+        unsynced_time (float): monotonic time of the first line written since
+            the last synchronization.
+    """
+
+    def __init__(
+        self,
+        path,
+        sync_batch=SYNC_BATCH,
+        sync_interval=SYNC_INTERVAL,
+        compact_threshold=COMPACT_THRESHOLD,
+    ):
+        self.path = Path(path)
+        self.sync_batch = sync_batch
+        self.sync_interval = sync_interval
+        self.compact_threshold = compact_threshold
+        self.lock = Lock()
+        self.compact_lock = Lock()
+        self.file = None
+        self.pending = {}
+        self.sequence = 0
+        self.acked_count = 0
+        self.unsynced_count = 0
+        self.unsynced_time = None
+
+    def load(self):
+        """Read the journal file and open it for appending
+
+        Returns:
+            list: pending events, in order. Each event is a tuple of its
+            sequence number, the method name and its arguments.
+        """
+        with self.lock:
+            self.read()
+
+        self.compact()
+
+        with self.lock:
+            if self.pending:
+                logger.info(
+                    "%i status events from the journal to send again",
+                    len(self.pending),
+                )
+
+            return [
+                (sequence, method_name, args)
+                for sequence, (method_name, args) in self.pending.items()
+            ]
+
+    def read(self):
+        """Read the journal file
+
+        Must be called with the lock held.
+        """
+        self.pending = {}
+        self.sequence = 0
+        self.acked_count = 0
+
+        if not self.path.exists():
+            return
+
+        with self.path.open(encoding="utf8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+
+                except ValueError:
+                    logger.warning("Ignoring invalid line in status journal")
+                    continue
+
+                if "ack" in record:
+                    if self.pending.pop(record["ack"], None) is not None:
+                        self.acked_count += 1
+
+                    continue
+
+                self.pending[record["seq"]] = (record["method"], record["args"])
+                self.sequence = max(self.sequence, record["seq"])
+
+    def append(self, method_name, args):
+        """Write an event in the journal
+
+        Args:
+            method_name (str): name of the method of the HTTP connection.
+            args (list): arguments of the method.
+
+        Returns:
+            int: sequence number of the event.
+        """
+        with self.lock:
+            self.sequence += 1
+            self.pending[self.sequence] = (method_name, list(args))
+            self.write(
+                {"seq": self.sequence, "method": method_name, "args": list(args)}
+            )
+
+            return self.sequence
+
+    def ack(self, sequence):
+        """Write the acknowledgement of an event in the journal
+
+        Args:
+            sequence (int): sequence number of the event.
+        """
+        with self.lock:
+            if self.pending.pop(sequence, None) is None:
+                return
+
+            self.acked_count += 1
+            self.write({"ack": sequence})
+            must_compact = self.acked_count > self.compact_threshold
+
+        if must_compact:
+            self.compact()
+
+    def write(self, record):
+        """Write a line in the journal file and synchronize it if needed
+
+        Must be called with the lock held.
+
+        Args:
+            record (dict): content of the line.
+        """
+        if self.file is None:
+            return
+
+        self.file.write(json.dumps(record) + "\n")
+
+        now = time.monotonic()
+        if self.unsynced_count == 0:
+            self.unsynced_time = now
+
+        self.unsynced_count += 1
+        if (
+            self.unsynced_count >= self.sync_batch
+            or now - self.unsynced_time >= self.sync_interval
+        ):
+            self.sync()
+
+    def sync(self):
+        """Synchronize the journal file to disk
+
+        Must be called with the lock held.
+        """
+        if self.file is None or self.unsynced_count == 0:
+            return
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced_count = 0
+
+    def sync_expired(self):
+        """Synchronize the journal file if lines wait for too long
+        """
+        with self.lock:
+            if (
+                self.unsynced_count > 0
+                and time.monotonic() - self.unsynced_time >= self.sync_interval
+            ):
+                self.sync()
+
+    def compact(self):
+        """Rewrite the journal file with the pending events only
+
+        Must be called without the lock held.
+        """
+        with self.compact_lock:
+            with self.lock:
+                self.drop_pause_resume()
+                snapshot = dict(self.pending)
+
+                # avoid to compact again while the file is written
+                self.acked_count = 0
+
+            # write the new file
+            self.path.dirname().makedirs_p()
+            path_temp = self.path + ".tmp"
+            with path_temp.open("w", encoding="utf8") as file:
+                for sequence, (method_name, args) in snapshot.items():
+                    file.write(
+                        json.dumps(
+                            {"seq": sequence, "method": method_name, "args": args}
+                        )
+                        + "\n"
+                    )
+
+                file.flush()
+                os.fsync(file.fileno())
+
+            with self.lock:
+                if self.file is not None:
+                    self.file.close()
+
+                os.replace(path_temp, self.path)
+
+                self.acked_count = 0
+                self.unsynced_count = 0
+                self.file = self.path.open("a", encoding="utf8")
+
+                # copy the changes made while the file was written
+                for sequence, (method_name, args) in self.pending.items():
+                    if sequence not in snapshot:
+                        self.write(
+                            {"seq": sequence, "method": method_name, "args": args}
+                        )
+
+                for sequence in snapshot:
+                    if sequence not in self.pending:
+                        self.acked_count += 1
+                        self.write({"ack": sequence})
+
+    def drop_pause_resume(self):
+        """Drop pause and resume pairs of the same playlist entry
+
+        Must be called with the lock held.
+        """
+        last_paused = None
+        for sequence, (method_name, args) in list(self.pending.items()):
+            if method_name == "update_paused":
+                last_paused = (sequence, args[0])
+                continue
+
+            if (
+                method_name == "update_resumed"
+                and last_paused is not None
+                and last_paused[1] == args[0]
+            ):
+                del self.pending[last_paused[0]]
+                del self.pending[sequence]
+
+            last_paused = None
+
+    def close(self):
+        """Synchronize and close the journal file
+        """
+        with self.lock:
+            if self.file is None:
+                return
+
+            self.sync()
+            self.file.close()
+            self.file = None
@@ -0,0 +1,435 @@
+import logging
+import time
+from collections import deque
+from queue import Empty, Queue
+from threading import Lock
+
+from dakara_base.http_client import ResponseInvalidError, ResponseRequestError
+from dakara_base.safe_workers import Worker
+from dakara_base.websocket_client import NotConnectedError
+from websocket import WebSocketException
+
+from dakara_player_vlc.backoff import Backoff
+
+
+RETRY_DELAY = 1
+RETRY_DELAY_MAX = 30
+POLL_INTERVAL = 1
+DRAIN_TIMEOUT = 5
+
+
+logger = logging.getLogger(__name__)
+
+
+class StatusSender(Worker):
+    """Queue of status events to send to the server
+
+    The status methods have the same signature as the ones of
+    `DakaraServerHTTPConnection` and return immediately. The events are put in
+    a queue and sent in order by a dedicated thread, so that a slow server does
+    not block the player.
+
+    If the server cannot be reached, the event is sent again after a random
+    delay, whose upper bound doubles after each failure, up to
+    `retry_delay_max`. Next events wait for it, to preserve the order. The
+    event stays first in line if the program stops meanwhile, so that it is
+    sent before the next ones on exit. If the server rejects the event, or if
+    sending it fails for any other reason, it is dropped. Events without
+    playlist entry ID, as reported by the idle screen, are never queued.
+
+    When the worker exits, the remaining events are sent a last time, without
+    retry, within `DRAIN_TIMEOUT` seconds.
+
+    If a WebSocket connection is given, each event is sent as a message on it
+    when it is connected, and with the HTTP connection otherwise. There is no
+    acknowledgement on the WebSocket connection, an event is considered sent
+    once the message is written.
+
+    If a journal is given, events are written in it by the sending thread when
+    it takes them from the queue, so that the player does not wait for the
+    disk, and acknowledged when sent. While an event is retried, the events
+    queued meanwhile are taken and written in the journal every
+    `POLL_INTERVAL` seconds. Events that were not sent by a previous execution
+    are queued first on load.
+
+    Example of use:
+
+    >>> with StatusSender(stop, errors, http_connection) as status_sender:
+    ...     status_sender.load()
+    ...     status_sender.thread.start()
+    ...     status_sender.update_started_song(42)
+
+    Args:
+        stop (Event): event to stop the program.
+        errors (Queue): queue of errors.
+        dakara_server_http (dakara_server.DakaraServerHTTPConnection):
+            interface to the Dakara server for the HTTP protocol. It must not
+            mute errors.
+        retry_delay (float): upper bound of the delay in seconds before
+            sending again an event after a first failure.
+        retry_delay_max (float): maximum upper bound of the delay in seconds
+            before sending again an event.
+        journal (status_journal.StatusJournal): journal of the events.
+            Optional.
+        dakara_server_websocket
+            (dakara_server.DakaraServerWebSocketConnection): interface to the
+            Dakara server for the WebSocket protocol, used in priority to send
+            events. Optional.
+
+    Attributes:
+        dakara_server_http (dakara_server.DakaraServerHTTPConnection):
+            interface to the Dakara server for the HTTP protocol.
+        backoff (backoff.Backoff): delays before sending again an event.
+        journal (status_journal.StatusJournal): journal of the events.
+        dakara_server_websocket
+            (dakara_server.DakaraServerWebSocketConnection): interface to the
+            Dakara server for the WebSocket protocol.
+        queue (queue.Queue): events waiting to be sent. Each event is a tuple
+            of the name of the method of the HTTP connection, its arguments,
+            the monotonic time when it was queued and its sequence number in
+            the journal, which is None until the event is taken by the sending
+            thread.
+        events (collections.deque): events taken from the queue, and written
+            in the journal, but not sent yet, in order. The first one is the
+            event being sent. Only used by the sending thread, and on exit
+            once it is stopped.
+        sent_count (int): number of events sent successfully.
+        latency_total (float): sum of the latencies of sent events in seconds.
+        latency_max (float): maximum latency of a sent event in seconds.
+        thread (SafeThread): thread sending the events.
+    """
+
+    def init_worker(
+        self,
+        dakara_server_http,
+        retry_delay=RETRY_DELAY,
+        retry_delay_max=RETRY_DELAY_MAX,
+        journal=None,
+        dakara_server_websocket=None,
+    ):
+        self.dakara_server_http = dakara_server_http
+        self.backoff = Backoff(retry_delay, retry_delay_max)
+        self.journal = journal
+        self.dakara_server_websocket = dakara_server_websocket
+        self.queue = Queue()
+        self.events = deque()
+        self.stats_lock = Lock()
+        self.sent_count = 0
+        self.latency_total = 0
+        self.latency_max = 0
+
+        # create the sending thread
+        self.thread = self.create_thread(target=self.run)
+
+    def load(self):
+        """Queue the events not sent by a previous execution
+        """
+        if self.journal is None:
+            return
+
+        for sequence, method_name, args in self.journal.load():
+            if not args or args[0] is None:
+                self.journal.ack(sequence)
+                continue
+
+            self.queue.put((method_name, tuple(args), time.monotonic(), sequence))
+
+    def push(self, method_name, *args):
+        """Queue an event
+
+        Args:
+            method_name (str): name of the method of the HTTP connection to
+                call.
+            Extra arguments are passed to this method. The first one is the
+            playlist entry ID, the event is dropped if it is None.
+        """
+        if not args or args[0] is None:
+            logger.debug(
+                "Status event '%s' without playlist entry ID dropped", method_name
+            )
+            return
+
+        self.queue.put((method_name, args, time.monotonic(), None))
+
+    def create_player_error(self, playlist_entry_id, message):
+        """Queue an error report
+
+        See `DakaraServerHTTPConnection.create_player_error`.
+        """
+        self.push("create_player_error", playlist_entry_id, message)
+
+    def update_finished(self, playlist_entry_id):
+        """Queue the report that a playlist entry has finished
+
+        See `DakaraServerHTTPConnection.update_finished`.
+        """
+        self.push("update_finished", playlist_entry_id)
+
+    def update_started_transition(self, playlist_entry_id):
+        """Queue the report that the transition of a playlist entry has started
+
+        See `DakaraServerHTTPConnection.update_started_transition`.
+        """
+        self.push("update_started_transition", playlist_entry_id)
+
+    def update_started_song(self, playlist_entry_id):
+        """Queue the report that the song of a playlist entry has started
+
+        See `DakaraServerHTTPConnection.update_started_song`.
+        """
+        self.push("update_started_song", playlist_entry_id)
+
+    def update_could_not_play(self, playlist_entry_id):
+        """Queue the report that a playlist entry could not play
+
+        See `DakaraServerHTTPConnection.update_could_not_play`.
+        """
+        self.push("update_could_not_play", playlist_entry_id)
+
+    def update_paused(self, playlist_entry_id, timing):
+        """Queue the report that the player is paused
+
+        See `DakaraServerHTTPConnection.update_paused`.
+        """
+        self.push("update_paused", playlist_entry_id, timing)
+
+    def update_resumed(self, playlist_entry_id, timing):
+        """Queue the report that the player resumed playing
+
+        See `DakaraServerHTTPConnection.update_resumed`.
+        """
+        self.push("update_resumed", playlist_entry_id, timing)
+
+    def run(self):
+        """Send the events until the end of the program
+        """
+        while not self.stop.is_set():
+            try:
+                event = self.get_next_event(timeout=POLL_INTERVAL)
+
+            except Empty:
+                if self.journal is not None:
+                    self.journal.sync_expired()
+
+                continue
+
+            self.backoff.reset()
+            while not self.send(event):
+                delay = self.backoff.get_delay()
+                logger.debug("Sending status event again in %.1f s", delay)
+                if self.wait(delay):
+                    # the event stays first for the last attempt on exit
+                    return
+
+            self.events.popleft()
+
+    def get_next_event(self, block=True, timeout=None):
+        """Get the next event to send
+
+        The event is not removed from the events to send, it has to be popped
+        once it does not have to be sent again.
+
+        Args:
+            block (bool): if True, wait for an event to be queued.
+            timeout (float): maximum duration in seconds to wait for an event.
+
+        Returns:
+            tuple: event, as stored in the queue.
+
+        Raises:
+            queue.Empty: if there are no events to send.
+        """
+        if not self.events:
+            self.take_event(self.queue.get(block, timeout))
+
+        return self.events[0]
+
+    def take_event(self, event):
+        """Keep an event taken from the queue to send it
+
+        The event is written in the journal if it is not in it yet.
+
+        Args:
+            event (tuple): event, as stored in the queue.
+        """
+        method_name, args, queued_time, sequence = event
+        if self.journal is not None and sequence is None:
+            sequence = self.journal.append(method_name, args)
+
+        self.events.append((method_name, args, queued_time, sequence))
+
+    def take_queued_events(self):
+        """Keep all the events of the queue to send them
+        """
+        while True:
+            try:
+                self.take_event(self.queue.get_nowait())
+
+            except Empty:
+                return
+
+    def wait(self, delay):
+        """Wait before sending an event again
+
+        The events queued meanwhile are kept, and written in the journal.
+
+        Args:
+            delay (float): duration to wait in seconds.
+
+        Returns:
+            bool: True if the program has been stopped meanwhile.
+        """
+        deadline = time.monotonic() + delay
+        while True:
+            self.take_queued_events()
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+
+            if self.stop.wait(min(remaining, POLL_INTERVAL)):
+                return True
+
+    def send(self, event):
+        """Send an event to the server
+
+        Args:
+            event (tuple): event to send, as stored in the queue.
+
+        Returns:
+            bool: True if the event does not have to be sent again.
+        """
+        method_name, args, queued_time, sequence = event
+
+        if self.send_websocket(method_name, args):
+            transport = "websocket"
+
+        else:
+            transport = "HTTP"
+            try:
+                getattr(self.dakara_server_http, method_name)(*args)
+
+            except ResponseRequestError:
+                return False
+
+            except ResponseInvalidError:
+                logger.warning("Status event '%s' rejected by the server", method_name)
+                self.ack(sequence)
+                return True
+
+            except Exception:
+                logger.exception("Unable to send status event '%s'", method_name)
+                self.ack(sequence)
+                return True
+
+        self.ack(sequence)
+
+        latency = time.monotonic() - queued_time
+        with self.stats_lock:
+            self.sent_count += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+        logger.debug(
+            "Status event '%s' sent by %s after %.3f s, %i pending",
+            method_name,
+            transport,
+            latency,
+            self.get_stats()["pending"] - 1,
+        )
+
+        return True
+
+    def send_websocket(self, method_name, args):
+        """Send an event with the WebSocket connection if possible
+
+        Args:
+            method_name (str): name of the method of the connection to call.
+            args (tuple): arguments of the method.
+
+        Returns:
+            bool: True if the event has been sent.
+        """
+        if (
+            self.dakara_server_websocket is None
+            or not self.dakara_server_websocket.is_connected
+        ):
+            return False
+
+        try:
+            getattr(self.dakara_server_websocket, method_name)(*args)
+
+        except (NotConnectedError, WebSocketException, OSError):
+            logger.debug("Unable to send status event by websocket")
+            return False
+
+        return True
+
+    def ack(self, sequence):
+        """Acknowledge an event in the journal
+
+        Args:
+            sequence (int): sequence number of the event. None if there is no
+                journal.
+        """
+        if self.journal is not None and sequence is not None:
+            self.journal.ack(sequence)
+
+    def get_stats(self):
+        """Get statistics about the events
+
+        Returns:
+            dict: contains the number of pending events ("pending"), the number
+                of sent events ("sent"), and the mean and maximum latency in
+                seconds between queuing and sending an event ("latency_mean"
+                and "latency_max").
+        """
+        with self.stats_lock:
+            return {
+                "pending": self.queue.qsize() + len(self.events),
+                "sent": self.sent_count,
+                "latency_mean": self.latency_total / self.sent_count
+                if self.sent_count
+                else 0,
+                "latency_max": self.latency_max,
+            }
+
+    def exit_worker(self, *args, **kwargs):
+        """Send the remaining events a last time
+        """
+        if self.thread.is_alive():
+            self.thread.join()
+
+        # write the remaining events in the journal, in case they cannot be
+        # sent in time
+        self.take_queued_events()
+
+        deadline = time.monotonic() + DRAIN_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                event = self.get_next_event(block=False)
+
+            except Empty:
+                break
+
+            if not self.send(event):
+                break
+
+            self.events.popleft()
+
+        pending = self.get_stats()["pending"]
+        if pending:
+            logger.warning("%i status events could not be sent to the server", pending)
+            if self.journal is not None:
+                logger.info("They will be sent on next start")
+
+        stats = self.get_stats()
+        logger.debug(
+            "Sent %i status events, mean latency %.3f s, max latency %.3f s",
+            stats["sent"],
+            stats["latency_mean"],
+            stats["latency_max"],
+        )
+
+        if self.journal is not None:
+            self.journal.close()
@@ -0,0 +1,341 @@
+import logging
+import time
+from contextlib import ExitStack
+from queue import Empty, Queue
+from threading import Event
+
+from dakara_base.safe_workers import NoErrorCaughtError
+
+from dakara_player_vlc.backoff import Backoff
+from dakara_player_vlc.startup_trace import StartupTrace
+
+
+MAX_RESTARTS = 10
+RESTART_DELAY = 1
+RESTART_DELAY_MAX = 60
+
+
+logger = logging.getLogger(__name__)
+
+
+class ComponentGroup:
+    """Components of the program restarted together
+
+    The components of the group are workers created with the stop event and
+    the errors queue of the group, and entered in its exit stack. When one of
+    them fails, only the stop event of the group is set, so the other groups
+    keep running.
+
+    A group that is not isolated uses the stop event and the errors queue of
+    the program, so a failure of one of its components stops the program.
+
+    Args:
+        name (str): name of the group.
+        start (function): function to start again the components of the
+            group, after a failure. It receives the group as argument.
+        stop (threading.Event): stop event of the program. If given, the group
+            is not isolated.
+        errors (queue.Queue): errors queue of the program. Must be given if
+            `stop` is given.
+
+    Attributes:
+        name (str): name of the group.
+        start (function): function to start again the components of the
+            group.
+        isolated (bool): true if the group has its own stop event and errors
+            queue.
+        stop (threading.Event): stop event of the components of the group.
+        errors (queue.Queue): errors queue of the components of the group.
+        stack (contextlib.ExitStack): stack of the components of the group.
+        restarts_count (int): number of times the group was restarted.
+        restarts_duration (float): time spent to restart the group, in
+            seconds.
+    """
+
+    def __init__(self, name, start, stop=None, errors=None):
+        self.name = name
+        self.start = start
+        self.isolated = stop is None
+        self.stop = Event() if self.isolated else stop
+        self.errors = Queue() if self.isolated else errors
+        self.stack = ExitStack()
+        self.restarts_count = 0
+        self.restarts_duration = 0
+
+    def enter_context(self, context_manager):
+        """Enter a component and add it to the stack of the group
+
+        Args:
+            context_manager: component to enter.
+
+        Returns:
+            result of the `__enter__` method of the component.
+        """
+        return self.stack.enter_context(context_manager)
+
+    def has_failed(self):
+        """Tell if a component of an isolated group has failed
+
+        Returns:
+            bool: true if the group is isolated and stopped.
+        """
+        return self.isolated and self.stop.is_set()
+
+    def get_error(self):
+        """Get the error of the failed component
+
+        Returns:
+            Exception: the error, or None if there is none.
+        """
+        try:
+            _, error, traceback = self.errors.get_nowait()
+
+        except Empty:
+            return None
+
+        return error.with_traceback(traceback)
+
+    def close(self):
+        """Exit the components of the group
+
+        The group can then be started again, with a new stop event and a new
+        errors queue if it is isolated.
+        """
+        try:
+            self.stack.close()
+
+        finally:
+            self.stack = ExitStack()
+            if self.isolated:
+                self.stop = Event()
+                self.errors = Queue()
+
+
+class Supervisor:
+    """Restart the groups of components that failed
+
+    Groups are created in order of dependency: a group may use the components
+    of the groups created before it. When a group fails, it is closed with the
+    groups created after it, then they are all started again, after a delay
+    given by a capped exponential backoff. The groups created before it, and
+    the components that are not in any group, are kept running.
+
+    If the supervisor is not enabled, the groups are not isolated and any
+    failure stops the program.
+
+    Restarts are counted and timed. The program stops with the last error if
+    the groups fail `max_restarts` times in a row, without running for longer
+    than the maximum restart delay in between.
+
+    Example of use:
+
+    >>> supervisor = Supervisor(stop, errors, enabled=True)
+    >>> backend = supervisor.create_group("backend", start_backend)
+    >>> server = supervisor.create_group("server", start_server)
+    >>> start_backend(backend)
+    >>> start_server(server)
+    >>> supervisor.supervise()
+    >>> supervisor.close()
+
+    Args:
+        stop (threading.Event): stop event of the program.
+        errors (queue.Queue): errors queue of the program.
+        enabled (bool): if true, failed groups are restarted.
+        max_restarts (int): number of restarts in a row before giving up.
+        restart_delay (float): upper bound of the first delay before a
+            restart, in seconds.
+        restart_delay_max (float): maximum upper bound of the delay before a
+            restart, in seconds.
+        trace (startup_trace.StartupTrace): trace of the startup, where the
+            restarts are recorded. Optional.
+
+    Attributes:
+        stop (threading.Event): stop event of the program.
+        errors (queue.Queue): errors queue of the program.
+        enabled (bool): if true, failed groups are restarted.
+        max_restarts (int): number of restarts in a row before giving up.
+        backoff (backoff.Backoff): delay before a restart.
+        trace (startup_trace.StartupTrace): trace of the startup.
+        groups (list of ComponentGroup): groups, in order of dependency.
+        failures_count (int): number of failures in a row.
+        started_time (float): monotonic time of the last start of groups.
+    """
+
+    POLLING_INTERVAL = 0.5
+
+    def __init__(
+        self,
+        stop,
+        errors,
+        enabled=False,
+        max_restarts=MAX_RESTARTS,
+        restart_delay=RESTART_DELAY,
+        restart_delay_max=RESTART_DELAY_MAX,
+        trace=None,
+    ):
+        self.stop = stop
+        self.errors = errors
+        self.enabled = enabled
+        self.max_restarts = max_restarts
+        self.backoff = Backoff(restart_delay, restart_delay_max)
+        self.trace = trace or StartupTrace()
+        self.groups = []
+        self.failures_count = 0
+        self.started_time = time.monotonic()
+
+    def create_group(self, name, start):
+        """Create a group of components
+
+        Args:
+            name (str): name of the group.
+            start (function): function to start again the components of the
+                group, after a failure. It receives the group as argument.
+
+        Returns:
+            ComponentGroup: the group, isolated if the supervisor is enabled.
+        """
+        if self.enabled:
+            group = ComponentGroup(name, start)
+
+        else:
+            group = ComponentGroup(name, start, self.stop, self.errors)
+
+        self.groups.append(group)
+
+        return group
+
+    def wait(self):
+        """Wait for the program to stop or for a group to fail
+
+        Returns:
+            ComponentGroup: the first failed group, or None if the program
+            stops.
+        """
+        if not self.enabled:
+            self.stop.wait()
+            return None
+
+        while not self.stop.wait(self.POLLING_INTERVAL):
+            for group in self.groups:
+                if group.has_failed():
+                    return group
+
+        return None
+
+    def supervise(self):
+        """Restart the failed groups until the program stops
+
+        Raises:
+            Exception: the last error if the groups failed too many times in a
+            row.
+        """
+        while True:
+            group = self.wait()
+            if group is None:
+                return
+
+            error = group.get_error() or NoErrorCaughtError("Unknown error happened")
+            logger.error("Components '%s' failed: %s", group.name, error)
+            self.restart(self.groups[self.groups.index(group) :], error)
+
+    def restart(self, groups, error):
+        """Close and start again groups
+
+        If a group cannot be started again, the restart is attempted again.
+
+        Args:
+            groups (list of ComponentGroup): groups to restart, in order of
+                dependency.
+            error (Exception): error that made the first group fail.
+
+        Raises:
+            Exception: the last error if the groups failed too many times in a
+            row.
+        """
+        # the failures count is reset if the groups run for long enough
+        if time.monotonic() - self.started_time > self.backoff.cap:
+            self.failures_count = 0
+            self.backoff.reset()
+
+        self.close(groups)
+
+        while True:
+            self.failures_count += 1
+            if self.failures_count > self.max_restarts:
+                logger.critical(
+                    "Components '%s' failed %i times in a row, giving up",
+                    groups[0].name,
+                    self.max_restarts,
+                )
+                raise error
+
+            delay = self.backoff.get_delay()
+            logger.info(
+                "Restarting components '%s' in %.1f s",
+                "', '".join(group.name for group in groups),
+                delay,
+            )
+            if self.stop.wait(delay):
+                return
+
+            start = time.monotonic()
+            durations = []
+            try:
+                for group in groups:
+                    group_start = time.monotonic()
+                    with self.trace.span("restart/" + group.name):
+                        group.start(group)
+
+                    durations.append(time.monotonic() - group_start)
+
+            except Exception as restart_error:
+                logger.error(
+                    "Unable to restart components '%s': %s",
+                    groups[0].name,
+                    restart_error,
+                )
+                self.close(groups)
+                error = restart_error
+                continue
+
+            self.started_time = end = time.monotonic()
+            for group, duration in zip(groups, durations):
+                group.restarts_count += 1
+                group.restarts_duration += duration
+
+            logger.info(
+                "Restarted components '%s' in %.3f s (restart %i)",
+                groups[0].name,
+                end - start,
+                groups[0].restarts_count,
+            )
+            return
+
+    def close(self, groups=None):
+        """Close groups in reverse order of dependency
+
+        Args:
+            groups (list of ComponentGroup): groups to close. By default, all
+                of them.
+        """
+        if groups is None:
+            groups = self.groups
+
+        with ExitStack() as stack:
+            # exit stacks close every group even if one fails
+            for group in groups:
+                stack.callback(group.close)
+
+    def log_restarts_stats(self):
+        """Log the number and the duration of restarts of each group
+        """
+        for group in self.groups:
+            if not group.restarts_count:
+                continue
+
+            logger.info(
+                "Components '%s' restarted %i times, in %.3f s on average",
+                group.name,
+                group.restarts_count,
+                group.restarts_duration / group.restarts_count,
+            )
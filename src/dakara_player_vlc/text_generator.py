@@ -1,12 +1,16 @@
+import hashlib
 import json
 import logging
 
 from dakara_base.exceptions import DakaraError
-from dakara_base.resources_manager import get_file
 from jinja2 import ChoiceLoader, Environment, FileSystemLoader
 from path import Path
 
-from dakara_player_vlc.resources_manager import PATH_TEMPLATES
+from dakara_player_vlc.resources_manager import (
+    get_resource_directory,
+    get_templates_directory,
+    RESOURCES,
+)
 
 
 TRANSITION_TEMPLATE_NAME = "transition.ass"
@@ -57,6 +61,8 @@ class TextGenerator:
             transition text.
         idle_template_name (jinja2.Template): template to generate the idle
             text.
+        transition_template_hash (str): hash of the source of the transition
+            template, computed on demand.
         icon_map (dict): map of icons. Keys are icon name, values are icon character.
     """
 
@@ -68,6 +74,7 @@ class TextGenerator:
         self.environment = None
         self.transition_template = None
         self.idle_template = None
+        self.transition_template_hash = None
 
         # icon map
         self.icon_map = {}
@@ -86,24 +93,15 @@ class TextGenerator:
     def load_icon_map(self):
         """Load the icon map
         """
-        icon_map_path = get_file("dakara_player_vlc.resources", ICON_MAP_FILE)
+        icon_map_path = get_resource_directory(RESOURCES) / ICON_MAP_FILE
         with icon_map_path.open() as file:
             self.icon_map = json.load(file)
 
     def load_templates(self):
         """Set up Jinja environment
         """
-        # create loaders
-        loaders = [FileSystemLoader(self.directory), FileSystemLoader(PATH_TEMPLATES)]
-
         # create Jinja2 environment
-        self.environment = Environment(loader=ChoiceLoader(loaders))
-
-        # add filter for converting font icon name to character
-        self.environment.filters["icon"] = self.convert_icon
-
-        # add filter for work link type complete name
-        self.environment.filters["link_type_name"] = self.convert_link_type_name
+        self.environment = self.create_environment(self.directory)
 
         # load templates
         self.load_transition_template(
@@ -114,6 +112,96 @@ class TextGenerator:
             self.config.get("idle_template_name", IDLE_TEMPLATE_NAME)
         )
 
+    def create_environment(self, directory):
+        """Create a Jinja environment
+
+        Args:
+            directory (path.Path): path to custom templates directory.
+
+        Returns:
+            jinja2.Environment: environment looking for templates in the
+            custom directory first, then in the default one.
+        """
+        # create loaders
+        loaders = [
+            FileSystemLoader(directory),
+            FileSystemLoader(get_templates_directory()),
+        ]
+
+        # create Jinja2 environment
+        environment = Environment(loader=ChoiceLoader(loaders))
+
+        # add filter for converting font icon name to character
+        environment.filters["icon"] = self.convert_icon
+
+        # add filter for work link type complete name
+        environment.filters["link_type_name"] = self.convert_link_type_name
+
+        return environment
+
+    def prepare_reload(self, config):
+        """Load the templates of a new config without applying them
+
+        If the directory of templates has changed, a new Jinja environment is
+        created. Otherwise, the templates are requested again to the current
+        environment, which compiles again only the ones whose source has
+        changed since they were loaded. The current templates are not
+        modified, so that they are kept if the new ones cannot be loaded.
+
+        Args:
+            config (dict): new config dictionary.
+
+        Returns:
+            dict: loaded templates, to give to `reload`.
+
+        Raises:
+            TemplateNotFoundError: if a template cannot be found.
+            jinja2.TemplateError: if a template is invalid.
+        """
+        directory = Path(config.get("directory", ""))
+        environment = self.environment
+        if environment is None or directory != self.directory:
+            environment = self.create_environment(directory)
+
+        return {
+            "config": config,
+            "directory": directory,
+            "environment": environment,
+            "transition_template": self.get_transition_template(
+                environment,
+                config.get("transition_template_name", TRANSITION_TEMPLATE_NAME),
+            ),
+            "idle_template": self.get_idle_template(
+                environment, config.get("idle_template_name", IDLE_TEMPLATE_NAME)
+            ),
+        }
+
+    def reload(self, prepared):
+        """Apply the templates loaded by `prepare_reload`
+
+        Args:
+            prepared (dict): templates returned by `prepare_reload`.
+
+        Returns:
+            set: names of the templates that have changed, among "transition"
+            and "idle".
+        """
+        changed = set()
+        if prepared["transition_template"] is not self.transition_template:
+            self.transition_template = prepared["transition_template"]
+            self.transition_template_hash = None
+            changed.add("transition")
+
+        if prepared["idle_template"] is not self.idle_template:
+            self.idle_template = prepared["idle_template"]
+            changed.add("idle")
+
+        self.config = prepared["config"]
+        self.directory = prepared["directory"]
+        self.environment = prepared["environment"]
+
+        return changed
+
     def load_transition_template(self, transition_template_name):
         """Load transition screen text template file
 
@@ -123,53 +211,89 @@ class TextGenerator:
             transition_template_name (str): name of the transition template to
                 use.
         """
-        loader_custom, loader_default = self.environment.loader.loaders
+        self.transition_template = self.get_transition_template(
+            self.environment, transition_template_name
+        )
+        self.transition_template_hash = None
+
+    def get_transition_template(self, environment, transition_template_name):
+        """Get the transition screen text template from an environment
+
+        Args:
+            environment (jinja2.Environment): environment to get the template
+                from.
+            transition_template_name (str): name of the transition template to
+                use.
+
+        Returns:
+            jinja2.Template: the custom template if it exists, the default one
+            otherwise.
+        """
+        loader_custom, loader_default = environment.loader.loaders
 
         if transition_template_name in loader_custom.list_templates():
             logger.debug(
                 "Loading custom transition template file '%s'", transition_template_name
             )
 
-            self.transition_template = self.environment.get_template(
-                transition_template_name
-            )
-
-            return
+            return environment.get_template(transition_template_name)
 
         if TRANSITION_TEMPLATE_NAME in loader_default.list_templates():
             logger.debug("Loading default transition template file")
 
-            self.transition_template = self.environment.get_template(
-                TRANSITION_TEMPLATE_NAME
-            )
-
-            return
+            return environment.get_template(TRANSITION_TEMPLATE_NAME)
 
         raise TemplateNotFoundError("No template file for transition screen found")
 
+    def get_transition_template_hash(self):
+        """Get the hash of the transition template source
+
+        The hash is computed once.
+
+        Returns:
+            str: hash of the transition template source.
+        """
+        if self.transition_template_hash is None:
+            with open(self.transition_template.filename, "rb") as file:
+                self.transition_template_hash = hashlib.sha256(file.read()).hexdigest()
+
+        return self.transition_template_hash
+
     def load_idle_template(self, idle_template_name):
         """Load idle screen text template file
 
         Load the default or customized ASS template for idle screen.
 
         Args:
-            transition_template_name (str): name of the idle template to use.
+            idle_template_name (str): name of the idle template to use.
+        """
+        self.idle_template = self.get_idle_template(
+            self.environment, idle_template_name
+        )
+
+    def get_idle_template(self, environment, idle_template_name):
+        """Get the idle screen text template from an environment
+
+        Args:
+            environment (jinja2.Environment): environment to get the template
+                from.
+            idle_template_name (str): name of the idle template to use.
+
+        Returns:
+            jinja2.Template: the custom template if it exists, the default one
+            otherwise.
         """
-        loader_custom, loader_default = self.environment.loader.loaders
+        loader_custom, loader_default = environment.loader.loaders
 
         if idle_template_name in loader_custom.list_templates():
             logger.debug("Loading custom idle template file '%s'", idle_template_name)
 
-            self.idle_template = self.environment.get_template(idle_template_name)
-
-            return
+            return environment.get_template(idle_template_name)
 
         if IDLE_TEMPLATE_NAME in loader_default.list_templates():
             logger.debug("Loading default idle template file")
 
-            self.idle_template = self.environment.get_template(IDLE_TEMPLATE_NAME)
-
-            return
+            return environment.get_template(IDLE_TEMPLATE_NAME)
 
         raise TemplateNotFoundError("No template file for idle screen found")
 
@@ -222,7 +346,7 @@ class TextGenerator:
             str: text containing the transition screen content.
         """
         info = playlist_entry
-        info['fade_in'] = fade_in
+        info["fade_in"] = fade_in
         return self.transition_template.render(info)
 
 
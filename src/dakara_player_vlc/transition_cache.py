@@ -0,0 +1,275 @@
+import hashlib
+import logging
+import os
+from threading import Lock
+
+from dakara_base.exceptions import DakaraError
+from path import Path
+
+
+CLIP_EXTENSION = ".mkv"
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_SIZE = 500
+
+
+logger = logging.getLogger(__name__)
+
+
+class TransitionCache:
+    """Cache of pre-rendered transition clips
+
+    A transition clip is the video of a transition screen, with its background
+    and its text already composited. The clips are stored in a directory and
+    identified by a key made from the hash of the transition template, the
+    hash of the background file and the transition text of the playlist entry.
+
+    Only one clip can be rendered at a time. Once a clip is stored, the least
+    recently used clips are removed until the size of the cache is below its
+    maximum size.
+
+    Hashing a large background file takes time, so the hash is computed in a
+    separate thread, and the cache cannot be used until it is known.
+
+    Example of use:
+
+    >>> cache = TransitionCache(Path("/path/to/cache"))
+    >>> cache.load()
+    >>> background_hash = cache.get_background_hash(Path("background.png"))
+    >>> if background_hash is None and cache.reserve_hashing():
+    ...     cache.compute_background_hash(Path("background.png"))
+    >>> key = cache.get_key("template hash", background_hash, "text")
+    >>> cache.get_clip(key)
+    None
+    >>> if cache.reserve():
+    ...     cache.store(key, render)
+    >>> cache.get_clip(key)
+    Path("/path/to/cache/0123456789abcdef.mkv")
+
+    Args:
+        directory (path.Path): directory where to store the clips.
+        max_size (float): maximum size of the cache in megabytes.
+
+    Attributes:
+        directory (path.Path): directory where to store the clips.
+        max_size (int): maximum size of the cache in bytes.
+        background_hashes (dict): cache of background hashes. The key is the
+            background path, the value a tuple of its modification time, its
+            size and its hash.
+        rendering (threading.Lock): lock held while a clip is rendered.
+        hashing (threading.Lock): lock held while a background is hashed.
+    """
+
+    def __init__(self, directory, max_size=MAX_SIZE):
+        self.directory = Path(directory)
+        self.max_size = int(max_size * 1024 * 1024)
+        self.background_hashes = {}
+        self.rendering = Lock()
+        self.hashing = Lock()
+
+    def load(self):
+        """Create the directory of the cache and reduce it to its maximum size
+        """
+        self.directory.makedirs_p()
+        logger.debug("Transition clips cache in '%s'", self.directory)
+        self.evict()
+
+    def get_background_hash(self, path):
+        """Get the hash of a background file if it is known
+
+        Args:
+            path (path.Path): path of the background file.
+
+        Returns:
+            str: hash of the content of the file. None if it has not been
+            computed yet or if the file has changed since.
+        """
+        try:
+            stat = os.stat(path)
+
+        except OSError:
+            return None
+
+        cached = self.background_hashes.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime, stat.st_size):
+            return cached[2]
+
+        return None
+
+    def reserve_hashing(self):
+        """Reserve the right to hash a background file
+
+        If the method returns True, the `compute_background_hash` method must
+        be called next.
+
+        Returns:
+            bool: True if no other background is currently hashed.
+        """
+        return self.hashing.acquire(blocking=False)
+
+    def compute_background_hash(self, path):
+        """Compute the hash of a background file and keep it
+
+        This method is intended to be called in a separate thread. The
+        reservation obtained with `reserve_hashing` is released at the end.
+
+        Args:
+            path (path.Path): path of the background file.
+        """
+        try:
+            stat = os.stat(path)
+            digest = hashlib.sha256()
+            with open(path, "rb") as file:
+                for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+
+            self.background_hashes[path] = (
+                stat.st_mtime,
+                stat.st_size,
+                digest.hexdigest(),
+            )
+            logger.debug("Hashed background file '%s'", path)
+
+        except OSError as error:
+            logger.warning("Unable to hash background file: %s", error)
+
+        finally:
+            self.hashing.release()
+
+    def get_key(self, template_hash, background_hash, text, duration=None):
+        """Get the key of a transition clip
+
+        Args:
+            template_hash (str): hash of the transition template.
+            background_hash (str): hash of the background file.
+            text (str): transition text of the playlist entry.
+            duration (float): duration of the clip in seconds. Optional.
+
+        Returns:
+            str: key of the clip.
+        """
+        digest = hashlib.sha256()
+        digest.update(template_hash.encode())
+        digest.update(background_hash.encode())
+        digest.update(text.encode("utf8"))
+        if duration is not None:
+            digest.update(str(duration).encode())
+
+        return digest.hexdigest()
+
+    def get_clip_path(self, key):
+        """Get the path of a clip, whether it exists or not
+
+        Args:
+            key (str): key of the clip.
+
+        Returns:
+            path.Path: path of the clip.
+        """
+        return self.directory / key + CLIP_EXTENSION
+
+    def get_clip(self, key):
+        """Get the path of a clip if it has been rendered
+
+        Args:
+            key (str): key of the clip.
+
+        Returns:
+            path.Path: path of the clip, None if not rendered yet.
+        """
+        path = self.get_clip_path(key)
+        try:
+            # mark the clip as recently used
+            os.utime(path)
+
+        except OSError:
+            return None
+
+        return path
+
+    def reserve(self):
+        """Reserve the right to render a clip
+
+        If the method returns True, the `store` method must be called next.
+
+        Returns:
+            bool: True if no other clip is currently rendered.
+        """
+        return self.rendering.acquire(blocking=False)
+
+    def store(self, key, render):
+        """Render a clip and store it in the cache
+
+        The clip is rendered in a temporary file, which is renamed once the
+        rendering is done, so that an incomplete clip is never used. Any error
+        is logged, as this method is intended to be called in a separate
+        thread. The reservation obtained with `reserve` is released at the
+        end.
+
+        Args:
+            key (str): key of the clip.
+            render (function): function that renders the clip. It receives
+                the path of the output file. It can raise a
+                `TransitionRenderError` if the rendering fails.
+        """
+        path = self.get_clip_path(key)
+        path_temp = self.directory / ".{}.part{}".format(key, CLIP_EXTENSION)
+
+        try:
+            logger.debug("Rendering transition clip '%s'", path)
+            render(path_temp)
+            os.replace(path_temp, path)
+            logger.debug("Rendered transition clip '%s'", path)
+            self.evict()
+
+        except TransitionRenderError as error:
+            logger.warning("Unable to render transition clip: %s", error)
+
+        except Exception:
+            logger.exception("Unable to render transition clip")
+
+        finally:
+            try:
+                path_temp.remove_p()
+
+            except OSError:
+                pass
+
+            self.rendering.release()
+
+    def evict(self):
+        """Remove the least recently used clips above the maximum size
+        """
+        try:
+            clips = []
+            for entry in os.scandir(self.directory):
+                if entry.name.startswith(".") or not entry.name.endswith(
+                    CLIP_EXTENSION
+                ):
+                    continue
+
+                stat = entry.stat()
+                clips.append((stat.st_mtime, stat.st_size, entry.path))
+
+        except OSError as error:
+            logger.warning("Unable to list transition clips: %s", error)
+            return
+
+        size = sum(clip_size for _, clip_size, _ in clips)
+        for _, clip_size, path in sorted(clips):
+            if size <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+
+            except OSError as error:
+                logger.warning("Unable to remove transition clip: %s", error)
+                continue
+
+            size -= clip_size
+            logger.debug("Removed transition clip '%s'", path)
+
+
+class TransitionRenderError(DakaraError):
+    """Error raised when a transition clip cannot be rendered
+    """
@@ -1,10 +1,13 @@
 import logging
-from pkg_resources import parse_version
 
-import importlib_metadata
+try:
+    from importlib.metadata import version as get_distribution_version
 
+except ImportError:
+    from importlib_metadata import version as get_distribution_version
 
-__version__ = importlib_metadata.version("dakaraplayervlc")
+
+__version__ = get_distribution_version("dakaraplayervlc")
 __date__ = "2019-12-06"
 
 logger = logging.getLogger(__name__)
@@ -13,6 +16,9 @@ logger = logging.getLogger(__name__)
 def check_version():
     """Display version number and check if on release
     """
+    # pkg_resources is slow to import and only needed here
+    from pkg_resources import parse_version
+
     # log player versio
     logger.info("Dakara player %s (%s)", __version__, __date__)
 
@@ -0,0 +1,238 @@
+import ctypes
+import ctypes.util
+import itertools
+import logging
+import sys
+import time
+from collections import deque
+
+import vlc
+from dakara_base.exceptions import DakaraError
+
+
+RING_SIZE = 200
+LEVEL = "warning"
+LINE_SIZE = 512
+
+LEVELS = {"debug": 0, "notice": 2, "warning": 3, "error": 4}
+LEVELS_NAMES = {value: key for key, value in LEVELS.items()}
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_vsnprintf():
+    """Get the C function that formats a message with a list of arguments
+
+    On Windows, the function of the C runtime is named `_vsnprintf`.
+
+    Returns:
+        function: the vsnprintf function of the C library. None if it cannot
+            be found.
+    """
+    if sys.platform == "win32":
+        library_name = "msvcrt"
+        function_names = ("_vsnprintf", "vsnprintf")
+
+    else:
+        library_name = ctypes.util.find_library("c")
+        function_names = ("vsnprintf",)
+
+    try:
+        libc = ctypes.CDLL(library_name)
+
+    except OSError:
+        return None
+
+    for function_name in function_names:
+        vsnprintf = getattr(libc, function_name, None)
+        if vsnprintf is not None:
+            break
+
+    else:
+        return None
+
+    vsnprintf.argtypes = [
+        ctypes.c_char_p,
+        ctypes.c_size_t,
+        ctypes.c_char_p,
+        ctypes.c_void_p,
+    ]
+    vsnprintf.restype = ctypes.c_int
+
+    return vsnprintf
+
+
+class VlcLogCapture:
+    """Keep the last log messages of VLC in memory
+
+    A log callback is set on the VLC instance. Messages below the minimal level
+    are discarded before being formatted, so that they cost almost nothing. The
+    other ones are formatted and put in a ring buffer of fixed size, the oldest
+    messages being discarded.
+
+    The buffer is marked each time a new media is played, so that the messages
+    related to the current media can be attached to an error.
+
+    Example of use:
+
+    >>> log_capture = VlcLogCapture(instance, "warning")
+    >>> log_capture.start()
+    >>> log_capture.mark()
+    >>> log_capture.get_error_message("Unable to play current media")
+    "Unable to play current media: error: cannot open file"
+
+    Args:
+        instance (vlc.Instance): VLC instance to capture the logs of.
+        level (str): minimal level of the captured messages, either 'debug',
+            'notice', 'warning' or 'error'.
+        size (int): maximum number of messages in the buffer.
+
+    Attributes:
+        instance (vlc.Instance): VLC instance to capture the logs of.
+        level (int): minimal level of the captured messages.
+        lines (collections.deque): buffer of captured messages with their
+            index.
+        counter (itertools.count): generator of the indexes of the messages.
+        mark_index (int): index of the mark of the current media, the
+            messages with a greater index are related to it.
+        callback (vlc.CallbackDecorators.LogCb): log callback given to VLC.
+        vsnprintf (function): C function formatting the messages.
+    """
+
+    def __init__(self, instance, level=LEVEL, size=RING_SIZE):
+        try:
+            self.level = LEVELS[level]
+
+        except KeyError as error:
+            raise InvalidVlcLogLevelError(
+                "Invalid VLC log level '{}'".format(level)
+            ) from error
+
+        self.instance = instance
+        self.lines = deque(maxlen=size)
+        self.counter = itertools.count()
+        self.mark_index = -1
+        self.callback = None
+        self.vsnprintf = None
+
+    def start(self):
+        """Set the log callback on the VLC instance
+
+        If the messages cannot be formatted, the capture stays disabled.
+        """
+        self.vsnprintf = get_vsnprintf()
+        if self.vsnprintf is None:
+            logger.warning(
+                "Unable to find a function to format VLC log messages, "
+                "capture disabled"
+            )
+            return
+
+        self.callback = vlc.CallbackDecorators.LogCb(self.handle_log)
+        self.instance.log_set(self.callback, None)
+
+    def stop(self):
+        """Remove the log callback from the VLC instance
+        """
+        if self.callback is None:
+            return
+
+        self.instance.log_unset()
+        self.callback = None
+
+    def handle_log(self, data, level, context, fmt, arguments):
+        """Callback called by VLC for each log message
+
+        Called from any thread of VLC.
+
+        Args:
+            data (ctypes.c_void_p): data given with the callback, unused.
+            level (int): level of the message.
+            context (ctypes.c_void_p): context of the message.
+            fmt (bytes): printf format of the message.
+            arguments (ctypes.c_void_p): list of arguments of the format.
+        """
+        if level < self.level:
+            return
+
+        buffer = ctypes.create_string_buffer(LINE_SIZE)
+        self.vsnprintf(buffer, LINE_SIZE, fmt, arguments)
+        self.append(
+            "{}: {}".format(
+                LEVELS_NAMES.get(level, level), buffer.value.decode(errors="replace")
+            )
+        )
+
+    def append(self, line):
+        """Put a message in the buffer
+
+        Args:
+            line (str): formatted message.
+        """
+        self.lines.append((next(self.counter), line))
+
+    def mark(self):
+        """Mark the start of a new media
+        """
+        self.mark_index = next(self.counter)
+
+    def get_lines(self):
+        """Get the messages related to the current media
+
+        Returns:
+            list of str: messages captured since the last mark, from the
+            oldest.
+        """
+        return [line for index, line in list(self.lines) if index > self.mark_index]
+
+    def get_error_message(self, message, length=255):
+        """Attach the last messages of the current media to an error message
+
+        The most recent messages that fit are attached.
+
+        Args:
+            message (str): error message.
+            length (int): maximum length of the resulting message.
+
+        Returns:
+            str: error message with the last messages.
+        """
+        attached = []
+        error_message = message
+        for line in reversed(self.get_lines()):
+            candidate = "{}: {}".format(message, " | ".join([line] + attached))
+            if len(candidate) > length:
+                break
+
+            attached.insert(0, line)
+            error_message = candidate
+
+        return error_message
+
+    def dump(self, path, message):
+        """Write an error message and the messages of the current media
+
+        Args:
+            path (path.Path): path of the file to write.
+            message (str): error message.
+        """
+        try:
+            path.parent.makedirs_p()
+            with path.open("w", encoding="utf8") as file:
+                file.write(
+                    "{} {}\n".format(time.strftime("%Y-%m-%d %H:%M:%S"), message)
+                )
+                for line in self.get_lines():
+                    file.write(line + "\n")
+
+        except OSError as error:
+            logger.warning("Unable to write VLC log file: %s", error)
+            return
+
+        logger.info("VLC log written in '%s'", path)
+
+
+class InvalidVlcLogLevelError(DakaraError):
+    """Error raised when the VLC log level is unknown
+    """
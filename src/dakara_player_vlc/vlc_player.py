@@ -1,14 +1,22 @@
 import logging
+import time
 import urllib
 from pkg_resources import parse_version
-from threading import Timer
+from threading import Event, Timer
 
 import vlc
+from dakara_base.config import get_config_directory
 from vlc import Instance
 from path import Path
 
 from dakara_player_vlc.media_player import MediaPlayer
+from dakara_player_vlc.transition_cache import TransitionRenderError
 from dakara_player_vlc.version import __version__
+from dakara_player_vlc.vlc_log import LEVEL, RING_SIZE, VlcLogCapture
+
+
+RENDER_TIMEOUT = 60
+LOG_DIRECTORY = "vlc_logs"
 
 
 logger = logging.getLogger(__name__)
@@ -36,6 +44,10 @@ class VlcPlayer(MediaPlayer):
         vlc_version (str): version of VLC.
         media_pending (vlc.Media): media containing a song which will be played
             after the transition screen.
+        log_capture (vlc_log.VlcLogCapture): buffer of the last VLC log
+            messages, None if not enabled.
+        log_directory (path.Path): directory where the VLC log messages are
+            written on error, None if not enabled.
     """
 
     def init_player(self, config, tempdir):
@@ -48,6 +60,21 @@ class VlcPlayer(MediaPlayer):
         self.event_manager = self.player.event_manager()
         self.vlc_version = None
 
+        # set VLC log capture
+        config_log = config_vlc.get("log") or {}
+        self.log_capture = None
+        self.log_directory = None
+        if config_log.get("enabled", False):
+            self.log_capture = VlcLogCapture(
+                self.instance,
+                level=config_log.get("level", LEVEL),
+                size=config_log.get("size", RING_SIZE),
+            )
+            self.log_directory = Path(
+                config_log.get("directory")
+                or get_config_directory().expand() / LOG_DIRECTORY
+            )
+
         # set vlc callbacks
         self.vlc_callbacks = {}
         self.set_vlc_default_callbacks()
@@ -63,6 +90,10 @@ class VlcPlayer(MediaPlayer):
         # set VLC fullscreen
         self.player.set_fullscreen(self.fullscreen)
 
+        # capture VLC logs
+        if self.log_capture is not None:
+            self.log_capture.start()
+
     def check_vlc_version(self):
         """Print the VLC version and perform some parameter adjustements
         """
@@ -137,6 +168,9 @@ class VlcPlayer(MediaPlayer):
             file_path = mrl_to_path(self.media_pending.get_mrl())
             logger.info("Now playing '%s'", file_path)
 
+            # reset the clock for the new song
+            self.clock.reset()
+
             # call the callback for when a song starts
             self.callbacks["started_song"](self.playing_id)
 
@@ -157,7 +191,9 @@ class VlcPlayer(MediaPlayer):
         """Callback called when error occurs
 
         Try to get error message and then call the callbacks
-        `callbackss["finished"]` and `callbacks["error"]`
+        `callbackss["finished"]` and `callbacks["error"]`. If the VLC logs are
+        captured, the last messages of the current media are attached to the
+        error message and written on disk.
 
         Args:
             event (vlc.EventType): VLC event object.
@@ -166,6 +202,15 @@ class VlcPlayer(MediaPlayer):
 
         message = "Unable to play current media"
         logger.error(message)
+
+        if self.log_capture is not None:
+            self.log_capture.dump(
+                self.log_directory
+                / "{}_{}.log".format(time.strftime("%Y%m%d-%H%M%S"), self.playing_id),
+                message,
+            )
+            message = self.log_capture.get_error_message(message)
+
         self.callbacks["finished"](self.playing_id)
         self.callbacks["error"](self.playing_id, message)
 
@@ -179,10 +224,16 @@ class VlcPlayer(MediaPlayer):
         Args:
             media (vlc.Media): VLC media object.
         """
+        if self.log_capture is not None:
+            self.log_capture.mark()
+
         self.player.set_media(media)
         self.player.play()
 
     def play_playlist_entry(self, playlist_entry):
+        # apply the reloaded config
+        self.apply_pending_reload()
+
         # file location
         file_path = self.kara_folder_path / playlist_entry["song"]["file_path"]
 
@@ -196,32 +247,74 @@ class VlcPlayer(MediaPlayer):
 
             return
 
+        # leave the idle screen
+        self.report_idle_cpu_usage()
+
         # create the media
         self.playing_id = playlist_entry["id"]
         self.media_pending = self.instance.media_new_path(str(file_path))
         self.media_pending.add_options(*self.media_parameters)
 
-        # create the transition screen
-        with self.transition_text_path.open("w", encoding="utf8") as file:
-            file.write(self.text_generator.create_transition_text(playlist_entry))
+        # create the transition screen, use the pre-rendered clip if possible
+        clip = self.get_transition_clip(playlist_entry)
+        if clip is not None:
+            media_transition = self.instance.media_new_path(str(clip))
+            media_transition.add_options(*self.media_parameters)
 
-        media_transition = self.instance.media_new_path(
-            self.background_loader.backgrounds["transition"]
-        )
+        else:
+            with self.transition_text_path.open("w", encoding="utf8") as file:
+                file.write(self.get_transition_text(playlist_entry))
+
+            media_transition = self.instance.media_new_path(
+                self.background_loader.backgrounds["transition"]
+            )
+
+            media_transition.add_options(
+                *self.media_parameters_text_screen,
+                *self.media_parameters,
+                "sub-file={}".format(self.transition_text_path),
+                "image-duration={}".format(self.durations["transition"]),
+            )
 
-        media_transition.add_options(
-            *self.media_parameters_text_screen,
-            *self.media_parameters,
-            "sub-file={}".format(self.transition_text_path),
-            "image-duration={}".format(self.durations["transition"]),
-        )
         self.in_transition = True
 
         self.play_media(media_transition)
         logger.info("Playing transition for '%s'", file_path)
         self.callbacks["started_transition"](playlist_entry["id"])
 
+        # prepare the background of the next transition
+        self.prepare_next_background("transition")
+
+    def resume_playlist_entry(self, playlist_entry, timing):
+        # file location
+        file_path = self.kara_folder_path / playlist_entry["song"]["file_path"]
+
+        # play the entry normally if the file does not exist
+        if not file_path.exists():
+            self.play_playlist_entry(playlist_entry)
+            return
+
+        # leave the idle screen
+        self.report_idle_cpu_usage()
+
+        # play the song directly
+        self.playing_id = playlist_entry["id"]
+        self.in_transition = False
+        self.media_pending = self.instance.media_new_path(str(file_path))
+        self.media_pending.add_options(
+            *self.media_parameters, "start-time={}".format(timing)
+        )
+        self.clock.reset()
+        self.play_media(self.media_pending)
+        logger.info("Resuming '%s' at %.1f s", file_path, timing)
+
+        # call the callback for when a song starts
+        self.callbacks["started_song"](self.playing_id)
+
     def play_idle_screen(self):
+        # apply the reloaded config
+        self.apply_pending_reload()
+
         # set idle state
         self.playing_id = None
         self.in_transition = False
@@ -242,27 +335,79 @@ class VlcPlayer(MediaPlayer):
                 )
             )
 
+        if self.idle_power_saving:
+            # display the idle screen indefinitely at a low frame rate and
+            # without hardware decoding, and release the previous song
+            self.media_pending = None
+            idle_parameters = [
+                "image-duration=-1",
+                "image-fps={}".format(self.idle_frame_rate),
+                "avcodec-hw=none",
+            ]
+
+        else:
+            idle_parameters = ["image-duration={}".format(self.durations["idle"])]
+
         media.add_options(
             *self.media_parameters_text_screen,
             *self.media_parameters,
-            "image-duration={}".format(self.durations["idle"]),
+            *idle_parameters,
             "sub-file={}".format(self.idle_text_path),
         )
 
         self.play_media(media)
         logger.debug("Playing idle screen")
+        self.start_idle_cpu_measure()
 
-    def get_timing(self):
-        if self.is_idle() or self.in_transition:
-            return 0
+        # prepare the background of the next idle screen
+        self.prepare_next_background("idle")
 
+    def render_transition_clip(self, background_path, text_path, duration, output_path):
+        # the clip is rendered by a dedicated media player that uses the stream
+        # output of VLC to transcode the background with the text burnt in
+        media = self.instance.media_new_path(str(background_path))
+        media.add_options(
+            *self.media_parameters_text_screen,
+            "sub-file={}".format(text_path),
+            "image-duration={}".format(duration),
+            "sout=#transcode{{vcodec=h264,acodec=none,soverlay}}"
+            ":std{{access=file,mux=mkv,dst={}}}".format(output_path),
+        )
+
+        player = self.instance.media_player_new()
+        event_manager = player.event_manager()
+        ended = Event()
+        failed = Event()
+        event_manager.event_attach(
+            vlc.EventType.MediaPlayerEndReached, lambda event: ended.set()
+        )
+        event_manager.event_attach(
+            vlc.EventType.MediaPlayerEncounteredError,
+            lambda event: (failed.set(), ended.set()),
+        )
+
+        player.set_media(media)
+        player.play()
+
+        try:
+            if not ended.wait(duration + RENDER_TIMEOUT):
+                raise TransitionRenderError("VLC took too long to render the clip")
+
+            if failed.is_set():
+                raise TransitionRenderError("VLC was unable to render the clip")
+
+        finally:
+            player.stop()
+            player.release()
+
+    def get_player_time(self):
         timing = self.player.get_time()
 
         # correct the way VLC handles when it hasn't started to play yet
         if timing == -1:
-            timing = 0
+            return 0
 
-        return timing // 1000
+        return timing
 
     def is_paused(self):
         return self.player.get_state() == vlc.State.Paused
@@ -276,6 +421,7 @@ class VlcPlayer(MediaPlayer):
 
                 logger.info("Setting pause")
                 self.player.pause()
+                self.clock.sync(playing=False)
                 logger.debug("Set pause")
                 self.callbacks["paused"](self.playing_id, self.get_timing())
 
@@ -286,6 +432,7 @@ class VlcPlayer(MediaPlayer):
 
                 logger.info("Resuming play")
                 self.player.play()
+                self.clock.sync(playing=True)
                 logger.debug("Resumed play")
                 self.callbacks["resumed"](self.playing_id, self.get_timing())
 
@@ -301,6 +448,9 @@ class VlcPlayer(MediaPlayer):
         # clear the warning
         timer_stop_player_too_long.cancel()
 
+        if self.log_capture is not None:
+            self.log_capture.stop()
+
         logger.debug("Stopped player")
 
     @staticmethod
@@ -1,3 +1,5 @@
+from collections import Counter
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest.mock import call, patch
 
@@ -6,6 +8,8 @@ from path import Path
 from dakara_player_vlc.background_loader import (
     BackgroundLoader,
     BackgroundNotFoundError,
+    BackgroundPool,
+    BackgroundPoolStrategyError,
 )
 
 
@@ -266,3 +270,264 @@ class BackgroundLoaderTestCase(TestCase):
 
         # assert the call of the mocked method
         mocked_exists.assert_called_with(Path("custom/background.png").normpath())
+
+    @patch(
+        "dakara_player_vlc.background_loader.exists", return_value=True, autospec=True
+    )
+    def test_load_pool(self, mocked_exists):
+        """Test to load a background from a pool
+        """
+        with TemporaryDirectory() as temp:
+            directory = Path(temp)
+            (directory / "pool.png").touch()
+
+            loader = BackgroundLoader(
+                default_directory=Path("default"),
+                default_background_filenames={"background": "background.png"},
+                background_pools={"background": {"directory": directory}},
+            )
+
+            # load the backgrounds
+            loader.load()
+
+            # assert the backgrounds
+            self.assertDictEqual(
+                loader.backgrounds, {"background": (directory / "pool.png").normpath()}
+            )
+
+    @patch("dakara_player_vlc.background_loader.exists", autospec=True)
+    def test_reload(self, mocked_exists):
+        """Test to resolve again the backgrounds with a new config
+        """
+        mocked_exists.side_effect = lambda path: path != Path("custom/other.png")
+        loader = BackgroundLoader(
+            default_directory=Path("default"),
+            default_background_filenames={
+                "transition": "transition.png",
+                "idle": "idle.png",
+            },
+        )
+        loader.load()
+
+        # call the methods
+        prepared = loader.prepare_reload(
+            directory=Path("custom"),
+            background_filenames={"transition": "custom.png", "idle": "other.png"},
+        )
+
+        # assert the current backgrounds were not modified yet
+        self.assertEqual(loader.backgrounds["idle"], Path("default") / "idle.png")
+
+        changed = loader.reload(prepared)
+
+        # assert the backgrounds are taken from the custom directory
+        self.assertSetEqual(changed, {"transition", "idle"})
+        self.assertDictEqual(
+            loader.backgrounds,
+            {
+                "transition": Path("custom") / "custom.png",
+                "idle": Path("custom") / "idle.png",
+            },
+        )
+
+        # call the methods again with the same config
+        changed = loader.reload(
+            loader.prepare_reload(
+                directory=Path("custom"),
+                background_filenames={"transition": "custom.png", "idle": "other.png"},
+            )
+        )
+
+        # assert nothing has changed
+        self.assertSetEqual(changed, set())
+
+    @patch("dakara_player_vlc.background_loader.exists", autospec=True)
+    def test_prepare_reload_not_found(self, mocked_exists):
+        """Test a missing background does not modify the current ones
+        """
+        mocked_exists.return_value = True
+        loader = BackgroundLoader(
+            default_directory=Path("default"),
+            default_background_filenames={
+                "transition": "transition.png",
+                "idle": "idle.png",
+            },
+        )
+        loader.load()
+        mocked_exists.return_value = False
+
+        # call the method
+        with self.assertRaises(BackgroundNotFoundError):
+            loader.prepare_reload(directory=Path("custom"))
+
+        # assert the backgrounds were not modified
+        self.assertEqual(loader.directory, Path())
+        self.assertEqual(loader.backgrounds["idle"], Path("default") / "idle.png")
+
+    @patch(
+        "dakara_player_vlc.background_loader.exists", return_value=True, autospec=True
+    )
+    def test_pick_next_no_pool(self, mocked_exists):
+        """Test to pick the next background without pool
+        """
+        loader = BackgroundLoader(
+            default_directory=Path("default"),
+            default_background_filenames={"background": "background.png"},
+        )
+        loader.load()
+
+        # call the method
+        path = loader.pick_next("background")
+
+        # assert the background has not changed
+        self.assertEqual(path, Path("default/background.png").normpath())
+
+
+class BackgroundPoolTestCase(TestCase):
+    """Test the pool of backgrounds
+    """
+
+    def setUp(self):
+        # create a pool directory
+        self.temp = TemporaryDirectory()
+        self.directory = Path(self.temp.name)
+        for name in ("a.png", "b.png", "c.png", ".hidden"):
+            (self.directory / name).touch()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_load(self):
+        """Test to index a pool
+        """
+        pool = BackgroundPool(self.directory)
+
+        # call the method
+        pool.load()
+
+        # assert the index
+        self.assertSetEqual(pool.files, {"a.png", "b.png", "c.png"})
+
+    def test_load_error(self):
+        """Test to index a pool which does not exist
+        """
+        pool = BackgroundPool(self.directory / "missing")
+
+        # call the method
+        with self.assertRaises(BackgroundNotFoundError):
+            pool.load()
+
+    def test_init_error_strategy(self):
+        """Test to create a pool with an unknown strategy
+        """
+        with self.assertRaises(BackgroundPoolStrategyError):
+            BackgroundPool(self.directory, strategy="unknown")
+
+    def test_pick_shuffle(self):
+        """Test to pick all files of a pool without repetition
+        """
+        pool = BackgroundPool(self.directory)
+        pool.load()
+
+        # call the method
+        picked = [pool.pick() for _ in range(3)]
+
+        # assert each file has been picked once
+        self.assertCountEqual(
+            picked,
+            [
+                (self.directory / "a.png").normpath(),
+                (self.directory / "b.png").normpath(),
+                (self.directory / "c.png").normpath(),
+            ],
+        )
+
+        # assert the next pick does not repeat the last one
+        self.assertNotEqual(pool.pick(), picked[-1])
+
+    def test_pick_weighted(self):
+        """Test to pick files of a pool according to weights
+        """
+        pool = BackgroundPool(
+            self.directory, strategy="weighted", weights={"a.png": 8, "c.png": 0}
+        )
+        pool.load()
+
+        # call the method
+        counter = Counter(pool.pick().basename() for _ in range(1000))
+
+        # assert the distribution
+        self.assertNotIn("c.png", counter)
+        self.assertGreater(counter["a.png"], counter["b.png"])
+
+    def test_pick_empty(self):
+        """Test to pick a file from an empty pool
+        """
+        with TemporaryDirectory() as temp:
+            pool = BackgroundPool(Path(temp))
+            pool.load()
+
+            # call the method
+            self.assertIsNone(pool.pick())
+
+    def test_refresh(self):
+        """Test to update the index incrementally
+        """
+        pool = BackgroundPool(self.directory)
+        pool.load()
+
+        # change the directory
+        (self.directory / "a.png").remove()
+        (self.directory / "d.png").touch()
+
+        # force the modification time to be different
+        pool.mtime = None
+
+        # call the method
+        pool.refresh()
+
+        # assert the index
+        self.assertSetEqual(pool.files, {"b.png", "c.png", "d.png"})
+        self.assertCountEqual(pool.bag, ["b.png", "c.png", "d.png"])
+
+    @patch("dakara_player_vlc.background_loader.os.scandir", autospec=True)
+    def test_refresh_unchanged(self, mocked_scandir):
+        """Test to not scan a directory which did not change
+        """
+        pool = BackgroundPool(self.directory)
+        pool.files = {"a.png"}
+        pool.mtime = self.directory.stat().st_mtime
+
+        # call the method
+        pool.refresh()
+
+        # assert the directory was not scanned
+        mocked_scandir.assert_not_called()
+
+    def test_update_error(self):
+        """Test to keep the index if the directory cannot be scanned
+        """
+        pool = BackgroundPool(self.directory)
+        pool.load()
+        mtime = pool.mtime
+
+        # call the method
+        with patch(
+            "dakara_player_vlc.background_loader.os.scandir",
+            side_effect=PermissionError("denied"),
+        ):
+            with self.assertLogs(
+                "dakara_player_vlc.background_loader", "DEBUG"
+            ) as logger:
+                pool.update()
+
+        # assert the index was not modified
+        self.assertSetEqual(pool.files, {"a.png", "b.png", "c.png"})
+        self.assertEqual(pool.mtime, mtime)
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:dakara_player_vlc.background_loader:Unable to scan "
+                "background pool directory '{}': denied".format(self.directory)
+            ],
+        )
@@ -0,0 +1,123 @@
+import heapq
+from collections import Counter
+from random import Random
+from unittest import TestCase
+
+from dakara_player_vlc.backoff import Backoff
+
+
+class BackoffTestCase(TestCase):
+    """Test the backoff
+    """
+
+    def test_get_delay(self):
+        """Test the upper bound of the delays doubles up to the cap
+        """
+        backoff = Backoff(1, 5, random_generator=Random(0))
+
+        # call the method
+        upper_bounds = []
+        for _ in range(5):
+            upper_bounds.append(backoff.get_upper_bound())
+            delay = backoff.get_delay()
+            self.assertLessEqual(delay, upper_bounds[-1])
+
+        # assert the result
+        self.assertListEqual(upper_bounds, [1, 2, 4, 5, 5])
+
+    def test_reset(self):
+        """Test to start again from the first delay
+        """
+        backoff = Backoff(1, 5)
+        backoff.get_delay()
+        backoff.get_delay()
+
+        # call the method
+        backoff.reset()
+
+        # assert the result
+        self.assertEqual(backoff.get_upper_bound(), 1)
+
+
+class StandInServer:
+    """Stand-in server that is down until a given time
+
+    Args:
+        up_time (float): time when the server is up again.
+
+    Attributes:
+        up_time (float): time when the server is up again.
+        attempts (collections.Counter): number of connection attempts by
+            second.
+    """
+
+    def __init__(self, up_time):
+        self.up_time = up_time
+        self.attempts = Counter()
+
+    def connect(self, time):
+        """Attempt to connect
+
+        Args:
+            time (float): time of the attempt.
+
+        Returns:
+            bool: True if the connection is established.
+        """
+        self.attempts[int(time)] += 1
+        return time >= self.up_time
+
+
+def simulate_fleet(players, get_delay_function, up_time):
+    """Simulate players reconnecting to a restarting server
+
+    All players lose the connection at time 0.
+
+    Args:
+        players (int): number of players.
+        get_delay_function (function): function returning for a player a
+            function giving the delay before its next attempt.
+        up_time (float): time when the server is up again.
+
+    Returns:
+        int: peak number of connection attempts in one second.
+    """
+    server = StandInServer(up_time)
+    get_delays = [get_delay_function(index) for index in range(players)]
+    attempts = [(get_delays[index](), index) for index in range(players)]
+    heapq.heapify(attempts)
+
+    while attempts:
+        time, index = heapq.heappop(attempts)
+        if not server.connect(time):
+            heapq.heappush(attempts, (time + get_delays[index](), index))
+
+    return max(server.attempts.values())
+
+
+class BackoffFleetTestCase(TestCase):
+    """Test the backoff spreads the reconnections of a fleet of players
+    """
+
+    players = 100
+    up_time = 30
+
+    def test_fixed_interval(self):
+        """Test all players reconnect at the same time with a fixed interval
+        """
+        peak = simulate_fleet(self.players, lambda index: lambda: 5, self.up_time)
+
+        # assert the result
+        self.assertEqual(peak, self.players)
+
+    def test_backoff(self):
+        """Test the peak of connections is reduced with the backoff
+        """
+        peak = simulate_fleet(
+            self.players,
+            lambda index: Backoff(5, 60, random_generator=Random(index)).get_delay,
+            self.up_time,
+        )
+
+        # assert the result
+        self.assertLess(peak, self.players / 3)
@@ -0,0 +1,157 @@
+import os
+from queue import Queue
+from tempfile import TemporaryDirectory
+from threading import Event
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from path import Path
+
+from dakara_player_vlc.config_reloader import ConfigReloader
+
+
+class ConfigReloaderTestCase(TestCase):
+    """Test the config reloader class
+    """
+
+    def setUp(self):
+        # create safe worker control objects
+        self.stop = Event()
+        self.errors = Queue()
+
+        # create the config file and a templates directory
+        self.temp = TemporaryDirectory()
+        self.directory = Path(self.temp.name)
+        self.config_path = self.directory / "config.yaml"
+        self.config_path.write_text(
+            "player:\n  durations:\n    transition_duration: 5\nserver: {}\n"
+        )
+        self.templates_directory = self.directory / "templates"
+        self.templates_directory.mkdir()
+        (self.templates_directory / "transition.ass").write_text("transition")
+
+        # create the media player
+        self.media_player = MagicMock()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def get_instance(self, watch_interval=5):
+        """Get an instance of ConfigReloader
+        """
+        return ConfigReloader(
+            self.stop,
+            self.errors,
+            self.media_player,
+            self.config_path,
+            {"templates": {"directory": self.templates_directory}},
+            watch_interval=watch_interval,
+        )
+
+    def test_has_changed(self):
+        """Test to detect a change of a watched file
+        """
+        config_reloader = self.get_instance()
+
+        # assert nothing has changed
+        self.assertFalse(config_reloader.has_changed())
+
+        # modify a template
+        os.utime(self.templates_directory / "transition.ass", (0, 0))
+
+        # assert the change is detected once
+        self.assertTrue(config_reloader.has_changed())
+        self.assertFalse(config_reloader.has_changed())
+
+        # add a template
+        (self.templates_directory / "idle.ass").write_text("idle")
+
+        # assert the change is detected
+        self.assertTrue(config_reloader.has_changed())
+
+    def test_reload(self):
+        """Test to load the config again and give it to the media player
+        """
+        config_reloader = self.get_instance()
+
+        # call the method
+        with self.assertLogs("dakara_base.config", "DEBUG"):
+            config_reloader.reload()
+
+        # assert the call
+        self.media_player.request_reload.assert_called_once_with(
+            {"durations": {"transition_duration": 5}}
+        )
+        self.assertDictEqual(
+            config_reloader.config, {"durations": {"transition_duration": 5}}
+        )
+
+    def test_reload_error(self):
+        """Test to keep the current config if the new one cannot be loaded
+        """
+        config_reloader = self.get_instance()
+        self.config_path.write_text("server: {}\n")
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.config_reloader", "DEBUG") as logger:
+            config_reloader.reload()
+
+        # assert the media player was not reloaded
+        self.media_player.request_reload.assert_not_called()
+        self.assertListEqual(
+            logger.output,
+            [
+                "ERROR:dakara_player_vlc.config_reloader:Unable to reload config: "
+                "Invalid config file, missing 'player'"
+            ],
+        )
+
+    def test_reload_invalid(self):
+        """Test to keep the current config if the new one is not valid
+        """
+        config_reloader = self.get_instance()
+        config = config_reloader.config
+
+        for content in ("player: value\n", "- player\n", ""):
+            self.config_path.write_text(content)
+
+            # call the method
+            with self.assertLogs(
+                "dakara_player_vlc.config_reloader", "DEBUG"
+            ) as logger:
+                config_reloader.reload()
+
+            # assert the error was logged
+            self.assertEqual(len(logger.output), 1)
+            self.assertTrue(
+                logger.output[0].startswith(
+                    "ERROR:dakara_player_vlc.config_reloader:Unable to reload config"
+                )
+            )
+
+        # assert the media player was not reloaded
+        self.media_player.request_reload.assert_not_called()
+        self.assertIs(config_reloader.config, config)
+
+    def test_run_requested(self):
+        """Test to reload the config on request
+        """
+        reloaded = Event()
+        self.media_player.request_reload.side_effect = lambda config: reloaded.set()
+
+        # start the thread and request a reload
+        with self.assertLogs("dakara_player_vlc.config_reloader", "DEBUG") as logger:
+            with self.get_instance(watch_interval=0) as config_reloader:
+                config_reloader.thread.start()
+                config_reloader.request_reload()
+                self.assertTrue(reloaded.wait(5))
+
+            config_reloader.thread.join(5)
+
+        # assert the thread has ended
+        self.assertFalse(config_reloader.thread.is_alive())
+        self.assertFalse(config_reloader.reload_requested.is_set())
+        self.assertIn(
+            "INFO:dakara_player_vlc.config_reloader:Config reload requested",
+            logger.output,
+        )
@@ -0,0 +1,101 @@
+from queue import Queue
+from threading import Event, Thread
+from unittest import TestCase
+
+from dakara_player_vlc.coordinator import Coordinator
+
+
+class CoordinatorTestCase(TestCase):
+    """Test the coordinator class
+    """
+
+    def setUp(self):
+        # create safe worker control objects
+        self.stop = Event()
+        self.errors = Queue()
+
+    def test_wrap_order(self):
+        """Test events from several threads are handled one at a time in order
+        """
+        handled = []
+        done = Event()
+
+        def handler(source, index):
+            handled.append((source, index))
+            if len(handled) == 200:
+                done.set()
+
+        def emit(source):
+            for index in range(100):
+                wrapped(source, index)
+
+        with self.assertLogs("dakara_player_vlc.coordinator", "DEBUG") as logger:
+            with Coordinator(self.stop, self.errors) as coordinator:
+                coordinator.thread.start()
+                wrapped = coordinator.wrap(handler)
+
+                # call the wrapped handler from two threads
+                threads = [Thread(target=emit, args=(name,)) for name in "ab"]
+                for thread in threads:
+                    thread.start()
+
+                for thread in threads:
+                    thread.join()
+
+                self.assertTrue(done.wait(5))
+
+        # assert the events of each thread were handled in order
+        for name in "ab":
+            self.assertListEqual(
+                [index for source, index in handled if source == name],
+                list(range(100)),
+            )
+
+        # assert the loop is closed and statistics are logged
+        self.assertTrue(coordinator.loop.is_closed())
+        self.assertEqual(coordinator.events_count, 200)
+        self.assertTrue(
+            logger.output[0].startswith(
+                "DEBUG:dakara_player_vlc.coordinator:Handled 200 events"
+            )
+        )
+
+    def test_call_error(self):
+        """Test an error in a handler stops the program
+        """
+
+        def handler():
+            raise ValueError("error")
+
+        with Coordinator(self.stop, self.errors) as coordinator:
+            coordinator.thread.start()
+
+            # call the method
+            coordinator.call(handler)
+
+            # assert the program stops with the error
+            self.assertTrue(self.stop.wait(5))
+            _, error, _ = self.errors.get(timeout=5)
+            self.assertIsInstance(error, ValueError)
+
+            coordinator.thread.join(5)
+            self.assertFalse(coordinator.thread.is_alive())
+
+    def test_call_closed(self):
+        """Test events are ignored once the coordinator has exited
+        """
+        with Coordinator(self.stop, self.errors) as coordinator:
+            coordinator.thread.start()
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.coordinator", "DEBUG") as logger:
+            coordinator.call(print, "ignored")
+
+        # assert the effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "DEBUG:dakara_player_vlc.coordinator:Event ignored, the event loop "
+                "is closed"
+            ],
+        )
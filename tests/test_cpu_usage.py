@@ -0,0 +1,52 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from dakara_player_vlc.cpu_usage import CpuUsageMeter
+
+
+class CpuUsageMeterTestCase(TestCase):
+    """Test the CPU usage meter
+    """
+
+    @patch("dakara_player_vlc.cpu_usage.time.monotonic", autospec=True)
+    @patch("dakara_player_vlc.cpu_usage.time.process_time", autospec=True)
+    def test_measure(self, mocked_process_time, mocked_monotonic):
+        """Test to measure the CPU usage
+        """
+        meter = CpuUsageMeter()
+        mocked_process_time.side_effect = [10, 12]
+        mocked_monotonic.side_effect = [100, 200]
+
+        # call the methods
+        meter.start()
+        self.assertTrue(meter.is_running())
+        usage = meter.stop()
+
+        # assert the result
+        self.assertEqual(usage, (2, 100, 2.0))
+        self.assertFalse(meter.is_running())
+
+    @patch("dakara_player_vlc.cpu_usage.time.monotonic", autospec=True)
+    @patch("dakara_player_vlc.cpu_usage.time.process_time", autospec=True)
+    def test_start_twice(self, mocked_process_time, mocked_monotonic):
+        """Test that starting a running measure does not restart it
+        """
+        meter = CpuUsageMeter()
+        mocked_process_time.side_effect = [10, 14]
+        mocked_monotonic.side_effect = [100, 200]
+
+        # call the methods
+        meter.start()
+        meter.start()
+        usage = meter.stop()
+
+        # assert the result
+        self.assertEqual(usage, (4, 100, 4.0))
+
+    def test_stop_not_running(self):
+        """Test to stop a measure that is not running
+        """
+        meter = CpuUsageMeter()
+
+        # call the method
+        self.assertIsNone(meter.stop())
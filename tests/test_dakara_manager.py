@@ -51,6 +51,17 @@ class DakaraManagerTestCase(TestCase):
         self.media_player.play_idle_screen.assert_not_called()
         self.media_player.play_playlist_entry.assert_called_once_with(playlist_entry)
 
+    def test_play_playlist_entry_already_playing(self):
+        """Test to not play again the playlist entry currently playing
+        """
+        self.media_player.playing_id = 42
+
+        # call the method
+        self.dakara_manager.play_playlist_entry({"id": 42})
+
+        # assert the call
+        self.media_player.play_playlist_entry.assert_not_called()
+
     def test_handle_error(self):
         """Test the callback called on error
         """
@@ -150,3 +161,219 @@ class DakaraManagerTestCase(TestCase):
         # call the method
         with self.assertRaises(AssertionError):
             self.dakara_manager.do_command("invalid")
+
+
+class DakaraManagerPlayerStateTestCase(TestCase):
+    """Test the dakara manager class with a player state
+    """
+
+    def setUp(self):
+        # create mock modules
+        self.media_player = MagicMock()
+        self.dakara_server_http = MagicMock()
+        self.player_state = MagicMock()
+
+        # create a Dakara manager
+        self.dakara_manager = DakaraManager(
+            MagicMock(),
+            self.media_player,
+            self.dakara_server_http,
+            MagicMock(),
+            player_state=self.player_state,
+        )
+
+        # create a playlist entry
+        self.playlist_entry = {"id": 42, "song": {"file_path": "path/to/file.mkv"}}
+
+    def test_play_playlist_entry_resume(self):
+        """Test to resume the playlist entry played before a restart
+        """
+        self.player_state.pop_saved_state.return_value = {
+            "playlist_entry_id": 42,
+            "file_path": "path/to/file.mkv",
+            "timing": 12.5,
+        }
+
+        # call the method
+        with self.assertLogs("dakara_manager", "DEBUG") as logger:
+            self.dakara_manager.play_playlist_entry(self.playlist_entry)
+
+        # assert the call
+        self.media_player.resume_playlist_entry.assert_called_with(
+            self.playlist_entry, 12.5
+        )
+        self.media_player.play_playlist_entry.assert_not_called()
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output, ["INFO:dakara_manager:Resuming playlist entry 42"]
+        )
+
+    def test_play_playlist_entry_other(self):
+        """Test to play a playlist entry different from the saved one
+        """
+        self.player_state.pop_saved_state.return_value = {
+            "playlist_entry_id": 41,
+            "file_path": "path/to/file.mkv",
+            "timing": 12.5,
+        }
+
+        # call the method
+        self.dakara_manager.play_playlist_entry(self.playlist_entry)
+
+        # assert the call
+        self.media_player.resume_playlist_entry.assert_not_called()
+        self.media_player.play_playlist_entry.assert_called_with(self.playlist_entry)
+
+    def test_play_idle_screen(self):
+        """Test to play the idle screen forgets the saved state
+        """
+        # call the method
+        self.dakara_manager.play_idle_screen()
+
+        # assert the call
+        self.player_state.pop_saved_state.assert_called_with()
+        self.player_state.clear.assert_called_with()
+        self.media_player.play_idle_screen.assert_called_with()
+
+    def test_handle_started_song(self):
+        """Test the song start is written in the state
+        """
+        self.player_state.pop_saved_state.return_value = None
+        self.dakara_manager.play_playlist_entry(self.playlist_entry)
+
+        # call the method
+        self.dakara_manager.handle_started_song(42)
+
+        # assert the call
+        self.player_state.set_playing.assert_called_with(42, "path/to/file.mkv")
+        self.dakara_server_http.update_started_song.assert_called_with(42)
+
+    def test_handle_finished(self):
+        """Test the song end is written in the state
+        """
+        # call the method
+        self.dakara_manager.handle_finished(42)
+
+        # assert the call
+        self.player_state.clear.assert_called_with()
+        self.dakara_server_http.update_finished.assert_called_with(42)
+
+
+class DakaraManagerPlaylistPrefetcherTestCase(TestCase):
+    """Test the dakara manager class with a playlist prefetcher
+    """
+
+    def setUp(self):
+        # create mock modules
+        self.media_player = MagicMock()
+        self.media_player.playing_id = None
+        self.playlist_prefetcher = MagicMock()
+
+        # create a Dakara manager
+        self.dakara_manager = DakaraManager(
+            MagicMock(),
+            self.media_player,
+            MagicMock(),
+            MagicMock(),
+            playlist_prefetcher=self.playlist_prefetcher,
+        )
+
+    def test_play_playlist_entry(self):
+        """Test the upcoming playlist entries are polled when playing an entry
+        """
+        playlist_entry = {"id": 42, "song": {"file_path": "path/to/file.mkv"}}
+
+        # call the method
+        self.dakara_manager.play_playlist_entry(playlist_entry)
+
+        # assert the call
+        self.playlist_prefetcher.request_poll.assert_called_with()
+        self.media_player.play_playlist_entry.assert_called_with(playlist_entry)
+
+
+class DakaraManagerHistoryWarmerTestCase(TestCase):
+    """Test the dakara manager class with a history warmer
+    """
+
+    def setUp(self):
+        # create mock modules
+        self.media_player = MagicMock()
+        self.media_player.playing_id = None
+        self.history_warmer = MagicMock()
+
+        # create a Dakara manager
+        self.dakara_manager = DakaraManager(
+            MagicMock(),
+            self.media_player,
+            MagicMock(),
+            MagicMock(),
+            history_warmer=self.history_warmer,
+        )
+
+        # create a playlist entry
+        self.playlist_entry = {"id": 42, "song": {"file_path": "path/to/file.mkv"}}
+
+    def test_play_and_finish(self):
+        """Test the songs played are given to the history warmer
+        """
+        # call the methods
+        self.dakara_manager.play_playlist_entry(self.playlist_entry)
+        self.dakara_manager.handle_finished(42)
+
+        # assert the calls
+        self.history_warmer.count_play.assert_called_with("path/to/file.mkv")
+        self.history_warmer.record_finished.assert_called_with("path/to/file.mkv")
+
+    def test_finish_other(self):
+        """Test a finished song which is not the requested one is not recorded
+        """
+        # call the methods
+        self.dakara_manager.play_playlist_entry(self.playlist_entry)
+        self.dakara_manager.handle_finished(43)
+
+        # assert the calls
+        self.history_warmer.record_finished.assert_not_called()
+
+    def test_skip(self):
+        """Test a skipped song is not recorded in the history warmer
+        """
+        # call the methods
+        self.dakara_manager.play_playlist_entry(self.playlist_entry)
+        self.media_player.playing_id = 42
+        self.dakara_manager.do_command("skip")
+
+        # assert the calls
+        self.history_warmer.record_finished.assert_not_called()
+
+
+class DakaraManagerCoordinatorTestCase(TestCase):
+    """Test the dakara manager class with a coordinator
+    """
+
+    def test_callbacks_coordinated(self):
+        """Test the callbacks are run by the coordinator
+        """
+        media_player = MagicMock()
+        dakara_server_websocket = MagicMock()
+        coordinator = MagicMock()
+
+        # create a Dakara manager
+        dakara_manager = DakaraManager(
+            MagicMock(),
+            media_player,
+            MagicMock(),
+            dakara_server_websocket,
+            coordinator=coordinator,
+        )
+
+        # assert the callbacks are wrapped
+        coordinator.wrap.assert_any_call(dakara_manager.handle_finished)
+        coordinator.wrap.assert_any_call(dakara_manager.play_playlist_entry)
+        media_player.set_callback.assert_any_call(
+            "finished", coordinator.wrap.return_value
+        )
+        dakara_server_websocket.set_callback.assert_any_call(
+            "playlist_entry", coordinator.wrap.return_value
+        )
+        self.assertEqual(coordinator.wrap.call_count, 11)
@@ -1,9 +1,12 @@
+import os
+import signal
 from queue import Queue
 from threading import Event
-from unittest import TestCase
-from unittest.mock import ANY, patch
+from unittest import TestCase, skipUnless
+from unittest.mock import ANY, DEFAULT, MagicMock, patch
 
 from dakara_player_vlc.dakara_player_vlc import DakaraPlayerVlc, DakaraWorker
+from dakara_player_vlc.supervisor import Supervisor
 
 
 CONFIG = {
@@ -46,9 +49,22 @@ class DakaraWorkerTestCase(TestCase):
             ["DEBUG:dakara_player_vlc.dakara_player_vlc:Starting Dakara worker"],
         )
 
+    @patch("dakara_player_vlc.dakara_player_vlc.FontLoader", autospec=True)
+    def test_start_font_loader_shared(self, mocked_font_loader_class):
+        """Test to not load the fonts if they are already loaded
+        """
+        dakara_worker = DakaraWorker(Event(), Queue(), CONFIG, load_fonts=False)
+
+        # call the method
+        font_loader = dakara_worker.start_font_loader(MagicMock())
+
+        # assert the fonts were not loaded
+        self.assertIsNone(font_loader)
+        mocked_font_loader_class.assert_not_called()
+
     @patch("dakara_player_vlc.dakara_player_vlc.TemporaryDirectory", autospec=True)
     @patch("dakara_player_vlc.dakara_player_vlc.FontLoader", autospec=True)
-    @patch("dakara_player_vlc.dakara_player_vlc.VlcPlayer", autospec=True)
+    @patch("dakara_player_vlc.dakara_player_vlc.get_media_player_class", autospec=True)
     @patch(
         "dakara_player_vlc.dakara_player_vlc.DakaraServerHTTPConnection", autospec=True
     )
@@ -56,13 +72,15 @@ class DakaraWorkerTestCase(TestCase):
         "dakara_player_vlc.dakara_player_vlc.DakaraServerWebSocketConnection",
         autospec=True,
     )
+    @patch("dakara_player_vlc.dakara_player_vlc.StatusSender", autospec=True)
     @patch("dakara_player_vlc.dakara_player_vlc.DakaraManager", autospec=True)
     def test_run(
         self,
         mocked_dakara_manager_class,
+        mocked_status_sender_class,
         mocked_dakara_server_websocket_class,
         mocked_dakara_server_http_class,
-        mocked_vlc_player_class,
+        mocked_get_media_player_class,
         mocked_font_loader_class,
         mocked_temporary_directory_class,
     ):
@@ -74,6 +92,10 @@ class DakaraWorkerTestCase(TestCase):
         )
         mocked_dakara_server_http = mocked_dakara_server_http_class.return_value
         mocked_dakara_server_http.get_token_header.return_value = "token"
+        mocked_status_sender = (
+            mocked_status_sender_class.return_value.__enter__.return_value
+        )
+        mocked_vlc_player_class = mocked_get_media_player_class.return_value
         mocked_vlc_player = mocked_vlc_player_class.return_value.__enter__.return_value
         mocked_font_loader = (
             mocked_font_loader_class.return_value.__enter__.return_value
@@ -96,13 +118,27 @@ class DakaraWorkerTestCase(TestCase):
         mocked_temporary_directory_class.assert_called_with(suffix=".dakara")
         mocked_font_loader_class.assert_called_with()
         mocked_font_loader.load.assert_called_with()
+        mocked_get_media_player_class.assert_called_with("vlc")
         mocked_vlc_player_class.assert_called_with(stop, errors, CONFIG["player"], ANY)
         mocked_vlc_player.load.assert_called_with()
         mocked_dakara_server_http_class.assert_called_with(
-            CONFIG["server"], endpoint_prefix="api/", mute_raise=True
+            CONFIG["server"], endpoint_prefix="api/", token_cache_path=None
         )
-        mocked_dakara_server_http.authenticate.assert_called_with()
+        mocked_dakara_server_http.authenticate_cached.assert_called_with()
+        mocked_dakara_server_http.warm_up.assert_called_with()
+        mocked_dakara_server_http.log_latency_stats.assert_called_with()
+        mocked_dakara_server_http.close.assert_called_with()
         mocked_dakara_server_http.get_token_header.assert_called_with()
+        mocked_status_sender_class.assert_called_with(
+            stop,
+            errors,
+            mocked_dakara_server_http,
+            retry_delay=1,
+            retry_delay_max=30,
+            journal=None,
+            dakara_server_websocket=None,
+        )
+        mocked_status_sender.load.assert_called_with()
         mocked_dakara_server_websocket_class.assert_called_with(
             stop,
             errors,
@@ -113,11 +149,101 @@ class DakaraWorkerTestCase(TestCase):
         mocked_dakara_manager_class.assert_called_with(
             mocked_font_loader,
             mocked_vlc_player,
-            mocked_dakara_server_http,
+            mocked_status_sender,
             mocked_dakara_server_websocket,
+            player_state=None,
+            playlist_prefetcher=None,
+            history_warmer=None,
+            coordinator=None,
+        )
+        mocked_status_sender.thread.start.assert_called_with()
+        mocked_dakara_server_websocket.set_callback.assert_called_with(
+            "token_rejected", mocked_dakara_server_http.renew_token_header
         )
         mocked_dakara_server_websocket.timer.start.assert_called_with()
 
+    @patch.object(Supervisor, "POLLING_INTERVAL", 0.01)
+    @patch("dakara_player_vlc.dakara_player_vlc.TemporaryDirectory", autospec=True)
+    @patch("dakara_player_vlc.dakara_player_vlc.FontLoader", autospec=True)
+    @patch("dakara_player_vlc.dakara_player_vlc.get_media_player_class", autospec=True)
+    @patch(
+        "dakara_player_vlc.dakara_player_vlc.DakaraServerHTTPConnection", autospec=True
+    )
+    @patch(
+        "dakara_player_vlc.dakara_player_vlc.DakaraServerWebSocketConnection",
+        autospec=True,
+    )
+    @patch("dakara_player_vlc.dakara_player_vlc.StatusSender", autospec=True)
+    @patch("dakara_player_vlc.dakara_player_vlc.DakaraManager", autospec=True)
+    def test_run_supervisor(
+        self,
+        mocked_dakara_manager_class,
+        mocked_status_sender_class,
+        mocked_dakara_server_websocket_class,
+        mocked_dakara_server_http_class,
+        mocked_get_media_player_class,
+        mocked_font_loader_class,
+        mocked_temporary_directory_class,
+    ):
+        """Test a run where the server components fail and are restarted
+        """
+        mocked_dakara_server_http = mocked_dakara_server_http_class.return_value
+        mocked_vlc_player_class = mocked_get_media_player_class.return_value
+
+        # create safe worker control objects
+        stop = Event()
+        errors = Queue()
+
+        # the first WebSocket connection fails, the program stops after the
+        # second one
+        def create_websocket(group_stop, group_errors, *args, **kwargs):
+            if mocked_dakara_server_websocket_class.call_count == 1:
+                error = ValueError("error")
+                group_errors.put((ValueError, error, None))
+                group_stop.set()
+                return DEFAULT
+
+            stop.set()
+            return DEFAULT
+
+        mocked_dakara_server_websocket_class.side_effect = create_websocket
+
+        # create Dakara worker
+        config = dict(CONFIG, supervisor={"enabled": True, "restart_delay": 0.01},)
+        dakara_worker = DakaraWorker(stop, errors, config)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.supervisor", "DEBUG") as logger:
+            dakara_worker.run()
+
+        # assert only the server components were created again
+        mocked_font_loader_class.assert_called_once_with()
+        mocked_vlc_player_class.assert_called_once()
+        self.assertEqual(mocked_dakara_server_websocket_class.call_count, 2)
+        self.assertEqual(mocked_status_sender_class.call_count, 2)
+        self.assertEqual(mocked_dakara_manager_class.call_count, 2)
+        mocked_dakara_server_http_class.assert_called_once()
+        mocked_dakara_server_http.renew_token_header.assert_called_once_with()
+
+        # assert the components have their own stop event
+        self.assertIsNot(mocked_vlc_player_class.call_args[0][0], stop)
+        self.assertTrue(errors.empty())
+
+        # assert the effect on logs
+        self.assertIn(
+            "ERROR:dakara_player_vlc.supervisor:Components 'server' failed: error",
+            logger.output,
+        )
+        self.assertTrue(
+            any(
+                line.startswith(
+                    "INFO:dakara_player_vlc.supervisor:Components 'server' "
+                    "restarted 1 times"
+                )
+                for line in logger.output
+            )
+        )
+
 
 class DakaraPlayerVlcTestCase(TestCase):
     """Test the `DakaraPlayerVlc` class
@@ -152,4 +278,27 @@ class DakaraPlayerVlcTestCase(TestCase):
         dakara_player_vlc.run()
 
         # assert the call
-        mocked_run_safe.assert_called_with(DakaraWorker, CONFIG)
+        mocked_run_safe.assert_called_with(
+            DakaraWorker,
+            CONFIG,
+            dakara_player_vlc.trace,
+            None,
+            dakara_player_vlc.reload_requested,
+            True,
+        )
+
+    @skipUnless(hasattr(signal, "SIGHUP"), "SIGHUP not available")
+    @patch.object(DakaraPlayerVlc, "run_safe")
+    def test_run_sighup(self, mocked_run_safe):
+        """Test SIGHUP requests a reload of the config during the run
+        """
+        dakara_player_vlc = DakaraPlayerVlc(CONFIG)
+        mocked_run_safe.side_effect = lambda *args: os.kill(os.getpid(), signal.SIGHUP)
+        previous_handler = signal.getsignal(signal.SIGHUP)
+
+        # call the method
+        dakara_player_vlc.run()
+
+        # assert a reload was requested and the handler restored
+        self.assertTrue(dakara_player_vlc.reload_requested.is_set())
+        self.assertEqual(signal.getsignal(signal.SIGHUP), previous_handler)
@@ -1,11 +1,20 @@
+import os
+import stat
 from queue import Queue
+from tempfile import TemporaryDirectory
 from threading import Event
 from unittest import TestCase
 from unittest.mock import ANY, MagicMock, patch
 
+from dakara_base.http_client import AuthenticationError, MethodError
+from dakara_base.websocket_client import ParameterError
+from path import Path
+from websocket import WebSocketBadStatusException
+
 from dakara_player_vlc.dakara_server import (
     DakaraServerHTTPConnection,
     DakaraServerWebSocketConnection,
+    TokenRejectedError,
 )
 
 
@@ -44,6 +53,174 @@ class DakaraServerHTTPConnectionTestCase(TestCase):
         """
         self.assertEqual(self.dakara_server.server_url, self.url)
 
+    def test_init_pool(self):
+        """Test the pool parameters are read from the config
+        """
+        dakara_server = DakaraServerHTTPConnection(
+            {
+                "address": self.address,
+                "login": self.login,
+                "password": self.password,
+                "pool_size": 4,
+                "pool_idle_timeout": 10,
+            }
+        )
+
+        # assert the parameters
+        self.assertEqual(dakara_server.pool_idle_timeout, 10)
+        adapter = dakara_server.session.get_adapter("http://www.example.com")
+        self.assertEqual(adapter._pool_maxsize, 4)
+
+    def test_send_request_raw_session(self):
+        """Test requests are sent with the session and their latency recorded
+        """
+        with patch.object(self.dakara_server, "session") as mocked_session:
+            mocked_session.put.return_value.ok = True
+
+            # call the method
+            with self.assertLogs("dakara_player_vlc.dakara_server", "DEBUG"):
+                self.dakara_server.send_request_raw(
+                    "put", "playlist/player/status/", json={}
+                )
+
+        # assert the call
+        mocked_session.put.assert_called_with(
+            "http://www.example.com/api/playlist/player/status/", json={}
+        )
+        mocked_session.close.assert_not_called()
+        self.assertIsNotNone(
+            self.dakara_server.latency_stats.get_percentiles("playlist/player/status/")
+        )
+
+    @patch("dakara_player_vlc.dakara_server.time.monotonic")
+    def test_send_request_raw_idle(self, mocked_monotonic):
+        """Test idle connections are closed before sending a request
+        """
+        mocked_monotonic.return_value = 100
+        self.dakara_server.last_request_time = 100 - 61
+
+        with patch.object(self.dakara_server, "session") as mocked_session:
+            mocked_session.put.return_value.ok = True
+
+            # call the method
+            with self.assertLogs("dakara_player_vlc.dakara_server", "DEBUG") as logger:
+                self.dakara_server.send_request_raw("put", "playlist/player/status/")
+
+        # assert the call
+        mocked_session.close.assert_called_with()
+        self.assertIn(
+            "DEBUG:dakara_player_vlc.dakara_server:"
+            "Closing idle connections to the server",
+            logger.output,
+        )
+
+    @patch("dakara_player_vlc.dakara_server.time.monotonic")
+    def test_send_request_raw_idle_pending(self, mocked_monotonic):
+        """Test connections are not closed while another request is sent
+        """
+        mocked_monotonic.return_value = 100
+        self.dakara_server.last_request_time = 100 - 61
+        self.dakara_server.requests_pending = 1
+
+        with patch.object(self.dakara_server, "session") as mocked_session:
+            mocked_session.put.return_value.ok = True
+
+            # call the method
+            with self.assertLogs("dakara_player_vlc.dakara_server", "DEBUG"):
+                self.dakara_server.send_request_raw("put", "playlist/player/status/")
+
+        # assert the call
+        mocked_session.close.assert_not_called()
+        self.assertEqual(self.dakara_server.requests_pending, 1)
+
+    def test_send_request_raw_method_error(self):
+        """Test to send a request with an unknown method
+        """
+        with self.assertRaises(MethodError):
+            self.dakara_server.send_request_raw("invalid", "endpoint")
+
+    @patch.object(DakaraServerHTTPConnection, "send_request_raw")
+    @patch.object(DakaraServerHTTPConnection, "authenticate")
+    def test_send_request_token_rejected(
+        self, mocked_authenticate, mocked_send_request_raw
+    ):
+        """Test to log in again when the token is rejected
+        """
+        mocked_send_request_raw.side_effect = [
+            TokenRejectedError("error"),
+            "response",
+        ]
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "INFO"):
+            response = self.dakara_server.send_request("put", "endpoint")
+
+        # assert the result
+        self.assertEqual(response, "response")
+        mocked_authenticate.assert_called_with()
+        self.assertEqual(mocked_send_request_raw.call_count, 2)
+
+    @patch.object(DakaraServerHTTPConnection, "send_request_raw")
+    @patch.object(DakaraServerHTTPConnection, "authenticate")
+    def test_send_request_token_rejected_renew_error(
+        self, mocked_authenticate, mocked_send_request_raw
+    ):
+        """Test to fail to log in again when the token is rejected
+        """
+        mocked_send_request_raw.side_effect = TokenRejectedError("error")
+        mocked_authenticate.side_effect = AuthenticationError("denied")
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "INFO"):
+            with self.assertRaises(AuthenticationError):
+                self.dakara_server.send_request("put", "endpoint")
+
+        # assert the request was not sent again
+        mocked_send_request_raw.assert_called_once_with("put", "endpoint", headers=ANY)
+
+    def test_set_server(self):
+        """Test to use another server
+        """
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "DEBUG"):
+            self.dakara_server.set_server({"address": "standby:8000", "ssl": True})
+
+        # assert the result
+        self.assertEqual(self.dakara_server.server_url, "https://standby:8000/api")
+
+    @patch.object(DakaraServerHTTPConnection, "get")
+    def test_get_queuing_playlist_entries(self, mocked_get):
+        """Test to get the next playlist entries from a paginated response
+        """
+        mocked_get.return_value = {
+            "count": 3,
+            "results": [{"id": 42}, {"id": 43}, {"id": 44}],
+        }
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "DEBUG"):
+            playlist_entries = self.dakara_server.get_queuing_playlist_entries(2)
+
+        # assert the call
+        self.assertListEqual(playlist_entries, [{"id": 42}, {"id": 43}])
+        mocked_get.assert_called_with(
+            endpoint="playlist/queuing/",
+            message_on_error="Unable to get the next playlist entries",
+        )
+
+    @patch.object(DakaraServerHTTPConnection, "get")
+    def test_get_queuing_playlist_entries_empty(self, mocked_get):
+        """Test to get the next playlist entries when there are none
+        """
+        mocked_get.return_value = []
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "DEBUG"):
+            playlist_entries = self.dakara_server.get_queuing_playlist_entries(2)
+
+        # assert the call
+        self.assertListEqual(playlist_entries, [])
+
     @patch.object(DakaraServerHTTPConnection, "post")
     def test_create_player_error_successful(self, mocked_post):
         """Test to report an error sucessfuly
@@ -295,6 +472,74 @@ class DakaraServerHTTPConnectionTestCase(TestCase):
         mocked_put.assert_not_called()
 
 
+class DakaraServerHTTPConnectionTokenCacheTestCase(TestCase):
+    """Test the token cache of the HTTP connection with the server
+    """
+
+    def setUp(self):
+        # create a temporary directory
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name) / "token.json"
+
+        # create a DakaraServerHTTPConnection instance
+        self.dakara_server = DakaraServerHTTPConnection(
+            {"address": "www.example.com", "login": "test", "password": "test"},
+            endpoint_prefix="api",
+            token_cache_path=self.path,
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @patch.object(DakaraServerHTTPConnection, "authenticate")
+    def test_authenticate_cached_no_cache(self, mocked_authenticate):
+        """Test to authenticate when there is no cached token
+        """
+
+        def authenticate():
+            self.dakara_server.token = "token"
+
+        mocked_authenticate.side_effect = authenticate
+
+        # call the method
+        self.dakara_server.authenticate_cached()
+
+        # assert the call
+        mocked_authenticate.assert_called_with()
+
+        # assert the cache file
+        self.assertTrue(self.path.exists())
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+        # assert another connection uses the cached token
+        dakara_server = DakaraServerHTTPConnection(
+            {"address": "www.example.com", "login": "test", "password": "test"},
+            endpoint_prefix="api",
+            token_cache_path=self.path,
+        )
+        with self.assertLogs("dakara_player_vlc.dakara_server", "INFO"):
+            dakara_server.authenticate_cached()
+
+        self.assertEqual(dakara_server.token, "token")
+        mocked_authenticate.assert_called_once_with()
+
+    def test_load_token_other_login(self):
+        """Test the cached token of another login is not used
+        """
+        self.dakara_server.token = "token"
+        self.dakara_server.save_token()
+
+        # create a connection with another login
+        dakara_server = DakaraServerHTTPConnection(
+            {"address": "www.example.com", "login": "other", "password": "test"},
+            endpoint_prefix="api",
+            token_cache_path=self.path,
+        )
+
+        # assert the result
+        self.assertFalse(dakara_server.load_token())
+
+
 class DakaraServerWebSocketConnectionTestCase(TestCase):
     """Test the WebSocket connection with the server
     """
@@ -333,6 +578,19 @@ class DakaraServerWebSocketConnectionTestCase(TestCase):
         """
         self.assertEqual(self.dakara_server.server_url, self.url)
 
+    def test_init_ping_timeout_error(self):
+        """Test to create the object with a ping timeout too long
+        """
+        with self.assertRaisesRegex(
+            ParameterError, r"Ping timeout \(10 s\) must be lower than ping interval"
+        ):
+            DakaraServerWebSocketConnection(
+                self.stop,
+                self.errors,
+                {"address": self.address, "ping_interval": 10, "ping_timeout": 10},
+                endpoint="ws",
+            )
+
     @patch.object(DakaraServerWebSocketConnection, "send_ready")
     def test_on_connected(self, mocked_send_ready):
         """Test the callback on connection open
@@ -351,6 +609,9 @@ class DakaraServerWebSocketConnectionTestCase(TestCase):
         mocked_connection_lost = MagicMock()
         self.dakara_server.set_callback("connection_lost", mocked_connection_lost)
 
+        # disable the grace period
+        self.dakara_server.grace_period = 0
+
         # call the on_close callback
         with self.assertLogs("dakara_base.websocket_client", "DEBUG"):
             self.dakara_server.on_close(None, None)
@@ -359,6 +620,94 @@ class DakaraServerWebSocketConnectionTestCase(TestCase):
         mocked_connection_lost.assert_called_once_with()
         mocked_create_timer.assert_called_once_with(ANY, ANY)
 
+        # assert the reconnection delay is within the reconnect interval
+        delay = mocked_create_timer.call_args[0][0]
+        self.assertLessEqual(delay, self.reconnect_interval)
+        self.assertEqual(self.dakara_server.reconnect_backoff.attempt, 1)
+
+    @patch.object(DakaraServerWebSocketConnection, "send_ready")
+    @patch.object(DakaraServerWebSocketConnection, "create_timer")
+    def test_on_connection_lost_grace_period(
+        self, mocked_create_timer, mocked_send_ready
+    ):
+        """Test the connection lost callback waits for the grace period
+        """
+        # mock the callback
+        mocked_connection_lost = MagicMock()
+        self.dakara_server.set_callback("connection_lost", mocked_connection_lost)
+
+        # enable the grace period
+        self.dakara_server.grace_period = 15
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "WARNING"):
+            self.dakara_server.on_connection_lost()
+
+        # assert the call
+        mocked_connection_lost.assert_not_called()
+        mocked_create_timer.assert_called_once_with(
+            15, self.dakara_server.on_grace_period_expired
+        )
+        mocked_create_timer.return_value.start.assert_called_once_with()
+
+        # reconnect in time
+        with self.assertLogs("dakara_player_vlc.dakara_server", "INFO"):
+            self.dakara_server.on_connected()
+
+        # assert the call
+        mocked_create_timer.return_value.cancel.assert_called_once_with()
+        mocked_connection_lost.assert_not_called()
+
+    def test_on_grace_period_expired(self):
+        """Test the connection lost callback is called after the grace period
+        """
+        # mock the callback
+        mocked_connection_lost = MagicMock()
+        self.dakara_server.set_callback("connection_lost", mocked_connection_lost)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "ERROR"):
+            self.dakara_server.on_grace_period_expired()
+
+        # assert the call
+        mocked_connection_lost.assert_called_once_with()
+
+    @patch("dakara_player_vlc.dakara_server.WebSocketApp")
+    def test_run_ping(self, mocked_websocket_app_class):
+        """Test the connection sends pings
+        """
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "DEBUG"):
+            self.dakara_server.run()
+
+        # assert the call
+        mocked_websocket_app_class.return_value.run_forever.assert_called_with(
+            ping_interval=10, ping_timeout=5
+        )
+
+    @patch("dakara_base.websocket_client.WebSocketApp")
+    def test_run_no_ping(self, mocked_websocket_app_class):
+        """Test the connection uses the base implementation without pings
+        """
+        self.dakara_server.ping_interval = 0
+
+        # call the method
+        with self.assertLogs("dakara_base.websocket_client", "DEBUG"):
+            self.dakara_server.run()
+
+        # assert the call
+        mocked_websocket_app_class.return_value.run_forever.assert_called_with()
+
+    def test_set_server(self):
+        """Test to use another server
+        """
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "DEBUG"):
+            self.dakara_server.set_server({"address": "standby:8000"})
+
+        # assert the result
+        self.assertEqual(self.dakara_server.server_url, "ws://standby:8000/ws")
+
     def test_receive_idle(self):
         """Test the receive idle event method
         """
@@ -449,3 +798,137 @@ class DakaraServerWebSocketConnectionTestCase(TestCase):
 
         # assert the call
         mocked_send.assert_called_with("ready")
+
+    def test_connection_state(self):
+        """Test the connection state follows the connection
+        """
+        self.assertFalse(self.dakara_server.is_connected)
+
+        # call the open callback
+        with patch.object(DakaraServerWebSocketConnection, "send_ready"):
+            self.dakara_server.on_connected()
+
+        self.assertTrue(self.dakara_server.is_connected)
+
+        # call the lost callback
+        self.dakara_server.grace_period = 0
+        self.dakara_server.on_connection_lost()
+
+        self.assertFalse(self.dakara_server.is_connected)
+
+    @patch.object(DakaraServerWebSocketConnection, "send")
+    def test_update_paused(self, mocked_send):
+        """Test to report a pause by websocket
+        """
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "DEBUG"):
+            self.dakara_server.update_paused(42, 12.5)
+
+        # assert the call
+        mocked_send.assert_called_with(
+            "status", {"event": "paused", "playlist_entry_id": 42, "timing": 12.5}
+        )
+
+    @patch.object(DakaraServerWebSocketConnection, "send")
+    def test_create_player_error(self, mocked_send):
+        """Test to report an error by websocket
+        """
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "DEBUG"):
+            self.dakara_server.create_player_error(42, "message")
+
+        # assert the call
+        mocked_send.assert_called_with(
+            "error", {"playlist_entry_id": 42, "error_message": "message"}
+        )
+
+    def test_on_error_token_rejected(self):
+        """Test to get a new token when the server rejects it
+        """
+        self.dakara_server.set_callback(
+            "token_rejected", MagicMock(return_value={"token": "new"})
+        )
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "INFO"):
+            self.dakara_server.on_error(WebSocketBadStatusException("error %s %s", 401))
+
+        # assert the new header is used
+        self.assertDictEqual(self.dakara_server.header, {"token": "new"})
+        self.assertTrue(self.dakara_server.retry)
+        self.assertTrue(self.errors.empty())
+
+    @patch.object(DakaraServerWebSocketConnection, "create_timer")
+    def test_on_error_token_rejected_close(self, mocked_create_timer):
+        """Test the closing after renewing the token is not a connection loss
+        """
+        mocked_connection_lost = MagicMock()
+        mocked_disconnected = MagicMock()
+        self.dakara_server.set_callback("connection_lost", mocked_connection_lost)
+        self.dakara_server.set_callback("disconnected", mocked_disconnected)
+        self.dakara_server.set_callback(
+            "token_rejected", MagicMock(return_value={"token": "new"})
+        )
+        self.dakara_server.grace_period = 15
+
+        # call the methods
+        with self.assertLogs("dakara_player_vlc.dakara_server", "INFO"):
+            self.dakara_server.on_error(WebSocketBadStatusException("error %s %s", 401))
+
+        with self.assertLogs("dakara_base.websocket_client", "DEBUG"):
+            self.dakara_server.on_close(None, None)
+
+        # assert the connection is not considered lost
+        mocked_disconnected.assert_not_called()
+        mocked_connection_lost.assert_not_called()
+        self.assertIsNone(self.dakara_server.grace_timer)
+        self.assertFalse(self.dakara_server.renewing_token)
+
+        # assert the reconnection is attempted
+        mocked_create_timer.assert_called_once_with(ANY, self.dakara_server.run)
+
+    def test_on_error_token_rejected_twice(self):
+        """Test the token is renewed only once until connected
+        """
+        mocked_token_rejected = MagicMock(return_value={"token": "new"})
+        self.dakara_server.set_callback("token_rejected", mocked_token_rejected)
+
+        # call the method twice
+        with self.assertLogs("dakara_player_vlc.dakara_server", "INFO"):
+            self.dakara_server.on_error(WebSocketBadStatusException("error %s %s", 401))
+
+        self.dakara_server.on_error(WebSocketBadStatusException("error %s %s", 401))
+
+        # assert the error
+        mocked_token_rejected.assert_called_once_with()
+        self.assertFalse(self.errors.empty())
+
+    def test_on_error_token_rejected_renew_error(self):
+        """Test the error is raised when renewing the token fails
+        """
+        self.dakara_server.set_callback(
+            "token_rejected", MagicMock(side_effect=AuthenticationError("denied"))
+        )
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.dakara_server", "ERROR") as logger:
+            self.dakara_server.on_error(WebSocketBadStatusException("error %s %s", 401))
+
+        # assert the error
+        self.assertFalse(self.errors.empty())
+        self.assertListEqual(
+            logger.output,
+            [
+                "ERROR:dakara_player_vlc.dakara_server:Unable to get a new token: "
+                "denied"
+            ],
+        )
+
+    def test_on_error_token_rejected_no_renew(self):
+        """Test the error is raised when no new token can be obtained
+        """
+        # call the method
+        self.dakara_server.on_error(WebSocketBadStatusException("error %s %s", 401))
+
+        # assert the error
+        self.assertFalse(self.errors.empty())
@@ -0,0 +1,124 @@
+from queue import Queue
+from threading import Event
+from unittest import TestCase
+from unittest.mock import MagicMock, call, patch
+
+from path import Path
+
+from dakara_player_vlc.history_warmer import HistoryWarmer
+
+
+class HistoryWarmerTestCase(TestCase):
+    """Test the history warmer class
+    """
+
+    def setUp(self):
+        # create mock modules
+        self.play_history = MagicMock()
+        self.media_player = MagicMock()
+        self.media_player.is_idle.return_value = True
+
+        # create a history warmer
+        self.history_warmer = HistoryWarmer(
+            Event(),
+            Queue(),
+            self.play_history,
+            self.media_player,
+            Path("kara"),
+            budget=300,
+        )
+
+    @patch("dakara_player_vlc.history_warmer.warm_file")
+    @patch("dakara_player_vlc.history_warmer.os.path.getsize")
+    def test_warm_budget(self, mocked_getsize, mocked_warm_file):
+        """Test to warm the most likely songs within the budget
+        """
+        self.play_history.get_most_likely.return_value = [
+            "file1.mkv",
+            "file2.mkv",
+            "file3.mkv",
+        ]
+        sizes = {
+            Path("kara") / "file1.mkv": 200,
+            Path("kara") / "file2.mkv": 200,
+            Path("kara") / "file3.mkv": 100,
+        }
+        mocked_getsize.side_effect = sizes.get
+        mocked_warm_file.side_effect = sizes.get
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.history_warmer", "DEBUG"):
+            self.history_warmer.warm()
+
+        # assert the songs too big for the budget are skipped
+        mocked_warm_file.assert_has_calls(
+            [call(Path("kara") / "file1.mkv"), call(Path("kara") / "file3.mkv")]
+        )
+        self.assertSetEqual(self.history_warmer.warmed, {"file1.mkv", "file3.mkv"})
+
+    @patch("dakara_player_vlc.history_warmer.warm_file")
+    @patch("dakara_player_vlc.history_warmer.os.path.getsize")
+    def test_warm_not_idle(self, mocked_getsize, mocked_warm_file):
+        """Test the warming stops when a song starts
+        """
+        self.play_history.get_most_likely.return_value = ["file1.mkv"]
+        self.media_player.is_idle.return_value = False
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.history_warmer", "DEBUG"):
+            self.history_warmer.warm()
+
+        # assert nothing is warmed
+        mocked_warm_file.assert_not_called()
+        self.assertSetEqual(self.history_warmer.warmed, set())
+
+    def test_count_play(self):
+        """Test to compute the hit rate
+        """
+        self.history_warmer.warmed = {"file1.mkv"}
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.history_warmer", "DEBUG"):
+            self.history_warmer.count_play("file1.mkv")
+            self.history_warmer.count_play("file2.mkv")
+
+        # assert the hit rate
+        self.assertEqual(self.history_warmer.get_hit_rate(), 0.5)
+
+        # assert the hit rate is logged on exit
+        with self.assertLogs("dakara_player_vlc.history_warmer", "INFO") as logger:
+            self.history_warmer.exit_worker()
+
+        self.assertListEqual(
+            logger.output,
+            [
+                "INFO:dakara_player_vlc.history_warmer:Most played songs warming "
+                "hit rate 50% (1 of 2 songs)"
+            ],
+        )
+
+    def test_record_finished(self):
+        """Test to record a finished song in the history
+        """
+        self.history_warmer.record_finished("file1.mkv")
+
+        # assert the call
+        self.play_history.record.assert_called_with("file1.mkv")
+
+    def test_run_flush(self):
+        """Test to write the play history periodically and on exit
+        """
+        self.media_player.is_idle.return_value = False
+        self.play_history.flush.side_effect = lambda: self.history_warmer.stop.set()
+
+        # call the method
+        self.history_warmer.run()
+
+        # assert the call
+        self.play_history.flush.assert_called_once_with()
+
+        # exit the worker
+        self.history_warmer.exit_worker(None, None, None)
+
+        # assert the call
+        self.assertEqual(self.play_history.flush.call_count, 2)
@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+from dakara_player_vlc.latency_stats import LatencyStats
+
+
+class LatencyStatsTestCase(TestCase):
+    """Test the latency statistics
+    """
+
+    def test_get_percentiles(self):
+        """Test to get percentiles of latencies
+        """
+        stats = LatencyStats()
+        for index in range(1, 101):
+            stats.add("endpoint", index / 1000)
+
+        # call the method
+        percentiles = stats.get_percentiles("endpoint")
+
+        # assert the result
+        self.assertDictEqual(percentiles, {50: 0.05, 90: 0.09, 99: 0.099})
+
+    def test_get_percentiles_unknown(self):
+        """Test to get percentiles of an unknown name
+        """
+        stats = LatencyStats()
+
+        # assert the result
+        self.assertIsNone(stats.get_percentiles("endpoint"))
+
+    def test_samples_count(self):
+        """Test only the last latencies are kept
+        """
+        stats = LatencyStats(samples_count=2)
+        stats.add("endpoint", 10)
+        stats.add("endpoint", 0.1)
+        stats.add("endpoint", 0.2)
+
+        # assert the result
+        self.assertEqual(stats.get_percentiles("endpoint")[99], 0.2)
+        self.assertListEqual(
+            stats.get_summary(),
+            ["endpoint: 3 requests, p50 100.0 ms, p90 200.0 ms, p99 200.0 ms"],
+        )
@@ -0,0 +1,111 @@
+import logging
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from dakara_player_vlc.log_limiter import LogLimiter
+
+
+class LogLimiterTestCase(TestCase):
+    """Test the log limiter class
+    """
+
+    def setUp(self):
+        # create a logger and a fake clock
+        self.logger = logging.getLogger("dakara_player_vlc.test")
+        self.clock = MagicMock(return_value=0)
+
+    def get_instance(self, burst=3):
+        """Get an instance of LogLimiter
+        """
+        return LogLimiter(self.logger, "mpv", burst=burst, interval=1, clock=self.clock)
+
+    def test_log_repeated(self):
+        """Test consecutive identical messages are logged once
+        """
+        limiter = self.get_instance()
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.test", "DEBUG") as logger:
+            for _ in range(3):
+                limiter.log(logging.ERROR, "ffmpeg", "error while decoding")
+
+            limiter.log(logging.ERROR, "ffmpeg", "other error")
+
+        # assert the effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "ERROR:dakara_player_vlc.test:mpv: ffmpeg: error while decoding",
+                "ERROR:dakara_player_vlc.test:mpv: ffmpeg: last message repeated "
+                "2 times",
+                "ERROR:dakara_player_vlc.test:mpv: ffmpeg: other error",
+            ],
+        )
+
+    def test_log_rate_limited(self):
+        """Test to limit the number of messages of a source within an interval
+        """
+        limiter = self.get_instance(burst=2)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.test", "DEBUG") as logger:
+            for index in range(4):
+                limiter.log(logging.DEBUG, "vo", "frame {}".format(index))
+
+            # other sources are not limited
+            limiter.log(logging.DEBUG, "ao", "sample")
+
+            # the next interval starts
+            self.clock.return_value = 1
+            limiter.log(logging.DEBUG, "vo", "frame 4")
+
+        # assert the effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "DEBUG:dakara_player_vlc.test:mpv: vo: frame 0",
+                "DEBUG:dakara_player_vlc.test:mpv: vo: frame 1",
+                "DEBUG:dakara_player_vlc.test:mpv: ao: sample",
+                "WARNING:dakara_player_vlc.test:mpv: vo: 2 messages suppressed, as "
+                "they were logged too fast",
+                "DEBUG:dakara_player_vlc.test:mpv: vo: frame 4",
+            ],
+        )
+
+    def test_log_unlimited(self):
+        """Test to not limit the number of messages if the burst is 0
+        """
+        limiter = self.get_instance(burst=0)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.test", "DEBUG") as logger:
+            for index in range(5):
+                limiter.log(logging.DEBUG, "vo", "frame {}".format(index))
+
+        # assert the effect on logs
+        self.assertEqual(len(logger.output), 5)
+
+    def test_flush(self):
+        """Test to log the pending counts
+        """
+        limiter = self.get_instance(burst=1)
+
+        with self.assertLogs("dakara_player_vlc.test", "DEBUG") as logger:
+            limiter.log(logging.INFO, "vo", "frame 0")
+            limiter.log(logging.INFO, "vo", "frame 0")
+            limiter.log(logging.INFO, "vo", "frame 1")
+            limiter.log(logging.INFO, "vo", "frame 1")
+
+            # call the method
+            limiter.flush()
+
+        # assert the effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "INFO:dakara_player_vlc.test:mpv: vo: frame 0",
+                "INFO:dakara_player_vlc.test:mpv: vo: last message repeated 1 times",
+                "WARNING:dakara_player_vlc.test:mpv: vo: 2 messages suppressed, as "
+                "they were logged too fast",
+            ],
+        )
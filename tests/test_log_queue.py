@@ -0,0 +1,98 @@
+import logging
+from threading import Event
+from unittest import TestCase
+
+from dakara_player_vlc.log_queue import LogQueue
+
+
+class RecordingHandler(logging.Handler):
+    """Handler keeping the records and the threads that handled them
+    """
+
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.messages = []
+        self.threads = set()
+        self.blocked = None
+
+    def emit(self, record):
+        if self.blocked is not None:
+            self.blocked.wait(5)
+
+        self.messages.append(record.getMessage())
+        self.threads.add(record.threadName)
+
+
+class LogQueueTestCase(TestCase):
+    """Test the log queue class
+    """
+
+    def setUp(self):
+        # replace the handlers of the root logger
+        self.root_logger = logging.getLogger()
+        self.former_handlers = list(self.root_logger.handlers)
+        self.former_level = self.root_logger.level
+        for handler in self.former_handlers:
+            self.root_logger.removeHandler(handler)
+
+        self.handler = RecordingHandler(logging.INFO)
+        self.root_logger.addHandler(self.handler)
+        self.root_logger.setLevel(logging.DEBUG)
+        self.logger = logging.getLogger("dakara_player_vlc.test")
+
+    def tearDown(self):
+        self.root_logger.removeHandler(self.handler)
+        for handler in self.former_handlers:
+            self.root_logger.addHandler(handler)
+
+        self.root_logger.setLevel(self.former_level)
+
+    def test_queue(self):
+        """Test records are written by the former handlers
+        """
+        arguments = ["value"]
+
+        with LogQueue() as log_queue:
+            # assert the handlers are replaced
+            self.assertListEqual(self.root_logger.handlers, [log_queue.handler])
+            self.assertEqual(log_queue.handler.level, logging.INFO)
+
+            self.logger.info("Message with %s", arguments)
+            self.logger.debug("Debug message")
+
+            # modify the argument after logging
+            arguments.append("other")
+
+        # assert the handlers are restored
+        self.assertListEqual(self.root_logger.handlers, [self.handler])
+
+        # assert the records were written with the arguments at logging time
+        self.assertListEqual(self.handler.messages, ["Message with ['value']"])
+
+    def test_queue_full(self):
+        """Test records are dropped and counted when the queue is full
+        """
+        self.handler.blocked = Event()
+
+        with self.assertLogs("dakara_player_vlc.log_queue", "WARNING") as logger:
+            with LogQueue(size=2) as log_queue:
+                for index in range(10):
+                    self.logger.info("Message %i", index)
+
+                # let the listener write the records
+                self.handler.blocked.set()
+
+        # assert records were dropped
+        self.assertGreater(log_queue.handler.dropped_count, 0)
+        self.assertEqual(
+            len(self.handler.messages) + log_queue.handler.dropped_count, 10
+        )
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:dakara_player_vlc.log_queue:{} log messages dropped, as "
+                "they were logged faster than written".format(
+                    log_queue.handler.dropped_count
+                )
+            ],
+        )
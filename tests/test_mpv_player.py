@@ -0,0 +1,139 @@
+import sys
+from importlib import import_module
+from queue import Queue
+from threading import Event
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from path import Path
+
+# libmpv may not be installed, so the mpv module is mocked to import the player
+with patch.dict(sys.modules, {"mpv": MagicMock()}):
+    mpv_player = import_module("dakara_player_vlc.mpv_player")
+
+
+class MpvPlayerTestCase(TestCase):
+    """Test the mpv player class unitary
+    """
+
+    def get_instance(self, config={}):
+        """Get a heavily mocked instance of MpvPlayer
+
+        Args:
+            config (dict): configuration passed to the constructor.
+
+        Returns:
+            tuple: contains the following elements:
+                MpvPlayer: instance;
+                unittest.mock.MagicMock: mpv module.
+        """
+        with patch("dakara_player_vlc.media_player.TextGenerator"), patch(
+            "dakara_player_vlc.media_player.BackgroundLoader"
+        ), patch.object(mpv_player, "mpv") as mocked_mpv:
+            return (
+                mpv_player.MpvPlayer(Event(), Queue(), config, Path("temp")),
+                mocked_mpv,
+            )
+
+    def get_end_file_event(self, mocked_mpv, reason):
+        """Get an end file event of mpv
+
+        Args:
+            mocked_mpv (unittest.mock.MagicMock): mpv module.
+            reason (str): name of the reason of the end of the file.
+
+        Returns:
+            dict: event.
+        """
+        return {"event": {"reason": getattr(mocked_mpv.MpvEventEndFile, reason)}}
+
+    def test_handle_log_messages_error(self):
+        """Test an error message alone does not report the media as failed
+        """
+        # create instance
+        mpv_player_instance, _ = self.get_instance()
+        mpv_player_instance.playing_id = 42
+        mocked_finished = MagicMock()
+        mocked_error = MagicMock()
+        mpv_player_instance.set_callback("finished", mocked_finished)
+        mpv_player_instance.set_callback("error", mocked_error)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.mpv_player", "DEBUG") as logger:
+            mpv_player_instance.handle_log_messages(
+                "error", "ffmpeg", "decoding error\n"
+            )
+
+        # assert the error is kept and logged but not reported
+        self.assertEqual(mpv_player_instance.last_error, "decoding error")
+        mocked_finished.assert_not_called()
+        mocked_error.assert_not_called()
+        self.assertListEqual(
+            logger.output,
+            ["ERROR:dakara_player_vlc.mpv_player:mpv: ffmpeg: decoding error"],
+        )
+
+    def test_handle_end_reached_error(self):
+        """Test a file ended with an error is reported once with the last error
+        """
+        # create instance
+        mpv_player_instance, mocked_mpv = self.get_instance()
+        mpv_player_instance.playing_id = 42
+        mocked_finished = MagicMock()
+        mocked_error = MagicMock()
+        mpv_player_instance.set_callback("finished", mocked_finished)
+        mpv_player_instance.set_callback("error", mocked_error)
+
+        # call the methods
+        with self.assertLogs("dakara_player_vlc.mpv_player", "DEBUG") as logger:
+            mpv_player_instance.handle_log_messages("error", "cplayer", "first error")
+            mpv_player_instance.handle_log_messages(
+                "error", "cplayer", "cannot open file"
+            )
+
+            with patch.object(mpv_player, "mpv", mocked_mpv):
+                mpv_player_instance.handle_end_reached(
+                    self.get_end_file_event(mocked_mpv, "ERROR")
+                )
+
+        # assert the media was reported once with the last error
+        mocked_finished.assert_called_once_with(42)
+        mocked_error.assert_called_once_with(
+            42, "Unable to play current media: cannot open file"
+        )
+        self.assertIn(
+            "ERROR:dakara_player_vlc.mpv_player:"
+            "Unable to play current media: cannot open file",
+            logger.output,
+        )
+
+        # assert the state is reset
+        self.assertIsNone(mpv_player_instance.playing_id)
+        self.assertIsNone(mpv_player_instance.last_error)
+        self.assertFalse(mpv_player_instance.in_transition)
+
+    def test_handle_end_reached_error_idle(self):
+        """Test a failure of the idle screen is only logged
+        """
+        # create instance
+        mpv_player_instance, mocked_mpv = self.get_instance()
+        mpv_player_instance.playing_id = None
+        mocked_finished = MagicMock()
+        mocked_error = MagicMock()
+        mpv_player_instance.set_callback("finished", mocked_finished)
+        mpv_player_instance.set_callback("error", mocked_error)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.mpv_player", "DEBUG") as logger:
+            with patch.object(mpv_player, "mpv", mocked_mpv):
+                mpv_player_instance.handle_end_reached(
+                    self.get_end_file_event(mocked_mpv, "ERROR")
+                )
+
+        # assert the failure was not reported
+        mocked_finished.assert_not_called()
+        mocked_error.assert_not_called()
+        self.assertListEqual(
+            logger.output,
+            ["ERROR:dakara_player_vlc.mpv_player:Unable to play current media"],
+        )
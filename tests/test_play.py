@@ -1,4 +1,6 @@
+import json
 from argparse import ArgumentParser, Namespace
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest.mock import ANY, MagicMock, patch
 
@@ -66,7 +68,15 @@ class PlayTestCase(TestCase):
 
         # call the function
         with self.assertRaises(ConfigNotFoundError) as error:
-            play.play(Namespace(debug=False, force=False, progress=True))
+            play.play(
+                Namespace(
+                    debug=False,
+                    force=False,
+                    progress=True,
+                    trace_startup=None,
+                    log_queue=False,
+                )
+            )
 
         # assert the error
         self.assertEqual(
@@ -111,7 +121,15 @@ class PlayTestCase(TestCase):
         # call the function
         with self.assertRaises(DakaraError) as error:
             with self.assertLogs("dakara_player_vlc.commands.play") as logger:
-                play.play(Namespace(debug=False, force=False, progress=True))
+                play.play(
+                    Namespace(
+                        debug=False,
+                        force=False,
+                        progress=True,
+                        trace_startup=None,
+                        log_queue=False,
+                    )
+                )
 
         # assert the error
         self.assertEqual(str(error.exception), "Config-related error")
@@ -159,7 +177,7 @@ class PlayTestCase(TestCase):
         mocked_load_config.return_value = config
 
         # call the function
-        play.play(Namespace(debug=False))
+        play.play(Namespace(debug=False, trace_startup=None, log_queue=False))
 
         # assert the call
         mocked_create_logger.assert_called_with()
@@ -170,6 +188,121 @@ class PlayTestCase(TestCase):
         mocked_load.assert_called_with()
         mocked_run.assert_called_with()
 
+    @patch.object(DakaraPlayerVlc, "load")
+    @patch.object(DakaraPlayerVlc, "run")
+    @patch("dakara_player_vlc.commands.play.set_loglevel")
+    @patch("dakara_player_vlc.commands.play.load_config")
+    @patch("dakara_player_vlc.commands.play.get_config_file")
+    @patch("dakara_player_vlc.commands.play.create_logger")
+    def test_play_trace_startup(
+        self,
+        mocked_create_logger,
+        mocked_get_config_file,
+        mocked_load_config,
+        mocked_set_loglevel,
+        mocked_run,
+        mocked_load,
+    ):
+        """Test to play with a startup trace
+        """
+        # setup the mocks
+        mocked_get_config_file.return_value = Path("path") / "to" / "config"
+        mocked_load_config.return_value = {"player": {}, "server": {}}
+
+        with TemporaryDirectory() as tempdir:
+            trace_path = Path(tempdir) / "trace.json"
+
+            # call the function
+            with patch("builtins.print") as mocked_print:
+                with self.assertLogs("dakara_player_vlc.startup_trace"):
+                    play.play(
+                        Namespace(
+                            debug=False, trace_startup=trace_path, log_queue=False
+                        )
+                    )
+
+            # assert the trace
+            with trace_path.open() as file:
+                trace = json.load(file)
+
+        self.assertListEqual(
+            [phase["name"] for phase in trace["phases"]],
+            ["command/import player", "command/load config"],
+        )
+        mocked_print.assert_any_call(
+            "Startup and shutdown phases, from the longest to the shortest:"
+        )
+
+    @patch("dakara_player_vlc.commands.play.LogQueue", autospec=True)
+    @patch.object(DakaraPlayerVlc, "load")
+    @patch.object(DakaraPlayerVlc, "run")
+    @patch("dakara_player_vlc.commands.play.set_loglevel")
+    @patch("dakara_player_vlc.commands.play.load_config")
+    @patch("dakara_player_vlc.commands.play.get_config_file")
+    @patch("dakara_player_vlc.commands.play.create_logger")
+    def test_play_log_queue(
+        self,
+        mocked_create_logger,
+        mocked_get_config_file,
+        mocked_load_config,
+        mocked_set_loglevel,
+        mocked_run,
+        mocked_load,
+        mocked_log_queue_class,
+    ):
+        """Test to play with the logs written in a background thread
+        """
+        # setup the mocks
+        mocked_get_config_file.return_value = Path("path") / "to" / "config"
+        mocked_load_config.return_value = {"player": {}, "server": {}}
+        mocked_log_queue = mocked_log_queue_class.return_value
+        mocked_run.side_effect = lambda: mocked_log_queue.__exit__.assert_not_called()
+
+        # call the function
+        play.play(Namespace(debug=False, trace_startup=None, log_queue=True))
+
+        # assert the logs were queued during the run
+        mocked_log_queue_class.assert_called_with()
+        mocked_log_queue.__enter__.assert_called_once()
+        mocked_log_queue.__exit__.assert_called_once()
+        mocked_run.assert_called_with()
+
+    @patch("dakara_player_vlc.rooms.RoomSupervisor", autospec=True)
+    @patch.object(DakaraPlayerVlc, "run")
+    @patch("dakara_player_vlc.commands.play.set_loglevel")
+    @patch("dakara_player_vlc.commands.play.load_config")
+    @patch("dakara_player_vlc.commands.play.get_config_file")
+    @patch("dakara_player_vlc.commands.play.create_logger")
+    def test_play_rooms(
+        self,
+        mocked_create_logger,
+        mocked_get_config_file,
+        mocked_load_config,
+        mocked_set_loglevel,
+        mocked_run,
+        mocked_room_supervisor_class,
+    ):
+        """Test to play in multi-room mode
+        """
+        # setup the mocks
+        mocked_get_config_file.return_value = Path("path") / "to" / "config"
+        config = {
+            "player": {"kara_folder": Path("path") / "to" / "folder"},
+            "server": {"url": "www.example.com"},
+            "rooms": {"enabled": True, "list": [{"name": "room"}]},
+        }
+        mocked_load_config.return_value = config
+
+        # call the function
+        play.play(Namespace(debug=False, trace_startup=None, log_queue=False))
+
+        # assert the rooms were run instead of the player
+        mocked_room_supervisor_class.assert_called_with(config, trace=ANY)
+        mocked_room_supervisor = mocked_room_supervisor_class.return_value
+        mocked_room_supervisor.load.assert_called_with()
+        mocked_room_supervisor.run.assert_called_with()
+        mocked_run.assert_not_called()
+
 
 class CreateConfigTestCase(TestCase):
     """Test the create-config action
@@ -0,0 +1,147 @@
+import json
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from path import Path
+
+from dakara_player_vlc.play_history import PlayHistory
+
+
+class PlayHistoryTestCase(TestCase):
+    """Test the play history class
+    """
+
+    def setUp(self):
+        # create a temporary directory
+        self.tempdir = TemporaryDirectory()
+        self.path = Path(self.tempdir.name) / "history.json"
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_load_no_file(self):
+        """Test to load the history when there is no file
+        """
+        play_history = PlayHistory(self.path)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.play_history", "DEBUG"):
+            play_history.load()
+
+        # assert the history is empty
+        self.assertDictEqual(play_history.entries, {})
+
+    def test_load_invalid(self):
+        """Test to load an invalid history file
+        """
+        self.path.write_text("invalid")
+        play_history = PlayHistory(self.path)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.play_history", "WARNING"):
+            play_history.load()
+
+        # assert the history is empty
+        self.assertDictEqual(play_history.entries, {})
+
+    def test_load_malformed(self):
+        """Test to load a history file which does not have the expected content
+        """
+        play_history = PlayHistory(self.path)
+
+        for content in ([1, 2], {"file.mkv": 3}, {"file.mkv": ["a", 1000]}):
+            self.path.write_text(json.dumps(content))
+
+            # call the method
+            with self.assertLogs("dakara_player_vlc.play_history", "WARNING"):
+                play_history.load()
+
+            # assert the history is empty
+            self.assertDictEqual(play_history.entries, {})
+
+    @patch("dakara_player_vlc.play_history.time.time")
+    def test_record_save_load(self, mocked_time):
+        """Test to record plays and read them again
+        """
+        mocked_time.return_value = 1000
+        play_history = PlayHistory(self.path)
+
+        # call the methods
+        play_history.record("file1.mkv")
+        play_history.record("file1.mkv")
+        play_history.record("file2.mkv")
+
+        # assert the file is not written yet
+        self.assertFalse(self.path.exists())
+
+        play_history.flush()
+
+        # assert the file content
+        self.assertDictEqual(
+            json.loads(self.path.text()),
+            {"file1.mkv": [2, 1000], "file2.mkv": [1, 1000]},
+        )
+
+        # assert the history can be loaded
+        play_history_loaded = PlayHistory(self.path)
+        with self.assertLogs("dakara_player_vlc.play_history", "DEBUG"):
+            play_history_loaded.load()
+
+        self.assertDictEqual(
+            play_history_loaded.entries,
+            {"file1.mkv": (2, 1000), "file2.mkv": (1, 1000)},
+        )
+
+    @patch("dakara_player_vlc.play_history.time.time")
+    def test_get_most_likely_recency(self, mocked_time):
+        """Test recent songs are preferred to old hits
+        """
+        play_history = PlayHistory(self.path, half_life=100)
+        play_history.entries = {
+            "old_hit.mkv": (4, 0),
+            "recent.mkv": (1, 1000),
+            "frequent.mkv": (3, 1000),
+        }
+        mocked_time.return_value = 1000
+
+        # call the method
+        most_likely = play_history.get_most_likely()
+
+        # assert the result
+        self.assertListEqual(most_likely, ["frequent.mkv", "recent.mkv", "old_hit.mkv"])
+        self.assertListEqual(play_history.get_most_likely(1), ["frequent.mkv"])
+
+    @patch("dakara_player_vlc.play_history.time.time")
+    def test_record_max_entries(self, mocked_time):
+        """Test only the best songs are kept
+        """
+        play_history = PlayHistory(self.path, max_entries=2)
+        play_history.entries = {"file1.mkv": (3, 1000), "file2.mkv": (2, 1000)}
+        mocked_time.return_value = 1000
+
+        # call the method
+        play_history.record("file3.mkv")
+
+        # assert the worst song has been dropped
+        self.assertDictEqual(
+            play_history.entries, {"file1.mkv": (3, 1000), "file2.mkv": (2, 1000)}
+        )
+
+    @patch.object(PlayHistory, "save", autospec=True)
+    def test_flush_not_dirty(self, mocked_save):
+        """Test to write the history only if it has changed
+        """
+        play_history = PlayHistory(self.path)
+
+        # call the method without change
+        play_history.flush()
+        mocked_save.assert_not_called()
+
+        # call the method after a change
+        play_history.record("file1.mkv")
+        play_history.flush()
+        play_history.flush()
+
+        # assert the history was written once
+        mocked_save.assert_called_once_with(play_history, play_history.entries)
@@ -0,0 +1,96 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from dakara_player_vlc.playback_clock import PlaybackClock
+
+
+@patch("dakara_player_vlc.playback_clock.time.monotonic", autospec=True)
+class PlaybackClockTestCase(TestCase):
+    """Test the playback clock
+    """
+
+    def setUp(self):
+        # create a player time getter
+        self.get_player_time = MagicMock()
+
+        # create a clock
+        self.clock = PlaybackClock(self.get_player_time, resync_interval=5)
+
+    def test_get_time_first(self, mocked_monotonic):
+        """Test to get the time for the first time
+        """
+        mocked_monotonic.return_value = 100
+        self.get_player_time.return_value = 1000
+
+        # call the method
+        self.assertEqual(self.clock.get_time(), 1000)
+
+        # assert the call
+        self.get_player_time.assert_called_once_with()
+
+    def test_get_time_extrapolated(self, mocked_monotonic):
+        """Test to extrapolate the time while playing
+        """
+        mocked_monotonic.side_effect = [100, 100, 101.5]
+        self.get_player_time.return_value = 1000
+
+        # call the method
+        self.clock.get_time()
+        self.assertEqual(self.clock.get_time(), 2500)
+
+        # assert the player has been queried only once
+        self.get_player_time.assert_called_once_with()
+
+    def test_get_time_rate(self, mocked_monotonic):
+        """Test to extrapolate the time with a different playback rate
+        """
+        mocked_monotonic.side_effect = [100, 101]
+        self.get_player_time.return_value = 1000
+
+        # call the method
+        self.clock.sync(rate=2)
+        self.assertEqual(self.clock.get_time(), 3000)
+
+    def test_get_time_paused(self, mocked_monotonic):
+        """Test to get the time while paused
+        """
+        mocked_monotonic.side_effect = [100, 103]
+        self.get_player_time.return_value = 1000
+
+        # call the method
+        self.clock.sync(playing=False)
+        self.assertEqual(self.clock.get_time(), 1000)
+
+    def test_get_time_resync(self, mocked_monotonic):
+        """Test to resynchronize the clock after the resync interval
+        """
+        mocked_monotonic.side_effect = [100, 100, 106, 106]
+        self.get_player_time.side_effect = [1000, 6900]
+
+        # call the method
+        self.clock.get_time()
+        self.assertEqual(self.clock.get_time(), 6900)
+
+        # assert the player has been queried twice
+        self.assertEqual(self.get_player_time.call_count, 2)
+
+    def test_get_time_not_started(self, mocked_monotonic):
+        """Test to not extrapolate from a player that has not started yet
+        """
+        mocked_monotonic.side_effect = [100, 101, 101]
+        self.get_player_time.side_effect = [0, 500]
+
+        # call the method
+        self.assertEqual(self.clock.get_time(), 0)
+        self.assertEqual(self.clock.get_time(), 500)
+
+    def test_reset(self, mocked_monotonic):
+        """Test to reset the clock
+        """
+        mocked_monotonic.return_value = 100
+        self.get_player_time.side_effect = [1000, 0]
+
+        # call the methods
+        self.clock.get_time()
+        self.clock.reset()
+        self.assertEqual(self.clock.get_time(), 0)
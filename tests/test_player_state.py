@@ -0,0 +1,141 @@
+import json
+from queue import Queue
+from tempfile import TemporaryDirectory
+from threading import Event
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from path import Path
+
+from dakara_player_vlc.player_state import PlayerState
+
+
+class PlayerStateTestCase(TestCase):
+    """Test the player state
+    """
+
+    def setUp(self):
+        # create a temporary directory
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name) / "state.json"
+
+        # create a timing function
+        self.get_timing = MagicMock(return_value=12.5)
+
+        # create the player state
+        self.player_state = PlayerState(Event(), Queue(), self.path, self.get_timing)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_load_no_file(self):
+        """Test to load when there is no state file
+        """
+        with self.assertLogs("dakara_player_vlc.player_state", "DEBUG") as logger:
+            self.player_state.load()
+
+        # assert the state
+        self.assertIsNone(self.player_state.pop_saved_state())
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            ["DEBUG:dakara_player_vlc.player_state:No player state file found"],
+        )
+
+    def test_load_invalid(self):
+        """Test to load an invalid state file
+        """
+        self.path.write_text("invalid")
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.player_state", "DEBUG"):
+            self.player_state.load()
+
+        # assert the state
+        self.assertIsNone(self.player_state.pop_saved_state())
+
+    def test_load_missing_key(self):
+        """Test to load a state file with a missing key
+        """
+        self.path.write_text(json.dumps({"playlist_entry_id": 42, "timing": 12.5}))
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.player_state", "DEBUG") as logger:
+            self.player_state.load()
+
+        # assert the state
+        self.assertIsNone(self.player_state.pop_saved_state())
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:dakara_player_vlc.player_state:Invalid player state "
+                "file: missing key 'file_path'"
+            ],
+        )
+
+    def test_load_invalid_content(self):
+        """Test to load a state file which does not contain a mapping
+        """
+        self.path.write_text(json.dumps([42, "path/to/file.mkv", 12.5]))
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.player_state", "DEBUG"):
+            self.player_state.load()
+
+        # assert the state
+        self.assertIsNone(self.player_state.pop_saved_state())
+
+    def test_flush_load(self):
+        """Test to write a state and to load it back
+        """
+        self.player_state.set_playing(42, Path("path/to/file.mkv"))
+
+        # call the method
+        self.player_state.flush()
+
+        # assert the file
+        self.assertDictEqual(
+            json.loads(self.path.text()),
+            {"playlist_entry_id": 42, "file_path": "path/to/file.mkv", "timing": 12.5},
+        )
+        self.assertFalse((self.path + ".tmp").exists())
+
+        # load the state in a new object
+        player_state = PlayerState(Event(), Queue(), self.path, self.get_timing)
+        player_state.load()
+
+        # assert the saved state can be popped only once
+        self.assertDictEqual(
+            player_state.pop_saved_state(),
+            {"playlist_entry_id": 42, "file_path": "path/to/file.mkv", "timing": 12.5},
+        )
+        self.assertIsNone(player_state.pop_saved_state())
+
+    def test_flush_unchanged(self):
+        """Test the state file is not written again if the state is unchanged
+        """
+        self.player_state.set_playing(42, "path/to/file.mkv")
+        self.player_state.flush()
+        self.path.remove()
+
+        # call the method
+        self.player_state.flush()
+
+        # assert the file has not been written
+        self.assertFalse(self.path.exists())
+
+    def test_clear(self):
+        """Test to write that no song is playing
+        """
+        self.player_state.set_playing(42, "path/to/file.mkv")
+        self.player_state.flush()
+
+        # call the method
+        self.player_state.clear()
+        self.player_state.exit_worker()
+
+        # assert the file
+        self.assertIsNone(json.loads(self.path.text()))
@@ -0,0 +1,191 @@
+import json
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from queue import Queue
+from threading import Event, Thread
+from unittest import TestCase
+from unittest.mock import ANY, MagicMock, call
+
+from dakara_base.http_client import ResponseRequestError
+
+from dakara_player_vlc.dakara_server import DakaraServerHTTPConnection
+from dakara_player_vlc.playlist_prefetcher import PlaylistPrefetcher
+
+
+class PlaylistPrefetcherTestCase(TestCase):
+    """Test the playlist prefetcher class
+    """
+
+    def setUp(self):
+        # create mock modules
+        self.dakara_server_http = MagicMock()
+        self.media_player = MagicMock()
+
+        # create a playlist prefetcher
+        self.playlist_prefetcher = PlaylistPrefetcher(
+            Event(),
+            Queue(),
+            self.dakara_server_http,
+            self.media_player,
+            count=2,
+            warm_size=1024,
+        )
+
+        # create playlist entries
+        self.playlist_entry_1 = {"id": 42, "song": {"file_path": "file1.mkv"}}
+        self.playlist_entry_2 = {"id": 43, "song": {"file_path": "file2.mkv"}}
+
+    def test_poll(self):
+        """Test to prepare the upcoming playlist entries
+        """
+        self.dakara_server_http.get_queuing_playlist_entries.return_value = [
+            self.playlist_entry_1,
+            self.playlist_entry_2,
+        ]
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.playlist_prefetcher", "DEBUG"):
+            self.playlist_prefetcher.poll()
+
+        # assert the call
+        self.dakara_server_http.get_queuing_playlist_entries.assert_called_with(2)
+        self.media_player.forget_prepared_playlist_entries.assert_called_with([42, 43])
+        self.media_player.prepare_playlist_entry.assert_has_calls(
+            [call(self.playlist_entry_1, 1024), call(self.playlist_entry_2, 1024)]
+        )
+        self.assertListEqual(self.playlist_prefetcher.upcoming_ids, [42, 43])
+
+    def test_poll_unchanged(self):
+        """Test nothing is prepared if the queue has not changed
+        """
+        self.playlist_prefetcher.upcoming_ids = [42]
+        self.dakara_server_http.get_queuing_playlist_entries.return_value = [
+            self.playlist_entry_1
+        ]
+
+        # call the method
+        self.playlist_prefetcher.poll()
+
+        # assert the call
+        self.media_player.forget_prepared_playlist_entries.assert_not_called()
+        self.media_player.prepare_playlist_entry.assert_not_called()
+
+    def test_poll_error(self):
+        """Test nothing is prepared if the server cannot be reached
+        """
+        self.playlist_prefetcher.upcoming_ids = [42]
+        mocked_get = self.dakara_server_http.get_queuing_playlist_entries
+        mocked_get.side_effect = ResponseRequestError("error")
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.playlist_prefetcher", "DEBUG"):
+            self.playlist_prefetcher.poll()
+
+        # assert the call
+        self.media_player.forget_prepared_playlist_entries.assert_not_called()
+        self.assertListEqual(self.playlist_prefetcher.upcoming_ids, [42])
+
+    def test_run_request_poll(self):
+        """Test the queue is polled again on request
+        """
+        self.playlist_prefetcher.poll_interval = 60
+        self.dakara_server_http.get_queuing_playlist_entries.return_value = []
+
+        # start the thread
+        self.playlist_prefetcher.thread.start()
+
+        # request a poll and stop
+        self.playlist_prefetcher.request_poll()
+        self.playlist_prefetcher.stop.set()
+        self.playlist_prefetcher.exit_worker()
+        self.playlist_prefetcher.thread.join(5)
+
+        # assert the thread ended
+        self.assertFalse(self.playlist_prefetcher.thread.is_alive())
+        self.dakara_server_http.get_queuing_playlist_entries.assert_called_with(2)
+
+
+class PlaylistPrefetcherServerTestCase(TestCase):
+    """Test the playlist prefetcher against a local stand-in server
+    """
+
+    def setUp(self):
+        # queue of the stand-in server
+        self.queuing = []
+        queuing = self.queuing
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/api/playlist/queuing/":
+                    self.send_error(404)
+                    return
+
+                body = json.dumps({"count": len(queuing), "results": queuing})
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args):
+                pass
+
+        # start the stand-in server
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.server_thread = Thread(target=self.server.serve_forever)
+        self.server_thread.start()
+
+        # create a connection to it
+        self.dakara_server_http = DakaraServerHTTPConnection(
+            {
+                "address": "127.0.0.1:{}".format(self.server.server_port),
+                "login": "login",
+                "password": "password",
+            },
+            endpoint_prefix="api/",
+        )
+        self.dakara_server_http.token = "token"
+
+        # create a playlist prefetcher
+        self.media_player = MagicMock()
+        self.playlist_prefetcher = PlaylistPrefetcher(
+            Event(), Queue(), self.dakara_server_http, self.media_player, count=2
+        )
+
+    def tearDown(self):
+        self.dakara_server_http.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+
+    def test_poll_queue_changes(self):
+        """Test the preparation follows the changes of the queue
+        """
+        playlist_entry_1 = {"id": 42, "song": {"file_path": "file1.mkv"}}
+        playlist_entry_2 = {"id": 43, "song": {"file_path": "file2.mkv"}}
+        playlist_entry_3 = {"id": 44, "song": {"file_path": "file3.mkv"}}
+        self.queuing.extend([playlist_entry_1, playlist_entry_2, playlist_entry_3])
+
+        # poll the first time
+        self.playlist_prefetcher.poll()
+
+        # assert only the first entries are prepared
+        self.media_player.forget_prepared_playlist_entries.assert_called_with([42, 43])
+        self.assertEqual(self.media_player.prepare_playlist_entry.call_count, 2)
+
+        # the first entry starts playing
+        self.queuing.pop(0)
+        self.media_player.prepare_playlist_entry.reset_mock()
+        self.playlist_prefetcher.poll()
+
+        # assert the preparation follows
+        self.media_player.forget_prepared_playlist_entries.assert_called_with([43, 44])
+        self.media_player.prepare_playlist_entry.assert_has_calls(
+            [call(playlist_entry_2, ANY), call(playlist_entry_3, ANY)]
+        )
+
+        # poll again without change
+        self.media_player.prepare_playlist_entry.reset_mock()
+        self.playlist_prefetcher.poll()
+
+        # assert nothing is prepared
+        self.media_player.prepare_playlist_entry.assert_not_called()
@@ -1,12 +1,13 @@
 from unittest import TestCase
-from unittest.mock import ANY, call, patch
+from unittest.mock import patch
 
 from path import Path
-from dakara_base.resources_manager import get_file
+from dakara_base.resources_manager import get_file, ResourceNotFoundError
 
 from dakara_player_vlc.resources_manager import (
     get_all_fonts,
     get_background,
+    get_resource_list,
     get_template,
 )
 
@@ -27,6 +28,19 @@ class GetBackgroundTestCase(TestCase):
         # assert the result
         self.assertEqual(result, MODULE_PATH / "resources" / "backgrounds" / "idle.png")
 
+    def test_not_found(self):
+        """Test to access a background that does not exist
+        """
+        # call the function
+        with self.assertRaises(ResourceNotFoundError) as error:
+            get_background("nothing.png")
+
+        # assert the error
+        self.assertEqual(
+            str(error.exception),
+            "Background file 'nothing.png' not found within resources",
+        )
+
 
 class GetTemplateTestCase(TestCase):
     """Test the `get_template` function
@@ -46,21 +60,22 @@ class GetAllFontsTestCase(TestCase):
     """Test the `get_all_fonts` function
     """
 
-    @patch("dakara_player_vlc.resources_manager.resource_filename", autospec=True)
-    @patch("dakara_player_vlc.resources_manager.LIST_FONTS", autospec=True)
-    def test(self, mocked_list_fonts, mocked_resource_filename):
+    @patch("dakara_player_vlc.resources_manager.get_resource_list", autospec=True)
+    @patch("dakara_player_vlc.resources_manager.get_resource_directory", autospec=True)
+    def test(self, mocked_get_resource_directory, mocked_get_resource_list):
         """Test to get all the fonts
         """
         # mock the call
-        mocked_list_fonts.__iter__.return_value = ["aa", "bb"]
-        mocked_resource_filename.side_effect = ["path/to/aa", "path/to/bb"]
+        mocked_get_resource_directory.return_value = Path("path/to")
+        mocked_get_resource_list.return_value = ["aa", "bb"]
 
         # call the function
         result = get_all_fonts()
 
         # assert the call
-        mocked_list_fonts.__iter__.assert_called_once_with()
-        mocked_resource_filename.assert_has_calls([call(ANY, "aa"), call(ANY, "bb")])
+        mocked_get_resource_list.assert_called_once_with(
+            "dakara_player_vlc.resources.fonts"
+        )
 
         # assert the result
         self.assertListEqual(result, [Path("path/to/aa"), Path("path/to/bb")])
@@ -75,3 +90,18 @@ class GetAllFontsTestCase(TestCase):
         self.assertIn(
             MODULE_PATH / "resources" / "fonts" / "fontawesome-webfont.ttf", result
         )
+
+
+class GetResourceListTestCase(TestCase):
+    """Test the `get_resource_list` function
+    """
+
+    def test_real(self):
+        """Test special files are not listed
+        """
+        # call the function
+        result = get_resource_list("dakara_player_vlc.resources.templates")
+
+        # assert the result
+        self.assertIn("idle.ass", result)
+        self.assertNotIn("__init__.py", result)
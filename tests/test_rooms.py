@@ -0,0 +1,345 @@
+import os
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from dakara_base.exceptions import DakaraError
+from path import Path
+
+from dakara_player_vlc.rooms import (
+    get_room_config,
+    InvalidRoomsConfigError,
+    merge_config,
+    RoomsFailedError,
+    RoomSupervisor,
+    run_room,
+    run_room_process,
+)
+
+
+CONFIG = {
+    "player": {"kara_folder": "path/to/folder", "player_name": "vlc"},
+    "server": {"url": "www.example.com", "login": "login", "password": "password"},
+    "rooms": {
+        "enabled": True,
+        "restart_delay": 0.01,
+        "list": [
+            {
+                "name": "room1",
+                "cpus": [0],
+                "environment": {"DISPLAY": ":0.0"},
+                "config": {"server": {"login": "room1"}},
+            },
+            {"name": "room2", "config": {"server": {"login": "room2"}}},
+        ],
+    },
+}
+
+
+def get_process_class(exit_codes):
+    """Get a mocked process class whose instances end with the given codes
+
+    An exit code of None means the process keeps running.
+    """
+    exit_codes = iter(exit_codes)
+    processes = []
+
+    def create_process(*args, **kwargs):
+        process = MagicMock()
+        process.exitcode = next(exit_codes)
+        process.is_alive.return_value = process.exitcode is None
+        processes.append(process)
+
+        return process
+
+    process_class = MagicMock(side_effect=create_process)
+    process_class.processes = processes
+
+    return process_class
+
+
+class MergeConfigTestCase(TestCase):
+    """Test the `merge_config` function
+    """
+
+    def test_merge(self):
+        """Test to merge nested configs
+        """
+        config = {"server": {"url": "url", "login": "login"}, "loglevel": "info"}
+
+        # call the function
+        merged = merge_config(config, {"server": {"login": "room"}, "other": 1})
+
+        # assert the result
+        self.assertDictEqual(
+            merged,
+            {
+                "server": {"url": "url", "login": "room"},
+                "loglevel": "info",
+                "other": 1,
+            },
+        )
+
+        # assert the base config was not modified
+        self.assertEqual(config["server"]["login"], "login")
+
+
+@patch("dakara_player_vlc.rooms.get_config_directory", autospec=True)
+class GetRoomConfigTestCase(TestCase):
+    """Test the `get_room_config` function
+    """
+
+    def test_get(self, mocked_get_config_directory):
+        """Test the files of a room are put in its directory
+        """
+        mocked_get_config_directory.return_value = Path("directory")
+        config_room = {
+            "name": "room1",
+            "config": {
+                "server": {"login": "room1"},
+                "player": {"resume": {"state_file": "state.json"}},
+            },
+        }
+
+        # call the function
+        room_config = get_room_config(CONFIG, config_room)
+
+        # assert the config
+        self.assertNotIn("rooms", room_config)
+        self.assertEqual(room_config["server"]["login"], "room1")
+        self.assertEqual(room_config["server"]["url"], "www.example.com")
+        self.assertEqual(
+            Path(room_config["server"]["token_cache"]["cache_file"]),
+            Path("directory") / "rooms" / "room1" / "player_vlc_token.json",
+        )
+        self.assertEqual(
+            room_config["player"]["resume"]["state_file"], "state.json",
+        )
+
+
+class RoomSupervisorTestCase(TestCase):
+    """Test the room supervisor class
+    """
+
+    def setUp(self):
+        # create the context of the processes
+        self.context = MagicMock()
+
+    def test_init_no_rooms(self):
+        """Test to create a supervisor without rooms
+        """
+        with self.assertRaisesRegex(InvalidRoomsConfigError, "No rooms defined"):
+            RoomSupervisor({**CONFIG, "rooms": {"enabled": True}}, context=self.context)
+
+    def test_init_duplicated_room(self):
+        """Test to create a supervisor with two rooms of the same name
+        """
+        config = {
+            **CONFIG,
+            "rooms": {"list": [{"name": "room"}, {"name": "room"}]},
+        }
+
+        with self.assertRaisesRegex(
+            InvalidRoomsConfigError, "Room 'room' is defined twice"
+        ):
+            RoomSupervisor(config, context=self.context)
+
+    @patch("dakara_player_vlc.rooms.multiprocessing", autospec=True)
+    def test_get_context(self, mocked_multiprocessing):
+        """Test the modules of the player are preloaded in the forkserver
+        """
+        mocked_multiprocessing.get_all_start_methods.return_value = [
+            "fork",
+            "spawn",
+            "forkserver",
+        ]
+        mocked_context = mocked_multiprocessing.get_context.return_value
+
+        # call the method
+        RoomSupervisor(CONFIG)
+
+        # assert the context
+        mocked_multiprocessing.get_context.assert_called_with("forkserver")
+        mocked_context.set_forkserver_preload.assert_called_with(
+            ["dakara_player_vlc.dakara_player_vlc", "dakara_player_vlc.vlc_player"]
+        )
+
+    @patch("dakara_player_vlc.rooms.wait", autospec=True)
+    def test_supervise_restart(self, mocked_wait):
+        """Test to restart only a failed room
+        """
+        self.context.Process = get_process_class([1, 0, 0])
+        room_supervisor = RoomSupervisor(CONFIG, context=self.context)
+        room1, room2 = room_supervisor.rooms
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.rooms", "DEBUG") as logger:
+            for room in room_supervisor.rooms:
+                room_supervisor.start_room(room)
+
+            room_supervisor.supervise()
+
+        # assert the processes
+        self.assertEqual(self.context.Process.call_count, 3)
+        self.context.Process.assert_called_with(
+            target=run_room_process,
+            args=("room1", room1.config),
+            kwargs={"cpus": [0], "environment": {"DISPLAY": ":0.0"}},
+            name="Room-room1",
+        )
+        self.assertEqual(room1.restarts_count, 1)
+        self.assertEqual(room2.restarts_count, 0)
+        self.assertFalse(room1.failed)
+
+        # assert the effect on logs
+        self.assertIn(
+            "ERROR:dakara_player_vlc.rooms:Room 'room1' failed with exit code 1",
+            logger.output,
+        )
+        self.assertIn(
+            "INFO:dakara_player_vlc.rooms:Restarted room 'room1' (restart 1)",
+            logger.output,
+        )
+
+    @patch("dakara_player_vlc.rooms.wait", autospec=True)
+    def test_supervise_give_up(self, mocked_wait):
+        """Test to stop restarting a room that fails too many times in a row
+        """
+        self.context.Process = get_process_class([1, 0, 1])
+        room_supervisor = RoomSupervisor(
+            {**CONFIG, "rooms": {**CONFIG["rooms"], "max_restarts": 1}},
+            context=self.context,
+        )
+        room1, room2 = room_supervisor.rooms
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.rooms", "DEBUG") as logger:
+            for room in room_supervisor.rooms:
+                room_supervisor.start_room(room)
+
+            room_supervisor.supervise()
+
+        # assert the failed room was given up
+        self.assertTrue(room1.failed)
+        self.assertFalse(room2.failed)
+        self.assertIn(
+            "CRITICAL:dakara_player_vlc.rooms:Room 'room1' failed 1 times in a "
+            "row, giving up",
+            logger.output,
+        )
+
+    @patch("dakara_player_vlc.rooms.FontLoader", autospec=True)
+    @patch.object(RoomSupervisor, "supervise", autospec=True)
+    def test_run_failed(self, mocked_supervise, mocked_font_loader_class):
+        """Test to load the fonts once and report the failed rooms
+        """
+        self.context.Process = get_process_class([None, None])
+        room_supervisor = RoomSupervisor(CONFIG, context=self.context)
+
+        def supervise(self):
+            self.rooms[1].failed = True
+
+        mocked_supervise.side_effect = supervise
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.rooms", "DEBUG"):
+            with self.assertRaisesRegex(RoomsFailedError, "Rooms 'room2' failed"):
+                room_supervisor.run()
+
+        # assert the fonts were loaded and the rooms stopped
+        mocked_font_loader = (
+            mocked_font_loader_class.return_value.__enter__.return_value
+        )
+        mocked_font_loader.load.assert_called_with()
+        self.assertEqual(self.context.Process.call_count, 2)
+        for process in self.context.Process.processes:
+            process.terminate.assert_called_with()
+
+    def test_stop(self):
+        """Test to kill a room that does not stop in time
+        """
+        self.context.Process = get_process_class([None, None])
+        room_supervisor = RoomSupervisor(CONFIG, context=self.context)
+        with self.assertLogs("dakara_player_vlc.rooms", "DEBUG"):
+            for room in room_supervisor.rooms:
+                room_supervisor.start_room(room)
+
+        process1 = room_supervisor.rooms[0].process
+        process2 = room_supervisor.rooms[1].process
+        process1.join.side_effect = lambda timeout=None: setattr(
+            process1.is_alive, "return_value", False
+        )
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.rooms", "DEBUG") as logger:
+            room_supervisor.stop()
+
+        # assert the calls
+        process1.terminate.assert_called_with()
+        process1.kill.assert_not_called()
+        process2.terminate.assert_called_with()
+        process2.kill.assert_called_with()
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:dakara_player_vlc.rooms:Room 'room2' takes too long to "
+                "stop, killing it"
+            ],
+        )
+
+
+@patch("dakara_player_vlc.rooms.signal", autospec=True)
+@patch("dakara_player_vlc.rooms.set_loglevel", autospec=True)
+@patch("dakara_player_vlc.rooms.create_logger", autospec=True)
+@patch("dakara_player_vlc.dakara_player_vlc.DakaraPlayerVlc", autospec=True)
+class RunRoomTestCase(TestCase):
+    """Test the `run_room` function
+    """
+
+    @patch.dict("dakara_player_vlc.rooms.os.environ", {}, clear=True)
+    @patch("dakara_player_vlc.rooms.os.sched_setaffinity", create=True)
+    def test_run(
+        self,
+        mocked_sched_setaffinity,
+        mocked_dakara_player_vlc_class,
+        mocked_create_logger,
+        mocked_set_loglevel,
+        mocked_signal,
+    ):
+        """Test to run the player of a room
+        """
+        config = {"player": {}, "server": {}}
+
+        # call the function
+        exit_code = run_room("room1", config, [0, 1], {"DISPLAY": ":1.0"})
+
+        # assert the call
+        self.assertEqual(exit_code, 0)
+        mocked_create_logger.assert_called_with(
+            custom_log_format="[%(asctime)s] room1 %(name)s %(levelname)s "
+            "%(message)s"
+        )
+        mocked_sched_setaffinity.assert_called_with(0, [0, 1])
+        self.assertEqual(os.environ["DISPLAY"], ":1.0")
+        mocked_dakara_player_vlc_class.assert_called_with(config, load_fonts=False)
+        mocked_dakara_player_vlc_class.return_value.run.assert_called_with()
+
+    def test_run_error(
+        self,
+        mocked_dakara_player_vlc_class,
+        mocked_create_logger,
+        mocked_set_loglevel,
+        mocked_signal,
+    ):
+        """Test the exit code of a room that fails
+        """
+        mocked_dakara_player_vlc_class.return_value.run.side_effect = DakaraError(
+            "error"
+        )
+
+        # call the function
+        with self.assertLogs("dakara_player_vlc.rooms", "DEBUG") as logger:
+            exit_code = run_room("room1", {"player": {}, "server": {}})
+
+        # assert the exit code
+        self.assertEqual(exit_code, 1)
+        self.assertListEqual(logger.output, ["CRITICAL:dakara_player_vlc.rooms:error"])
@@ -0,0 +1,151 @@
+import socket
+from queue import Queue
+from threading import Event
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from dakara_player_vlc.server_selector import (
+    get_server_configs,
+    ServerEndpoint,
+    ServerSelector,
+)
+
+
+def get_closed_port():
+    """Get a local port where nothing listens
+
+    Returns:
+        int: port number.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class GetServerConfigsTestCase(TestCase):
+    """Test the server configs getter
+    """
+
+    def test_no_endpoints(self):
+        """Test to get the config of a single server
+        """
+        config = {"address": "www.example.com", "login": "login"}
+
+        # assert the result
+        self.assertListEqual(get_server_configs(config), [config])
+
+    def test_endpoints(self):
+        """Test to get the config of several endpoints
+        """
+        config = {
+            "address": "www.example.com",
+            "login": "login",
+            "endpoints": ["primary:8000", {"host": "standby", "ssl": True}],
+        }
+
+        # assert the result
+        self.assertListEqual(
+            get_server_configs(config),
+            [
+                {"address": "primary:8000", "login": "login"},
+                {"host": "standby", "ssl": True, "login": "login"},
+            ],
+        )
+
+
+class ServerSelectorTestCase(TestCase):
+    """Test the server selector with a local stand-in server
+    """
+
+    def setUp(self):
+        # create a stand-in server
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen()
+        self.server_port = self.server.getsockname()[1]
+
+        # create configs
+        self.config_up = {"address": "127.0.0.1:{}".format(self.server_port)}
+        self.config_down = {"address": "127.0.0.1:{}".format(get_closed_port())}
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_probe(self):
+        """Test to probe an endpoint
+        """
+        endpoint_up = ServerEndpoint(self.config_up)
+        endpoint_down = ServerEndpoint(self.config_down)
+
+        # call the method
+        self.assertTrue(endpoint_up.probe())
+        with self.assertLogs("dakara_player_vlc.server_selector", "DEBUG"):
+            self.assertFalse(endpoint_down.probe())
+
+        # assert the health
+        self.assertTrue(endpoint_up.healthy)
+        self.assertIsNotNone(endpoint_up.rtt)
+        self.assertFalse(endpoint_down.healthy)
+        self.assertIsNone(endpoint_down.rtt)
+        self.assertEqual(endpoint_down.failures, 1)
+
+    def test_select(self):
+        """Test to select the reachable endpoint
+        """
+        server_selector = ServerSelector(
+            Event(), Queue(), [self.config_down, self.config_up]
+        )
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.server_selector", "DEBUG"):
+            config = server_selector.select()
+
+        # assert the result
+        self.assertIs(config, self.config_up)
+        health = server_selector.get_health()
+        self.assertFalse(health[0]["healthy"])
+        self.assertFalse(health[0]["current"])
+        self.assertTrue(health[1]["healthy"])
+        self.assertTrue(health[1]["current"])
+
+    def test_fail_over(self):
+        """Test to switch to another endpoint when the current one is down
+        """
+        server_selector = ServerSelector(
+            Event(), Queue(), [self.config_up, self.config_down]
+        )
+        switched = MagicMock()
+        server_selector.set_callback("switched", switched)
+        with self.assertLogs("dakara_player_vlc.server_selector", "DEBUG"):
+            server_selector.select()
+
+        # make the endpoints change
+        server_selector.endpoints[0].config = self.config_down
+        server_selector.endpoints[0].healthy = False
+        server_selector.endpoints[1].healthy = True
+        server_selector.endpoints[1].rtt = 0.001
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.server_selector", "WARNING"):
+            server_selector.fail_over()
+
+        # assert the call
+        switched.assert_called_with(self.config_down)
+        self.assertIs(server_selector.current, server_selector.endpoints[1])
+
+    def test_fail_over_healthy(self):
+        """Test to not switch when the current endpoint is up
+        """
+        server_selector = ServerSelector(
+            Event(), Queue(), [self.config_up, self.config_down]
+        )
+        switched = MagicMock()
+        server_selector.set_callback("switched", switched)
+        with self.assertLogs("dakara_player_vlc.server_selector", "DEBUG"):
+            server_selector.select()
+
+        # call the method
+        server_selector.fail_over()
+
+        # assert the call
+        switched.assert_not_called()
@@ -0,0 +1,57 @@
+import time
+from contextlib import ExitStack
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from dakara_player_vlc.startup import StartupOrchestrator
+
+
+class StartupOrchestratorTestCase(TestCase):
+    """Test the startup orchestrator class
+    """
+
+    def test_wait_parallel(self):
+        """Test phases are run in parallel
+        """
+        with ExitStack() as stack:
+            startup = StartupOrchestrator(stack)
+
+            # call the method
+            start = time.monotonic()
+            with self.assertLogs("dakara_player_vlc.startup", "DEBUG"):
+                startup.submit("first", time.sleep, 0.2)
+                startup.submit("second", lambda: time.sleep(0.2) or "result")
+                results = startup.wait()
+
+            duration = time.monotonic() - start
+
+        # assert the result
+        self.assertDictEqual(results, {"first": None, "second": "result"})
+        self.assertLess(duration, 0.35)
+        self.assertSetEqual(set(startup.durations), {"first", "second"})
+
+    def test_wait_error(self):
+        """Test context managers of all phases are exited if one phase fails
+        """
+        context_manager = MagicMock()
+
+        def failing_phase():
+            raise ValueError("error")
+
+        def slow_phase(startup):
+            time.sleep(0.1)
+            startup.enter_context(context_manager)
+
+        # call the method
+        with self.assertRaisesRegex(ValueError, "error"):
+            with ExitStack() as stack:
+                startup = StartupOrchestrator(stack)
+                with self.assertLogs("dakara_player_vlc.startup", "DEBUG"):
+                    startup.submit("failing", failing_phase)
+                    startup.submit("slow", slow_phase, startup)
+                    startup.wait()
+
+        # assert the context manager of the other phase has been exited
+        context_manager.__enter__.assert_called_once()
+        context_manager.__exit__.assert_called_once()
+        self.assertIn(ValueError, context_manager.__exit__.call_args[0])
@@ -0,0 +1,110 @@
+import json
+from contextlib import ExitStack
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from path import Path
+
+from dakara_player_vlc.startup_trace import StartupTrace
+
+
+class StartupTraceTestCase(TestCase):
+    """Test the startup trace class
+    """
+
+    @patch("dakara_player_vlc.startup_trace.time.monotonic")
+    def test_span(self, mocked_monotonic):
+        """Test to record phases and get them by duration
+        """
+        mocked_monotonic.side_effect = [100, 101, 101.5, 102, 104, 105]
+        trace = StartupTrace()
+
+        # call the methods
+        with trace.span("short"):
+            pass
+
+        with trace.span("long"):
+            pass
+
+        trace.mark("ready")
+
+        # assert the breakdown
+        self.assertListEqual(
+            [
+                (phase["name"], phase["start"], phase["duration"])
+                for phase in trace.get_breakdown()
+            ],
+            [("long", 2, 2), ("short", 1, 0.5), ("ready", 5, 0)],
+        )
+        self.assertEqual(len(trace.get_summary()), 3)
+
+    def test_enter_context(self):
+        """Test to trace the entry and the exit of a context manager
+        """
+        trace = StartupTrace()
+        context_manager = MagicMock()
+
+        def exit_context_manager(*args):
+            # the exit is in progress
+            self.assertListEqual(
+                [phase["name"] for phase in trace.phases], ["enter/MagicMock"]
+            )
+
+        context_manager.__exit__.side_effect = exit_context_manager
+
+        # call the method
+        with ExitStack() as stack:
+            result = trace.enter_context(stack, context_manager)
+
+        # assert the result
+        self.assertIs(result, context_manager.__enter__.return_value)
+        self.assertListEqual(
+            [phase["name"] for phase in trace.phases],
+            ["enter/MagicMock", "teardown/MagicMock"],
+        )
+
+    def test_enter_context_error(self):
+        """Test to fail to enter a context manager
+        """
+        trace = StartupTrace()
+        context_manager = MagicMock()
+        context_manager.__enter__.side_effect = ValueError("error")
+        callback = MagicMock()
+
+        # call the method
+        with self.assertRaisesRegex(ValueError, "error"):
+            with ExitStack() as stack:
+                stack.callback(callback)
+                trace.enter_context(stack, context_manager)
+
+        # assert the stack was unwound without exiting the context manager
+        callback.assert_called_with()
+        context_manager.__exit__.assert_not_called()
+        self.assertListEqual(
+            [phase["name"] for phase in trace.phases], ["enter/MagicMock"]
+        )
+
+    def test_write(self):
+        """Test to write the trace as JSON
+        """
+        trace = StartupTrace()
+        with trace.span("phase"):
+            pass
+
+        with TemporaryDirectory() as tempdir:
+            path = Path(tempdir) / "trace.json"
+
+            # call the method
+            with self.assertLogs("dakara_player_vlc.startup_trace", "INFO"):
+                trace.write(path)
+
+            # assert the content
+            with path.open() as file:
+                content = json.load(file)
+
+        self.assertIn("version", content)
+        self.assertIn("python", content)
+        self.assertIn("platform", content)
+        self.assertEqual(content["phases"][0]["name"], "phase")
+        self.assertEqual(content["phases"][0]["thread"], "MainThread")
@@ -0,0 +1,144 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from path import Path
+
+from dakara_player_vlc.status_journal import StatusJournal
+
+
+class StatusJournalTestCase(TestCase):
+    """Test the status journal
+    """
+
+    def setUp(self):
+        # create a temporary directory
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name) / "journal.jsonl"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_load_no_file(self):
+        """Test to load when there is no journal file
+        """
+        journal = StatusJournal(self.path)
+
+        # call the method
+        pending_events = journal.load()
+        journal.close()
+
+        # assert the result
+        self.assertListEqual(pending_events, [])
+        self.assertTrue(self.path.exists())
+
+    def test_replay(self):
+        """Test events not acknowledged are given back on next load
+        """
+        journal = StatusJournal(self.path)
+        journal.load()
+
+        # write events
+        sequence_started = journal.append("update_started_song", [42])
+        journal.append("update_finished", [42])
+        journal.ack(sequence_started)
+        journal.close()
+
+        # load the journal again
+        journal = StatusJournal(self.path)
+        pending_events = journal.load()
+
+        # assert the result
+        self.assertListEqual(pending_events, [(2, "update_finished", [42])])
+
+        # assert next sequence numbers continue
+        self.assertEqual(journal.append("update_started_song", [43]), 3)
+        journal.close()
+
+    def test_load_incomplete_line(self):
+        """Test an incomplete last line is ignored
+        """
+        self.path.write_text(
+            '{"seq": 1, "method": "update_finished", "args": [42]}\n{"seq": 2, "met'
+        )
+        journal = StatusJournal(self.path)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.status_journal", "WARNING"):
+            pending_events = journal.load()
+
+        journal.close()
+
+        # assert the result
+        self.assertListEqual(pending_events, [(1, "update_finished", [42])])
+
+    def test_compact_pause_resume(self):
+        """Test a pause followed by a resume is dropped on compaction
+        """
+        journal = StatusJournal(self.path)
+        journal.load()
+
+        # write events
+        journal.append("update_started_song", [42])
+        journal.append("update_paused", [42, 10])
+        journal.append("update_resumed", [42, 10])
+        journal.append("update_paused", [42, 20])
+        journal.close()
+
+        # load the journal again
+        journal = StatusJournal(self.path)
+        pending_events = journal.load()
+        journal.close()
+
+        # assert the result
+        self.assertListEqual(
+            pending_events,
+            [(1, "update_started_song", [42]), (4, "update_paused", [42, 20])],
+        )
+        self.assertEqual(len(self.path.lines()), 2)
+
+    def test_compact_threshold(self):
+        """Test the journal is compacted when too many events are acknowledged
+        """
+        journal = StatusJournal(self.path, compact_threshold=10)
+        journal.load()
+
+        # write events
+        for index in range(11):
+            journal.ack(journal.append("update_finished", [index]))
+
+        journal.append("update_finished", [99])
+        journal.close()
+
+        # assert the file has been compacted
+        self.assertEqual(len(self.path.lines()), 1)
+
+    def test_compact_concurrent(self):
+        """Test events appended and acknowledged while compacting are kept
+        """
+        journal = StatusJournal(self.path)
+        journal.load()
+        sequence_started = journal.append("update_started_song", [42])
+        journal.append("update_finished", [42])
+
+        def fsync(fileno):
+            # the lock is not held while the new file is written
+            journal.append("update_started_song", [43])
+            journal.ack(sequence_started)
+
+        # call the method
+        with patch("dakara_player_vlc.status_journal.os.fsync", side_effect=fsync):
+            journal.compact()
+
+        journal.close()
+
+        # load the journal again
+        journal = StatusJournal(self.path)
+        pending_events = journal.load()
+        journal.close()
+
+        # assert the result
+        self.assertListEqual(
+            pending_events,
+            [(2, "update_finished", [42]), (3, "update_started_song", [43])],
+        )
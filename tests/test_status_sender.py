@@ -0,0 +1,364 @@
+from queue import Queue
+from threading import Event
+from unittest import TestCase
+from unittest.mock import call, MagicMock, patch
+
+from dakara_base.http_client import ResponseInvalidError, ResponseRequestError
+from dakara_base.websocket_client import NotConnectedError
+
+from dakara_player_vlc.status_sender import StatusSender
+
+
+class StatusSenderTestCase(TestCase):
+    """Test the status sender
+    """
+
+    def setUp(self):
+        # create a mock HTTP connection
+        self.dakara_server_http = MagicMock()
+
+        # create a status sender
+        self.stop = Event()
+        self.status_sender = StatusSender(
+            self.stop, Queue(), self.dakara_server_http, retry_delay=0.01
+        )
+
+    def test_push(self):
+        """Test status methods only queue events
+        """
+        # call the methods
+        self.status_sender.update_started_song(42)
+        self.status_sender.update_paused(42, 12.5)
+
+        # assert the events are queued
+        self.assertEqual(self.status_sender.queue.qsize(), 2)
+        self.dakara_server_http.update_started_song.assert_not_called()
+        self.dakara_server_http.update_paused.assert_not_called()
+
+    def test_push_no_id(self):
+        """Test events without playlist entry ID are dropped
+        """
+        # call the methods
+        self.status_sender.update_finished(None)
+        self.status_sender.create_player_error(None, "error")
+
+        # assert no event is queued
+        self.assertEqual(self.status_sender.queue.qsize(), 0)
+
+    def test_send(self):
+        """Test to send an event
+        """
+        self.status_sender.update_finished(42)
+        event = self.status_sender.get_next_event()
+
+        # call the method
+        self.assertTrue(self.status_sender.send(event))
+
+        # assert the call
+        self.dakara_server_http.update_finished.assert_called_with(42)
+
+        # assert the stats, the event is removed by the caller once sent
+        stats = self.status_sender.get_stats()
+        self.assertEqual(stats["sent"], 1)
+        self.assertEqual(stats["pending"], 1)
+
+    def test_send_unreachable(self):
+        """Test to send an event when the server is unreachable
+        """
+        self.dakara_server_http.update_finished.side_effect = ResponseRequestError(
+            "error"
+        )
+        self.status_sender.update_finished(42)
+        event = self.status_sender.get_next_event()
+
+        # call the method
+        self.assertFalse(self.status_sender.send(event))
+
+        # assert the stats
+        self.assertEqual(self.status_sender.get_stats()["sent"], 0)
+
+    def test_send_rejected(self):
+        """Test to send an event rejected by the server
+        """
+        self.dakara_server_http.update_finished.side_effect = ResponseInvalidError(
+            "error"
+        )
+        self.status_sender.update_finished(42)
+        event = self.status_sender.get_next_event()
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.status_sender", "WARNING"):
+            self.assertTrue(self.status_sender.send(event))
+
+    def test_send_failed(self):
+        """Test an event failing unexpectedly is dropped
+        """
+        self.dakara_server_http.update_finished.side_effect = TypeError("error")
+        self.status_sender.update_finished(42)
+        event = self.status_sender.get_next_event()
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.status_sender", "ERROR"):
+            self.assertTrue(self.status_sender.send(event))
+
+        # assert the stats
+        self.assertEqual(self.status_sender.get_stats()["sent"], 0)
+
+    def test_run_retry(self):
+        """Test events are sent in order and retried on failure
+        """
+        calls = []
+
+        def update_started_song(playlist_entry_id):
+            calls.append(("started_song", playlist_entry_id))
+            if len(calls) < 3:
+                raise ResponseRequestError("error")
+
+        def update_finished(playlist_entry_id):
+            calls.append(("finished", playlist_entry_id))
+            self.stop.set()
+
+        self.dakara_server_http.update_started_song.side_effect = update_started_song
+        self.dakara_server_http.update_finished.side_effect = update_finished
+
+        self.status_sender.update_started_song(42)
+        self.status_sender.update_finished(42)
+
+        # call the method
+        self.status_sender.run()
+
+        # assert the calls
+        self.assertListEqual(
+            calls,
+            [
+                ("started_song", 42),
+                ("started_song", 42),
+                ("started_song", 42),
+                ("finished", 42),
+            ],
+        )
+
+    def test_exit_drain_order(self):
+        """Test an event retried when stopping is sent first on exit
+        """
+        calls = []
+
+        def update_started_song(playlist_entry_id):
+            calls.append(("started_song", playlist_entry_id))
+            if len(calls) == 1:
+                # new events are queued while the first one is retried
+                self.status_sender.update_finished(42)
+                self.status_sender.update_started_song(43)
+                self.stop.set()
+                raise ResponseRequestError("error")
+
+        def update_finished(playlist_entry_id):
+            calls.append(("finished", playlist_entry_id))
+
+        self.dakara_server_http.update_started_song.side_effect = update_started_song
+        self.dakara_server_http.update_finished.side_effect = update_finished
+
+        self.status_sender.update_started_song(42)
+
+        # call the methods
+        self.status_sender.run()
+        with self.assertLogs("dakara_player_vlc.status_sender", "DEBUG"):
+            self.status_sender.exit_worker()
+
+        # assert the calls
+        self.assertListEqual(
+            calls,
+            [
+                ("started_song", 42),
+                ("started_song", 42),
+                ("finished", 42),
+                ("started_song", 43),
+            ],
+        )
+        self.assertEqual(self.status_sender.get_stats()["pending"], 0)
+
+    @patch("dakara_player_vlc.status_sender.POLL_INTERVAL", 0.01)
+    def test_exit_drain(self):
+        """Test the remaining events are sent on exit
+        """
+        self.status_sender.update_finished(42)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.status_sender", "DEBUG"):
+            with self.status_sender:
+                pass
+
+        # assert the call
+        self.dakara_server_http.update_finished.assert_called_with(42)
+        self.assertEqual(self.status_sender.get_stats()["pending"], 0)
+
+
+class StatusSenderJournalTestCase(TestCase):
+    """Test the status sender with a journal
+    """
+
+    def setUp(self):
+        # create mocks
+        self.dakara_server_http = MagicMock()
+        self.journal = MagicMock()
+        self.journal.append.return_value = 2
+
+        # create a status sender
+        self.status_sender = StatusSender(
+            Event(), Queue(), self.dakara_server_http, journal=self.journal
+        )
+
+    def test_load(self):
+        """Test events of the journal are queued first
+        """
+        self.journal.load.return_value = [(1, "update_finished", [41])]
+
+        # call the method
+        self.status_sender.load()
+        self.status_sender.update_started_song(42)
+
+        # assert the queue
+        method_name, args, _, sequence = self.status_sender.queue.get()
+        self.assertEqual(method_name, "update_finished")
+        self.assertEqual(args, (41,))
+        self.assertEqual(sequence, 1)
+
+        method_name, args, _, sequence = self.status_sender.queue.get()
+        self.assertEqual(method_name, "update_started_song")
+        self.assertIsNone(sequence)
+
+    def test_send_ack(self):
+        """Test a sent event is acknowledged
+        """
+        self.status_sender.update_started_song(42)
+
+        # assert the event is not written in the journal by the caller
+        self.journal.append.assert_not_called()
+
+        # call the method
+        self.status_sender.send(self.status_sender.get_next_event())
+
+        # assert the calls
+        self.journal.append.assert_called_with("update_started_song", (42,))
+        self.journal.ack.assert_called_with(2)
+
+    def test_send_unreachable_no_ack(self):
+        """Test an event not sent is not acknowledged
+        """
+        self.dakara_server_http.update_started_song.side_effect = ResponseRequestError(
+            "error"
+        )
+        self.status_sender.update_started_song(42)
+
+        # call the method
+        self.status_sender.send(self.status_sender.get_next_event())
+
+        # assert the call
+        self.journal.ack.assert_not_called()
+
+    def test_send_failed_ack(self):
+        """Test an event failing unexpectedly is acknowledged
+        """
+        self.dakara_server_http.update_started_song.side_effect = ValueError("error")
+        self.status_sender.update_started_song(42)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.status_sender", "ERROR"):
+            self.assertTrue(
+                self.status_sender.send(self.status_sender.get_next_event())
+            )
+
+        # assert the call
+        self.journal.ack.assert_called_with(2)
+
+    @patch("dakara_player_vlc.status_sender.POLL_INTERVAL", 0.01)
+    def test_wait_journal(self):
+        """Test events queued while an event is retried are written in the journal
+        """
+        self.status_sender.update_started_song(42)
+        self.status_sender.get_next_event()
+        self.status_sender.update_finished(42)
+
+        # call the method
+        self.assertFalse(self.status_sender.wait(0.02))
+
+        # assert the events are written in the journal in order
+        self.journal.append.assert_has_calls(
+            [call("update_started_song", (42,)), call("update_finished", (42,))]
+        )
+        self.assertEqual(self.status_sender.queue.qsize(), 0)
+        self.assertEqual(self.status_sender.get_stats()["pending"], 2)
+
+    def test_load_no_id(self):
+        """Test events of the journal without playlist entry ID are dropped
+        """
+        self.journal.load.return_value = [(1, "update_finished", [None])]
+
+        # call the method
+        self.status_sender.load()
+
+        # assert the event is acknowledged and not queued
+        self.assertEqual(self.status_sender.queue.qsize(), 0)
+        self.journal.ack.assert_called_with(1)
+
+
+class StatusSenderWebSocketTestCase(TestCase):
+    """Test the status sender with a WebSocket connection
+    """
+
+    def setUp(self):
+        # create mocks
+        self.dakara_server_http = MagicMock()
+        self.dakara_server_websocket = MagicMock()
+
+        # create a status sender
+        self.status_sender = StatusSender(
+            Event(),
+            Queue(),
+            self.dakara_server_http,
+            dakara_server_websocket=self.dakara_server_websocket,
+        )
+
+    def test_send_websocket(self):
+        """Test to send an event by websocket when connected
+        """
+        self.dakara_server_websocket.is_connected = True
+        self.status_sender.update_paused(42, 12.5)
+
+        # call the method
+        self.assertTrue(self.status_sender.send(self.status_sender.get_next_event()))
+
+        # assert the calls
+        self.dakara_server_websocket.update_paused.assert_called_with(42, 12.5)
+        self.dakara_server_http.update_paused.assert_not_called()
+
+    def test_send_disconnected(self):
+        """Test to send an event by HTTP when the websocket is disconnected
+        """
+        self.dakara_server_websocket.is_connected = False
+        self.status_sender.update_paused(42, 12.5)
+
+        # call the method
+        self.assertTrue(self.status_sender.send(self.status_sender.get_next_event()))
+
+        # assert the calls
+        self.dakara_server_websocket.update_paused.assert_not_called()
+        self.dakara_server_http.update_paused.assert_called_with(42, 12.5)
+
+    def test_send_websocket_failed(self):
+        """Test to send an event by HTTP when the websocket fails
+        """
+        self.dakara_server_websocket.is_connected = True
+        self.dakara_server_websocket.update_paused.side_effect = NotConnectedError(
+            "error"
+        )
+        self.status_sender.update_paused(42, 12.5)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.status_sender", "DEBUG"):
+            self.assertTrue(
+                self.status_sender.send(self.status_sender.get_next_event())
+            )
+
+        # assert the calls
+        self.dakara_server_http.update_paused.assert_called_with(42, 12.5)
@@ -0,0 +1,217 @@
+from queue import Queue
+from threading import Event
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from dakara_player_vlc.supervisor import ComponentGroup, Supervisor
+
+
+def fail(group, error):
+    """Make a group fail as if one of its workers raised an error
+    """
+    group.errors.put((type(error), error, None))
+    group.stop.set()
+
+
+@patch.object(Supervisor, "POLLING_INTERVAL", 0.01)
+class SupervisorTestCase(TestCase):
+    """Test the supervisor class
+    """
+
+    def setUp(self):
+        # create safe worker control objects
+        self.stop = Event()
+        self.errors = Queue()
+
+    def test_create_group_disabled(self):
+        """Test groups share the stop event of the program if not enabled
+        """
+        supervisor = Supervisor(self.stop, self.errors)
+
+        # call the method
+        group = supervisor.create_group("group", MagicMock())
+
+        # assert the group
+        self.assertFalse(group.isolated)
+        self.assertIs(group.stop, self.stop)
+        self.assertIs(group.errors, self.errors)
+
+    def test_supervise_disabled(self):
+        """Test to wait for the end of the program if not enabled
+        """
+        supervisor = Supervisor(self.stop, self.errors)
+        start = MagicMock()
+        supervisor.create_group("group", start)
+        self.stop.set()
+
+        # call the method
+        supervisor.supervise()
+
+        # assert the group was not restarted
+        start.assert_not_called()
+
+    def test_supervise_restart(self):
+        """Test to restart only a failed group
+        """
+        supervisor = Supervisor(
+            self.stop, self.errors, enabled=True, restart_delay=0.01
+        )
+        start_backend = MagicMock()
+        start_server = MagicMock()
+        supervisor.create_group("backend", start_backend)
+        server = supervisor.create_group("server", start_server)
+        component = MagicMock()
+        server.enter_context(component)
+        component_backend = MagicMock()
+        supervisor.groups[0].enter_context(component_backend)
+
+        # stop the program after the first restart
+        start_server.side_effect = lambda group: self.stop.set()
+        fail(server, ValueError("error"))
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.supervisor", "DEBUG") as logger:
+            supervisor.supervise()
+
+        # assert only the failed group was restarted
+        start_backend.assert_not_called()
+        start_server.assert_called_once_with(server)
+        self.assertEqual(server.restarts_count, 1)
+        self.assertEqual(supervisor.groups[0].restarts_count, 0)
+        component.__exit__.assert_called_once()
+        component_backend.__exit__.assert_not_called()
+
+        # assert the failed group can fail again
+        self.assertFalse(server.has_failed())
+
+        # assert the effect on logs
+        self.assertIn(
+            "ERROR:dakara_player_vlc.supervisor:Components 'server' failed: error",
+            logger.output,
+        )
+
+    def test_supervise_restart_dependent(self):
+        """Test the groups depending on a failed group are restarted too
+        """
+        supervisor = Supervisor(
+            self.stop, self.errors, enabled=True, restart_delay=0.01
+        )
+        start_backend = MagicMock()
+        start_server = MagicMock()
+        backend = supervisor.create_group("backend", start_backend)
+        server = supervisor.create_group("server", start_server)
+        start_server.side_effect = lambda group: self.stop.set()
+        fail(backend, ValueError("error"))
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.supervisor", "DEBUG"):
+            supervisor.supervise()
+
+        # assert both groups were restarted in order
+        start_backend.assert_called_once_with(backend)
+        start_server.assert_called_once_with(server)
+        self.assertEqual(backend.restarts_count, 1)
+        self.assertEqual(server.restarts_count, 1)
+
+    def test_supervise_restart_failed(self):
+        """Test a restart that fails is attempted again
+        """
+        supervisor = Supervisor(
+            self.stop, self.errors, enabled=True, restart_delay=0.01
+        )
+        start = MagicMock()
+        group = supervisor.create_group("server", start)
+
+        def start_side_effect(group):
+            if start.call_count == 1:
+                group.enter_context(context_manager)
+                raise ValueError("still unreachable")
+
+            self.stop.set()
+
+        context_manager = MagicMock()
+        start.side_effect = start_side_effect
+        fail(group, ValueError("error"))
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.supervisor", "DEBUG") as logger:
+            supervisor.supervise()
+
+        # assert the restart was attempted twice
+        self.assertEqual(start.call_count, 2)
+        self.assertEqual(group.restarts_count, 1)
+        context_manager.__exit__.assert_called_once()
+        self.assertIn(
+            "ERROR:dakara_player_vlc.supervisor:Unable to restart components "
+            "'server': still unreachable",
+            logger.output,
+        )
+
+    def test_supervise_give_up(self):
+        """Test to stop with the last error after too many restarts
+        """
+        supervisor = Supervisor(
+            self.stop, self.errors, enabled=True, max_restarts=2, restart_delay=0.01
+        )
+        start = MagicMock()
+        start.side_effect = ValueError("still unreachable")
+        group = supervisor.create_group("server", start)
+        fail(group, ValueError("error"))
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.supervisor", "DEBUG") as logger:
+            with self.assertRaisesRegex(ValueError, "still unreachable"):
+                supervisor.supervise()
+
+        # assert the restarts were attempted
+        self.assertEqual(start.call_count, 2)
+        self.assertIn(
+            "CRITICAL:dakara_player_vlc.supervisor:Components 'server' failed 2 "
+            "times in a row, giving up",
+            logger.output,
+        )
+
+    def test_log_restarts_stats(self):
+        """Test to log the restarts of groups
+        """
+        supervisor = Supervisor(self.stop, self.errors, enabled=True)
+        group = supervisor.create_group("server", MagicMock())
+        supervisor.create_group("other", MagicMock())
+        group.restarts_count = 2
+        group.restarts_duration = 1
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.supervisor", "DEBUG") as logger:
+            supervisor.log_restarts_stats()
+
+        # assert the effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "INFO:dakara_player_vlc.supervisor:Components 'server' restarted 2 "
+                "times, in 0.500 s on average"
+            ],
+        )
+
+
+class ComponentGroupTestCase(TestCase):
+    """Test the component group class
+    """
+
+    def test_close(self):
+        """Test to close an isolated group
+        """
+        group = ComponentGroup("group", MagicMock())
+        context_manager = MagicMock()
+        group.enter_context(context_manager)
+        stop = group.stop
+        fail(group, ValueError("error"))
+
+        # call the method
+        group.close()
+
+        # assert the components were exited and the group can be started again
+        context_manager.__exit__.assert_called_once()
+        self.assertIsNot(group.stop, stop)
+        self.assertFalse(group.has_failed())
+        self.assertIsNone(group.get_error())
@@ -1,7 +1,10 @@
+import os
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest.mock import mock_open, patch
 
 from dakara_base.resources_manager import get_file
+from jinja2 import TemplateSyntaxError
 from path import Path
 
 from dakara_player_vlc.text_generator import (
@@ -34,14 +37,16 @@ class TextGeneratorTestCase(TestCase):
 
     @patch.object(Path, "open", new_callable=mock_open)
     @patch("dakara_player_vlc.text_generator.ICON_MAP_FILE", "icon_map_file")
-    @patch("dakara_player_vlc.text_generator.get_file", autospec=True)
+    @patch("dakara_player_vlc.text_generator.get_resource_directory", autospec=True)
     @patch("dakara_player_vlc.text_generator.json.load", autospec=True)
-    def test_load_icon_map(self, mocked_load, mocked_get_file, mocked_open):
+    def test_load_icon_map(
+        self, mocked_load, mocked_get_resource_directory, mocked_open
+    ):
         """Test to load the icon map
         """
         # create the mock
         mocked_load.return_value = {"name": "value"}
-        mocked_get_file.return_value = Path("path/to/icon_map_file")
+        mocked_get_resource_directory.return_value = Path("path/to")
 
         # create the object
         text_generator = TextGenerator({})
@@ -57,9 +62,7 @@ class TextGeneratorTestCase(TestCase):
 
         # assert the mock
         mocked_load.assert_called_with(mocked_open.return_value)
-        mocked_get_file.assert_called_with(
-            "dakara_player_vlc.resources", "icon_map_file"
-        )
+        mocked_get_resource_directory.assert_called_with("dakara_player_vlc.resources")
         mocked_open.assert_called_with()
 
     def test_load_templates_default(self):
@@ -86,6 +89,97 @@ class TextGeneratorTestCase(TestCase):
             get_template(TRANSITION_TEMPLATE_NAME),
         )
 
+    def test_get_transition_template_hash(self):
+        """Test to get the hash of the transition template
+        """
+        # create object
+        text_generator = TextGenerator({})
+        text_generator.load_templates()
+
+        # call the method
+        template_hash = text_generator.get_transition_template_hash()
+
+        # assert the hash
+        self.assertEqual(len(template_hash), 64)
+        self.assertEqual(template_hash, text_generator.get_transition_template_hash())
+
+    def test_reload(self):
+        """Test to reload only the templates that have changed
+        """
+        with TemporaryDirectory() as temp:
+            directory = Path(temp)
+            (directory / TRANSITION_TEMPLATE_NAME).write_text("transition")
+            (directory / IDLE_TEMPLATE_NAME).write_text("idle")
+
+            # create object
+            text_generator = TextGenerator({"directory": directory})
+            text_generator.load_templates()
+            idle_template = text_generator.idle_template
+
+            # call the methods with no changes
+            prepared = text_generator.prepare_reload({"directory": directory})
+            self.assertSetEqual(text_generator.reload(prepared), set())
+
+            # modify the transition template
+            (directory / TRANSITION_TEMPLATE_NAME).write_text("new transition")
+            os.utime(directory / TRANSITION_TEMPLATE_NAME, (0, 0))
+
+            # call the methods
+            prepared = text_generator.prepare_reload({"directory": directory})
+
+            # assert the current template was not modified yet
+            self.assertEqual(text_generator.create_transition_text({}), "transition")
+
+            changed = text_generator.reload(prepared)
+
+            # assert only the transition template was loaded again
+            self.assertSetEqual(changed, {"transition"})
+            self.assertIs(text_generator.idle_template, idle_template)
+            self.assertEqual(
+                text_generator.create_transition_text({}), "new transition"
+            )
+
+    def test_reload_directory(self):
+        """Test to reload all templates when the directory has changed
+        """
+        # create object
+        text_generator = TextGenerator({})
+        text_generator.load_templates()
+        environment = text_generator.environment
+
+        # call the methods
+        changed = text_generator.reload(
+            text_generator.prepare_reload({"directory": "other"})
+        )
+
+        # assert all the templates were loaded again
+        self.assertSetEqual(changed, {"transition", "idle"})
+        self.assertEqual(text_generator.directory, Path("other"))
+        self.assertIsNot(text_generator.environment, environment)
+
+    def test_prepare_reload_error(self):
+        """Test an invalid template does not modify the current ones
+        """
+        with TemporaryDirectory() as temp:
+            directory = Path(temp)
+            (directory / TRANSITION_TEMPLATE_NAME).write_text("transition")
+
+            # create object
+            text_generator = TextGenerator({})
+            text_generator.load_templates()
+            transition_template = text_generator.transition_template
+
+            # make the transition template invalid
+            (directory / TRANSITION_TEMPLATE_NAME).write_text("{% if %}")
+
+            # call the method
+            with self.assertRaises(TemplateSyntaxError):
+                text_generator.prepare_reload({"directory": directory})
+
+            # assert the templates were not modified
+            self.assertEqual(text_generator.directory, Path(""))
+            self.assertIs(text_generator.transition_template, transition_template)
+
     def test_load_templates_custom_directory_success(self):
         """Test to load custom templates using an existing directory
 
@@ -0,0 +1,209 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from path import Path
+
+from dakara_player_vlc.transition_cache import (
+    CLIP_EXTENSION,
+    TransitionCache,
+    TransitionRenderError,
+)
+
+
+class TransitionCacheTestCase(TestCase):
+    """Test the cache of transition clips
+    """
+
+    def setUp(self):
+        # create a cache directory
+        self.temp = TemporaryDirectory()
+        self.directory = Path(self.temp.name) / "cache"
+
+        # create a background file
+        self.background_path = Path(self.temp.name) / "background.png"
+        self.background_path.write_bytes(b"background")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_load(self):
+        """Test to create the cache directory
+        """
+        cache = TransitionCache(self.directory)
+
+        # call the method
+        cache.load()
+
+        # assert the directory exists
+        self.assertTrue(self.directory.isdir())
+
+    def test_get_key(self):
+        """Test to get the key of a clip
+        """
+        cache = TransitionCache(self.directory)
+
+        # call the method
+        key = cache.get_key("template", "background", "text")
+
+        # assert the key changes with any of its components
+        self.assertEqual(key, cache.get_key("template", "background", "text"))
+        self.assertNotEqual(key, cache.get_key("other", "background", "text"))
+        self.assertNotEqual(key, cache.get_key("template", "other", "text"))
+        self.assertNotEqual(key, cache.get_key("template", "background", "other"))
+        self.assertNotEqual(key, cache.get_key("template", "background", "text", 2))
+
+    def test_background_hash(self):
+        """Test to compute the hash of a background
+        """
+        cache = TransitionCache(self.directory)
+
+        # pre assert the hash is not known
+        self.assertIsNone(cache.get_background_hash(self.background_path))
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.transition_cache", "DEBUG"):
+            self.assertTrue(cache.reserve_hashing())
+            cache.compute_background_hash(self.background_path)
+
+        # assert the hash is known and the reservation has been released
+        background_hash = cache.get_background_hash(self.background_path)
+        self.assertEqual(len(background_hash), 64)
+        self.assertTrue(cache.reserve_hashing())
+
+        # change the background
+        self.background_path.write_bytes(b"other background")
+        os.utime(self.background_path, (0, 0))
+
+        # assert the hash is not known anymore
+        self.assertIsNone(cache.get_background_hash(self.background_path))
+
+    def test_background_hash_error(self):
+        """Test to fail to compute the hash of a background
+        """
+        cache = TransitionCache(self.directory)
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.transition_cache", "DEBUG") as logger:
+            self.assertTrue(cache.reserve_hashing())
+            cache.compute_background_hash(Path(self.temp.name) / "missing.png")
+
+        # assert the reservation has been released
+        self.assertTrue(cache.reserve_hashing())
+        self.assertTrue(
+            logger.output[0].startswith(
+                "WARNING:dakara_player_vlc.transition_cache:"
+                "Unable to hash background file"
+            )
+        )
+
+    def test_store(self):
+        """Test to render and store a clip
+        """
+        cache = TransitionCache(self.directory)
+        cache.load()
+
+        # create a render function
+        def render(output_path):
+            output_path.write_bytes(b"clip")
+
+        # pre assert there is no clip
+        self.assertIsNone(cache.get_clip("key"))
+
+        # call the method
+        self.assertTrue(cache.reserve())
+        cache.store("key", render)
+
+        # assert the clip exists
+        clip = cache.get_clip("key")
+        self.assertIsNotNone(clip)
+        self.assertEqual(clip.bytes(), b"clip")
+
+        # assert the reservation has been released
+        self.assertTrue(cache.reserve())
+
+    def test_store_error(self):
+        """Test to fail to render a clip
+        """
+        cache = TransitionCache(self.directory)
+        cache.load()
+
+        # create a render function
+        render = MagicMock(side_effect=TransitionRenderError("error"))
+
+        # call the method
+        self.assertTrue(cache.reserve())
+        with self.assertLogs("dakara_player_vlc.transition_cache", "DEBUG") as logger:
+            cache.store("key", render)
+
+        # assert there is no clip
+        self.assertIsNone(cache.get_clip("key"))
+        self.assertListEqual(self.directory.listdir(), [])
+
+        # assert the effect on logs
+        self.assertIn(
+            "WARNING:dakara_player_vlc.transition_cache:"
+            "Unable to render transition clip: error",
+            logger.output,
+        )
+
+    def test_store_unexpected_error(self):
+        """Test to fail unexpectedly to render a clip
+        """
+        cache = TransitionCache(self.directory)
+        cache.load()
+
+        # create a render function
+        def render(output_path):
+            output_path.write_bytes(b"partial clip")
+            raise ValueError("error")
+
+        # call the method
+        self.assertTrue(cache.reserve())
+        with self.assertLogs("dakara_player_vlc.transition_cache", "DEBUG") as logger:
+            cache.store("key", render)
+
+        # assert there is no clip and the reservation has been released
+        self.assertIsNone(cache.get_clip("key"))
+        self.assertListEqual(self.directory.listdir(), [])
+        self.assertTrue(cache.reserve())
+
+        # assert the effect on logs
+        self.assertIn(
+            "ERROR:dakara_player_vlc.transition_cache:"
+            "Unable to render transition clip",
+            [line.split("\n")[0] for line in logger.output],
+        )
+
+    def test_store_evict(self):
+        """Test to remove the least recently used clips above the maximum size
+        """
+        cache = TransitionCache(self.directory, max_size=2 / 1024)
+        cache.load()
+        for index, key in enumerate(("old", "used", "recent")):
+            (self.directory / key + CLIP_EXTENSION).write_bytes(b"x" * 1024)
+            os.utime(self.directory / key + CLIP_EXTENSION, (index, index))
+
+        # use a clip
+        self.assertIsNotNone(cache.get_clip("used"))
+
+        # call the method
+        self.assertTrue(cache.reserve())
+        with self.assertLogs("dakara_player_vlc.transition_cache", "DEBUG"):
+            cache.store("key", lambda output_path: output_path.write_bytes(b"clip"))
+
+        # assert the least recently used clips were removed
+        self.assertIsNone(cache.get_clip("old"))
+        self.assertIsNone(cache.get_clip("recent"))
+        self.assertIsNotNone(cache.get_clip("used"))
+        self.assertIsNotNone(cache.get_clip("key"))
+
+    def test_reserve(self):
+        """Test that only one clip can be rendered at a time
+        """
+        cache = TransitionCache(self.directory)
+
+        # call the method
+        self.assertTrue(cache.reserve())
+        self.assertFalse(cache.reserve())
@@ -0,0 +1,183 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import ANY, MagicMock, patch
+
+from path import Path
+
+from dakara_player_vlc.vlc_log import (
+    get_vsnprintf,
+    InvalidVlcLogLevelError,
+    VlcLogCapture,
+)
+
+
+@patch("dakara_player_vlc.vlc_log.ctypes", autospec=True)
+@patch("dakara_player_vlc.vlc_log.sys")
+class GetVsnprintfTestCase(TestCase):
+    """Test the `get_vsnprintf` function
+    """
+
+    def test_get_windows(self, mocked_sys, mocked_ctypes):
+        """Test to get the function of the C runtime on Windows
+        """
+        mocked_sys.platform = "win32"
+        mocked_ctypes.CDLL.return_value = MagicMock(spec=["_vsnprintf"])
+
+        # call the function
+        vsnprintf = get_vsnprintf()
+
+        # assert the result
+        mocked_ctypes.CDLL.assert_called_with("msvcrt")
+        self.assertIs(vsnprintf, mocked_ctypes.CDLL.return_value._vsnprintf)
+
+    def test_get_not_found(self, mocked_sys, mocked_ctypes):
+        """Test to get the function when the C library does not have it
+        """
+        mocked_sys.platform = "linux"
+        mocked_ctypes.CDLL.return_value = MagicMock(spec=[])
+
+        # call the function
+        self.assertIsNone(get_vsnprintf())
+
+    def test_get_no_library(self, mocked_sys, mocked_ctypes):
+        """Test to get the function when the C library cannot be loaded
+        """
+        mocked_sys.platform = "win32"
+        mocked_ctypes.CDLL.side_effect = OSError("error")
+
+        # call the function
+        self.assertIsNone(get_vsnprintf())
+
+
+class VlcLogCaptureTestCase(TestCase):
+    """Test the VLC log capture class
+    """
+
+    def setUp(self):
+        # create the VLC instance
+        self.instance = MagicMock()
+
+    def test_init_invalid_level(self):
+        """Test to create a capture with an unknown level
+        """
+        with self.assertRaisesRegex(
+            InvalidVlcLogLevelError, "Invalid VLC log level 'verbose'"
+        ):
+            VlcLogCapture(self.instance, level="verbose")
+
+    @patch("dakara_player_vlc.vlc_log.get_vsnprintf", autospec=True)
+    def test_start_stop(self, mocked_get_vsnprintf):
+        """Test to set and remove the log callback
+        """
+        log_capture = VlcLogCapture(self.instance)
+
+        # call the methods
+        log_capture.start()
+        log_capture.stop()
+        log_capture.stop()
+
+        # assert the calls
+        self.instance.log_set.assert_called_once_with(ANY, None)
+        self.instance.log_unset.assert_called_once_with()
+
+    @patch("dakara_player_vlc.vlc_log.get_vsnprintf", autospec=True)
+    def test_start_no_vsnprintf(self, mocked_get_vsnprintf):
+        """Test the capture stays disabled if messages cannot be formatted
+        """
+        mocked_get_vsnprintf.return_value = None
+        log_capture = VlcLogCapture(self.instance)
+
+        # call the methods
+        with self.assertLogs("dakara_player_vlc.vlc_log", "WARNING") as logger:
+            log_capture.start()
+
+        log_capture.stop()
+
+        # assert the calls
+        self.instance.log_set.assert_not_called()
+        self.instance.log_unset.assert_not_called()
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:dakara_player_vlc.vlc_log:Unable to find a function to "
+                "format VLC log messages, capture disabled"
+            ],
+        )
+
+    def test_handle_log(self):
+        """Test to capture only the messages of sufficient level
+        """
+        log_capture = VlcLogCapture(self.instance, level="warning")
+
+        def vsnprintf(buffer, size, fmt, arguments):
+            buffer.value = fmt
+
+        log_capture.vsnprintf = MagicMock(side_effect=vsnprintf)
+
+        # call the method
+        log_capture.handle_log(None, 0, None, b"debug message", None)
+        log_capture.handle_log(None, 4, None, b"cannot open file", None)
+
+        # assert only the error was formatted and captured
+        log_capture.vsnprintf.assert_called_once()
+        self.assertListEqual(log_capture.get_lines(), ["error: cannot open file"])
+
+    def test_get_lines(self):
+        """Test to get the messages since the last mark
+        """
+        log_capture = VlcLogCapture(self.instance, size=3)
+        log_capture.append("previous media")
+        log_capture.mark()
+        for index in range(4):
+            log_capture.append("message {}".format(index))
+
+        # call the method
+        lines = log_capture.get_lines()
+
+        # assert the oldest messages were discarded
+        self.assertListEqual(lines, ["message 1", "message 2", "message 3"])
+
+    def test_get_error_message(self):
+        """Test to attach the last messages that fit to an error message
+        """
+        log_capture = VlcLogCapture(self.instance)
+        log_capture.append("a" * 20)
+        log_capture.append("b" * 10)
+        log_capture.append("c" * 10)
+
+        # call the method
+        message = log_capture.get_error_message("error", length=40)
+
+        # assert the message
+        self.assertEqual(message, "error: " + "b" * 10 + " | " + "c" * 10)
+        self.assertLessEqual(len(message), 40)
+
+    def test_get_error_message_empty(self):
+        """Test the error message is unchanged if there are no messages
+        """
+        log_capture = VlcLogCapture(self.instance)
+
+        # call the method
+        message = log_capture.get_error_message("error")
+
+        # assert the message
+        self.assertEqual(message, "error")
+
+    def test_dump(self):
+        """Test to write the messages in a file
+        """
+        log_capture = VlcLogCapture(self.instance)
+        log_capture.append("error: cannot open file")
+
+        with TemporaryDirectory() as temp:
+            path = Path(temp) / "logs" / "error.log"
+
+            # call the method
+            with self.assertLogs("dakara_player_vlc.vlc_log", "DEBUG"):
+                log_capture.dump(path, "Unable to play current media")
+
+            # assert the file
+            lines = path.text(encoding="utf8").splitlines()
+
+        self.assertTrue(lines[0].endswith(" Unable to play current media"))
+        self.assertEqual(lines[1], "error: cannot open file")
@@ -3,17 +3,19 @@ import tempfile
 from queue import Queue
 from threading import Event
 from unittest import TestCase
-from unittest.mock import MagicMock, patch, ANY
+from unittest.mock import MagicMock, mock_open, patch, ANY
 
 from dakara_base.resources_manager import get_file
 from path import Path
 from vlc import State, EventType
 
+from dakara_player_vlc.background_loader import BackgroundNotFoundError
 from dakara_player_vlc.vlc_player import (
     mrl_to_path,
     VlcPlayer,
 )
 from dakara_player_vlc.media_player import (
+    get_media_player_class,
     IDLE_BG_NAME,
     KaraFolderNotFound,
     TRANSITION_BG_NAME,
@@ -21,7 +23,17 @@ from dakara_player_vlc.media_player import (
 from dakara_player_vlc.resources_manager import get_background
 
 
-@patch("dakara_player_vlc.media_player.PATH_BACKGROUNDS", "bg")
+class GetMediaPlayerClassTestCase(TestCase):
+    """Test the `get_media_player_class` function
+    """
+
+    def test_vlc(self):
+        """Test to get the VLC player class
+        """
+        self.assertIs(get_media_player_class("vlc"), VlcPlayer)
+
+
+@patch("dakara_player_vlc.media_player.get_backgrounds_directory", lambda: "bg")
 @patch("dakara_player_vlc.media_player.TRANSITION_DURATION", 10)
 @patch("dakara_player_vlc.media_player.IDLE_DURATION", 20)
 class VlcPlayerTestCase(TestCase):
@@ -415,6 +427,39 @@ class VlcPlayerTestCase(TestCase):
         self.assertIsNone(vlc_player.playing_id)
         self.assertFalse(vlc_player.in_transition)
 
+    @patch("dakara_player_vlc.vlc_player.time.strftime", autospec=True)
+    def test_handle_encountered_error_log_capture(self, mocked_strftime):
+        """Test error callback attaches the captured VLC logs
+        """
+        mocked_strftime.return_value = "20200101-000000"
+
+        # create instance
+        vlc_player, _ = self.get_instance(
+            {"vlc": {"log": {"enabled": True, "directory": "logs"}}}
+        )
+        vlc_player.log_capture = MagicMock()
+        vlc_player.log_capture.get_error_message.return_value = (
+            "Unable to play current media: error: cannot open file"
+        )
+
+        # mock the call
+        vlc_player.set_callback("error", MagicMock())
+        vlc_player.set_callback("finished", MagicMock())
+        vlc_player.playing_id = 999
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.vlc_player", "DEBUG"):
+            vlc_player.handle_encountered_error("event")
+
+        # assert the call
+        vlc_player.log_capture.dump.assert_called_once_with(
+            Path("logs") / "20200101-000000_999.log", "Unable to play current media"
+        )
+        vlc_player.callbacks["finished"].assert_called_once_with(999)
+        vlc_player.callbacks["error"].assert_called_with(
+            999, "Unable to play current media: error: cannot open file"
+        )
+
     def test_default_backgrounds(self):
         """Test to instanciate with default backgrounds
         """
@@ -430,6 +475,7 @@ class VlcPlayerTestCase(TestCase):
                 "transition": "transition.png",
                 "idle": "idle.png",
             },
+            background_pools={},
         )
 
     def test_custom_backgrounds(self):
@@ -458,7 +504,199 @@ class VlcPlayerTestCase(TestCase):
                 "transition": "transition.png",
                 "idle": "idle.png",
             },
+            background_pools={},
+        )
+
+    @patch("dakara_player_vlc.media_player.warm_file")
+    @patch.object(Path, "exists")
+    def test_prepare_playlist_entry(self, mocked_exists, mocked_warm_file):
+        """Test to prepare an upcoming playlist entry
+        """
+        # create instance
+        vlc_player, _ = self.get_instance({"kara_folder": "kara"})
+        mocked_exists.return_value = True
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.media_player", "DEBUG"):
+            prepared = vlc_player.prepare_playlist_entry(self.playlist_entry, 1024)
+
+        # assert the call
+        self.assertTrue(prepared)
+        mocked_warm_file.assert_called_with(Path("kara") / self.song_file_path, 1024)
+        vlc_player.text_generator.create_transition_text.assert_called_with(
+            self.playlist_entry, fade_in=True
+        )
+
+        # assert the prepared text is used
+        vlc_player.text_generator.create_transition_text.reset_mock()
+        text = vlc_player.get_transition_text(self.playlist_entry)
+        self.assertEqual(
+            text, vlc_player.text_generator.create_transition_text.return_value
+        )
+        vlc_player.text_generator.create_transition_text.assert_not_called()
+
+        # assert the preparation is forgotten
+        vlc_player.forget_prepared_playlist_entries([43])
+        vlc_player.get_transition_text(self.playlist_entry)
+        vlc_player.text_generator.create_transition_text.assert_called_with(
+            self.playlist_entry, fade_in=True
+        )
+
+    @patch("dakara_player_vlc.media_player.warm_file")
+    @patch.object(Path, "exists")
+    def test_prepare_playlist_entry_not_found(self, mocked_exists, mocked_warm_file):
+        """Test to prepare an upcoming playlist entry whose file is missing
+        """
+        # create instance
+        vlc_player, _ = self.get_instance()
+        mocked_exists.return_value = False
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.media_player", "WARNING"):
+            prepared = vlc_player.prepare_playlist_entry(self.playlist_entry)
+
+        # assert the call
+        self.assertFalse(prepared)
+        mocked_warm_file.assert_not_called()
+        self.assertDictEqual(vlc_player.prepared_transition_texts, {})
+
+    def test_get_transition_clip_disabled(self):
+        """Test to get a transition clip when the cache is disabled
+        """
+        # create instance
+        vlc_player, _ = self.get_instance()
+
+        # call the method
+        self.assertIsNone(vlc_player.get_transition_clip(self.playlist_entry))
+
+    @patch("dakara_player_vlc.media_player.TransitionCache", autospec=True)
+    @patch.object(VlcPlayer, "create_thread")
+    def test_get_transition_clip_cached(
+        self, mocked_create_thread, mocked_transition_cache_class
+    ):
+        """Test to get a transition clip from the cache
+        """
+        # create instance
+        vlc_player, _ = self.get_instance(
+            {"transition_cache": {"enabled": True, "directory": "cache"}}
+        )
+        mocked_transition_cache = mocked_transition_cache_class.return_value
+        mocked_transition_cache.get_background_hash.return_value = "hash"
+        mocked_transition_cache.get_clip.return_value = Path("cache/clip.mkv")
+
+        # call the method
+        clip = vlc_player.get_transition_clip(self.playlist_entry)
+
+        # assert the result
+        self.assertEqual(clip, Path("cache/clip.mkv"))
+        mocked_transition_cache_class.assert_called_with(Path("cache"), max_size=500)
+        mocked_create_thread.assert_not_called()
+
+    @patch("dakara_player_vlc.media_player.TransitionCache", autospec=True)
+    @patch.object(VlcPlayer, "create_thread")
+    def test_get_transition_clip_not_hashed(
+        self, mocked_create_thread, mocked_transition_cache_class
+    ):
+        """Test to request the hash of the background before using the cache
+        """
+        # create instance
+        vlc_player, _ = self.get_instance(
+            {"transition_cache": {"enabled": True, "directory": "cache"}}
+        )
+        mocked_transition_cache = mocked_transition_cache_class.return_value
+        mocked_transition_cache.get_background_hash.return_value = None
+        mocked_transition_cache.reserve_hashing.return_value = True
+
+        # call the method
+        clip = vlc_player.get_transition_clip(self.playlist_entry)
+
+        # assert the result
+        self.assertIsNone(clip)
+        mocked_transition_cache.get_clip.assert_not_called()
+        mocked_create_thread.assert_called_with(
+            target=mocked_transition_cache.compute_background_hash,
+            args=(vlc_player.background_loader.backgrounds.__getitem__.return_value,),
+        )
+        mocked_create_thread.return_value.start.assert_called_with()
+
+    @patch("dakara_player_vlc.media_player.TransitionCache", autospec=True)
+    @patch.object(VlcPlayer, "create_thread")
+    def test_get_transition_clip_not_cached(
+        self, mocked_create_thread, mocked_transition_cache_class
+    ):
+        """Test to request the rendering of a transition clip
+        """
+        # create instance
+        vlc_player, _ = self.get_instance(
+            {"transition_cache": {"enabled": True, "directory": "cache"}}
+        )
+        mocked_transition_cache = mocked_transition_cache_class.return_value
+        mocked_transition_cache.get_background_hash.return_value = "hash"
+        mocked_transition_cache.get_clip.return_value = None
+        mocked_transition_cache.get_key.return_value = "key"
+        mocked_transition_cache.reserve.return_value = True
+
+        # call the method
+        clip = vlc_player.get_transition_clip(self.playlist_entry)
+
+        # assert the result
+        self.assertIsNone(clip)
+        mocked_create_thread.assert_called_with(
+            target=vlc_player.store_transition_clip,
+            args=(
+                "key",
+                vlc_player.background_loader.backgrounds.__getitem__.return_value,
+                vlc_player.text_generator.create_transition_text.return_value,
+            ),
+        )
+        mocked_create_thread.return_value.start.assert_called_with()
+
+    @patch.object(Path, "open", new_callable=mock_open)
+    def test_play_idle_screen_power_saving(self, mocked_open):
+        """Test to play the idle screen in power saving mode
+        """
+        # create instance
+        vlc_player, (_, _, mocked_instance_class) = self.get_instance(
+            {"idle": {"power_saving": True, "frame_rate": 2}}
+        )
+        vlc_player.vlc_version = "3.0.0 NoName"
+        vlc_player.media_pending = MagicMock()
+        mocked_media = mocked_instance_class.return_value.media_new_path.return_value
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.vlc_player", "DEBUG"):
+            vlc_player.play_idle_screen()
+
+        # assert the call
+        mocked_media.add_options.assert_called_with(
+            "image-duration=-1",
+            "image-fps=2",
+            "avcodec-hw=none",
+            "sub-file={}".format(Path("temp") / "idle.ass"),
         )
+        self.assertIsNone(vlc_player.media_pending)
+        self.assertTrue(vlc_player.idle_cpu_meter.is_running())
+
+    def test_get_timing(self):
+        """Test to get the timing of the current song
+        """
+        # create instance
+        vlc_player, _ = self.get_instance()
+        vlc_player.playing_id = 999
+        vlc_player.player.get_time.return_value = 12345
+
+        # call the method
+        self.assertEqual(vlc_player.get_timing(), 12.345)
+
+    def test_get_timing_idle(self):
+        """Test to get the timing when idle
+        """
+        # create instance
+        vlc_player, _ = self.get_instance()
+
+        # call the method
+        self.assertEqual(vlc_player.get_timing(), 0)
+        vlc_player.player.get_time.assert_not_called()
 
     def test_default_durations(self):
         """Test to instanciate with default durations
@@ -478,6 +716,125 @@ class VlcPlayerTestCase(TestCase):
         # assert the instance
         self.assertDictEqual(vlc_player.durations, {"transition": 5, "idle": 20})
 
+    def test_prepare_reload(self):
+        """Test to load the templates, the backgrounds and the durations
+        """
+        # create object
+        vlc_player, _ = self.get_instance()
+
+        # call the method
+        prepared = vlc_player.prepare_reload(
+            {
+                "templates": {"directory": "templates"},
+                "backgrounds": {"directory": "backgrounds"},
+                "durations": {"transition_duration": 5},
+            }
+        )
+
+        # assert the call
+        vlc_player.text_generator.prepare_reload.assert_called_once_with(
+            {"directory": "templates"}
+        )
+        vlc_player.background_loader.prepare_reload.assert_called_once_with(
+            directory=Path("backgrounds"),
+            background_filenames={"transition": None, "idle": None},
+        )
+
+        # assert the result
+        self.assertDictEqual(prepared["durations"], {"transition": 5})
+
+        # assert the instance was not modified
+        self.assertDictEqual(vlc_player.durations, {"transition": 10, "idle": 20})
+
+    def test_reload(self):
+        """Test to apply the templates, the backgrounds and the durations
+        """
+        # create object
+        vlc_player, _ = self.get_instance()
+        vlc_player.text_generator.reload.return_value = {"transition"}
+        vlc_player.background_loader.reload.return_value = set()
+        vlc_player.prepared_transition_texts = {42: "text"}
+
+        # call the method
+        with self.assertLogs("dakara_player_vlc.media_player", "DEBUG") as logger:
+            vlc_player.reload(
+                {
+                    "templates": "templates",
+                    "backgrounds": "backgrounds",
+                    "durations": {"transition": 5},
+                }
+            )
+
+        # assert the call
+        vlc_player.text_generator.reload.assert_called_once_with("templates")
+        vlc_player.background_loader.reload.assert_called_once_with("backgrounds")
+
+        # assert the instance
+        self.assertDictEqual(vlc_player.durations, {"transition": 5, "idle": 20})
+        self.assertDictEqual(vlc_player.prepared_transition_texts, {})
+
+        # assert the effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "INFO:dakara_player_vlc.media_player:Config reloaded, changed "
+                "templates: transition, backgrounds: none, durations: transition"
+            ],
+        )
+
+    @patch.object(VlcPlayer, "reload")
+    @patch.object(VlcPlayer, "prepare_reload")
+    def test_apply_pending_reload(self, mocked_prepare_reload, mocked_reload):
+        """Test to apply a reload only once, when requested
+        """
+        # create object
+        vlc_player, _ = self.get_instance()
+
+        # call the method without request
+        vlc_player.apply_pending_reload()
+        mocked_reload.assert_not_called()
+
+        # request a reload
+        with self.assertLogs("dakara_player_vlc.media_player", "DEBUG"):
+            vlc_player.request_reload({"durations": {}})
+
+        # assert the config was loaded but not applied yet
+        mocked_prepare_reload.assert_called_once_with({"durations": {}})
+        mocked_reload.assert_not_called()
+
+        # call the method
+        vlc_player.apply_pending_reload()
+        vlc_player.apply_pending_reload()
+
+        # assert the reload was applied once
+        mocked_reload.assert_called_once_with(mocked_prepare_reload.return_value)
+
+    @patch.object(VlcPlayer, "reload")
+    def test_request_reload_error(self, mocked_reload):
+        """Test a config that cannot be loaded is not applied
+        """
+        # create object
+        vlc_player, _ = self.get_instance()
+        error = BackgroundNotFoundError("Unable to find a background file for idle")
+        vlc_player.background_loader.prepare_reload.side_effect = error
+
+        # request a reload
+        with self.assertLogs("dakara_player_vlc.media_player", "DEBUG") as logger:
+            vlc_player.request_reload({"templates": {"directory": "templates"}})
+
+        # call the method
+        vlc_player.apply_pending_reload()
+
+        # assert the reload was not applied
+        mocked_reload.assert_not_called()
+        self.assertListEqual(
+            logger.output,
+            [
+                "ERROR:dakara_player_vlc.media_player:Unable to reload config: "
+                "Unable to find a background file for idle"
+            ],
+        )
+
 
 class VlcPlayerIntegrationTestCase(TestCase):
     """Test the VLC player class in real conditions
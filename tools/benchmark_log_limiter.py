@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import logging
+import os
+import time
+from argparse import ArgumentParser
+
+from dakara_player_vlc.log_limiter import BURST, INTERVAL, LogLimiter
+
+
+COMPONENTS = ["ffmpeg/video", "vd", "vo/gpu", "ao/pulse", "cplayer"]
+
+
+logger = logging.getLogger("benchmark")
+
+
+def get_messages(count, distinct):
+    """Create a flood of debug messages of mpv
+
+    Each message is repeated a few times, as mpv does when decoding a broken
+    file.
+    """
+    return [
+        (
+            COMPONENTS[index % len(COMPONENTS)],
+            "message {}\n".format((index // len(COMPONENTS)) % distinct),
+        )
+        for index in range(count)
+    ]
+
+
+def log_direct(messages):
+    """Log each message, as done before the log limiter
+    """
+    for component, message in messages:
+        logger.log(logging.DEBUG, f"mpv: {component}: {message}")
+
+
+def log_limited(messages, burst, interval):
+    """Log the messages through the log limiter
+    """
+    limiter = LogLimiter(logger, "mpv", burst=burst, interval=interval)
+    for component, message in messages:
+        if not logger.isEnabledFor(logging.DEBUG):
+            continue
+
+        limiter.log(logging.DEBUG, component, message.rstrip("\n"))
+
+    limiter.flush()
+
+
+def benchmark(count, distinct, burst, interval):
+    """Measure the rate of messages handled with and without the log limiter
+    """
+    messages = get_messages(count, distinct)
+
+    with open(os.devnull, "w") as file:
+        handler = logging.StreamHandler(file)
+        handler.setFormatter(
+            logging.Formatter("[%(asctime)s] %(name)s %(levelname)s %(message)s")
+        )
+        logger.addHandler(handler)
+        logger.propagate = False
+
+        for level in (logging.DEBUG, logging.INFO):
+            logger.setLevel(level)
+
+            start = time.perf_counter()
+            log_direct(messages)
+            direct_duration = time.perf_counter() - start
+
+            start = time.perf_counter()
+            log_limited(messages, burst, interval)
+            limited_duration = time.perf_counter() - start
+
+            print(
+                "{} messages, logger at {}: "
+                "{:.0f} messages/s direct, {:.0f} messages/s limited".format(
+                    count,
+                    logging.getLevelName(level),
+                    count / direct_duration,
+                    count / limited_duration,
+                )
+            )
+
+        logger.removeHandler(handler)
+
+
+def get_arg_parser():
+    """Create the parser
+    """
+    parser = ArgumentParser("Log limiter benchmark")
+
+    parser.add_argument(
+        "--messages", type=int, default=100000, help="Number of messages to log."
+    )
+
+    parser.add_argument(
+        "--distinct",
+        type=int,
+        default=1000,
+        help="Number of distinct messages of each component.",
+    )
+
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=BURST,
+        help="Maximum number of messages logged by a component within an interval.",
+    )
+
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=INTERVAL,
+        help="Duration of an interval in seconds.",
+    )
+
+    return parser
+
+
+if __name__ == "__main__":
+    parser = get_arg_parser()
+
+    args = parser.parse_args()
+
+    benchmark(args.messages, args.distinct, args.burst, args.interval)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import time
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+
+from path import Path
+
+from dakara_player_vlc.status_journal import SYNC_BATCH, StatusJournal
+
+
+def benchmark(events, sync_batch):
+    """Measure the rate of events written and acknowledged in the journal
+    """
+    with TemporaryDirectory() as directory:
+        journal = StatusJournal(
+            Path(directory) / "journal.jsonl", sync_batch=sync_batch
+        )
+        journal.load()
+
+        # append events
+        start = time.perf_counter()
+        sequences = [
+            journal.append("update_paused", [42, float(index)])
+            for index in range(events)
+        ]
+        append_duration = time.perf_counter() - start
+
+        # acknowledge events
+        start = time.perf_counter()
+        for sequence in sequences:
+            journal.ack(sequence)
+
+        ack_duration = time.perf_counter() - start
+        journal.close()
+
+    print(
+        "{} events, sync every {} lines: "
+        "{:.0f} appends/s, {:.0f} acks/s".format(
+            events, sync_batch, events / append_duration, events / ack_duration
+        )
+    )
+
+
+def get_arg_parser():
+    """Create the parser
+    """
+    parser = ArgumentParser("Status journal benchmark")
+
+    parser.add_argument(
+        "--events", type=int, default=10000, help="Number of events to write."
+    )
+
+    parser.add_argument(
+        "--sync-batch",
+        type=int,
+        default=SYNC_BATCH,
+        help="Maximum number of lines written before synchronizing the file.",
+    )
+
+    return parser
+
+
+if __name__ == "__main__":
+    parser = get_arg_parser()
+
+    args = parser.parse_args()
+
+    benchmark(args.events, args.sync_batch)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+
+# code run in a fresh interpreter for each measure
+MEASURE_CODE = """
+import resource
+import sys
+import time
+
+start = time.perf_counter()
+{statement}
+duration = time.perf_counter() - start
+
+print(
+    duration,
+    resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    int("vlc" in sys.modules),
+    int("mpv" in sys.modules),
+    int("pkg_resources" in sys.modules),
+)
+"""
+
+STATEMENTS = {
+    "package": "import dakara_player_vlc",
+    "command": "import dakara_player_vlc.commands.play",
+    "worker": "import dakara_player_vlc.dakara_player_vlc",
+    "vlc backend": (
+        "from dakara_player_vlc.media_player import get_media_player_class; "
+        "get_media_player_class('vlc')"
+    ),
+}
+
+
+def measure(statement, repeat):
+    """Measure the import time and memory of a statement
+
+    Each measure is done in a new interpreter, and the best one is kept.
+    """
+    results = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", MEASURE_CODE.format(statement=statement)],
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout.split()
+        results.append(
+            (float(output[0]), int(output[1]), *(bool(int(v)) for v in output[2:]))
+        )
+
+    return min(results)
+
+
+def get_arg_parser():
+    """Create the parser
+    """
+    parser = ArgumentParser("Startup import time and memory measure")
+
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Number of measures for each import."
+    )
+
+    return parser
+
+
+def main():
+    args = get_arg_parser().parse_args()
+
+    for name, statement in STATEMENTS.items():
+        duration, max_rss, vlc, mpv, pkg_resources = measure(statement, args.repeat)
+        print(
+            "{}: {:.0f} ms, {:.1f} MiB max RSS, loaded: {}".format(
+                name,
+                duration * 1000,
+                max_rss / 1024,
+                ", ".join(
+                    module
+                    for module, loaded in (
+                        ("vlc", vlc),
+                        ("mpv", mpv),
+                        ("pkg_resources", pkg_resources),
+                    )
+                    if loaded
+                )
+                or "none",
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()